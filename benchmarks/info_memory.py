@@ -0,0 +1,139 @@
+"""
+Benchmark memory held per job in a long batch session
+
+Builds synthetic extraction results shaped like a YouTube watch page
+(~70 formats with URLs, HTTP headers and fragment lists, thumbnails,
+subtitle and automatic-caption tracks in many languages) and measures,
+with tracemalloc, what stays alive when a session keeps one entry per job:
+
+- full:   the complete info dict (what a job held before)
+- slim:   slim_info() with only the selected formats (held while downloading)
+- record: VideoRecord (held after format selection)
+
+Usage:
+    python benchmarks/info_memory.py [--jobs 1000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from simple_yt_dlp.download.records import VideoRecord, selected_format_ids, slim_info
+
+LANGS = [f"{a}{b}" for a in "abcdefghij" for b in "abcdefghijklmno"]
+
+
+def _token(n: int) -> str:
+    return random.randbytes((n + 1) // 2).hex()[:n]
+
+
+# Random pieces are pre-generated; every URL is still a distinct string object
+_SIGS = [_token(120) for _ in range(64)]
+_PARAMS = [_token(400) for _ in range(64)]
+_serial = iter(range(10**12))
+
+
+def _url(video_id: str) -> str:
+    n = next(_serial)
+    return (f"https://rr{n % 9}---sn-{n:08x}.googlevideo.com/videoplayback"
+            f"?expire=1700000000&id={video_id}&sig={_SIGS[n % 64]}&n={n:016x}"
+            f"&{_PARAMS[n * 7 % 64]}")
+
+
+def _headers() -> dict:
+    return {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-us,en;q=0.5",
+        "Sec-Fetch-Mode": "navigate",
+    }
+
+
+def make_info(index: int) -> dict:
+    """A synthetic, processed info dict with a merged format selected"""
+    video_id = f"{index:011d}"[-11:]
+    formats = []
+    for n in range(70):
+        is_audio = n < 10
+        fmt = {
+            "format_id": str(100 + n),
+            "format_note": "medium" if is_audio else f"{144 * (1 + n % 8)}p",
+            "ext": "m4a" if is_audio else "mp4",
+            "protocol": "https" if n % 3 else "m3u8_native",
+            "acodec": "mp4a.40.2" if is_audio else "none",
+            "vcodec": "none" if is_audio else "avc1.64001F",
+            "url": _url(video_id),
+            "width": None if is_audio else 256 * (1 + n % 8),
+            "height": None if is_audio else 144 * (1 + n % 8),
+            "fps": None if is_audio else 30,
+            "tbr": random.uniform(50, 5000),
+            "filesize": random.randint(10**6, 10**9),
+            "http_headers": _headers(),
+            "downloader_options": {"http_chunk_size": 10485760},
+        }
+        if fmt["protocol"] == "m3u8_native":
+            fmt["fragments"] = [{"url": _url(video_id), "duration": 5.0} for _ in range(20)]
+        formats.append(fmt)
+
+    def tracks(langs):
+        return {
+            lang: [{"ext": ext, "url": _url(video_id), "name": lang}
+                   for ext in ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")]
+            for lang in langs
+        }
+
+    info = {
+        "id": video_id,
+        "title": f"Video {index} " + _token(40),
+        "duration": random.randint(60, 7200),
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "description": _token(3000),
+        "tags": [_token(10) for _ in range(30)],
+        "formats": formats,
+        "thumbnails": [{"url": f"https://i.ytimg.com/vi/{video_id}/{n}.jpg", "preference": n}
+                       for n in range(40)],
+        "subtitles": tracks(LANGS[:3]),
+        "automatic_captions": tracks(LANGS),
+        "heatmap": [{"start_time": t, "end_time": t + 1, "value": random.random()}
+                    for t in range(100)],
+    }
+    info["requested_formats"] = [formats[-1], formats[0]]
+    return info
+
+
+def retained(build, jobs: int) -> int:
+    """Bytes still allocated after a session that keeps build(info) for every job"""
+    gc.collect()
+    tracemalloc.start()
+    held = []
+    for index in range(jobs):
+        info = make_info(index)
+        held.append(build(info))
+        del info
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=1000)
+    args = parser.parse_args()
+
+    variants = {
+        "full": lambda info: info,
+        "slim": lambda info: slim_info(info, selected_format_ids(info)),
+        "record": lambda info: VideoRecord.from_info(info, "mp4_best"),
+    }
+    print(f"{args.jobs} jobs")
+    print(f"{'variant':<8} {'retained':>12} {'per job':>10}")
+    for name, build in variants.items():
+        random.seed(0)
+        size = retained(build, args.jobs)
+        print(f"{name:<8} {size / 2**20:>9.1f} MB {size / args.jobs / 1024:>7.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark the ranged-download write path
+
+Compares the previous write path (truncate + 64 KiB seek/write per worker,
+no fsync until the caller closes) with OutputFile (fallocate, per-range
+write buffers, batched fsync, optional page-cache drop) for a file written
+by several threads in interleaved ranges, the way RangedDownloader does.
+
+Reported per variant:
+- wall time until the data is durable (a final fsync is included for all)
+- write syscalls
+- on-disk extents (filefrag, when available)
+- page cache still held by the file afterwards (mincore via fincore, when available)
+
+Usage:
+    python benchmarks/write_path.py [--size-mib 512] [--workers 4] [--dir /tmp]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from simple_yt_dlp.download.writer import OutputFile, WriteOptions
+
+MIB = 1024 * 1024
+CHUNK = 64 * 1024  # RangedDownloader READ_SIZE
+
+
+def _ranges(size: int, workers: int) -> list[tuple[int, int]]:
+    step = size // workers
+    return [(i * step, size if i == workers - 1 else (i + 1) * step) for i in range(workers)]
+
+
+def _run_threads(target, ranges) -> None:
+    threads = [threading.Thread(target=target, args=r) for r in ranges]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def legacy(path: Path, size: int, workers: int, block: bytes) -> int:
+    """Previous behaviour: truncate, then one file object per worker"""
+    calls = [0]
+    lock = threading.Lock()
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+    def fill(start, end):
+        n = 0
+        with open(path, "r+b") as f:
+            for pos in range(start, end, CHUNK):
+                f.seek(pos)
+                f.write(block[:min(CHUNK, end - pos)])
+                n += 1
+            f.flush()
+            os.fsync(f.fileno())
+        with lock:
+            calls[0] += n
+
+    _run_threads(fill, _ranges(size, workers))
+    return calls[0]
+
+
+def buffered(path: Path, size: int, workers: int, block: bytes, options: WriteOptions) -> int:
+    """OutputFile with per-range buffers"""
+    with OutputFile(path, size, options) as output:
+        def fill(start, end):
+            writer = output.writer(start)
+            for pos in range(start, end, CHUNK):
+                writer.write(block[:min(CHUNK, end - pos)])
+            writer.flush()
+
+        _run_threads(fill, _ranges(size, workers))
+        output.sync()
+    return output.stats["writes"]
+
+
+def _extents(path: Path) -> str:
+    if not shutil.which("filefrag"):
+        return "n/a"
+    out = subprocess.run(["filefrag", str(path)], capture_output=True, text=True).stdout
+    return out.rsplit(":", 1)[-1].split()[0] if ":" in out else "n/a"
+
+
+def _cached(path: Path) -> str:
+    if not shutil.which("fincore"):
+        return "n/a"
+    out = subprocess.run(["fincore", "-nb", "-o", "RES", str(path)],
+                         capture_output=True, text=True).stdout.strip()
+    return f"{int(out) // MIB} MiB" if out.isdigit() else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mib", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--dir", default=None, help="directory on the filesystem to test")
+    args = parser.parse_args()
+
+    size = args.size_mib * MIB
+    block = os.urandom(CHUNK)
+    variants = [
+        ("legacy 64K seek/write", lambda p: legacy(p, size, args.workers, block)),
+        ("buffered 1M", lambda p: buffered(p, size, args.workers, block, WriteOptions())),
+        ("buffered 1M, sparse", lambda p: buffered(
+            p, size, args.workers, block, WriteOptions(sparse=True))),
+        ("buffered 1M, drop cache", lambda p: buffered(
+            p, size, args.workers, block, WriteOptions(drop_cache=True))),
+    ]
+
+    print(f"{args.size_mib} MiB, {args.workers} workers")
+    print(f"{'variant':<26}{'MiB/s':>8}{'writes':>9}{'extents':>9}{'cached':>10}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for name, run in variants:
+            path = Path(tmp) / "bench.bin"
+            start = time.perf_counter()
+            writes = run(path)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<26}{size / MIB / elapsed:>8.0f}{writes:>9}"
+                  f"{_extents(path):>9}{_cached(path):>10}")
+            path.unlink()
+
+
+if __name__ == "__main__":
+    main()
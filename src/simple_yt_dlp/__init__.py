@@ -7,6 +7,13 @@ A beautiful TUI application for downloading YouTube videos with privacy by desig
 
 __version__ = "1.0.0"
 
-from .app import PrivacyYouTubeDownloader
-
 __all__ = ["PrivacyYouTubeDownloader", "__version__"]
+
+
+def __getattr__(name: str):
+    # 延迟导入 TUI：守护进程客户端等命令行入口不需要加载 Textual
+    if name == "PrivacyYouTubeDownloader":
+        from .app import PrivacyYouTubeDownloader
+
+        return PrivacyYouTubeDownloader
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
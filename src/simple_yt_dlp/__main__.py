@@ -1,11 +1,298 @@
 """
 主入口点 - Main entry point for pip install command
+
+不带子命令时启动 TUI；子命令用于运行守护进程或作为其轻量客户端：
+
+    simple-yt-dlp daemon [--jobs N] [--processes] [--log-json] [--deadline T] [--budget SIZE]
+                         [--simulate [PROFILE]]
+    simple-yt-dlp submit URL [URL ...] [-f FORMAT] [-d DIR] [--wait]
+
+格式 "auto" 由守护进程按 --deadline（"2h"、"23:30"）和 --budget（"20G"）
+在每个任务开始时选择放得下的最高画质。--simulate 使用不访问网络的模拟
+后端（合成文件写入临时目录），用于对队列和界面做压力测试。
+    simple-yt-dlp list | cancel ID | watch [ID] | stop
+
+多个进程或主机可通过共享目录中的同一个 SQLite 队列协作（租约协议）：
+
+    simple-yt-dlp queue worker DB [--jobs N]
+    simple-yt-dlp queue add DB URL [URL ...] [-f FORMAT] [-d DIR]
+    simple-yt-dlp queue list DB | queue cancel DB ID
 """
-from .app import PrivacyYouTubeDownloader
+import argparse
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def _build_core(simulation=None):
+    """
+    按用户配置创建下载核心（与 TUI 使用相同的目录、Cookie、FFmpeg 和去重存储）
+
+    Args:
+        simulation: SimulationProfile；指定时使用模拟后端，合成文件写入临时目录
+    """
+    from .config import Config
+    from .download import DownloadCore
+    from .download.store import ContentStore
+
+    if simulation is not None:
+        from .download.simulate import SimulatedBackend
+
+        return DownloadCore(
+            download_dir=Path(tempfile.mkdtemp(prefix="simple-yt-dlp-sim-")),
+            use_connection_pool=False,
+            backend=SimulatedBackend(simulation),
+        )
+    config = Config()
+    download_dir = config.download_dir or Path.home() / "Downloads" / "PrivateDownloads"
+    download_dir.mkdir(parents=True, exist_ok=True)
+    return DownloadCore(
+        download_dir=download_dir,
+        ffmpeg_location=shutil.which("ffmpeg"),
+        cookie_file=config.cookie_file,
+        store=ContentStore(config.store_dir) if config.store_dir else None,
+        staging_dir=config.staging_dir,
+        staging_limit=config.staging_limit,
+        streaming=config.streaming,
+        transcode_preset=config.transcode_preset,
+    )
+
+
+def _format_job(job: dict) -> str:
+    """格式化任务为一行文本"""
+    progress = job.get("progress") or {}
+    total = progress.get("total_bytes") or progress.get("total_bytes_estimate")
+    percent = ""
+    if total and progress.get("downloaded_bytes") is not None:
+        percent = f" {progress['downloaded_bytes'] / total * 100:5.1f}%"
+    detail = job.get("error") or job.get("title") or job["url"]
+    return f"#{job['id']:<4} {job['state']:<9}{percent} {job['format']:<10} {detail}"
+
+
+def _watch(client, job_id: Optional[int]) -> int:
+    """打印任务事件，返回退出码（指定任务失败时为 1）"""
+    state = None
+    for event in client.watch(job_id):
+        if event["event"] == "job":
+            state = event["job"]["state"]
+            print(_format_job(event["job"]), flush=True)
+        elif event["event"] == "status":
+            print(f"#{event['id']:<4} {event['message']}", flush=True)
+        elif event["event"] == "progress":
+            progress = event["progress"]
+            total = progress.get("total_bytes") or progress.get("total_bytes_estimate")
+            if total:
+                percent = progress.get("downloaded_bytes", 0) / total * 100
+                print(f"\r#{event['id']:<4} {percent:5.1f}%", end="", file=sys.stderr, flush=True)
+    return 0 if state in (None, "done") else 1
+
+
+def _submit(client, args: argparse.Namespace) -> int:
+    """规范化并去重 URL 后逐个提交，返回退出码（有无效 URL 或任务失败时为 1）"""
+    from .utils import normalize_youtube_urls
+
+    batch = normalize_youtube_urls(args.url)
+    for _, item in batch.errors:
+        print(f"skipped {item.source!r}: {item.error}", file=sys.stderr)
+    for index, first in batch.duplicates:
+        print(f"skipped {args.url[index]!r}: duplicate of {first.url}", file=sys.stderr)
+
+    jobs = []
+    for item in batch.items:
+        job = client.submit(item.url, args.format, args.directory)
+        print(_format_job(job))
+        jobs.append(job)
+
+    status = 1 if batch.errors else 0
+    if args.wait:
+        for job in jobs:
+            status = max(status, _watch(client, job["id"]))
+    return status
+
+
+def _run_queue(args: argparse.Namespace) -> int:
+    """执行共享队列子命令"""
+    import threading
 
+    from .download.jobs import parse_formats
+    from .download.leases import LeaseQueue, LeaseWorker, default_worker_id
+    from .download.quality import AUTO
+    from .utils import normalize_youtube_urls
 
-def main() -> None:
+    queue = LeaseQueue(args.db)
+    if args.action == "add":
+        try:
+            if parse_formats(args.format) == [AUTO]:
+                raise ValueError("format 'auto' is only available on the daemon")
+        except ValueError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        batch = normalize_youtube_urls(args.url)
+        for _, item in batch.errors:
+            print(f"skipped {item.source!r}: {item.error}", file=sys.stderr)
+        for item in batch.items:
+            job_id = queue.submit(item.url, args.format, args.directory)
+            print(f"#{job_id:<4} queued    {args.format:<10} {item.url}")
+        return 1 if batch.errors else 0
+    if args.action == "list":
+        for job in queue.list():
+            print(_format_job(job))
+        return 0
+    if args.action == "cancel":
+        if not queue.cancel(args.id):
+            print(f"job #{args.id} is not pending", file=sys.stderr)
+            return 1
+        return 0
+
+    from .utils import setup_logging
+
+    setup_logging(json_lines=args.log_json or None)
+    core = _build_core()
+    workers = [LeaseWorker(queue, core, default_worker_id(n)) for n in range(args.jobs)]
+    threads = [threading.Thread(target=w.run, name=w.worker_id) for w in workers]
+    for thread in threads:
+        thread.start()
+    print(f"{len(workers)} worker(s) on {args.db}; Ctrl+C to stop", file=sys.stderr)
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        # 正在执行的任务保留租约，过期后由其他工作者重试
+        for worker in workers:
+            worker.stop()
+        for thread in threads:
+            thread.join()
+    return 0
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    """执行子命令"""
+    from .daemon import DaemonClient, DaemonError
+
+    if args.command == "queue":
+        return _run_queue(args)
+    if args.command == "daemon":
+        from .daemon.server import run_daemon
+        from .download.quality import QualityPlanner
+        from .utils import setup_logging
+
+        setup_logging(json_lines=args.log_json or None)
+        planner = QualityPlanner(deadline=args.deadline, budget=args.budget)
+        core = _build_core(args.simulate)
+        if args.simulate is not None:
+            print(f"simulating downloads ({args.simulate!r}) into {core.download_dir}",
+                  file=sys.stderr)
+        try:
+            run_daemon(core, socket_path=args.socket, max_concurrent=args.jobs,
+                       processes=args.processes, planner=planner)
+        except DaemonError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    client = DaemonClient(args.socket)
+    try:
+        if args.command == "submit":
+            return _submit(client, args)
+        if args.command == "list":
+            for job in client.list():
+                print(_format_job(job))
+            return 0
+        if args.command == "cancel":
+            if not client.cancel(args.id):
+                print(f"job #{args.id} is not running", file=sys.stderr)
+                return 1
+            return 0
+        if args.command == "watch":
+            return _watch(client, args.id)
+        if args.command == "stop":
+            client.shutdown()
+            return 0
+    except DaemonError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _simulation_profile(text: str):
+    """解析 --simulate 的配置（按需导入模拟后端）"""
+    from .download.simulate import SimulationProfile
+
+    try:
+        return SimulationProfile.parse(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def _parse_args(argv: Optional[list[str]]) -> argparse.Namespace:
+    from .download.quality import parse_deadline, parse_size
+
+    parser = argparse.ArgumentParser(prog="simple-yt-dlp")
+    parser.add_argument("--socket", type=Path, default=None, help="daemon control socket")
+    sub = parser.add_subparsers(dest="command")
+
+    daemon = sub.add_parser("daemon", help="run the resident download engine")
+    daemon.add_argument("--jobs", type=int, default=2, help="concurrent downloads")
+    daemon.add_argument("--processes", action="store_true",
+                        help="run each download slot in its own warm worker process")
+    daemon.add_argument("--log-json", action="store_true",
+                        help="also write JSON-lines logs tagged with job ids")
+    daemon.add_argument("--deadline", type=parse_deadline, default=None,
+                        help="finish 'auto' jobs by then: a duration (90m, 2h) or a time (23:30)")
+    daemon.add_argument("--budget", type=parse_size, default=None,
+                        help="total bytes 'auto' jobs may download, e.g. 20G")
+    daemon.add_argument("--simulate", type=_simulation_profile, nargs="?", const="",
+                        default=None, metavar="PROFILE",
+                        help="load-test without the network using synthetic downloads, "
+                             "e.g. seed=7,rate=1M-8M,link=200M,403=0.05,stall=0.05,size=0.01")
+
+    submit = sub.add_parser("submit", help="queue a download on the daemon")
+    submit.add_argument("url", nargs="+", help="video URLs (duplicates are skipped)")
+    submit.add_argument("-f", "--format", default="mp4_720p",
+                        help="format id ('auto' lets the daemon pick the quality); "
+                             "comma-separate several to fan out one fetch")
+    submit.add_argument("-d", "--directory", type=Path, default=None)
+    submit.add_argument("--wait", action="store_true", help="follow progress until done")
+
+    sub.add_parser("list", help="list daemon jobs")
+    cancel = sub.add_parser("cancel", help="cancel a job")
+    cancel.add_argument("id", type=int)
+    watch = sub.add_parser("watch", help="stream job events")
+    watch.add_argument("id", type=int, nargs="?")
+    sub.add_parser("stop", help="stop the daemon")
+
+    queue = sub.add_parser("queue", help="work on a job queue shared by several processes")
+    actions = queue.add_subparsers(dest="action", required=True)
+    worker = actions.add_parser("worker", help="claim and run jobs from the queue")
+    worker.add_argument("db", type=Path, help="queue database on a shared filesystem")
+    worker.add_argument("--jobs", type=int, default=1, help="concurrent downloads")
+    worker.add_argument("--log-json", action="store_true",
+                        help="also write JSON-lines logs tagged with job ids")
+    add = actions.add_parser("add", help="queue downloads")
+    add.add_argument("db", type=Path)
+    add.add_argument("url", nargs="+", help="video URLs (duplicates are skipped)")
+    add.add_argument("-f", "--format", default="mp4_720p",
+                     help="format id; comma-separate several to fan out one fetch")
+    add.add_argument("-d", "--directory", type=Path, default=None)
+    listing = actions.add_parser("list", help="list queued and finished jobs")
+    listing.add_argument("db", type=Path)
+    drop = actions.add_parser("cancel", help="cancel a pending or running job")
+    drop.add_argument("db", type=Path)
+    drop.add_argument("id", type=int)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
     """主入口点 - 被 pip install 后的命令调用"""
+    args = _parse_args(argv)
+    if args.command:
+        sys.exit(_run_command(args))
+
+    from .app import PrivacyYouTubeDownloader
+
     app = PrivacyYouTubeDownloader()
     app.run()
 
@@ -2,7 +2,9 @@
 Main Application - 主应用类
 Privacy-Focused YouTube Downloader Application
 """
+import itertools
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -13,7 +15,10 @@ from textual.containers import Horizontal, ScrollableContainer, Vertical
 from textual.widgets import Button, Footer, Input, Label, ProgressBar, Select, Static
 
 from .config import Config
+from .daemon import DaemonClient, DaemonError
 from .download import DownloadCore
+from .download.admission import RESERVE_MARGIN, format_size
+from .download.cancel import CancelToken
 from .download.formats import (
     FFMPEG_REQUIRED_FORMATS,
     FORMAT_NAMES,
@@ -21,6 +26,11 @@ from .download.formats import (
     get_available_formats,
     get_format_config,
 )
+from .download.monitor import JobMonitor
+from .download.prefetch import Prefetcher
+from .download.store import ContentStore
+from .download.warmup import WarmUp, start_warm_up
+from .screens.dashboard import DashboardScreen
 from .screens.directory import DirectorySelector
 from .screens.doctor import DoctorScreen
 from .styles import CSS
@@ -42,6 +52,7 @@ class PrivacyYouTubeDownloader(App):
         Binding("ctrl+d", "clear", "Clear Form", show=True),
         Binding("ctrl+s", "select_directory", "Select Directory", show=True),
         Binding("f1", "show_doctor", "Doctor", show=True),
+        Binding("f2", "show_dashboard", "Dashboard", show=True),
     ]
 
     def __init__(self):
@@ -51,7 +62,10 @@ class PrivacyYouTubeDownloader(App):
 
         # 应用状态
         self.is_downloading = False
+        self.cancel_token: Optional[CancelToken] = None
         self.download_history = []
+        # 当前下载已校验的输出（文件名、校验和、时长），完成后写入历史记录
+        self.verified_outputs: list[dict] = []
         self.download_dir = Path.home() / "Downloads" / "PrivateDownloads"
         self.last_format = "mp4_best"
 
@@ -74,8 +88,26 @@ class PrivacyYouTubeDownloader(App):
             ffmpeg_location=self.ffmpeg_location if self.ffmpeg_available else None,
             cookie_file=self.cookie_manager.cookie_path,
             progress_callback=self._progress_hook,
+            store=ContentStore(self.config.store_dir) if self.config.store_dir else None,
+            staging_dir=self.config.staging_dir,
+            staging_limit=self.config.staging_limit,
+            streaming=self.config.streaming,
+            transcode_preset=self.config.transcode_preset,
         )
 
+        # 输入 URL 时在后台预提取视频信息，下载时直接使用
+        self.prefetcher = Prefetcher(
+            self.download_core.extract_raw_info, self.download_core.info_cache
+        )
+
+        # 任务面板的共享状态：本地下载和守护进程的任务事件都汇总到这里
+        self.monitor = JobMonitor()
+        self._local_job_ids = itertools.count(1)
+        self._daemon_watch: Optional[threading.Thread] = None
+
+        # 下载引擎预热（挂载后在后台进行，第一次下载前等待就绪）
+        self.warmup: Optional[WarmUp] = None
+
         self.logger.info(f"应用初始化完成 (FFmpeg: {self.ffmpeg_available})")
 
     def _load_config(self) -> None:
@@ -173,6 +205,7 @@ class PrivacyYouTubeDownloader(App):
 
     def on_mount(self) -> None:
         """应用挂载时的初始化"""
+        self.warmup = start_warm_up(self.download_core.warm_up)
         self.query_one("#progress_bar").display = False
         self.query_one("#url_input").focus()
         self.update_history_display()
@@ -185,6 +218,34 @@ class PrivacyYouTubeDownloader(App):
             )
             self.logger.warning("FFmpeg 未检测到，部分格式不可用")
 
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """URL 输入变化时安排预提取（防抖）"""
+        if event.input.id != "url_input" or self.is_downloading:
+            return
+        self.query_one("#title", Static).update("")
+        url = event.value.strip()
+        if validate_youtube_url(url)[0]:
+            self.prefetcher.schedule(url, self._prefetch_ready)
+        else:
+            self.prefetcher.cancel()
+
+    def _prefetch_ready(self, url: str, raw_info: dict) -> None:
+        """预提取完成（后台线程）：显示标题和所选格式的大小"""
+        try:
+            title, size = self.download_core.preview(raw_info, self.last_format)
+        except Exception as e:
+            self.logger.debug(f"预览失败: {e}")
+            return
+        text = f"🎬 {title}"
+        if size:
+            text += f"  ·  ~{format_size(size)}"
+        self.call_from_thread(self._show_preview, url, text)
+
+    def _show_preview(self, url: str, text: str) -> None:
+        """仅当输入框仍是该 URL 时显示预览"""
+        if self.query_one("#url_input", Input).value.strip() == url:
+            self.query_one("#title", Static).update(text)
+
     def on_input_submitted(self, event: Input.Submitted) -> None:
         """处理输入提交"""
         if not self.is_downloading:
@@ -207,6 +268,10 @@ class PrivacyYouTubeDownloader(App):
             # 保存格式选择到配置
             self.config.last_format = event.value
             self.last_format = event.value
+            # 重新计算预览中的大小（预提取结果已缓存，不会再次提取）
+            url = self.query_one("#url_input", Input).value.strip()
+            if not self.is_downloading and validate_youtube_url(url)[0]:
+                self.prefetcher.schedule(url, self._prefetch_ready)
 
     def action_select_directory(self) -> None:
         """打开目录选择对话框"""
@@ -223,8 +288,32 @@ class PrivacyYouTubeDownloader(App):
             ffmpeg_path=self.ffmpeg_location,
             config_path=self.config.config_path,
             download_dir=self.download_dir,
+            pool_stats=self.download_core.connection_stats(),
         ))
 
+    def action_show_dashboard(self) -> None:
+        """显示任务面板"""
+        self._watch_daemon()
+        self.push_screen(DashboardScreen(self.monitor))
+
+    def _watch_daemon(self) -> None:
+        """有守护进程在运行时，在后台把它的所有任务事件汇总到任务面板"""
+        if self._daemon_watch is not None and self._daemon_watch.is_alive():
+            return
+        client = DaemonClient()
+        if not client.available():
+            return
+
+        def run() -> None:
+            try:
+                for event in client.watch():
+                    self.monitor.apply(event)
+            except (DaemonError, OSError) as e:
+                self.logger.debug(f"任务面板停止接收守护进程事件: {e}")
+
+        self._daemon_watch = threading.Thread(target=run, name="dashboard-watch", daemon=True)
+        self._daemon_watch.start()
+
     def directory_selected(self, path: Optional[Path]) -> None:
         """目录选择回调"""
         if path:
@@ -245,6 +334,10 @@ class PrivacyYouTubeDownloader(App):
 
             self.notify(f"Directory set to: {path}", severity="information")
 
+            free = shutil.disk_usage(path).free
+            if free < RESERVE_MARGIN:
+                self.notify(f"⚠️ 磁盘剩余空间不足: {format_size(free)}", severity="warning")
+
     def action_start_download(self) -> None:
         """开始下载"""
         url = self.query_one("#url_input", Input).value.strip()
@@ -259,8 +352,8 @@ class PrivacyYouTubeDownloader(App):
             self.query_one("#status", Static).update("⚠️ Already downloading a video")
             return
 
-        # 重置 UI
-        self.query_one("#title", Static).update("")
+        # 重置 UI（保留预提取得到的标题和大小）
+        self.prefetcher.cancel()
         self.query_one("#status", Static).update("⏳ Initializing secure download...")
         progress_bar = self.query_one("#progress_bar", ProgressBar)
         progress_bar.display = True
@@ -272,9 +365,12 @@ class PrivacyYouTubeDownloader(App):
         self.query_one("#clear_btn", Button).disabled = True
         self.query_one("#cancel_btn", Button).display = True
         self.is_downloading = True
+        self.cancel_token = CancelToken()
 
         # 异步执行下载
-        self.run_worker(self._download_video(url), thread=True, exclusive=True)
+        self.run_worker(
+            self._download_video(url, self.cancel_token), thread=True, exclusive=True
+        )
 
     def action_clear(self) -> None:
         """清除所有 UI 元素"""
@@ -296,11 +392,12 @@ class PrivacyYouTubeDownloader(App):
 
     def action_cancel_download(self) -> None:
         """取消正在进行的下载"""
-        if self.is_downloading:
+        if self.is_downloading and self.cancel_token is not None:
             self.query_one("#status", Static).update("🛑 Canceling download...")
-            self.is_downloading = False
+            # 下载线程在下一个数据块处退出，ffmpeg 子进程被直接终止
+            self.cancel_token.cancel()
 
-    async def _download_video(self, url: str) -> None:
+    async def _download_video(self, url: str, cancel_token: CancelToken) -> None:
         """执行下载"""
         format_id = self.query_one("#format_select", Select).value
 
@@ -311,20 +408,50 @@ class PrivacyYouTubeDownloader(App):
                 msg
             )
 
-        success, title, error = await self.download_core.download(
-            url=url,
-            format_id=format_id,
-            info_callback=info_callback,
-        )
+        self.verified_outputs = []
 
-        if self.is_downloading:  # 检查是否被取消
+        # 有守护进程在运行时作为客户端提交，共享其常驻的下载引擎
+        client = DaemonClient()
+        if client.available():
+            success, title, error = self._download_via_daemon(
+                client, url, format_id, info_callback, cancel_token
+            )
+        else:
+            job_id = f"L{next(self._local_job_ids)}"
+            job = {"id": job_id, "url": url, "format": format_id, "state": "running"}
+            self.monitor.apply({"event": "job", "job": job})
+
+            def progress_callback(d: dict) -> None:
+                self.monitor.apply({"event": "progress", "id": job_id, "progress": d})
+                self._progress_hook(d)
+
+            if self.warmup is not None and not self.warmup.ready:
+                info_callback("⏳ 正在初始化下载引擎...")
+                await self.warmup.wait_async()
+            success, title, error = await self.download_core.download(
+                url=url,
+                format_id=format_id,
+                info_callback=info_callback,
+                cancel_token=cancel_token,
+                progress_callback=progress_callback,
+            )
+            state = "cancelled" if cancel_token.cancelled else "done" if success else "failed"
+            self.monitor.apply({"event": "job", "job": dict(job, state=state, title=title)})
+
+        if cancel_token.cancelled:
+            self.call_from_thread(
+                self.query_one("#status", Static).update,
+                "🛑 Download cancelled"
+            )
+        elif self.is_downloading:
             if success:
                 # 添加到历史记录
                 self.download_history.append({
                     "title": title,
                     "timestamp": datetime.now(),
                     "status": "success",
-                    "path": self.download_dir
+                    "path": self.download_dir,
+                    "outputs": list(self.verified_outputs),
                 })
                 self.call_from_thread(self.update_history_display)
 
@@ -351,9 +478,50 @@ class PrivacyYouTubeDownloader(App):
 
         self.call_from_thread(self._download_complete)
 
+    def _download_via_daemon(
+        self,
+        client: DaemonClient,
+        url: str,
+        format_id: str,
+        info_callback,
+        cancel_token: CancelToken,
+    ) -> tuple[bool, str, Optional[str]]:
+        """通过守护进程下载，把任务事件转换为本地的状态和进度更新"""
+        try:
+            job = client.submit(url, format_id, self.download_dir)
+            job_id = job["id"]
+            self.logger.info(f"已提交到守护进程: 任务 #{job_id}")
+
+            def cancel_job() -> None:
+                # 取消回调在 UI 线程中执行，不能等待守护进程响应，在后台发送请求
+                def run() -> None:
+                    try:
+                        client.cancel(job_id)
+                    except (DaemonError, OSError) as e:
+                        self.logger.warning(f"⚠️ 取消守护进程任务失败: {e}")
+
+                threading.Thread(target=run, name=f"daemon-cancel-{job_id}", daemon=True).start()
+
+            unregister = cancel_token.add_callback(cancel_job)
+            try:
+                for event in client.watch(job["id"]):
+                    if event["event"] == "status":
+                        info_callback(event["message"])
+                    elif event["event"] == "progress":
+                        self._progress_hook(event["progress"])
+                    elif event["event"] == "job":
+                        job = event["job"]
+            finally:
+                unregister()
+        except DaemonError as e:
+            return False, "", str(e)
+        self.verified_outputs = job.get("outputs") or []
+        return job["state"] == "done", job.get("title") or "", job.get("error")
+
     def _download_complete(self) -> None:
         """下载完成后重置 UI"""
         self.is_downloading = False
+        self.cancel_token = None
         self.query_one("#url_input", Input).disabled = False
         self.query_one("#download_btn", Button).disabled = False
         self.query_one("#clear_btn", Button).disabled = False
@@ -402,6 +570,9 @@ class PrivacyYouTubeDownloader(App):
                 status_text
             )
 
+        elif d["status"] == "verified":
+            self.verified_outputs.append(d)
+
         elif d["status"] == "finished":
             self.call_from_thread(
                 self.query_one("#progress_bar", ProgressBar).update,
@@ -429,6 +600,9 @@ class PrivacyYouTubeDownloader(App):
 
             if item["status"] == "success":
                 history_text = f"{status_icon} {timestamp} | {item['title']}"
+                if item.get("outputs"):
+                    # 校验和前缀（完整值保存在历史记录中）
+                    history_text += f" | {item['outputs'][0]['checksum'][:15]}"
             else:
                 history_text = f"{status_icon} {timestamp} | {item.get('error', 'Download failed')}"
 
@@ -438,6 +612,8 @@ class PrivacyYouTubeDownloader(App):
         """退出应用"""
         if self.is_downloading:
             self.notify("⚠️ Download in progress. Press Ctrl+C again to force quit.", severity="warning")
+            if self.cancel_token is not None:
+                self.cancel_token.cancel()
             self.is_downloading = False
         else:
             self.exit()
@@ -23,6 +23,11 @@ class Config:
     - download_dir: 下载目录路径
     - last_format: 上次选择的格式
     - cookie_file: Cookie 文件路径（可选）
+    - store_dir: 去重存储目录（可选，设置后同一视频和格式只下载一次）
+    - staging_dir: 暂存目录（可选，进行中的文件和中间文件写在这里）
+    - staging_limit: 暂存目录的容量上限（可选，字节数或 "8G" 这样的字符串）
+    - streaming: 是否边下载边合并/转码（可选，默认 false）
+    - transcode_preset: 编码预设 fast / balanced / small（可选，默认 balanced）
     """
 
     def __init__(self, config_path: Optional[Path] = None):
@@ -133,6 +138,68 @@ class Config:
         """设置 Cookie 文件路径"""
         self.set("cookie_file", str(path))
 
+    @property
+    def store_dir(self) -> Optional[Path]:
+        """获取去重存储目录"""
+        path_str = self.get("store_dir")
+        return Path(path_str).expanduser() if path_str else None
+
+    @store_dir.setter
+    def store_dir(self, path: Path) -> None:
+        """设置去重存储目录"""
+        self.set("store_dir", str(path))
+
+    @property
+    def staging_dir(self) -> Optional[Path]:
+        """获取暂存目录"""
+        path_str = self.get("staging_dir")
+        return Path(path_str).expanduser() if path_str else None
+
+    @staging_dir.setter
+    def staging_dir(self, path: Path) -> None:
+        """设置暂存目录"""
+        self.set("staging_dir", str(path))
+
+    @property
+    def staging_limit(self) -> Optional[int]:
+        """获取暂存目录的容量上限（字节，无法解析时忽略）"""
+        value = self.get("staging_limit")
+        if value is None or isinstance(value, int):
+            return value
+        from ..download.quality import parse_size
+
+        try:
+            return parse_size(str(value))
+        except ValueError:
+            logger.warning(f"无效的 staging_limit: {value!r}")
+            return None
+
+    @property
+    def streaming(self) -> bool:
+        """获取是否边下载边合并/转码"""
+        return bool(self.get("streaming", False))
+
+    @streaming.setter
+    def streaming(self, enabled: bool) -> None:
+        """设置是否边下载边合并/转码"""
+        self.set("streaming", bool(enabled))
+
+    @property
+    def transcode_preset(self) -> str:
+        """获取编码预设（无效时使用默认预设）"""
+        from ..download.transcode import DEFAULT_PRESET, PRESETS
+
+        value = self.get("transcode_preset", DEFAULT_PRESET)
+        if value not in PRESETS:
+            logger.warning(f"无效的 transcode_preset: {value!r}")
+            return DEFAULT_PRESET
+        return value
+
+    @transcode_preset.setter
+    def transcode_preset(self, preset: str) -> None:
+        """设置编码预设"""
+        self.set("transcode_preset", preset)
+
 
 def migrate_old_config(old_path: Path, new_config: Config) -> bool:
     """
@@ -0,0 +1,5 @@
+"""Daemon package - Resident download engine and its control socket"""
+from .client import DaemonClient
+from .protocol import DaemonError, default_socket_path
+
+__all__ = ["DaemonClient", "DaemonError", "default_socket_path"]
@@ -0,0 +1,130 @@
+"""
+Daemon Client - 守护进程客户端
+Thin client used by the CLI and the TUI to talk to a running daemon
+"""
+import socket
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .protocol import DaemonError, decode, default_socket_path, encode
+
+
+class DaemonClient:
+    """
+    守护进程客户端 - 每个请求使用一条独立连接
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: float = 5.0):
+        """
+        初始化客户端
+
+        Args:
+            socket_path: 控制套接字路径，默认见 default_socket_path()
+            timeout: 普通请求的超时时间（秒）
+        """
+        self.socket_path = Path(socket_path or default_socket_path())
+        self.timeout = timeout
+
+    def _connect(self, timeout: Optional[float]) -> socket.socket:
+        if not hasattr(socket, "AF_UNIX"):
+            raise DaemonError("Unix domain sockets are not supported on this platform")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError as e:
+            sock.close()
+            raise DaemonError(f"Daemon not reachable at {self.socket_path}: {e}") from e
+        return sock
+
+    def available(self) -> bool:
+        """检查守护进程是否在运行"""
+        if not self.socket_path.exists():
+            return False
+        try:
+            self.request("ping")
+        except DaemonError:
+            return False
+        return True
+
+    def request(self, op: str, **params) -> dict:
+        """
+        发送一个请求并读取响应
+
+        Args:
+            op: 操作名
+            **params: 请求参数
+
+        Returns:
+            响应字典
+
+        Raises:
+            DaemonError: 无法连接或守护进程返回错误
+        """
+        with self._connect(self.timeout) as sock:
+            try:
+                sock.sendall(encode({"op": op, **params}))
+                line = sock.makefile("rb").readline()
+            except OSError as e:
+                raise DaemonError(f"Daemon request failed: {e}") from e
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        response = decode(line)
+        if not response.get("ok") and "error" in response:
+            raise DaemonError(response["error"])
+        return response
+
+    def submit(self, url: str, format_id: str, directory: Optional[Path] = None) -> dict:
+        """提交任务，返回任务字典（相对目录按客户端的工作目录解析）"""
+        params = {"url": url, "format": format_id}
+        if directory is not None:
+            params["directory"] = str(Path(directory).expanduser().resolve())
+        return self.request("submit", **params)["job"]
+
+    def list(self) -> list[dict]:
+        """获取所有任务"""
+        return self.request("list")["jobs"]
+
+    def cancel(self, job_id: int) -> bool:
+        """取消任务，任务存在且尚未结束时返回 True"""
+        return bool(self.request("cancel", id=job_id)["ok"])
+
+    def shutdown(self) -> None:
+        """停止守护进程"""
+        self.request("shutdown")
+
+    def watch(self, job_id: Optional[int] = None) -> Iterator[dict]:
+        """
+        订阅任务事件（阻塞迭代，指定任务结束后停止）
+
+        Args:
+            job_id: 任务 ID，None 表示所有任务
+
+        Yields:
+            事件字典（job / progress / status）
+
+        Raises:
+            DaemonError: 无法连接，或连接在事件流结束前断开（例如守护进程退出）
+        """
+        params = {} if job_id is None else {"id": job_id}
+        with self._connect(self.timeout) as sock:
+            sock.sendall(encode({"op": "watch", **params}))
+            stream = sock.makefile("rb")
+            first = stream.readline()
+            if not first:
+                raise DaemonError("Daemon closed the connection")
+            response = decode(first)
+            if not response.get("ok"):
+                raise DaemonError(response.get("error", "watch failed"))
+
+            sock.settimeout(None)
+            try:
+                for line in stream:
+                    event = decode(line)
+                    if event.get("event") == "end":
+                        return
+                    if event.get("event") != "heartbeat":
+                        yield event
+            except OSError as e:
+                raise DaemonError(f"Daemon connection lost: {e}") from e
+        raise DaemonError("Daemon closed the connection before the job finished")
@@ -0,0 +1,66 @@
+"""
+Daemon Protocol - 守护进程控制协议
+Line-delimited JSON protocol spoken over the daemon's Unix-domain socket
+
+每个请求和响应都是一行 JSON：
+
+    {"op": "submit", "url": "...", "format": "mp4_720p", "directory": "..."}
+    {"op": "submit", "url": "...", "format": ["mp4_1080p", "mp3"]}   # 多格式输出
+    {"op": "list"}
+    {"op": "cancel", "id": 3}
+    {"op": "watch", "id": 3}          # id 可省略，表示所有任务
+    {"op": "ping"} / {"op": "shutdown"}
+
+响应为 {"ok": true, ...} 或 {"ok": false, "error": "..."}。watch 在首个响应
+之后持续发送事件行（job / progress / status / heartbeat），指定的任务结束
+后以 {"event": "end"} 结束。
+"""
+import json
+import os
+from pathlib import Path
+
+# 协议版本（不兼容的修改时递增）
+PROTOCOL_VERSION = 1
+
+# 没有事件时发送心跳的间隔（秒），用于发现断开的客户端
+HEARTBEAT_INTERVAL = 10.0
+
+
+class DaemonError(Exception):
+    """守护进程返回错误或无法连接"""
+
+
+def default_socket_path() -> Path:
+    """
+    获取默认的控制套接字路径
+
+    优先使用 $XDG_RUNTIME_DIR（仅当前用户可访问），否则放在配置目录中。
+
+    Returns:
+        套接字路径
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and Path(runtime_dir).is_dir():
+        return Path(runtime_dir) / "simple-yt-dlp.sock"
+    return Path.home() / ".config" / "simple-yt-dlp" / "daemon.sock"
+
+
+def encode(message: dict) -> bytes:
+    """把消息编码为一行 JSON"""
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def decode(line: bytes) -> dict:
+    """
+    解码一行 JSON 消息
+
+    Raises:
+        DaemonError: 不是合法的 JSON 对象
+    """
+    try:
+        message = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise DaemonError(f"Invalid message: {e}") from e
+    if not isinstance(message, dict):
+        raise DaemonError("Invalid message: expected a JSON object")
+    return message
@@ -0,0 +1,239 @@
+"""
+Daemon Server - 常驻下载守护进程
+Long-running download engine behind a Unix-domain control socket
+
+守护进程常驻 DownloadCore（已导入的 yt-dlp、共享连接池、签名缓存）和任务
+队列，TUI 和 CLI 作为轻量客户端提交任务、查看进度和取消任务。
+"""
+import logging
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Optional
+
+from ..download.core import DownloadCore
+from ..download.jobs import DEFAULT_MAX_CONCURRENT, FINAL_STATES, JobManager
+from ..download.quality import QualityPlanner
+from ..download.warmup import start_warm_up
+from ..utils.validation import validate_youtube_url
+from .protocol import (
+    HEARTBEAT_INTERVAL,
+    PROTOCOL_VERSION,
+    DaemonError,
+    decode,
+    default_socket_path,
+    encode,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """处理一个客户端连接（可连续发送多个请求）"""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = decode(line)
+                op = request.get("op")
+                if op == "watch":
+                    self._watch(request)
+                    return
+                response = self.server.dispatch(op, request)
+            except (DaemonError, ValueError, TypeError) as e:
+                response = {"ok": False, "error": str(e)}
+            try:
+                self._send(response)
+            except OSError:
+                return
+
+    def _send(self, message: dict) -> None:
+        self.wfile.write(encode(message))
+        self.wfile.flush()
+
+    def _watch(self, request: dict) -> None:
+        """持续转发任务事件，直到指定任务结束或客户端断开"""
+        manager: JobManager = self.server.manager
+        job_id = request.get("id")
+        if job_id is not None:
+            job_id = int(job_id)
+        events = manager.subscribe()
+        try:
+            if job_id is not None:
+                job = manager.get(job_id)
+                if job is None:
+                    self._send({"ok": False, "error": f"No such job: {job_id}"})
+                    return
+                jobs = [job]
+            else:
+                jobs = manager.list()
+
+            self._send({"ok": True})
+            for job in jobs:
+                self._send({"event": "job", "job": job.to_dict()})
+            if job_id is not None and jobs[0].finished:
+                self._send({"event": "end"})
+                return
+
+            while not self.server.stopping.is_set():
+                try:
+                    event = events.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    self._send({"event": "heartbeat"})
+                    continue
+                event_job = event.get("job", {}).get("id", event.get("id"))
+                if job_id is not None and event_job != job_id:
+                    continue
+                self._send(event)
+                if job_id is not None and event["event"] == "job" and \
+                        event["job"]["state"] in FINAL_STATES:
+                    self._send({"event": "end"})
+                    return
+        except OSError:
+            pass  # 客户端断开
+        finally:
+            manager.unsubscribe(events)
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    守护进程控制服务器
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, manager: JobManager):
+        """
+        绑定控制套接字（仅当前用户可访问）
+
+        Args:
+            socket_path: 套接字路径
+            manager: 任务管理器
+
+        Raises:
+            DaemonError: 已有守护进程在运行
+        """
+        self.socket_path = Path(socket_path)
+        self.manager = manager
+        self.stopping = threading.Event()
+        _remove_stale_socket(self.socket_path)
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def dispatch(self, op: Optional[str], request: dict) -> dict:
+        """
+        执行一个非流式请求
+
+        Args:
+            op: 操作名
+            request: 请求字典
+
+        Returns:
+            响应字典
+        """
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "protocol": PROTOCOL_VERSION}
+
+        if op == "submit":
+            url = str(request.get("url") or "").strip()
+            valid, error = validate_youtube_url(url)
+            if not valid:
+                return {"ok": False, "error": error}
+            job = self.manager.submit(
+                url, request.get("format") or "mp4_720p", request.get("directory")
+            )
+            return {"ok": True, "job": job.to_dict()}
+
+        if op == "list":
+            return {"ok": True, "jobs": [job.to_dict() for job in self.manager.list()]}
+
+        if op == "cancel":
+            return {"ok": self.manager.cancel(int(request.get("id")))}
+
+        if op == "shutdown":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"ok": True}
+
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def stop(self) -> None:
+        """停止服务（取消所有任务并删除套接字）"""
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        self.shutdown()
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """删除上次异常退出留下的套接字文件；已有守护进程在运行时报错"""
+    if not path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+    else:
+        raise DaemonError(f"Daemon already running on {path}")
+    finally:
+        probe.close()
+
+
+def run_daemon(
+    core: DownloadCore,
+    socket_path: Optional[Path] = None,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+    processes: bool = False,
+    planner: Optional[QualityPlanner] = None,
+) -> None:
+    """
+    运行守护进程（阻塞，直到收到 shutdown 请求或 SIGTERM/SIGINT）
+
+    Args:
+        core: 下载核心
+        socket_path: 控制套接字路径，默认见 default_socket_path()
+        max_concurrent: 同时执行的任务数
+        processes: 是否在预启动的工作进程中执行任务
+        planner: "auto" 格式任务的画质规划器（截止时间和流量预算）
+    """
+    # 预热在后台进行：控制套接字立即可用，工作线程在第一个任务前等待就绪
+    warmup = start_warm_up(core.warm_up)
+    manager = JobManager(
+        core, max_concurrent=max_concurrent, processes=processes, planner=planner,
+        warmup=warmup,
+    )
+    server = DaemonServer(socket_path or default_socket_path(), manager)
+    manager.start()
+
+    def on_signal(signum, frame):
+        threading.Thread(target=server.stop, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+
+    logger.info(f"守护进程已启动: {server.socket_path} (pid {os.getpid()})")
+    try:
+        server.serve_forever(poll_interval=0.2)
+    finally:
+        manager.shutdown()
+        server.server_close()
+        logger.info("守护进程已停止")
@@ -0,0 +1,452 @@
+"""
+Admission Control - 基于剩余磁盘空间的任务准入
+Free-space-aware admission for download jobs
+
+根据提取到的 filesize / filesize_approx 乘以合并/转码开销系数估算任务峰值
+占用，与目标文件系统的剩余空间及运行中任务的预留量比较，决定任务：
+
+- ADMIT: 立即开始（并预留空间，直到任务结束）
+- WAIT: 等待运行中的任务释放预留（或外部释放空间）
+- REJECT: 即使所有运行中任务结束也放不下，直接拒绝
+
+磁盘写满（ENOSPC）通常发生在传输了数 GB 之后，是浪费带宽最多的错误。
+
+多个进程（进程池的工作进程）向同一目录下载时，预留记录在该目录的账本文件
+中，由目录上的文件锁保护，各进程的准入决定都计入其他进程的预留。
+"""
+import contextlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：只在进程内统计预留
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+ADMIT = "admit"
+WAIT = "wait"
+REJECT = "reject"
+
+# 始终为文件系统保留的余量
+RESERVE_MARGIN = 256 * 1024 * 1024
+
+# 峰值占用 / 下载大小。合并、转码和元数据重写都要在旧文件删除前写出新文件，
+# 因此默认按 2 倍估算；无损音频的输出远大于压缩的输入流。
+DEFAULT_OVERHEAD = 2.0
+OVERHEAD_FACTORS = {
+    "wav": 12.0,
+    "flac": 7.0,
+}
+
+# 等待空间时的轮询间隔（秒），用于感知外部释放的空间（包括其他进程的预留）
+POLL_INTERVAL = 2.0
+
+# 跨进程共享预留的账本文件（位于被预留的目录中）
+LEDGER_NAME = ".admission-ledger.json"
+
+
+class InsufficientSpaceError(Exception):
+    """磁盘空间不足，任务被拒绝或等待超时"""
+
+
+def format_size(num_bytes: float) -> str:
+    """
+    格式化字节数
+
+    Args:
+        num_bytes: 字节数
+
+    Returns:
+        可读字符串，例如 "1.5 GB"
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}" if unit != "B" else f"{int(num_bytes)} B"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
+
+
+def filesystem_id(directory: Path):
+    """
+    目录所在文件系统的标识（目录不存在时退化为路径本身）
+    """
+    try:
+        return os.stat(directory).st_dev
+    except OSError:
+        return str(directory)
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否仍在运行（账本中已退出进程的预留视为释放）"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def read_ledger(directory: Path) -> dict[str, int]:
+    """
+    读取目录的预留账本，只保留仍在运行的进程的条目
+
+    Args:
+        directory: 被预留的目录
+
+    Returns:
+        {预留键: 字节数}，键的格式为 "<pid>:<控制器>:<预留 ID>"
+    """
+    try:
+        entries = json.loads((directory / LEDGER_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(entries, dict):
+        return {}
+    return {
+        key: size for key, size in entries.items()
+        if isinstance(size, int) and key.split(":", 1)[0].isdigit()
+        and _pid_alive(int(key.split(":", 1)[0]))
+    }
+
+
+def _write_ledger(directory: Path, entries: dict[str, int]) -> None:
+    """原子地写入预留账本（读取方无需加锁）"""
+    path = directory / LEDGER_NAME
+    tmp = path.with_name(f"{LEDGER_NAME}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(entries))
+    os.replace(tmp, path)
+
+
+def download_bytes(info: dict) -> Optional[int]:
+    """
+    计算选中的流的下载大小
+
+    Args:
+        info: yt-dlp 提取的视频信息（已完成格式选择）
+
+    Returns:
+        字节数；任一流大小未知时返回 None
+    """
+    streams = info.get("requested_formats") or [info]
+    total = 0
+    for stream in streams:
+        size = stream.get("filesize") or stream.get("filesize_approx")
+        if not size:
+            return None
+        total += size
+    return int(total)
+
+
+def estimate_job_bytes(info: dict, format_id: str) -> Optional[int]:
+    """
+    估算任务的峰值磁盘占用
+
+    Args:
+        info: yt-dlp 提取的视频信息（已完成格式选择）
+        format_id: 格式标识符
+
+    Returns:
+        估算字节数；任一流大小未知时返回 None
+    """
+    total = download_bytes(info)
+    if total is None:
+        return None
+    return int(total * OVERHEAD_FACTORS.get(format_id, DEFAULT_OVERHEAD))
+
+
+class Reservation:
+    """
+    一个任务的空间预留（上下文管理器，退出时释放）
+    """
+
+    def __init__(
+        self,
+        controller: "AdmissionController",
+        job_id: int,
+        device,
+        size: int,
+        ledger: Optional[Path] = None,
+    ):
+        self.controller = controller
+        self.job_id = job_id
+        self.device = device
+        self.size = size
+        # 记录了该预留的账本所在目录（未写入账本时为 None）
+        self.ledger = ledger
+
+    def release(self) -> None:
+        """释放预留"""
+        self.controller.release(self.job_id)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """
+    任务准入控制器 - 按文件系统统计运行中任务的空间预留
+    """
+
+    def __init__(
+        self,
+        margin: int = RESERVE_MARGIN,
+        disk_usage: Callable = shutil.disk_usage,
+        ledger: bool = False,
+    ):
+        """
+        初始化准入控制器
+
+        Args:
+            margin: 始终保留的剩余空间
+            disk_usage: 查询磁盘用量的函数（返回带 free 属性的对象）
+            ledger: 是否通过目录中的账本文件与其他进程共享预留
+        """
+        self.margin = margin
+        self._disk_usage = disk_usage
+        self.ledger = ledger and fcntl is not None
+        self._ledger_id = uuid.uuid4().hex[:8]
+        self._cond = threading.Condition()
+        self._reservations: dict[int, Reservation] = {}
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def _device(directory: Path):
+        return filesystem_id(directory)
+
+    def _ledger_key(self, job_id: int) -> str:
+        return f"{os.getpid()}:{self._ledger_id}:{job_id}"
+
+    def _is_own(self, key: str) -> bool:
+        return key.startswith(f"{os.getpid()}:{self._ledger_id}:")
+
+    @contextlib.contextmanager
+    def _ledger_lock(self, directory: Path):
+        """
+        对目录加排他锁，保证其他进程不会在评估和记录预留之间插入
+
+        Yields:
+            可以写入账本时为 True；未启用账本或目录无法加锁时为 False
+        """
+        if not self.ledger:
+            yield False
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError as e:
+            logger.debug(f"无法打开账本目录，只在进程内统计预留: {e}")
+            yield False
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield True
+        finally:
+            os.close(fd)
+
+    def reserved(self, directory: Path) -> int:
+        """
+        获取目录所在文件系统上运行中任务的预留总量
+
+        启用账本时还包括其他进程在该目录记录的预留。
+
+        Args:
+            directory: 下载目录
+
+        Returns:
+            预留字节数
+        """
+        device = self._device(directory)
+        with self._cond:
+            held = sum(r.size for r in self._reservations.values() if r.device == device)
+        if self.ledger:
+            held += sum(
+                size for key, size in read_ledger(directory).items() if not self._is_own(key)
+            )
+        return held
+
+    def evaluate(
+        self, directory: Path, required: int, limit: Optional[int] = None
+    ) -> tuple[str, int, int]:
+        """
+        评估任务能否开始
+
+        运行中任务已写入的部分同时计入了 free 和预留，估算偏保守。
+
+        Args:
+            directory: 下载目录
+            required: 任务所需字节数
+            limit: 该目录允许的预留总量上限（例如暂存目录的容量上限）
+
+        Returns:
+            (决定, 剩余空间, 预留总量)
+        """
+        free = self._disk_usage(directory).free
+        held = self.reserved(directory)
+        if limit is not None:
+            if required > limit:
+                return REJECT, free, held
+            if held + required > limit:
+                return WAIT, free, held
+        needed = required + self.margin
+        if needed > free + held:
+            return REJECT, free, held
+        if needed > free - held:
+            return WAIT, free, held
+        return ADMIT, free, held
+
+    def admit(
+        self,
+        directory: Path,
+        required: Optional[int],
+        timeout: Optional[float] = None,
+        on_wait: Optional[Callable[[int, int, int], None]] = None,
+        should_abort: Optional[Callable[[], bool]] = None,
+        limit: Optional[int] = None,
+    ) -> Reservation:
+        """
+        等待准入并预留空间
+
+        Args:
+            directory: 下载目录
+            required: 任务所需字节数（未知时只检查余量）
+            timeout: 最长等待时间（秒），None 表示一直等待
+            on_wait: 进入等待时的回调 (所需, 剩余, 预留)
+            should_abort: 返回 True 时停止等待
+            limit: 该目录允许的预留总量上限（None 表示只受剩余空间限制）
+
+        Returns:
+            Reservation 实例
+
+        Raises:
+            InsufficientSpaceError: 空间永远不够、等待超时或被中止
+        """
+        required = required or 0
+        device = self._device(directory)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        notified = False
+
+        with self._cond:
+            while True:
+                with self._ledger_lock(directory) as shared:
+                    decision, free, held = self.evaluate(directory, required, limit)
+                    if decision == ADMIT:
+                        reservation = self._reserve(directory, device, required, shared)
+                if decision == ADMIT:
+                    logger.debug(
+                        f"任务准入: 预留 {format_size(required)}，"
+                        f"剩余 {format_size(free)}，已预留 {format_size(held)}"
+                    )
+                    return reservation
+
+                if limit is not None and held + required > limit:
+                    message = (
+                        f"Staging limit reached: need {format_size(required)}, "
+                        f"limit {format_size(limit)}, {format_size(held)} reserved by running jobs"
+                    )
+                else:
+                    message = (
+                        f"Not enough disk space: need {format_size(required + self.margin)}, "
+                        f"{format_size(free)} free, {format_size(held)} reserved by running jobs"
+                    )
+                if decision == REJECT:
+                    raise InsufficientSpaceError(message)
+
+                if not notified:
+                    logger.info(f"等待磁盘空间: {message}")
+                    if on_wait:
+                        on_wait(required, free, held)
+                    notified = True
+
+                wait = POLL_INTERVAL
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        raise InsufficientSpaceError(message)
+                if should_abort and should_abort():
+                    raise InsufficientSpaceError("Cancelled while waiting for disk space")
+                self._cond.wait(wait)
+
+    def _reserve(self, directory: Path, device, required: int, shared: bool) -> Reservation:
+        """记录预留（调用方持有 self._cond 和账本锁）"""
+        reservation = Reservation(self, next(self._ids), device, required)
+        if shared:
+            try:
+                entries = read_ledger(directory)
+                entries[self._ledger_key(reservation.job_id)] = required
+                _write_ledger(directory, entries)
+                reservation.ledger = directory
+            except OSError as e:
+                logger.debug(f"无法写入预留账本，只在进程内统计预留: {e}")
+        self._reservations[reservation.job_id] = reservation
+        return reservation
+
+    def wake(self) -> None:
+        """唤醒等待中的任务重新评估（例如任务被取消时）"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def release(self, job_id: int) -> None:
+        """
+        释放任务的预留并唤醒等待中的任务
+
+        Args:
+            job_id: 任务 ID
+        """
+        with self._cond:
+            reservation = self._reservations.pop(job_id, None)
+            if reservation is None:
+                return
+            if reservation.ledger is not None:
+                with self._ledger_lock(reservation.ledger) as shared:
+                    if shared:
+                        entries = read_ledger(reservation.ledger)
+                        entries.pop(self._ledger_key(job_id), None)
+                        try:
+                            _write_ledger(reservation.ledger, entries)
+                        except OSError as e:
+                            logger.debug(f"无法更新预留账本: {e}")
+            self._cond.notify_all()
+
+
+_shared_controller: Optional[AdmissionController] = None
+_shared_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """
+    获取进程级共享的准入控制器（所有 DownloadCore 实例共用预留）
+
+    Returns:
+        AdmissionController 实例
+    """
+    global _shared_controller
+    with _shared_lock:
+        if _shared_controller is None:
+            _shared_controller = AdmissionController()
+        return _shared_controller
+
+
+def share_reservations() -> None:
+    """
+    让进程级共享的准入控制器通过账本文件与其他进程共享预留
+
+    进程池的工作进程各有一个 DownloadCore，启动时调用，使并发任务的
+    准入决定计入其他工作进程的预留。
+    """
+    global _shared_controller
+    with _shared_lock:
+        _shared_controller = AdmissionController(ledger=True)
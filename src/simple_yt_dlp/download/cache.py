@@ -0,0 +1,231 @@
+"""
+Cache Invalidation - yt-dlp 缓存的定向失效
+Targeted invalidation of the yt-dlp disk cache
+
+yt-dlp 把 YouTube 播放器相关的签名 / nsig 解算结果按播放器 ID 存在缓存目录中，
+重新计算这些结果代价很高。遇到 403 时只清除与出错播放器相关的条目，
+其余播放器和其他站点的缓存保持不变。
+"""
+import contextlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 与播放器绑定的缓存分区（键中包含播放器 ID）
+# Cache sections whose keys embed the YouTube player id
+PLAYER_SECTIONS: tuple[str, ...] = (
+    "youtube-sigfuncs",
+    "youtube-nsig",
+    "youtube-sts",
+    "youtube-n",
+    "challenge-solver",
+)
+
+# 同一播放器在该时间窗口内只失效一次（并发任务同时 403 时避免重复清理）
+# Window in which repeated invalidations of the same player are skipped
+INVALIDATION_DEBOUNCE = 30.0
+
+# 进程内锁：串行化所有缓存目录的修改
+_cache_lock = threading.RLock()
+
+# 最近一次失效的时间戳: player_id -> monotonic time
+_recent_invalidations: dict[str, float] = {}
+
+
+@contextlib.contextmanager
+def cache_lock(cache_dir: Path) -> Iterator[None]:
+    """
+    获取缓存目录锁（进程内线程锁 + 跨进程文件锁）
+
+    Args:
+        cache_dir: yt-dlp 缓存根目录
+    """
+    with _cache_lock:
+        lock_file = None
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            lock_file = open(cache_dir / ".simple-yt-dlp.lock", "a+b")
+        except OSError as e:
+            logger.debug(f"无法创建缓存锁文件，仅使用进程内锁: {e}")
+
+        try:
+            if lock_file is not None:
+                _lock_file(lock_file)
+            yield
+        finally:
+            if lock_file is not None:
+                _unlock_file(lock_file)
+                lock_file.close()
+
+
+def _lock_file(f) -> None:
+    """对文件加排他锁（平台相关）"""
+    try:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f) -> None:
+    """释放文件锁"""
+    try:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def get_cache_dir(ydl) -> Optional[Path]:
+    """
+    获取 YoutubeDL 实例使用的缓存目录
+
+    Args:
+        ydl: yt_dlp.YoutubeDL 实例
+
+    Returns:
+        缓存目录，缓存被禁用时返回 None
+    """
+    if not ydl.cache.enabled:
+        return None
+    return Path(ydl.cache._get_root_dir())
+
+
+def find_player_ids(ydl) -> set[str]:
+    """
+    找出本次任务实际使用过的 YouTube 播放器 ID
+
+    Args:
+        ydl: 刚刚失败的 yt_dlp.YoutubeDL 实例
+
+    Returns:
+        播放器 ID 集合（可能为空）
+    """
+    ie = getattr(ydl, "_ies_instances", {}).get("Youtube")
+    if ie is None:
+        return set()
+
+    player_ids = set()
+    # _code_cache 的键为 "{player_id}-{variant}"
+    for key in getattr(ie, "_code_cache", {}):
+        player_ids.add(str(key).split("-", 1)[0])
+    # _player_cache 的键为 ("youtube-xxx", "{player_id}-{variant}", ...)
+    for key in getattr(ie, "_player_cache", {}):
+        if isinstance(key, tuple) and len(key) > 1 and key[1]:
+            player_ids.add(str(key[1]).split("-", 1)[0])
+    return player_ids
+
+
+def _iter_player_entries(cache_dir: Path) -> Iterator[Path]:
+    """遍历所有与播放器绑定的缓存文件"""
+    for section in PLAYER_SECTIONS:
+        section_dir = cache_dir / section
+        if not section_dir.is_dir():
+            continue
+        yield from (p for p in section_dir.iterdir() if p.is_file())
+
+
+def latest_player_id(cache_dir: Path, known_ids: Iterable[str] = ()) -> Optional[str]:
+    """
+    根据最近写入的缓存条目推断当前播放器 ID
+
+    Args:
+        cache_dir: yt-dlp 缓存根目录
+        known_ids: 候选播放器 ID（为空时从 youtube-* 条目的文件名解析）
+
+    Returns:
+        最近使用的播放器 ID，无法推断时返回 None
+    """
+    known_ids = set(known_ids)
+    newest: Optional[tuple[float, str]] = None
+    for entry in _iter_player_entries(cache_dir):
+        if entry.parent.name == "challenge-solver":
+            continue
+        player_id = entry.name.split("-", 1)[0]
+        if known_ids and player_id not in known_ids:
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        if newest is None or mtime > newest[0]:
+            newest = (mtime, player_id)
+    return newest[1] if newest else None
+
+
+def invalidate_players(cache_dir: Path, player_ids: Iterable[str]) -> int:
+    """
+    删除指定播放器的缓存条目（其他播放器和站点的缓存保留）
+
+    Args:
+        cache_dir: yt-dlp 缓存根目录
+        player_ids: 需要失效的播放器 ID
+
+    Returns:
+        删除的缓存文件数量
+    """
+    now = time.monotonic()
+    with cache_lock(cache_dir):
+        targets = {
+            pid for pid in player_ids
+            if pid and now - _recent_invalidations.get(pid, float("-inf")) > INVALIDATION_DEBOUNCE
+        }
+        if not targets:
+            return 0
+
+        removed = 0
+        for entry in list(_iter_player_entries(cache_dir)):
+            if not any(pid in entry.name for pid in targets):
+                continue
+            try:
+                os.remove(entry)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ 删除缓存条目失败 {entry}: {e}")
+
+        for pid in targets:
+            _recent_invalidations[pid] = now
+        return removed
+
+
+def invalidate_for_ydl(ydl) -> int:
+    """
+    针对失败任务定向清理缓存
+
+    优先使用任务中实际加载过的播放器 ID；若无法确定，
+    退回到缓存中最近写入的播放器条目。
+
+    Args:
+        ydl: 刚刚失败的 yt_dlp.YoutubeDL 实例
+
+    Returns:
+        删除的缓存文件数量
+    """
+    cache_dir = get_cache_dir(ydl)
+    if cache_dir is None or not cache_dir.exists():
+        return 0
+
+    player_ids = find_player_ids(ydl)
+    if not player_ids:
+        latest = latest_player_id(cache_dir)
+        player_ids = {latest} if latest else set()
+
+    if not player_ids:
+        logger.info("未找到与失败任务相关的播放器缓存，跳过清理")
+        return 0
+
+    removed = invalidate_players(cache_dir, player_ids)
+    logger.info(f"✅ 已失效播放器缓存 {sorted(player_ids)}: {removed} 个条目 ({cache_dir})")
+    return removed
@@ -0,0 +1,253 @@
+"""
+Cancellation - 协作式任务取消
+Cooperative cancellation tokens for download jobs
+
+每个任务持有一个 CancelToken：
+- 进度钩子和后处理钩子在取消后抛出 JobCancelled，yt-dlp 在下一个数据块处退出
+- 注册的中止回调（例如分段下载器的 abort）立即执行，中断阻塞中的读取
+- 任务线程中启动的 ffmpeg 子进程被记录，取消时直接终止
+- 记录任务产生的文件，取消后可清理 .part / 分离流 / 临时文件
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+# 当前线程正在执行的任务（用于把子进程关联到任务）
+_current = threading.local()
+
+
+def current_token() -> Optional["CancelToken"]:
+    """
+    获取当前线程激活的取消令牌
+
+    Returns:
+        CancelToken 实例，未激活时返回 None
+    """
+    return getattr(_current, "token", None)
+
+
+class CancelToken:
+    """
+    取消令牌 - 线程安全，可从 UI 线程调用 cancel()
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self._processes = weakref.WeakSet()
+        self._files: set[str] = set()
+        self.created_at = time.time()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """取消任务：执行中止回调并终止子进程"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+            processes = list(self._processes)
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"中止回调失败: {e}")
+        for proc in processes:
+            self._kill(proc)
+        logger.info("任务已取消")
+
+    def raise_if_cancelled(self) -> None:
+        """
+        已取消时抛出 JobCancelled
+
+        Raises:
+            JobCancelled: 任务已取消
+        """
+        if self._event.is_set():
+            raise JobCancelled("Download cancelled")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待取消
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否已取消
+        """
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        注册中止回调（已取消时立即执行）
+
+        Args:
+            callback: 取消时调用的函数
+
+        Returns:
+            用于注销该回调的函数
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    # ------------------------------------------------------------------
+    # 子进程
+    # ------------------------------------------------------------------
+
+    def attach_process(self, proc) -> None:
+        """
+        关联子进程（已取消时立即终止）
+
+        Args:
+            proc: subprocess.Popen 实例
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._processes.add(proc)
+                return
+        self._kill(proc)
+
+    @staticmethod
+    def _kill(proc) -> None:
+        if proc.poll() is None:
+            logger.debug(f"终止子进程 {proc.pid}")
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+    @contextmanager
+    def activate(self) -> Iterator["CancelToken"]:
+        """在当前线程激活令牌（期间启动的 ffmpeg 子进程会被关联）"""
+        previous = current_token()
+        _current.token = self
+        try:
+            yield self
+        finally:
+            _current.token = previous
+
+    # ------------------------------------------------------------------
+    # yt-dlp 钩子
+    # ------------------------------------------------------------------
+
+    def track_file(self, path: Optional[str]) -> None:
+        """记录任务产生的文件"""
+        if path:
+            with self._lock:
+                self._files.add(str(path))
+
+    def progress_hook(self, d: dict) -> None:
+        """yt-dlp 进度钩子：记录文件，取消后中止下载"""
+        self.track_file(d.get("filename"))
+        self.track_file(d.get("tmpfilename"))
+        self.raise_if_cancelled()
+
+    def postprocessor_hook(self, d: dict) -> None:
+        """yt-dlp 后处理钩子：记录中间文件，取消后跳过剩余后处理"""
+        info = d.get("info_dict") or {}
+        self.track_file(info.get("filepath"))
+        for path in info.get("__files_to_merge") or []:
+            self.track_file(path)
+        self.raise_if_cancelled()
+
+    # ------------------------------------------------------------------
+    # 清理
+    # ------------------------------------------------------------------
+
+    def cleanup(self) -> list[str]:
+        """
+        删除任务产生的部分文件和中间文件
+
+        只删除任务开始后修改过的文件，不会误删同名的已有文件。
+
+        Returns:
+            已删除的文件列表
+        """
+        with self._lock:
+            files = list(self._files)
+
+        candidates = set()
+        for name in files:
+            path = Path(name)
+            candidates.update({
+                path,
+                path.with_name(path.name + ".part"),
+                path.with_name(path.name + ".ytdl"),
+                path.with_name(f"{path.stem}.temp{path.suffix}"),
+            })
+            candidates.update(path.parent.glob(f"{path.name}.part-Frag*"))
+
+        removed = []
+        for path in candidates:
+            try:
+                if path.is_file() and path.stat().st_mtime >= self.created_at - 1:
+                    os.remove(path)
+                    removed.append(str(path))
+            except OSError as e:
+                logger.debug(f"清理文件失败 {path}: {e}")
+        if removed:
+            logger.info(f"已清理 {len(removed)} 个未完成文件")
+        return sorted(removed)
+
+
+_tracking_installed = False
+_tracking_lock = threading.Lock()
+
+
+def install_process_tracking() -> None:
+    """
+    让 yt-dlp 的 ffmpeg 后处理器和外部下载器启动的子进程关联到当前任务
+
+    替换这两个模块中的 Popen 为会登记到 current_token() 的子类（幂等）。
+    """
+    global _tracking_installed
+    with _tracking_lock:
+        if _tracking_installed:
+            return
+
+        import yt_dlp.downloader.external as external
+        import yt_dlp.postprocessor.ffmpeg as ffmpeg
+        from yt_dlp.utils import Popen
+
+        from .transcode import on_spawn
+
+        class TrackedPopen(Popen):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                token = current_token()
+                if token is not None:
+                    token.attach_process(self)
+                # 转码名额内启动的 ffmpeg 以较低优先级运行（见 transcode.py）
+                on_spawn(self.pid)
+
+        ffmpeg.Popen = TrackedPopen
+        external.Popen = TrackedPopen
+        _tracking_installed = True
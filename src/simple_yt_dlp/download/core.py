@@ -3,17 +3,97 @@ Download Core - 核心下载逻辑封装
 Core download logic wrapper for yt-dlp
 """
 import asyncio
+import contextlib
 import logging
-import shutil
+import re
 from pathlib import Path
 from typing import Callable, Optional
 
+from ..utils.validation import VIDEO, normalize_youtube_url
+from .admission import (
+    InsufficientSpaceError,
+    download_bytes,
+    estimate_job_bytes,
+    filesystem_id,
+    format_size,
+    get_admission_controller,
+)
+from .cache import invalidate_for_ydl
+from .cancel import CancelToken, JobCancelled, install_process_tracking
+from .fanout import (
+    FanoutError,
+    Target,
+    estimate_fanout_bytes,
+    find_ffmpeg,
+    plan_targets,
+    produce_outputs,
+)
 from .formats import get_format_config, requires_ffmpeg
+from .integrity import (
+    DEFAULT_ALGORITHM,
+    IntegrityError,
+    Verification,
+    find_ffprobe,
+    verify_output,
+)
+from .pool import get_shared_pool
+from .prefetch import InfoCache, get_info_cache
+from .records import VideoRecord, selected_format_ids, slim_info
+from .staging import make_workdir, move_into_place
+from .store import ContentStore
+from .transcode import (
+    DEFAULT_PRESET,
+    TranscodeScheduler,
+    encoder_args,
+    get_transcode_scheduler,
+)
+from .writer import WriteOptions
 
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
+# 下载开始时等待进行中的预提取的最长时间（秒）
+PREFETCH_WAIT = 30.0
+
+# URL 都已验证为 YouTube：只注册 YouTube 系列提取器（创建 YoutubeDL 时不再
+# 逐个注册约 1700 个提取器），视频 URL 直接交给 YouTube 提取器（不逐个匹配）
+YOUTUBE_EXTRACTORS = [r"youtube(:.+)?"]
+YOUTUBE_IE_KEY = "Youtube"
+
+
+def pinned_target(url: str) -> tuple[str, Optional[str]]:
+    """
+    确定提取用的 URL 和提取器
+
+    Args:
+        url: 视频 URL
+
+    Returns:
+        (提取用 URL, 提取器键)；视频 URL 返回规范 URL 和 YouTube 提取器，
+        其他 URL 原样返回并由 yt-dlp 匹配提取器（键为 None）
+    """
+    video = normalize_youtube_url(url)
+    if video.ok and video.kind == VIDEO:
+        # 规范 URL 不带 list= 参数，YouTube 提取器总能处理（noplaylist 下结果相同）
+        return video.url, YOUTUBE_IE_KEY
+    return url, None
+
+
+def extract_pinned(ydl, url: str) -> dict:
+    """
+    用固定的提取器提取未处理的视频信息
+
+    Args:
+        ydl: YoutubeDL 实例
+        url: 视频 URL
+
+    Returns:
+        未处理的 ie_result
+    """
+    target, ie_key = pinned_target(url)
+    return ydl.extract_info(target, download=False, process=False, ie_key=ie_key)
+
 
 class DownloadCore:
     """
@@ -27,6 +107,19 @@ class DownloadCore:
         ffmpeg_location: Optional[str] = None,
         cookie_file: Optional[Path] = None,
         progress_callback: Optional[Callable[[dict], None]] = None,
+        use_connection_pool: bool = True,
+        connections: int = 4,
+        write_options: Optional[WriteOptions] = None,
+        admission_timeout: Optional[float] = 600.0,
+        keep_partial_files: bool = False,
+        info_cache: Optional[InfoCache] = None,
+        store: Optional[ContentStore] = None,
+        backend: Optional[Callable[[dict], object]] = None,
+        staging_dir: Optional[Path] = None,
+        staging_limit: Optional[int] = None,
+        streaming: bool = False,
+        transcode_preset: str = DEFAULT_PRESET,
+        transcode_threads: Optional[int] = None,
     ):
         """
         初始化下载核心
@@ -36,28 +129,126 @@ class DownloadCore:
             ffmpeg_location: FFmpeg 可执行文件路径
             cookie_file: Cookie 文件路径（用于年龄限制视频）
             progress_callback: 进度回调函数
+            use_connection_pool: 是否通过跨任务共享的长连接池发送请求
+            connections: 单文件格式的并行分段连接数（<= 1 时禁用分段下载）
+            write_options: 磁盘写入参数（缓冲区大小、预分配、fsync 间隔等）
+            admission_timeout: 等待磁盘空间的最长时间（秒），None 表示一直等待
+            keep_partial_files: 取消后是否保留 .part 和中间流文件
+            info_cache: 提取结果缓存（预提取的结果），默认使用进程级共享缓存
+            store: 去重存储；已下载过的视频和格式直接从存储交付到下载目录
+            backend: 下载后端：用 yt-dlp 参数创建 YoutubeDL 兼容的实例（提取、
+                格式选择和传输），默认 SimpleYoutubeDL；模拟后端见 download/simulate.py
+            staging_dir: 暂存目录（例如本地 SSD 或 tmpfs）；进行中的文件和中间文件
+                写在这里，完成后每个输出移动一次到下载目录
+            staging_limit: 暂存目录中运行任务的预留总量上限（字节）
+            streaming: 是否把下载的字节直接送入 ffmpeg 生成最终文件（合并和音频
+                提取不再先把流写到磁盘，见 download/streaming.py）
+            transcode_preset: 编码预设（fast / balanced / small，见 download/transcode.py）
+            transcode_threads: 本实例专用的转码线程预算；默认与进程内其他实例共享
+                一个调度器（CPU 核数减一）
         """
         self.download_dir = download_dir
         self.ffmpeg_location = ffmpeg_location
         self.cookie_file = cookie_file
         self.progress_callback = progress_callback
+        self.use_connection_pool = use_connection_pool
+        self.connections = connections
+        self.write_options = write_options or WriteOptions()
+        self.admission_timeout = admission_timeout
+        self.keep_partial_files = keep_partial_files
+        self.info_cache = info_cache or get_info_cache()
+        self.store = store
+        self.backend = backend
+        self.staging_dir = staging_dir
+        self.staging_limit = staging_limit
+        self.streaming = streaming
+        self.transcode_preset = transcode_preset
+        self.transcode_threads = transcode_threads
+        self._scheduler = TranscodeScheduler(transcode_threads) if transcode_threads else None
+
+    def __getstate__(self) -> dict:
+        """序列化（交给工作进程）时不带进程内的缓存和回调"""
+        state = self.__dict__.copy()
+        state["info_cache"] = None
+        state["progress_callback"] = None
+        state["_scheduler"] = None
+        return state
 
-    def _clear_cache(self) -> None:
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.info_cache = get_info_cache()
+        if self.transcode_threads:
+            self._scheduler = TranscodeScheduler(self.transcode_threads)
+
+    def warm_up(self) -> None:
+        """
+        预先导入 yt-dlp、注册网络层、创建一次 YoutubeDL 并导入 YouTube 提取器，
+        后续任务不再承担冷启动开销（不访问网络）
         """
-        清除 yt-dlp 缓存目录
+        self._ensure_network()
+        install_process_tracking()
+        ydl_opts = self.build_ydl_opts("mp4_720p")
+        ydl_opts["progress_hooks"] = []
+        with self._new_ydl(ydl_opts) as ydl:
+            ydl.get_info_extractor("Youtube")
+
+    def _new_ydl(self, ydl_opts: dict):
+        """
+        用下载后端创建 YoutubeDL 实例
+
+        Args:
+            ydl_opts: yt-dlp 参数
+
+        Returns:
+            SimpleYoutubeDL（或后端创建的兼容实例）
+        """
+        if self.backend is not None:
+            return self.backend(ydl_opts)
+        from .ydl import SimpleYoutubeDL
+
+        return SimpleYoutubeDL(ydl_opts)
+
+    def _ensure_network(self) -> None:
+        """按需向 yt-dlp 注册共享连接池请求处理器"""
+        if self.use_connection_pool:
+            from .network import install_pooled_handler
 
-        用于解决 403 Forbidden 等缓存相关问题
+            install_pooled_handler()
+
+    def connection_stats(self) -> dict:
+        """
+        获取共享连接池统计信息
+
+        Returns:
+            连接池统计（复用率、空闲驱逐次数等）
+        """
+        return get_shared_pool().stats()
+
+    @property
+    def transcode_scheduler(self) -> TranscodeScheduler:
+        """转码调度器（未指定 transcode_threads 时为进程级共享的调度器）"""
+        return self._scheduler or get_transcode_scheduler()
+
+    def _clear_cache(self, ydl=None) -> None:
+        """
+        定向清除 yt-dlp 缓存
+
+        用于解决 403 Forbidden 等缓存相关问题。只失效与出错播放器相关的
+        签名 / nsig 缓存条目，其他缓存（以及并发任务依赖的缓存）保持不变。
+
+        Args:
+            ydl: 失败的 YoutubeDL 实例（用于确定播放器 ID）
 
         参考: https://github.com/yt-dlp/yt-dlp/wiki/Cache
         """
         import yt_dlp
 
         try:
-            # 使用 YoutubeDL 的 Cache API 来清除缓存
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                ydl.cache.remove()
-                cache_dir = ydl.cache._get_root_dir()
-                logger.info(f"✅ 已清除 yt-dlp 缓存: {cache_dir}")
+            if ydl is None:
+                with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+                    invalidate_for_ydl(ydl)
+            else:
+                invalidate_for_ydl(ydl)
         except Exception as e:
             logger.warning(f"⚠️ 清除缓存失败: {e}")
 
@@ -137,6 +328,18 @@ class DownloadCore:
             "referer": "https://www.google.com/",
             "no_check_certificates": False,
             "postprocessors": postprocessors,
+            "allowed_extractors": YOUTUBE_EXTRACTORS,
+            # 单文件 http 格式使用多连接分段下载（见 download/ydl.py）
+            "ranged_connections": self.connections,
+            "write_options": self.write_options,
+            # yt-dlp 自带下载器的初始读写块大小
+            "buffersize": self.write_options.buffer_size,
+            # 转码：按格式的编码预设，线程数和优先级由调度器决定（见 download/transcode.py）
+            "postprocessor_args": {
+                f"{'extractaudio' if is_audio else 'videoconvertor'}+ffmpeg_o":
+                    encoder_args(format_id, self.transcode_preset),
+            },
+            "transcode_scheduler": self.transcode_scheduler,
         }
 
         # 添加 FFmpeg 路径（如果指定）
@@ -149,6 +352,81 @@ class DownloadCore:
 
         return ydl_opts
 
+    def extract_raw_info(self, url: str) -> dict:
+        """
+        提取未处理的视频信息（不做格式选择，可用于任意格式），供预提取使用
+
+        Args:
+            url: 视频 URL
+
+        Returns:
+            未处理的 ie_result
+        """
+        self._ensure_network()
+        ydl_opts = self.build_ydl_opts("mp4_720p")
+        ydl_opts["progress_hooks"] = []
+        with self._new_ydl(ydl_opts) as ydl:
+            return extract_pinned(ydl, url)
+
+    def preview(self, raw_info: dict, format_id: str) -> tuple[str, Optional[int]]:
+        """
+        对预提取的信息做格式选择，得到标题和下载大小（不访问网络）
+
+        Args:
+            raw_info: extract_raw_info 的结果
+            format_id: 格式标识符
+
+        Returns:
+            (标题, 下载字节数或 None)
+        """
+        ydl_opts = self.build_ydl_opts(format_id)
+        ydl_opts["progress_hooks"] = []
+        with self._new_ydl(ydl_opts) as ydl:
+            info = ydl.process_extracted(raw_info)
+        return info.get("title") or "", download_bytes(info)
+
+    def estimate_sizes(self, url: str, format_ids: list[str]) -> dict[str, Optional[int]]:
+        """
+        提取一次视频信息，估算各格式的下载大小（供自动画质规划）
+
+        提取结果存入缓存，随后在本进程中的下载直接使用。
+
+        Args:
+            url: 视频 URL
+            format_ids: 格式标识符列表
+
+        Returns:
+            格式 -> 下载字节数（未知为 None）
+        """
+        raw = self.info_cache.get(url, wait=PREFETCH_WAIT)
+        if raw is None:
+            raw = self.extract_raw_info(url)
+            self.info_cache.put(url, raw)
+        return {format_id: self.preview(raw, format_id)[1] for format_id in format_ids}
+
+    def _extract(self, ydl, url: str, use_cache: bool = True) -> dict:
+        """
+        获取未处理的视频信息：优先使用（或等待进行中的）预提取结果
+
+        Args:
+            ydl: YoutubeDL 实例
+            url: 视频 URL
+            use_cache: 是否使用缓存（403 重试时必须重新提取）
+
+        Returns:
+            未处理的 ie_result（用 SimpleYoutubeDL.process_extracted 处理）
+        """
+        if use_cache:
+            raw = self.info_cache.get(url, wait=PREFETCH_WAIT)
+            if raw is not None:
+                logger.info("⚡ 使用预提取的视频信息")
+                return raw
+        else:
+            self.info_cache.invalidate(url)
+        raw = extract_pinned(ydl, url)
+        self.info_cache.put(url, raw)
+        return raw
+
     def _progress_hook(self, d: dict) -> None:
         """
         yt-dlp 进度钩子
@@ -164,6 +442,8 @@ class DownloadCore:
         url: str,
         format_id: str,
         info_callback: Optional[Callable[[str], None]] = None,
+        cancel_token: Optional[CancelToken] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None,
     ) -> tuple[bool, str, Optional[str]]:
         """
         执行下载（带智能重试）
@@ -172,21 +452,43 @@ class DownloadCore:
             url: 视频 URL
             format_id: 格式标识符
             info_callback: 信息回调函数（用于更新状态）
+            cancel_token: 取消令牌（取消后下载、转码和 ffmpeg 子进程立即中止）
+            progress_callback: 本次下载的进度回调（替代构造时传入的回调）
 
         Returns:
             (成功状态, 标题, 错误信息)
         """
         import yt_dlp
-        import re
 
+        stored_title = self._deliver_from_store(url, format_id, info_callback, progress_callback)
+        if stored_title is not None:
+            return True, stored_title, None
+
+        self._ensure_network()
+        install_process_tracking()
+        token = cancel_token or CancelToken()
         max_retries = 2  # 最多重试 2 次
         last_error = None
 
         for attempt in range(max_retries):
+            ydl = None
+            workdir = None
             try:
                 ydl_opts = self.build_ydl_opts(format_id)
+                if self.staging_dir is not None:
+                    # 所有进行中的文件写在暂存目录，完成后再移到下载目录
+                    workdir = make_workdir(self.staging_dir, f"{url}\n{format_id}")
+                    ydl_opts["outtmpl"] = str(workdir.path / Path(ydl_opts["outtmpl"]).name)
+                # 取消令牌：钩子中抛出 JobCancelled 中止下载和后处理
+                if progress_callback is not None:
+                    ydl_opts["progress_hooks"] = [progress_callback]
+                ydl_opts["progress_hooks"].insert(0, token.progress_hook)
+                streamed: dict = {}
+                ydl_opts["progress_hooks"].append(self._checksum_hook(streamed))
+                ydl_opts["postprocessor_hooks"] = [token.postprocessor_hook]
+                ydl_opts["cancel_token"] = token
 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                with token.activate(), self._new_ydl(ydl_opts) as ydl:
                     # 提取视频信息
                     if info_callback:
                         if attempt == 0:
@@ -194,13 +496,23 @@ class DownloadCore:
                         else:
                             info_callback("🔄 Retrying with fresh cache...")
 
-                    info = ydl.extract_info(url, download=False)
-                    title = info.get("title", "Unknown Title")
+                    # 只提取一次：格式选择和下载都基于同一份未处理的信息
+                    raw = self._extract(ydl, url, use_cache=attempt == 0)
+                    info = ydl.process_extracted(raw)
+                    token.raise_if_cancelled()
 
-                    # 清理标题用于显示
-                    display_title = re.sub(r'[^\w\s.-]', '', title)[:70]
-                    if len(title) > 70:
-                        display_title += "..."
+                    # 格式选择完成后只保留精简记录和选中的格式，释放完整的 info
+                    record = VideoRecord.from_info(info, format_id)
+                    required = estimate_job_bytes(info, format_id)
+                    # yt-dlp 只能看到暂存目录：下载目录中已有的输出由这里检查
+                    existing = (
+                        self._existing_output(ydl, info, format_id)
+                        if workdir is not None else None
+                    )
+                    raw = slim_info(raw, selected_format_ids(info))
+                    del info
+                    title = record.title or "Unknown Title"
+                    display_title = self._display_title(title)
 
                     # 开始下载
                     format_name = get_format_config(format_id)[0].upper()
@@ -212,16 +524,60 @@ class DownloadCore:
                         else:
                             info_callback(f"⬇️ 下载中为 {format_name} 格式...")
 
-                    ydl.download([url])
+                    # 准入控制：磁盘空间不足时等待或拒绝，避免传输后才 ENOSPC
+                    def on_wait(required: int, free: int, held: int) -> None:
+                        if info_callback:
+                            info_callback(
+                                f"⏳ 等待磁盘空间: 需要 {format_size(required)}，"
+                                f"剩余 {format_size(free)}"
+                            )
+
+                    if existing is not None:
+                        logger.info(f"📁 输出已存在，跳过下载: {existing.name}")
+                        outputs = [str(existing)]
+                    else:
+                        with self._admit(required, token, on_wait):
+                            output = None
+                            if self.streaming:
+                                output = self._stream_output(
+                                    ydl, raw, format_id, token, ydl_opts["progress_hooks"]
+                                )
+                            if output is not None:
+                                outputs = [str(output)]
+                            else:
+                                done = ydl.process_extracted(raw, download=True)
+                                outputs = [
+                                    d.get("filepath")
+                                    for d in done.get("requested_downloads") or [done]
+                                ]
+
+                        if workdir is not None:
+                            outputs = self._publish_outputs(outputs, streamed, info_callback)
+
+                    # 完整性检查：校验和写入历史记录，截断的输出视为失败
+                    if info_callback:
+                        info_callback("🔒 正在校验输出文件...")
+                    verified = self._verify_outputs(
+                        outputs, record.duration, streamed, progress_callback
+                    )
+                    if verified:
+                        self._store_output(record.id, format_id, verified[0], title)
 
                     # 下载成功
                     if attempt > 0:
                         logger.info(f"✅ 重试成功 (第 {attempt + 1} 次尝试)")
+                    if self.use_connection_pool:
+                        logger.debug(f"连接池统计: {self.connection_stats()}")
                     return True, display_title, None
 
+            except JobCancelled:
+                break
+
             except yt_dlp.utils.DownloadError as e:
                 last_error = e
                 error_msg = str(e)
+                if token.cancelled:
+                    break
 
                 # 检测是否为 403 错误
                 if self._is_403_error(e):
@@ -230,7 +586,8 @@ class DownloadCore:
                         logger.warning(f"⚠️ 检测到 403 错误，清除缓存后重试...")
                         if info_callback:
                             info_callback("⚠️ 403 错误，自动清除缓存重试中...")
-                        self._clear_cache()
+                        self._clear_cache(ydl)
+                        self._report_retry(progress_callback, attempt + 1)
                         continue  # 继续下一次尝试
                     else:
                         # 第二次仍然是 403，放弃
@@ -241,16 +598,455 @@ class DownloadCore:
                     logger.error(f"❌ 下载错误: {error_msg[:100]}")
                     break
 
+            except InsufficientSpaceError as e:
+                last_error = e
+                if token.cancelled:
+                    break
+                logger.error(f"❌ 磁盘空间不足: {e}")
+                break
+
+            except IntegrityError as e:
+                last_error = e
+                logger.error(f"❌ 输出校验失败: {e}")
+                break
+
             except Exception as e:
                 last_error = e
+                if token.cancelled:
+                    break
                 error_msg = f"{type(e).__name__}: {str(e)}"
                 logger.error(f"❌ 未知错误: {error_msg[:100]}")
                 break
 
+            finally:
+                if workdir is not None:
+                    workdir.release(keep=token.cancelled and self.keep_partial_files)
+
+        # 被取消：按配置清理未完成文件
+        if token.cancelled:
+            if not self.keep_partial_files:
+                token.cleanup()
+            logger.info("🛑 下载已取消")
+            return False, "", "Download cancelled"
+
         # 所有尝试都失败
         error_msg = str(last_error).split("\n")[0][:100] if last_error else "Unknown error"
         return False, "", error_msg
 
+    async def download_formats(
+        self,
+        url: str,
+        format_ids: list[str],
+        info_callback: Optional[Callable[[str], None]] = None,
+        cancel_token: Optional[CancelToken] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> tuple[bool, str, Optional[str]]:
+        """
+        一次获取，生成多个格式（例如同时要视频和 MP3）
+
+        只提取一次视频信息，所需流的并集各下载一次，然后用 ffmpeg 从本地
+        副本并行生成每个输出。音频目标复用视频目标的音频流。
+
+        Args:
+            url: 视频 URL
+            format_ids: 目标格式标识符列表
+            info_callback: 信息回调函数（用于更新状态）
+            cancel_token: 取消令牌
+            progress_callback: 本次下载的进度回调（替代构造时传入的回调）
+
+        Returns:
+            (成功状态, 标题, 错误信息)
+        """
+        format_ids = list(dict.fromkeys(format_ids))
+        if self.store is not None:
+            # 已存储的格式直接交付，只下载其余格式
+            stored = {
+                f: self._deliver_from_store(url, f, info_callback, progress_callback)
+                for f in format_ids
+            }
+            missing = [f for f, title in stored.items() if title is None]
+            if not missing:
+                return True, stored[format_ids[0]], None
+            format_ids = missing
+        if len(format_ids) == 1:
+            return await self.download(
+                url, format_ids[0], info_callback, cancel_token, progress_callback
+            )
+
+        import yt_dlp
+
+        self._ensure_network()
+        install_process_tracking()
+        token = cancel_token or CancelToken()
+        max_retries = 2
+        last_error = None
+
+        for attempt in range(max_retries):
+            ydl = None
+            workdir = None
+            try:
+                ffmpeg = find_ffmpeg(self.ffmpeg_location)
+                ydl_opts = self.build_ydl_opts(format_ids[0])
+                if progress_callback is not None:
+                    ydl_opts["progress_hooks"] = [progress_callback]
+                ydl_opts["progress_hooks"].insert(0, token.progress_hook)
+                ydl_opts["cancel_token"] = token
+                # 输出由 fanout 生成，不使用 yt-dlp 的后处理器
+                ydl_opts["postprocessors"] = []
+
+                with token.activate(), self._new_ydl(ydl_opts) as ydl:
+                    if info_callback:
+                        info_callback("🔍 Extracting video information securely...")
+                    raw = self._extract(ydl, url, use_cache=attempt == 0)
+                    info = ydl.process_extracted(raw)
+                    token.raise_if_cancelled()
+                    title = info.get("title", "Unknown Title")
+                    display_title = self._display_title(title)
+
+                    targets, streams = plan_targets(ydl, info, format_ids)
+                    info = slim_info(info, streams)
+                    outputs = self._fanout_outputs(ydl, info, targets)
+                    # 下载目录中已有的输出不重新生成，也不被覆盖
+                    for format_id, path in outputs.items():
+                        if path.is_file():
+                            logger.info(f"📁 输出已存在，跳过生成: {path.name}")
+                    targets = [t for t in targets if not outputs[t.format_id].is_file()]
+                    streams = {s["format_id"]: s for t in targets for s in t.streams}
+                    pending = {t.format_id: outputs[t.format_id] for t in targets}
+                    streamed: dict = {}
+                    if targets:
+                        with self._admit(estimate_fanout_bytes(targets, streams), token):
+                            # 按 URL 和格式命名：取消时保留的流可以被下一次任务续传
+                            workdir = make_workdir(
+                                self.staging_dir or self.download_dir,
+                                f"{url}\n{','.join(format_ids)}", prefix=".fanout-",
+                            )
+                            local_streams = {}
+                            for n, (stream_id, fmt) in enumerate(streams.items(), 1):
+                                if info_callback:
+                                    info_callback(f"⬇️ 下载流 {n}/{len(streams)} ({stream_id})...")
+                                path = workdir.path / f"f{stream_id}.{fmt['ext']}"
+                                stream_info = dict(info)
+                                stream_info.pop("requested_formats", None)
+                                stream_info.update(fmt)
+                                success, _ = ydl.dl(str(path), stream_info)
+                                if not success:
+                                    raise FanoutError(f"Failed to download stream {stream_id}")
+                                local_streams[stream_id] = path
+
+                            if info_callback:
+                                info_callback(f"🎞️ 正在并行生成 {len(targets)} 个输出...")
+                            if self.staging_dir is not None:
+                                # 输出也先生成在暂存目录中
+                                staged = {f: workdir.path / p.name for f, p in pending.items()}
+                                produce_outputs(
+                                    ffmpeg, targets, local_streams, staged, token,
+                                    scheduler=self.transcode_scheduler,
+                                    preset=self.transcode_preset,
+                                )
+                                published = self._publish_outputs(
+                                    [str(p) for p in staged.values()], streamed, info_callback
+                                )
+                                outputs.update(zip(pending, map(Path, published)))
+                            else:
+                                produce_outputs(
+                                    ffmpeg, targets, local_streams, pending, token,
+                                    scheduler=self.transcode_scheduler,
+                                    preset=self.transcode_preset,
+                                )
+
+                    if info_callback:
+                        info_callback("🔒 正在校验输出文件...")
+                    verified = {
+                        v.filename: v for v in self._verify_outputs(
+                            list(outputs.values()), info.get("duration"), streamed,
+                            progress_callback,
+                        )
+                    }
+                    for format_id, path in outputs.items():
+                        if str(path) in verified:
+                            self._store_output(
+                                info.get("id"), format_id, verified[str(path)], title
+                            )
+
+                    logger.info(f"✅ 已生成 {len(targets)} 个格式: {', '.join(format_ids)}")
+                    return True, display_title, None
+
+            except JobCancelled:
+                break
+
+            except (
+                yt_dlp.utils.DownloadError, FanoutError, InsufficientSpaceError, IntegrityError
+            ) as e:
+                last_error = e
+                if token.cancelled:
+                    break
+                if attempt == 0 and self._is_403_error(e):
+                    logger.warning("⚠️ 检测到 403 错误，清除缓存后重试...")
+                    if info_callback:
+                        info_callback("⚠️ 403 错误，自动清除缓存重试中...")
+                    self._clear_cache(ydl)
+                    self._report_retry(progress_callback, attempt + 1)
+                    continue
+                logger.error(f"❌ 多格式下载失败: {str(e)[:100]}")
+                break
+
+            finally:
+                if workdir is not None:
+                    workdir.release(keep=token.cancelled and self.keep_partial_files)
+
+        if token.cancelled:
+            if not self.keep_partial_files:
+                token.cleanup()
+            return False, "", "Download cancelled"
+
+        error_msg = str(last_error).split("\n")[0][:100] if last_error else "Unknown error"
+        return False, "", error_msg
+
+    def _report_retry(self, progress_callback: Optional[Callable[[dict], None]],
+                      attempt: int) -> None:
+        """通过进度回调报告重试（任务面板统计重试次数）"""
+        callback = progress_callback or self.progress_callback
+        if callback:
+            callback({"status": "retrying", "attempt": attempt})
+
+    @staticmethod
+    def _display_title(title: str) -> str:
+        """清理标题用于显示"""
+        display_title = re.sub(r'[^\w\s.-]', '', title)[:70]
+        if len(title) > 70:
+            display_title += "..."
+        return display_title
+
+    def _deliver_from_store(
+        self,
+        url: str,
+        format_id: str,
+        info_callback: Optional[Callable[[str], None]] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> Optional[str]:
+        """
+        视频和格式已在去重存储中时直接交付到下载目录（不提取、不下载）
+
+        Returns:
+            显示用标题；未存储时返回 None
+        """
+        if self.store is None:
+            return None
+        video = normalize_youtube_url(url)
+        if not video.ok or video.kind != VIDEO:
+            return None
+        obj = self.store.lookup(video.id, format_id)
+        if obj is None:
+            return None
+        try:
+            dest, method = self.store.deliver(obj, self.download_dir)
+        except OSError as e:
+            logger.warning(f"⚠️ 从存储交付失败，重新下载: {e}")
+            return None
+        if info_callback:
+            info_callback(f"♻️ 已下载过，从存储交付 ({method or 'already present'})")
+        callback = progress_callback or self.progress_callback
+        if callback:
+            verification = Verification(str(dest), obj.size, obj.checksum)
+            callback({"status": "verified", **verification.to_dict()})
+        return self._display_title(obj.title or Path(obj.name).stem)
+
+    def _store_output(self, video_id: Optional[str], format_id: str,
+                      verification: Verification, title: str) -> None:
+        """把校验过的输出加入去重存储（失败不影响下载结果）"""
+        if self.store is None or not video_id:
+            return
+        try:
+            self.store.add(
+                Path(verification.filename), video_id, format_id, verification.checksum, title
+            )
+        except OSError as e:
+            logger.warning(f"⚠️ 加入存储失败: {e}")
+
+    def _stream_output(
+        self, ydl, raw: dict, format_id: str, token: CancelToken, hooks: list
+    ) -> Optional[Path]:
+        """
+        流式生成输出（下载的字节直接送入 ffmpeg）
+
+        Returns:
+            输出文件；不适合流式生成或 ffmpeg 无法从管道生成时返回 None
+            （调用方回退到普通流程）
+        """
+        from .streaming import StreamingError, can_stream, stream_to_ffmpeg
+
+        info = ydl.process_extracted(raw)
+        streams = info.get("requested_formats") or [info]
+        if not can_stream(format_id, streams):
+            return None
+        try:
+            ffmpeg = find_ffmpeg(self.ffmpeg_location)
+        except FanoutError:
+            return None
+        target = Target(format_id, streams)
+        output = Path(ydl.prepare_filename({**info, "ext": target.ext}))
+        try:
+            return stream_to_ffmpeg(
+                ydl, ffmpeg, target, output, token, hooks,
+                scheduler=self.transcode_scheduler, preset=self.transcode_preset,
+            )
+        except StreamingError as e:
+            logger.warning(f"⚠️ 流式处理失败，改用普通流程: {e}")
+            return None
+
+    def _admit(
+        self,
+        required: Optional[int],
+        token: CancelToken,
+        on_wait: Optional[Callable[[int, int, int], None]] = None,
+    ) -> contextlib.ExitStack:
+        """
+        为任务预留磁盘空间：有暂存目录时进行中的文件都在暂存目录（受容量上限
+        约束），输出最终还要放进下载目录（位于其他文件系统时同样预留）
+
+        Returns:
+            持有所有预留的 ExitStack（退出时释放）
+
+        Raises:
+            InsufficientSpaceError: 空间不足、等待超时或被取消
+        """
+        controller = get_admission_controller()
+        directories = [(self.download_dir, None)]
+        if self.staging_dir is not None:
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            directories.insert(0, (self.staging_dir, self.staging_limit))
+            if filesystem_id(self.staging_dir) == filesystem_id(self.download_dir):
+                directories = directories[:1]
+        stack = contextlib.ExitStack()
+        unregister = token.add_callback(controller.wake)
+        try:
+            for directory, limit in directories:
+                stack.enter_context(controller.admit(
+                    directory,
+                    required,
+                    timeout=self.admission_timeout,
+                    on_wait=on_wait,
+                    should_abort=lambda: token.cancelled,
+                    limit=limit,
+                ))
+        except BaseException:
+            stack.close()
+            raise
+        finally:
+            unregister()
+        return stack
+
+    def _existing_output(self, ydl, info: dict, format_id: str) -> Optional[Path]:
+        """
+        下载目录中已有的同名输出（使用暂存目录时 yt-dlp 无法自己发现）
+
+        Returns:
+            已存在的输出文件；不存在时返回 None
+        """
+        ext = get_format_config(format_id)[0]
+        target = self.download_dir / Path(ydl.prepare_filename({**info, "ext": ext})).name
+        return target if target.is_file() else None
+
+    def _publish_outputs(
+        self,
+        paths: list,
+        streamed: dict,
+        info_callback: Optional[Callable[[str], None]] = None,
+    ) -> list:
+        """
+        把暂存目录中完成的输出移到下载目录
+
+        写入时的校验和随文件一起迁移；跨文件系统复制时顺便计算的校验和
+        记入 streamed，校验时无需再从（可能很慢的）下载目录读一遍。
+
+        Returns:
+            下载目录中的路径（与 paths 一一对应）
+        """
+        if info_callback:
+            info_callback("📦 正在移动到下载目录...")
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        published = []
+        for path in paths:
+            if not path or not Path(path).exists():
+                published.append(path)
+                continue
+            target = self.download_dir / Path(path).name
+            entry = streamed.pop(str(path), None)
+            checksum = move_into_place(Path(path), target, self.write_options.checksum)
+            if checksum is not None:
+                stat = target.stat()
+                entry = (checksum, stat.st_size, stat.st_mtime_ns)
+            if entry is not None:
+                streamed[str(target)] = entry
+            published.append(str(target))
+        return published
+
+    @staticmethod
+    def _checksum_hook(streamed: dict) -> Callable[[dict], None]:
+        """
+        进度钩子：记录下载器在写入时计算的校验和
+
+        同时记录文件的大小和修改时间；后处理器原地改写文件后校验和失效。
+        """
+        def hook(d: dict) -> None:
+            if d.get("status") == "finished" and d.get("checksum"):
+                try:
+                    stat = Path(d["filename"]).stat()
+                except OSError:
+                    return
+                streamed[d["filename"]] = (d["checksum"], stat.st_size, stat.st_mtime_ns)
+
+        return hook
+
+    def _verify_outputs(
+        self,
+        paths: list,
+        expected_duration: Optional[float],
+        streamed: dict,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+    ) -> list[Verification]:
+        """
+        校验输出文件并以 "verified" 进度事件报告结果
+
+        未被后处理器改写的文件直接使用写入时的校验和；其余文件读一遍计算，
+        使用与写入路径相同的算法（写入时不计算校验和则使用默认算法）。
+
+        Raises:
+            IntegrityError: 输出被截断
+        """
+        ffprobe = find_ffprobe(self.ffmpeg_location)
+        algorithm = self.write_options.checksum or DEFAULT_ALGORITHM
+        callback = progress_callback or self.progress_callback
+        results = []
+        for path in paths:
+            if not path or not Path(path).exists():
+                continue
+            checksum = None
+            if str(path) in streamed:
+                checksum, size, mtime = streamed[str(path)]
+                stat = Path(path).stat()
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                    checksum = None
+            verification = verify_output(
+                Path(path), expected_duration, checksum, ffprobe, algorithm=algorithm
+            )
+            results.append(verification)
+            if callback:
+                callback({"status": "verified", **verification.to_dict()})
+        return results
+
+    @staticmethod
+    def _fanout_outputs(ydl, info: dict, targets: list) -> dict:
+        """计算每个目标的输出路径（扩展名相同的目标追加格式标识）"""
+        names = {t.format_id: Path(ydl.prepare_filename({**info, "ext": t.ext})) for t in targets}
+        duplicates = {p for p in names.values() if list(names.values()).count(p) > 1}
+        return {
+            format_id: path.with_name(f"{path.stem}.{format_id}{path.suffix}")
+            if path in duplicates else path
+            for format_id, path in names.items()
+        }
+
     def extract_video_info(self, url: str) -> Optional[dict]:
         """
         提取视频信息（不下载）
@@ -263,10 +1059,12 @@ class DownloadCore:
         """
         import yt_dlp
 
+        self._ensure_network()
         ydl_opts = {
             "quiet": True,
             "no_warnings": True,
             "extract_flat": True,
+            "allowed_extractors": YOUTUBE_EXTRACTORS,
         }
 
         try:
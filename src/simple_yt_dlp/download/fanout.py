@@ -0,0 +1,286 @@
+"""
+Fan-out - 一次获取，多格式输出
+Produce several target formats from a single fetch of the needed streams
+
+流程：
+1. 对每个目标格式用 yt-dlp 的格式选择器选出所需的流（视频目标优先）
+2. 音频目标复用视频目标已选中的音频流，避免重复下载同一段音频
+3. 每个流只下载一次（见 DownloadCore.download_formats）
+4. 用 ffmpeg 从本地副本并行生成所有输出（合并/转封装、提取音频、转码）
+"""
+import contextlib
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from .admission import DEFAULT_OVERHEAD, OVERHEAD_FACTORS
+from .cancel import CancelToken, JobCancelled
+from .formats import get_format_config
+from .transcode import DEFAULT_PRESET, TranscodeScheduler, encoder_args, lower_priority
+
+logger = logging.getLogger(__name__)
+
+
+# 音频目标：(编码器, 可直接复制的源编码前缀)
+AUDIO_CODECS = {
+    "mp3": ("libmp3lame", ()),
+    "m4a": ("aac", ("mp4a", "aac")),
+    "opus": ("libopus", ("opus",)),
+    "flac": ("flac", ("flac",)),
+    "wav": ("pcm_s16le", ()),
+}
+
+# 有损音频的目标码率（与单格式下载的 preferredquality 一致）
+LOSSY_BITRATE = "192k"
+
+
+class FanoutError(Exception):
+    """多格式输出失败"""
+
+
+class Target:
+    """
+    一个输出目标及其输入流
+    """
+
+    def __init__(self, format_id: str, streams: list[dict]):
+        self.format_id = format_id
+        self.ext, _, self.is_audio = get_format_config(format_id)
+        self.streams = streams
+
+    def __repr__(self) -> str:
+        ids = "+".join(s["format_id"] for s in self.streams)
+        return f"Target({self.format_id} <- {ids})"
+
+
+def _has_audio(fmt: dict) -> bool:
+    return fmt.get("acodec") not in (None, "none")
+
+
+def _has_video(fmt: dict) -> bool:
+    return fmt.get("vcodec") not in (None, "none")
+
+
+def select_streams(ydl, info: dict, spec: str) -> list[dict]:
+    """
+    用 yt-dlp 的格式选择器为格式字符串选择流
+
+    Args:
+        ydl: YoutubeDL 实例
+        info: 已提取的视频信息
+        spec: yt-dlp 格式字符串
+
+    Returns:
+        需要下载的流（合并格式返回多个分离流）
+
+    Raises:
+        FanoutError: 没有满足条件的格式
+    """
+    formats = info.get("formats") or [info]
+    selected = ydl._select_formats(formats, ydl.build_format_selector(spec))
+    if not selected:
+        raise FanoutError(f"Requested format is not available: {spec}")
+    return selected[0].get("requested_formats") or [selected[0]]
+
+
+def plan_targets(ydl, info: dict, format_ids: list[str]) -> tuple[list[Target], dict[str, dict]]:
+    """
+    规划所有目标需要的流（取并集）
+
+    Args:
+        ydl: YoutubeDL 实例
+        info: 已提取的视频信息
+        format_ids: 目标格式标识符列表
+
+    Returns:
+        (目标列表, 需要下载的流 {format_id: 格式字典})
+    """
+    streams: dict[str, dict] = {}
+    targets = []
+    # 视频目标优先选择，音频目标尽量复用其中的音频流
+    ordered = sorted(dict.fromkeys(format_ids), key=lambda f: get_format_config(f)[2])
+    for format_id in ordered:
+        _, spec, is_audio = get_format_config(format_id)
+        shared_audio = [s for s in streams.values() if _has_audio(s)]
+        if is_audio and shared_audio:
+            chosen = [max(shared_audio, key=lambda s: (not _has_video(s), s.get("abr") or 0))]
+        else:
+            chosen = select_streams(ydl, info, spec)
+        for stream in chosen:
+            streams.setdefault(stream["format_id"], stream)
+        targets.append(Target(format_id, [streams[s["format_id"]] for s in chosen]))
+
+    # 恢复调用方给出的顺序
+    targets.sort(key=lambda t: format_ids.index(t.format_id))
+    logger.debug(f"多格式规划: {targets}，共 {len(streams)} 个流")
+    return targets, streams
+
+
+def estimate_fanout_bytes(targets: list[Target], streams: dict[str, dict]) -> Optional[int]:
+    """
+    估算峰值磁盘占用：下载的流 + 所有输出
+
+    Returns:
+        估算字节数；任一流大小未知时返回 None
+    """
+    sizes = {}
+    for format_id, stream in streams.items():
+        size = stream.get("filesize") or stream.get("filesize_approx")
+        if not size:
+            return None
+        sizes[format_id] = size
+
+    total = sum(sizes.values())
+    for target in targets:
+        factor = OVERHEAD_FACTORS.get(target.format_id, DEFAULT_OVERHEAD) - 1
+        total += factor * sum(sizes[s["format_id"]] for s in target.streams)
+    return int(total)
+
+
+def find_ffmpeg(location: Optional[str]) -> str:
+    """
+    解析 ffmpeg 可执行文件路径（location 可以是文件或目录）
+
+    Raises:
+        FanoutError: 找不到 ffmpeg
+    """
+    if location:
+        path = Path(location)
+        if path.is_dir():
+            path = path / "ffmpeg"
+        if path.exists() or shutil.which(str(path)):
+            return str(path)
+    found = shutil.which("ffmpeg")
+    if not found:
+        raise FanoutError("FFmpeg is required to produce multiple formats")
+    return found
+
+
+def ffmpeg_command(
+    ffmpeg: str,
+    target: Target,
+    inputs: list[Path],
+    output: Path,
+    threads: Optional[int] = None,
+    preset: str = DEFAULT_PRESET,
+) -> list[str]:
+    """
+    构建生成一个输出的 ffmpeg 命令
+
+    Args:
+        ffmpeg: ffmpeg 路径
+        target: 输出目标
+        inputs: 与 target.streams 一一对应的本地文件
+        output: 输出文件
+        threads: ffmpeg 线程数（默认由 ffmpeg 决定）
+        preset: 需要编码时使用的编码预设（见 transcode.py）
+
+    Returns:
+        命令参数列表
+    """
+    cmd = [ffmpeg, "-y", "-nostdin", "-loglevel", "error"]
+    for path in inputs:
+        cmd += ["-i", str(path)]
+
+    if target.is_audio:
+        encoder, copyable = AUDIO_CODECS[target.format_id]
+        source_codec = target.streams[0].get("acodec") or ""
+        cmd += ["-vn", "-map", "0:a:0"]
+        if copyable and source_codec.startswith(copyable):
+            cmd += ["-c:a", "copy"]
+        else:
+            cmd += ["-c:a", encoder, *encoder_args(target.format_id, preset)]
+            if target.format_id in ("mp3", "m4a", "opus"):
+                cmd += ["-b:a", LOSSY_BITRATE]
+    else:
+        for i, stream in enumerate(target.streams):
+            if _has_video(stream):
+                cmd += ["-map", f"{i}:v:0"]
+            if _has_audio(stream):
+                cmd += ["-map", f"{i}:a:0"]
+        cmd += ["-c", "copy"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+
+    # 隐私保护：不写入任何元数据
+    cmd += ["-map_metadata", "-1", str(output)]
+    return cmd
+
+
+def _run_ffmpeg(cmd: list[str], token: CancelToken) -> None:
+    proc = subprocess.Popen(
+        cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    token.attach_process(proc)
+    lower_priority(proc.pid)
+    _, stderr = proc.communicate()
+    token.raise_if_cancelled()
+    if proc.returncode != 0:
+        message = stderr.decode("utf-8", "replace").strip().splitlines()
+        raise FanoutError(f"ffmpeg failed: {message[-1] if message else proc.returncode}")
+
+
+def produce_outputs(
+    ffmpeg: str,
+    targets: list[Target],
+    local_streams: dict[str, Path],
+    outputs: dict[str, Path],
+    token: CancelToken,
+    max_workers: Optional[int] = None,
+    scheduler: Optional[TranscodeScheduler] = None,
+    preset: str = DEFAULT_PRESET,
+) -> list[Path]:
+    """
+    从本地流并行生成所有输出
+
+    Args:
+        ffmpeg: ffmpeg 路径
+        targets: 输出目标
+        local_streams: {流 format_id: 本地文件}
+        outputs: {目标 format_id: 输出文件}
+        token: 取消令牌（ffmpeg 子进程登记到令牌）
+        max_workers: 并行数，默认 min(目标数, CPU 数)
+        scheduler: 转码调度器（每个输出占一个线程名额，总数不超过预算）
+        preset: 编码预设
+
+    Returns:
+        生成的输出文件列表
+
+    Raises:
+        FanoutError: 任一输出失败
+        JobCancelled: 任务被取消
+    """
+    workers = max_workers or min(len(targets), os.cpu_count() or 1)
+
+    def produce(target: Target) -> Path:
+        output = outputs[target.format_id]
+        temp = output.with_name(f"{output.stem}.temp{output.suffix}")
+        token.track_file(str(output))
+        inputs = [local_streams[s["format_id"]] for s in target.streams]
+        # 音频编码器是单线程的，视频目标只复制流：每个输出一个线程即可
+        with scheduler.slot(1, token) if scheduler else contextlib.nullcontext(None) as threads:
+            cmd = ffmpeg_command(ffmpeg, target, inputs, temp, threads=threads, preset=preset)
+            _run_ffmpeg(cmd, token)
+        os.replace(temp, output)
+        logger.info(f"已生成 {target.format_id}: {output}")
+        return output
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout") as pool:
+        futures = [pool.submit(produce, target) for target in targets]
+        results, errors = [], []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except (FanoutError, JobCancelled, OSError) as e:
+                errors.append(e)
+
+    for error in errors:
+        if isinstance(error, JobCancelled):
+            raise error
+    if errors:
+        raise FanoutError(str(errors[0])) from errors[0]
+    return results
@@ -0,0 +1,264 @@
+"""
+Integrity - 下载结果的校验和与完整性检查
+Streaming checksums and a fast truncation check for finished outputs
+
+- StreamDigest: 在写入路径上计算校验和。分段下载的各区间乱序写入，按顺序
+  到达的数据直接计算；超前写入的区间先记录下来，前面的空洞补齐后从文件
+  （通常仍在页缓存中）读回补算，不需要下载完成后再完整读一遍文件
+- file_digest: 后处理器（合并、转码）生成的输出只能在生成后读一遍计算
+- probe_duration: 用 ffprobe 读取容器头中的时长（只读文件头，不解码），与
+  info 中的预期时长比较，发现被截断的输出
+"""
+import hashlib
+import json
+import logging
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 默认校验算法
+DEFAULT_ALGORITHM = "sha256"
+
+# 读回文件计算校验和时的块大小
+READ_SIZE = 1024 * 1024
+
+# 时长允许的误差：固定秒数（info 中的时长是取整的秒数，音频编码有填充）
+# 和预期时长的比例，取较大者
+DURATION_TOLERANCE = 2.0
+DURATION_TOLERANCE_RATIO = 0.01
+
+# ffprobe 超时（秒）
+PROBE_TIMEOUT = 30
+
+
+class IntegrityError(Exception):
+    """输出文件未通过完整性检查"""
+
+
+class StreamDigest:
+    """
+    写入路径上的增量校验和（支持多个线程按偏移乱序写入）
+    """
+
+    def __init__(self, algorithm: str = DEFAULT_ALGORITHM,
+                 read: Optional[Callable[[int, int], bytes]] = None):
+        """
+        Args:
+            algorithm: hashlib 算法名
+            read: read(offset, size) 从文件读回已写入的数据（用于补算乱序区间）
+        """
+        self.algorithm = algorithm
+        self._hash = hashlib.new(algorithm)
+        self._read = read
+        self._lock = threading.Lock()
+        self._frontier = 0
+        # 已写入但尚未计算的区间 [(start, end)]，按 start 排序且互不相邻
+        self._pending: list[list[int]] = []
+        self._busy = False
+        self.read_back = 0
+
+    @property
+    def hashed(self) -> int:
+        """已计算的连续前缀长度"""
+        return self._frontier
+
+    def _add(self, start: int, end: int) -> None:
+        start = max(start, self._frontier)
+        if end <= start:
+            return
+        merged = []
+        for span in self._pending:
+            if span[1] < start or span[0] > end:
+                merged.append(span)
+            else:
+                start, end = min(start, span[0]), max(end, span[1])
+        merged.append([start, end])
+        merged.sort()
+        self._pending = merged
+
+    def update_at(self, offset: int, data) -> None:
+        """
+        登记在 offset 处写入的数据（写入文件之后调用）
+
+        同一时间只有一个线程计算；其他线程只登记区间，由计算中的线程接手。
+        """
+        end = offset + len(data)
+        with self._lock:
+            self._add(offset, end)
+            if self._busy:
+                return
+            self._busy = True
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending or self._pending[0][0] > self._frontier:
+                        self._busy = False
+                        return
+                    start, stop = self._pending.pop(0)
+                    start = self._frontier
+                if start == offset and data is not None:
+                    # 刚写入的数据直接计算，其后相连的区间从文件读回
+                    self._hash.update(data)
+                    self._catch_up(end, stop)
+                    data = None
+                else:
+                    self._catch_up(start, stop)
+                with self._lock:
+                    self._frontier = stop
+        except BaseException:
+            with self._lock:
+                self._busy = False
+            raise
+
+    def _catch_up(self, start: int, stop: int) -> None:
+        while start < stop:
+            chunk = self._read(start, min(READ_SIZE, stop - start))
+            if not chunk:
+                raise IntegrityError(f"Short read at offset {start}")
+            self._hash.update(chunk)
+            self.read_back += len(chunk)
+            start += len(chunk)
+
+    def hexdigest(self, size: Optional[int] = None) -> Optional[str]:
+        """
+        获取校验和
+
+        Args:
+            size: 预期的文件大小
+
+        Returns:
+            "算法:十六进制"；仍有未写入的空洞（或长度与 size 不符）时返回 None
+        """
+        with self._lock:
+            complete = not self._pending and not self._busy
+            if not complete or (size is not None and self._frontier != size):
+                return None
+            return f"{self.algorithm}:{self._hash.hexdigest()}"
+
+
+def file_digest(path: Path, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    """
+    读一遍文件计算校验和（用于后处理器生成的输出）
+
+    Returns:
+        "算法:十六进制"
+    """
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_SIZE):
+            digest.update(chunk)
+    return f"{algorithm}:{digest.hexdigest()}"
+
+
+def find_ffprobe(ffmpeg_location: Optional[str] = None) -> Optional[str]:
+    """查找 ffprobe（优先与 ffmpeg 同目录）"""
+    if ffmpeg_location:
+        path = Path(ffmpeg_location)
+        directory = path if path.is_dir() else path.parent
+        candidate = directory / "ffprobe"
+        if candidate.exists():
+            return str(candidate)
+    return shutil.which("ffprobe")
+
+
+def probe_duration(path: Path, ffprobe: Optional[str]) -> Optional[float]:
+    """
+    读取媒体文件的时长（只解析容器头）
+
+    Returns:
+        时长（秒）；ffprobe 不可用或无法解析时返回 None
+    """
+    if not ffprobe:
+        return None
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "json",
+             str(path)],
+            capture_output=True, timeout=PROBE_TIMEOUT, check=True,
+        )
+        return float(json.loads(result.stdout)["format"]["duration"])
+    except (OSError, subprocess.SubprocessError, KeyError, TypeError, ValueError) as e:
+        logger.debug(f"无法读取时长 {path}: {e}")
+        return None
+
+
+class Verification:
+    """
+    一个输出文件的校验结果
+    """
+
+    __slots__ = ("filename", "size", "checksum", "duration", "expected_duration")
+
+    def __init__(self, filename: str, size: int, checksum: str,
+                 duration: Optional[float] = None, expected_duration: Optional[float] = None):
+        self.filename = filename
+        self.size = size
+        self.checksum = checksum
+        self.duration = duration
+        self.expected_duration = expected_duration
+
+    @property
+    def truncated(self) -> bool:
+        """实际时长明显短于预期时长"""
+        if self.duration is None or not self.expected_duration:
+            return False
+        tolerance = max(DURATION_TOLERANCE, self.expected_duration * DURATION_TOLERANCE_RATIO)
+        return self.duration < self.expected_duration - tolerance
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的字典（写入历史记录和任务事件）"""
+        return {
+            "filename": self.filename,
+            "size": self.size,
+            "checksum": self.checksum,
+            "duration": self.duration,
+            "expected_duration": self.expected_duration,
+        }
+
+    def __repr__(self) -> str:
+        return f"Verification({Path(self.filename).name}, {self.checksum[:19]}…)"
+
+
+def verify_output(
+    path: Path,
+    expected_duration: Optional[float] = None,
+    checksum: Optional[str] = None,
+    ffprobe: Optional[str] = None,
+    algorithm: str = DEFAULT_ALGORITHM,
+) -> Verification:
+    """
+    校验一个输出文件
+
+    Args:
+        path: 输出文件
+        expected_duration: info 中的预期时长（秒）
+        checksum: 写入时已计算的校验和；None 时读一遍文件计算
+        ffprobe: ffprobe 路径（None 时跳过时长检查）
+        algorithm: 需要读文件计算时使用的算法
+
+    Returns:
+        Verification
+
+    Raises:
+        IntegrityError: 输出时长明显短于预期（文件被截断）
+    """
+    path = Path(path)
+    verification = Verification(
+        filename=str(path),
+        size=path.stat().st_size,
+        checksum=checksum or file_digest(path, algorithm),
+        duration=probe_duration(path, ffprobe),
+        expected_duration=expected_duration,
+    )
+    if verification.truncated:
+        raise IntegrityError(
+            f"Output looks truncated: {verification.duration:.1f}s of "
+            f"{expected_duration:.0f}s ({path.name})"
+        )
+    logger.info(f"🔒 {path.name}: {verification.checksum}")
+    return verification
@@ -0,0 +1,472 @@
+"""
+Job Manager - 常驻下载任务队列
+Resident job queue shared by the daemon's clients
+
+任务按提交顺序排队，由固定数量的工作线程执行（限制同时下载数，避免
+多个进程各自抢占带宽和触发限流）。任务状态变化、进度和状态消息以事件
+的形式广播给订阅者（守护进程把事件转发给客户端）。格式为 "auto" 的任务
+在开始时由 QualityPlanner 按截止时间和流量预算选择画质。
+"""
+import asyncio
+import collections
+import copy
+import functools
+import itertools
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from ..utils.logging import log_context
+from .cancel import CancelToken
+from .core import DownloadCore
+from .formats import FORMAT_MAPPING
+from .integrity import Verification
+from .quality import AUTO, QualityPlan, QualityPlanner
+from .warmup import WarmUp
+
+logger = logging.getLogger(__name__)
+
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+# 同时执行的任务数
+DEFAULT_MAX_CONCURRENT = 2
+
+# 保留的已结束任务数（更早结束的任务被移除，list / watch 不再返回它们）
+DEFAULT_KEEP_FINISHED = 500
+
+# 同一任务两次进度事件的最小间隔（秒）
+PROGRESS_INTERVAL = 0.25
+
+# 转发给客户端的进度字段（yt-dlp 的进度字典包含不可序列化的 info_dict）
+# 以及 "verified" 事件中的校验结果字段
+PROGRESS_KEYS = (
+    "status", "attempt", "downloaded_bytes", "total_bytes", "total_bytes_estimate",
+    "speed", "eta", "filename", "size", "checksum", "duration", "expected_duration",
+)
+
+
+def run_download(
+    core: DownloadCore,
+    url: str,
+    formats: list[str],
+    directory: Path,
+    cancel_token: CancelToken,
+    info_callback: Optional[Callable[[str], None]] = None,
+    progress_callback: Optional[Callable[[dict], None]] = None,
+) -> tuple[bool, str, Optional[str]]:
+    """
+    在当前线程中用常驻核心的浅拷贝执行一个下载（多个格式时一次获取多格式输出）
+
+    Args:
+        core: 常驻的下载核心
+        url: 视频 URL
+        formats: 格式标识符列表
+        directory: 下载目录
+        cancel_token: 取消令牌
+        info_callback: 状态消息回调
+        progress_callback: 进度回调
+
+    Returns:
+        (成功状态, 标题, 错误信息)
+    """
+    core = copy.copy(core)
+    core.download_dir = directory
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if len(formats) > 1:
+        run = core.download_formats(
+            url=url,
+            format_ids=formats,
+            info_callback=info_callback,
+            cancel_token=cancel_token,
+            progress_callback=progress_callback,
+        )
+    else:
+        run = core.download(
+            url=url,
+            format_id=formats[0],
+            info_callback=info_callback,
+            cancel_token=cancel_token,
+            progress_callback=progress_callback,
+        )
+    return asyncio.run(run)
+
+
+def parse_formats(format_id: Union[str, list[str]]) -> list[str]:
+    """
+    解析并验证格式列表（逗号分隔的字符串或列表，去重保序）
+
+    "auto"（自动画质）只能单独使用。
+
+    Raises:
+        ValueError: 格式为空或不存在
+    """
+    if isinstance(format_id, str):
+        format_id = format_id.split(",")
+    formats = list(dict.fromkeys(f.strip() for f in format_id if f.strip()))
+    if formats == [AUTO]:
+        return formats
+    if AUTO in formats:
+        raise ValueError("Format 'auto' cannot be combined with other formats")
+    unknown = [f for f in formats if f not in FORMAT_MAPPING]
+    if not formats or unknown:
+        raise ValueError(f"Unknown format: {', '.join(unknown) or '(none)'}")
+    return formats
+
+
+class Job:
+    """
+    一个下载任务
+    """
+
+    # 守护进程中可能保留成千上万个任务，不使用实例字典
+    __slots__ = (
+        "id", "url", "formats", "directory", "state", "title", "error", "progress",
+        "created_at", "finished_at", "cancel_token", "outputs", "retries", "_last_progress",
+    )
+
+    def __init__(self, job_id: int, url: str, formats: list[str], directory: Path):
+        self.id = job_id
+        self.url = url
+        self.formats = formats
+        self.directory = directory
+        self.state = QUEUED
+        self.title = ""
+        self.error: Optional[str] = None
+        self.progress: dict = {}
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_token = CancelToken()
+        # 校验过的输出文件（文件名、大小、校验和、时长）
+        self.outputs: list[dict] = []
+        # 重试次数（例如 403 后清除缓存重新提取）
+        self.retries = 0
+        self._last_progress = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINAL_STATES
+
+    @property
+    def format_id(self) -> str:
+        """目标格式（多个格式以逗号分隔）"""
+        return ",".join(self.formats)
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的字典"""
+        return {
+            "id": self.id,
+            "url": self.url,
+            "format": self.format_id,
+            "directory": str(self.directory),
+            "state": self.state,
+            "title": self.title,
+            "error": self.error,
+            "progress": self.progress,
+            "outputs": self.outputs,
+            "retries": self.retries,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    任务管理器 - 排队、执行、取消和事件广播
+    """
+
+    def __init__(
+        self,
+        core: DownloadCore,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        processes: bool = False,
+        planner: Optional[QualityPlanner] = None,
+        warmup: Optional[WarmUp] = None,
+        keep_finished: int = DEFAULT_KEEP_FINISHED,
+    ):
+        """
+        初始化任务管理器
+
+        Args:
+            core: 常驻的下载核心（每个任务使用其浅拷贝，共享连接池和缓存）
+            max_concurrent: 同时执行的任务数
+            processes: 是否在预启动的工作进程中执行任务（每个并发槽位一个进程，
+                提取时的 CPU 密集工作不再争抢本进程的 GIL）
+            planner: "auto" 格式任务的画质规划器（截止时间和流量预算），
+                默认不受限（选最高画质）
+            warmup: 后台预热；工作线程在执行第一个任务前等待其就绪
+            keep_finished: 保留的已结束任务数（常驻进程的任务表不会无限增长）
+        """
+        self.core = core
+        self.planner = planner or QualityPlanner()
+        self.warmup = warmup
+        self.max_concurrent = max(1, max_concurrent)
+        self.keep_finished = max(0, keep_finished)
+        self.pool = None
+        if processes:
+            from .process_pool import ProcessPool
+
+            self.pool = ProcessPool(core, processes=self.max_concurrent)
+        self._lock = threading.Lock()
+        self._jobs: dict[int, Job] = {}
+        self._finished: collections.deque[int] = collections.deque()  # 按结束顺序
+        self._ids = itertools.count(1)
+        self._pending: queue.Queue = queue.Queue()
+        self._subscribers: list[queue.Queue] = []
+        self._workers: list[threading.Thread] = []
+        self._stopped = False
+
+    def start(self) -> None:
+        """启动工作线程（以及工作进程）"""
+        if self.pool is not None:
+            self.pool.start()
+        for i in range(self.max_concurrent):
+            worker = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def shutdown(self, cancel_running: bool = True) -> None:
+        """
+        停止任务管理器
+
+        Args:
+            cancel_running: 是否取消排队和运行中的任务
+        """
+        self._stopped = True
+        if cancel_running:
+            for job in self.list():
+                if not job.finished:
+                    job.cancel_token.cancel()
+        for _ in self._workers:
+            self._pending.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+        self._workers.clear()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    # ------------------------------------------------------------------
+    # 任务操作
+    # ------------------------------------------------------------------
+
+    def submit(
+        self, url: str, format_id: Union[str, list[str]], directory: Optional[Path] = None
+    ) -> Job:
+        """
+        提交任务
+
+        Args:
+            url: 视频 URL
+            format_id: 格式标识符；多个格式用列表或逗号分隔（一次获取，多格式输出）
+            directory: 下载目录，默认使用核心的下载目录
+
+        Returns:
+            新建的 Job
+
+        Raises:
+            ValueError: 格式不存在或管理器已停止
+        """
+        formats = parse_formats(format_id)
+        if self._stopped:
+            raise ValueError("Job manager is shutting down")
+
+        with self._lock:
+            job = Job(next(self._ids), url, formats, Path(directory or self.core.download_dir))
+            self._jobs[job.id] = job
+        logger.info(f"任务 #{job.id} 已提交: {url} ({format_id})")
+        self._publish({"event": "job", "job": job.to_dict()})
+        self._pending.put(job)
+        return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        """按 ID 获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        """获取所有任务（按提交顺序）"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        取消任务
+
+        Args:
+            job_id: 任务 ID
+
+        Returns:
+            任务存在且尚未结束时返回 True
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_token.cancel()
+        # 令牌先取消：_start 要么看到取消而不执行，要么已经开始执行，由 _run 结束任务
+        with self._lock:
+            queued = job.state == QUEUED
+        if queued:
+            self._finish(job, CANCELLED, "Download cancelled")
+        return True
+
+    # ------------------------------------------------------------------
+    # 事件
+    # ------------------------------------------------------------------
+
+    def subscribe(self) -> queue.Queue:
+        """
+        订阅任务事件
+
+        Returns:
+            接收事件字典的队列
+        """
+        events: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue) -> None:
+        """取消订阅"""
+        with self._lock:
+            if events in self._subscribers:
+                self._subscribers.remove(events)
+
+    def _publish(self, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            events.put(event)
+
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+
+    def _worker(self) -> None:
+        """工作线程：依次执行排队的任务"""
+        while True:
+            job = self._pending.get()
+            if job is None:
+                return
+            if job.finished:
+                continue
+            if self.warmup is not None and not self.warmup.ready:
+                message = "⏳ 等待下载引擎预热..."
+                self._publish({"event": "status", "id": job.id, "message": message})
+                self.warmup.wait()
+            if not self._start(job):
+                continue
+            with log_context(job.id):
+                try:
+                    self._run(job)
+                except Exception as e:
+                    logger.exception(f"任务 #{job.id} 异常")
+                    self._finish(job, FAILED, f"{type(e).__name__}: {e}")
+
+    def _start(self, job: Job) -> bool:
+        """
+        把排队的任务标记为运行中（与 cancel() 的状态检查互斥）
+
+        Returns:
+            任务是否可以执行；排队时已被取消的任务直接结束
+        """
+        with self._lock:
+            if job.finished:
+                return False
+            started = not job.cancel_token.cancelled
+            if started:
+                job.state = RUNNING
+        if not started:
+            self._finish(job, CANCELLED, "Download cancelled")
+        return started
+
+    def _run(self, job: Job) -> None:
+        """执行单个任务（状态已由 _start 设为运行中）"""
+        self._publish({"event": "job", "job": job.to_dict()})
+
+        def on_status(message: str) -> None:
+            self._publish({"event": "status", "id": job.id, "message": message})
+
+        plan = None
+        if job.formats == [AUTO]:
+            on_status("📐 正在规划自动画质...")
+            try:
+                plan = self._plan(job)
+            except Exception as e:
+                logger.error(f"❌ 自动画质规划失败: {e}")
+                self._finish(job, FAILED, str(e).split("\n")[0][:100])
+                return
+            job.formats = [plan.format_id]
+            on_status(f"📐 自动画质: {plan.describe()}")
+            self._publish({"event": "job", "job": job.to_dict()})
+
+        meter = self.planner.meter
+
+        def on_progress(d: dict) -> None:
+            if d.get("status") == "verified":
+                job.outputs.append({k: d.get(k) for k in Verification.__slots__})
+                return
+            if d.get("status") in ("downloading", "finished"):
+                meter.observe(job.id, d.get("filename"), d.get("downloaded_bytes"))
+            elif d.get("status") == "retrying":
+                job.retries += 1
+            now = time.monotonic()
+            if d.get("status") == "downloading" and now - job._last_progress < PROGRESS_INTERVAL:
+                return
+            job._last_progress = now
+            job.progress = {k: d.get(k) for k in PROGRESS_KEYS if d.get(k) is not None}
+            self._publish({"event": "progress", "id": job.id, "progress": job.progress})
+
+        if self.pool is not None:
+            run = functools.partial(self.pool.run, job_id=job.id)
+        else:
+            run = functools.partial(run_download, self.core)
+        try:
+            success, title, error = run(
+                job.url, job.formats, job.directory, job.cancel_token,
+                info_callback=on_status, progress_callback=on_progress,
+            )
+        finally:
+            downloaded = meter.finish(job.id)
+            if plan is not None:
+                self.planner.finish(plan, downloaded or None)
+        job.title = title
+        if job.cancel_token.cancelled:
+            self._finish(job, CANCELLED, "Download cancelled")
+        elif success:
+            self._finish(job, DONE, None)
+        else:
+            self._finish(job, FAILED, error)
+
+    def _plan(self, job: Job) -> QualityPlan:
+        """为 "auto" 任务选择档位（开始时才规划，使用最新的吞吐量）"""
+        with self._lock:
+            pending = sum(
+                1 for other in self._jobs.values()
+                if other is not job and other.state == QUEUED and other.formats == [AUTO]
+            )
+        sizes = self.core.estimate_sizes(job.url, list(self.planner.tiers))
+        return self.planner.choose(sizes, pending=pending + 1)
+
+    def _finish(self, job: Job, state: str, error: Optional[str]) -> None:
+        with self._lock:
+            if job.finished:
+                return
+            job.state = state
+            job.error = error
+            job.finished_at = time.time()
+            self._finished.append(job.id)
+            while len(self._finished) > self.keep_finished:
+                del self._jobs[self._finished.popleft()]
+        logger.info(f"任务 #{job.id} 结束: {state}")
+        self._publish({"event": "job", "job": job.to_dict()})
@@ -0,0 +1,473 @@
+"""
+Lease Queue - 多进程 / 多主机共享的任务队列
+Lease-based job queue on a shared SQLite file
+
+多个工作进程（可以在共享同一文件系统的不同主机上）各自运行 DownloadCore，
+从同一个 SQLite 文件中领取任务，不需要中心服务：
+
+- 领取 (claim): 在写事务中把最早的排队任务标记为 leased，记录工作者、租约
+  到期时间，并递增 lease_token（防护令牌）
+- 心跳 (heartbeat): 定期延长租约；租约已丢失或任务被取消时返回 False，
+  工作者应立即中止
+- 过期回收: 租约到期的任务（工作者崩溃或失联）重新排队，超过最大尝试
+  次数后标记为失败
+- 完成 (complete): 只有持有当前 lease_token 的工作者才能完成任务，完成
+  记录以任务 ID 为主键写入 completions 表，保证每个任务恰好完成一次
+
+注意：SQLite 依赖文件系统的字节范围锁，共享目录必须正确支持 POSIX 锁
+（多数 NFSv4 / SMB3 挂载支持）；不使用 WAL（需要共享内存，无法跨主机）。
+租约时间使用墙上时钟，各主机的时钟需要大致同步（误差远小于租约时长）。
+"""
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+from ..utils.logging import log_context
+from .cancel import CancelToken
+from .core import DownloadCore
+from .jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, parse_formats, run_download
+
+logger = logging.getLogger(__name__)
+
+
+# 租约时长（秒）和心跳间隔
+LEASE_SECONDS = 60.0
+HEARTBEAT_FRACTION = 3
+
+# 同一任务最多被领取的次数（工作者反复崩溃的任务最终标记为失败）
+MAX_ATTEMPTS = 3
+
+# 队列为空时工作者的轮询间隔（秒）
+IDLE_POLL = 2.0
+
+# 等待其他进程释放写锁的最长时间（秒）
+BUSY_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    formats TEXT NOT NULL,
+    directory TEXT,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_token INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    title TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE TABLE IF NOT EXISTS completions (
+    job_id INTEGER PRIMARY KEY REFERENCES jobs (id),
+    worker TEXT NOT NULL,
+    lease_token INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+"""
+
+
+class Lease:
+    """
+    一个已领取的任务
+    """
+
+    __slots__ = ("job_id", "token", "worker", "url", "formats", "directory", "expires_at")
+
+    def __init__(self, job_id: int, token: int, worker: str, url: str, formats: list[str],
+                 directory: Optional[str], expires_at: float):
+        self.job_id = job_id
+        self.token = token
+        self.worker = worker
+        self.url = url
+        self.formats = formats
+        self.directory = directory
+        self.expires_at = expires_at
+
+    def __repr__(self) -> str:
+        return f"Lease(#{self.job_id}, token={self.token}, worker={self.worker})"
+
+
+class LeaseQueue:
+    """
+    基于 SQLite 文件的租约队列（每个线程使用独立连接）
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = LEASE_SECONDS,
+                 max_attempts: int = MAX_ATTEMPTS):
+        """
+        打开（必要时创建）队列
+
+        Args:
+            path: SQLite 文件路径（放在所有工作者共享的目录中）
+            lease_seconds: 租约时长（秒）
+            max_attempts: 同一任务最多被领取的次数
+        """
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # executescript 自行提交，不能放在显式事务中
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # isolation_level=None：事务由 _transaction 显式控制
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=DELETE")
+            db.execute("PRAGMA synchronous=FULL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connect()
+        # IMMEDIATE：事务开始即获取写锁，领取时不会与其他工作者交错
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    # ------------------------------------------------------------------
+    # 提交和查询
+    # ------------------------------------------------------------------
+
+    def submit(self, url: str, format_id: Union[str, list[str]],
+               directory: Optional[Path] = None) -> int:
+        """
+        提交任务
+
+        Args:
+            url: 视频 URL
+            format_id: 格式标识符（多个格式用列表或逗号分隔）
+            directory: 下载目录，默认使用工作者核心的下载目录
+
+        Returns:
+            任务 ID
+
+        Raises:
+            ValueError: 格式不存在
+        """
+        formats = parse_formats(format_id)
+        with self._transaction() as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (url, formats, directory, state, max_attempts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, ",".join(formats), str(directory) if directory else None, QUEUED,
+                 self.max_attempts, time.time()),
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[dict]:
+        """按 ID 获取任务"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def completions(self) -> list[dict]:
+        """获取完成记录"""
+        rows = self._connect().execute("SELECT * FROM completions ORDER BY job_id").fetchall()
+        return [dict(row) for row in rows]
+
+    def list(self) -> list[dict]:
+        """获取所有任务（按提交顺序）"""
+        rows = self._connect().execute("SELECT * FROM jobs ORDER BY id").fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        """转换为与 Job.to_dict 相同形式的字典"""
+        state = RUNNING if row["state"] == "leased" else row["state"]
+        return {
+            "id": row["id"],
+            "url": row["url"],
+            "format": row["formats"],
+            "directory": row["directory"],
+            "state": state,
+            "title": row["title"] or "",
+            "error": row["error"],
+            "worker": row["worker"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    # ------------------------------------------------------------------
+    # 租约协议
+    # ------------------------------------------------------------------
+
+    def requeue_expired(self, now: Optional[float] = None) -> int:
+        """
+        回收租约已过期的任务
+
+        Returns:
+            回收的任务数（包括因超过尝试次数而标记为失败的任务）
+        """
+        now = time.time() if now is None else now
+        with self._transaction() as db:
+            return self._requeue_expired(db, now)
+
+    def _requeue_expired(self, db: sqlite3.Connection, now: float) -> int:
+        failed = db.execute(
+            "UPDATE jobs SET state = ?, error = ?, finished_at = ?, worker = NULL "
+            "WHERE state = 'leased' AND lease_until < ? AND attempts >= max_attempts",
+            (FAILED, "Worker lost too many times", now, now),
+        ).rowcount
+        requeued = db.execute(
+            "UPDATE jobs SET state = ?, worker = NULL, lease_until = NULL "
+            "WHERE state = 'leased' AND lease_until < ?",
+            (QUEUED, now),
+        ).rowcount
+        if failed or requeued:
+            logger.warning(f"回收过期租约: {requeued} 个重新排队，{failed} 个失败")
+        return failed + requeued
+
+    def claim(self, worker: str, now: Optional[float] = None) -> Optional[Lease]:
+        """
+        领取最早的排队任务
+
+        Args:
+            worker: 工作者标识
+            now: 当前时间（测试用）
+
+        Returns:
+            Lease；没有可领取的任务时返回 None
+        """
+        now = time.time() if now is None else now
+        with self._transaction() as db:
+            self._requeue_expired(db, now)
+            row = db.execute(
+                "SELECT * FROM jobs WHERE state = ? ORDER BY id LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            token = row["lease_token"] + 1
+            expires_at = now + self.lease_seconds
+            db.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_token = ?, "
+                "lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, token, expires_at, row["id"]),
+            )
+        logger.info(f"{worker} 领取任务 #{row['id']} (token {token})")
+        return Lease(row["id"], token, worker, row["url"], row["formats"].split(","),
+                     row["directory"], expires_at)
+
+    def heartbeat(self, lease: Lease, now: Optional[float] = None) -> bool:
+        """
+        延长租约
+
+        Returns:
+            仍持有租约时返回 True；租约已被回收或任务已取消时返回 False
+        """
+        now = time.time() if now is None else now
+        expires_at = now + self.lease_seconds
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE jobs SET lease_until = ? "
+                "WHERE id = ? AND state = 'leased' AND lease_token = ? AND lease_until >= ?",
+                (expires_at, lease.job_id, lease.token, now),
+            ).rowcount
+        if updated:
+            lease.expires_at = expires_at
+        return bool(updated)
+
+    def complete(self, lease: Lease, state: str, title: str = "",
+                 error: Optional[str] = None) -> bool:
+        """
+        记录任务结果（恰好一次）
+
+        Args:
+            lease: 领取时得到的租约
+            state: DONE / FAILED / CANCELLED
+            title: 视频标题
+            error: 错误信息
+
+        Returns:
+            记录成功时返回 True；租约已丢失（任务已被其他工作者领取或已完成）
+            时返回 False，结果被丢弃
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT state, lease_token FROM jobs WHERE id = ?", (lease.job_id,)
+            ).fetchone()
+            if row is None or row["state"] != "leased" or row["lease_token"] != lease.token:
+                logger.warning(f"{lease.worker} 的租约已失效，丢弃任务 #{lease.job_id} 的结果")
+                return False
+            try:
+                db.execute(
+                    "INSERT INTO completions (job_id, worker, lease_token, state, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (lease.job_id, lease.worker, lease.token, state, now),
+                )
+            except sqlite3.IntegrityError:
+                return False
+            db.execute(
+                "UPDATE jobs SET state = ?, title = ?, error = ?, finished_at = ?, "
+                "lease_until = NULL WHERE id = ?",
+                (state, title, error, now, lease.job_id),
+            )
+        return True
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        取消任务：排队中的任务直接取消；运行中的任务在工作者下次心跳时中止
+
+        Returns:
+            任务存在且尚未结束时返回 True
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["state"] not in (QUEUED, "leased"):
+                return False
+            db.execute(
+                "INSERT OR IGNORE INTO completions (job_id, worker, lease_token, state, "
+                "finished_at) SELECT id, COALESCE(worker, ''), lease_token, ?, ? "
+                "FROM jobs WHERE id = ?",
+                (CANCELLED, now, job_id),
+            )
+            db.execute(
+                "UPDATE jobs SET state = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ?",
+                (CANCELLED, "Download cancelled", now, job_id),
+            )
+        return True
+
+
+def default_worker_id(index: int = 0) -> str:
+    """工作者标识：主机名:进程号:序号"""
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+class LeaseWorker:
+    """
+    从租约队列领取并执行任务的工作者（一个线程执行一个任务）
+    """
+
+    def __init__(self, queue: LeaseQueue, core: DownloadCore, worker_id: Optional[str] = None,
+                 idle_poll: float = IDLE_POLL):
+        """
+        初始化工作者
+
+        Args:
+            queue: 租约队列
+            core: 常驻的下载核心（每个任务使用其浅拷贝）
+            worker_id: 工作者标识，默认 default_worker_id()
+            idle_poll: 队列为空时的轮询间隔（秒）
+        """
+        self.queue = queue
+        self.core = core
+        self.worker_id = worker_id or default_worker_id()
+        self.idle_poll = idle_poll
+        self.stopping = threading.Event()
+        self._token: Optional[CancelToken] = None
+
+    def stop(self, cancel_running: bool = True) -> None:
+        """停止领取新任务；可选取消正在执行的任务（其租约过期后由其他工作者重试）"""
+        self.stopping.set()
+        if cancel_running and self._token is not None:
+            self._token.cancel()
+
+    def run(self, max_jobs: Optional[int] = None) -> int:
+        """
+        循环领取并执行任务，直到 stop() 被调用
+
+        Args:
+            max_jobs: 最多执行的任务数（None 表示不限）
+
+        Returns:
+            执行的任务数
+        """
+        done = 0
+        while not self.stopping.is_set() and (max_jobs is None or done < max_jobs):
+            lease = self.queue.claim(self.worker_id)
+            if lease is None:
+                self.stopping.wait(self.idle_poll)
+                continue
+            self.run_one(lease)
+            done += 1
+        self.queue.close()
+        return done
+
+    def run_one(self, lease: Lease) -> bool:
+        """
+        执行一个已领取的任务（后台线程负责心跳）
+
+        Returns:
+            结果是否被记录（租约丢失时为 False）
+        """
+        token = CancelToken()
+        self._token = token
+        lost = threading.Event()
+        finished = threading.Event()
+
+        def keep_alive() -> None:
+            interval = self.queue.lease_seconds / HEARTBEAT_FRACTION
+            try:
+                while not finished.wait(interval):
+                    try:
+                        alive = self.queue.heartbeat(lease)
+                    except sqlite3.Error as e:
+                        logger.warning(f"心跳失败: {e}")
+                        continue
+                    if not alive:
+                        # 任务被取消或租约已被回收：立即停止，避免重复下载
+                        lost.set()
+                        token.cancel()
+                        return
+            finally:
+                self.queue.close()
+
+        heart = threading.Thread(target=keep_alive, name=f"lease-{lease.job_id}", daemon=True)
+        heart.start()
+
+        def on_progress(d: dict) -> None:
+            if d.get("status") == "finished":
+                logger.info(f"已下载 {d.get('filename') or lease.url}")
+
+        directory = Path(lease.directory) if lease.directory else self.core.download_dir
+        try:
+            with log_context(lease.job_id):
+                success, title, error = run_download(
+                    self.core, lease.url, lease.formats, directory, token,
+                    info_callback=logger.info, progress_callback=on_progress,
+                )
+        except Exception as e:
+            logger.exception(f"任务 #{lease.job_id} 异常")
+            success, title, error = False, "", f"{type(e).__name__}: {e}"
+        finally:
+            self._token = None
+            finished.set()  # 结束心跳线程
+            heart.join()
+
+        if lost.is_set():
+            logger.warning(f"任务 #{lease.job_id} 的租约已失效，结果未记录")
+            return False
+        if self.stopping.is_set() and not success:
+            # 工作者正在退出：保留租约，过期后由其他工作者重试
+            return False
+        state = DONE if success else FAILED
+        return self.queue.complete(lease, state, title, None if success else error)
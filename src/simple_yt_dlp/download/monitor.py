@@ -0,0 +1,256 @@
+"""
+Job Monitor - 多任务实时面板的共享快照
+Shared, fixed-rate snapshot of every job for the live dashboard
+
+任务事件（守护进程广播的 job / progress 事件，或本地下载的进度）只更新
+各任务的最新状态，代价很小；界面按固定频率调用 snapshot() 取一份快照
+并整体重绘，不随事件刷新。速度曲线在 snapshot() 时按固定间隔采样，
+因此不同任务的曲线在时间轴上可以直接比较。
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+# 面板刷新间隔（秒）
+REFRESH_INTERVAL = 0.5
+
+# 速度曲线保留的采样点数
+HISTORY = 40
+
+# 下载中超过这么久（秒）没有新的字节即视为停滞
+STALL_AFTER = 15.0
+
+# 一个任务占总吞吐量的比例超过该值（且有其他任务在下载）时视为独占带宽
+HOG_SHARE = 0.6
+
+_BLOCKS = "▁▂▃▄▅▆▇█"
+
+# 任务状态 -> 阶段
+QUEUED = "queued"
+EXTRACTING = "extracting"
+DOWNLOADING = "downloading"
+PROCESSING = "processing"
+RETRYING = "retrying"
+STALLED = "stalled"
+
+_PROGRESS_PHASES = {
+    "downloading": DOWNLOADING,
+    "finished": PROCESSING,
+    "verified": PROCESSING,
+    "retrying": RETRYING,
+}
+
+
+def sparkline(values, peak: Optional[float] = None) -> str:
+    """
+    用方块字符绘制数值曲线
+
+    Args:
+        values: 数值序列
+        peak: 满格对应的数值（默认取序列最大值；多行使用同一值才能互相比较）
+
+    Returns:
+        与 values 等长的字符串
+    """
+    values = list(values)
+    peak = peak if peak is not None else max(values, default=0)
+    if not peak:
+        return _BLOCKS[0] * len(values)
+    top = len(_BLOCKS) - 1
+    return "".join(_BLOCKS[min(top, max(0, round(v / peak * top)))] for v in values)
+
+
+class JobRow:
+    """
+    面板上的一行（一个未结束的任务）快照
+    """
+
+    __slots__ = (
+        "id", "label", "format", "phase", "speed", "history", "eta", "downloaded", "total",
+        "retries", "share", "stalled", "hogging",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    def __repr__(self) -> str:
+        return f"JobRow(#{self.id}, {self.phase}, {self.speed})"
+
+
+class Snapshot:
+    """
+    某一时刻所有任务的快照
+    """
+
+    __slots__ = ("rows", "throughput", "peak", "queued", "running", "done", "failed")
+
+    def __init__(self, rows: list[JobRow], throughput: float, peak: float,
+                 counts: dict[str, int]):
+        self.rows = rows
+        self.throughput = throughput
+        self.peak = peak
+        self.queued = counts.get("queued", 0)
+        self.running = counts.get("running", 0)
+        self.done = counts.get("done", 0)
+        self.failed = counts.get("failed", 0) + counts.get("cancelled", 0)
+
+
+class _Job:
+    """一个任务的最新状态（只在持有锁时访问）"""
+
+    __slots__ = (
+        "id", "label", "format", "state", "phase", "speed", "eta", "stream", "streamed",
+        "downloaded", "total", "retries", "changed_at", "history",
+    )
+
+    def __init__(self, job_id, history: int, now: float):
+        self.id = job_id
+        self.label = ""
+        self.format = ""
+        self.state = QUEUED
+        self.phase = QUEUED
+        self.speed = 0.0
+        self.eta = None
+        self.stream = None
+        self.streamed = 0  # 已完成的流的字节数
+        self.downloaded = 0
+        self.total = None
+        self.retries = 0
+        self.changed_at = now
+        self.history: deque = deque(maxlen=history)
+
+
+class JobMonitor:
+    """
+    汇总任务事件的共享状态（事件可以来自任意线程）
+    """
+
+    def __init__(self, history: int = HISTORY, stall_after: float = STALL_AFTER,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            history: 速度曲线的采样点数
+            stall_after: 判定停滞的秒数
+            clock: 时钟函数
+        """
+        self.history = history
+        self.stall_after = stall_after
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._jobs: dict = {}
+
+    def apply(self, event: dict) -> None:
+        """
+        处理一个任务事件（与守护进程广播的事件格式相同）
+
+        Args:
+            event: {"event": "job", "job": {...}} 或
+                {"event": "progress", "id": ..., "progress": {...}}
+        """
+        kind = event.get("event")
+        if kind == "job":
+            self._apply_job(event["job"])
+        elif kind == "progress":
+            self._apply_progress(event["id"], event.get("progress") or {})
+
+    def _get(self, job_id) -> _Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            job = self._jobs[job_id] = _Job(job_id, self.history, self.clock())
+        return job
+
+    def _apply_job(self, data: dict) -> None:
+        with self._lock:
+            job = self._get(data["id"])
+            job.label = data.get("title") or data.get("url") or job.label
+            job.format = data.get("format") or job.format
+            job.retries = max(job.retries, data.get("retries") or 0)
+            job.state = data.get("state") or job.state
+            if job.state == "running" and job.phase == QUEUED:
+                job.phase = EXTRACTING
+                job.changed_at = self.clock()
+            elif job.state != "running":
+                job.phase = job.state
+
+    def _apply_progress(self, job_id, progress: dict) -> None:
+        status = progress.get("status")
+        with self._lock:
+            job = self._get(job_id)
+            if job.state in (QUEUED, "running"):
+                job.state = "running"
+                job.phase = _PROGRESS_PHASES.get(status, job.phase)
+            if status == "retrying":
+                job.retries += 1
+                job.speed = 0.0
+                return
+            if status not in ("downloading", "finished"):
+                return
+
+            stream = progress.get("filename")
+            if stream != job.stream:
+                # 下一个流（例如视频之后的音频）：累计上一个流的字节数
+                job.streamed += job.downloaded
+                job.stream = stream
+                job.downloaded = 0
+            downloaded = progress.get("downloaded_bytes") or 0
+            if downloaded > job.downloaded:
+                job.changed_at = self.clock()
+            job.downloaded = max(job.downloaded, downloaded)
+            total = progress.get("total_bytes") or progress.get("total_bytes_estimate")
+            job.total = job.streamed + total if total else None
+            job.eta = progress.get("eta")
+            job.speed = (progress.get("speed") or 0.0) if status == "downloading" else 0.0
+
+    def forget_finished(self) -> None:
+        """丢弃已结束任务的记录"""
+        with self._lock:
+            for job_id in [k for k, j in self._jobs.items() if j.state not in (QUEUED, "running")]:
+                del self._jobs[job_id]
+
+    def snapshot(self) -> Snapshot:
+        """
+        采样一次速度并生成快照（由界面按固定频率调用）
+
+        Returns:
+            Snapshot（未结束的任务按 ID 排序）
+        """
+        now = self.clock()
+        counts: dict[str, int] = {}
+        rows = []
+        with self._lock:
+            active = []
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+                if job.state not in (QUEUED, "running"):
+                    continue
+                stalled = (
+                    job.phase == DOWNLOADING and now - job.changed_at > self.stall_after
+                )
+                speed = 0.0 if stalled or job.phase != DOWNLOADING else job.speed
+                job.history.append(speed)
+                active.append((job, speed, stalled))
+
+            throughput = sum(speed for _, speed, _ in active)
+            downloading = sum(1 for _, speed, _ in active if speed > 0)
+            peak = max((max(job.history) for job, _, _ in active if job.history), default=0.0)
+            for job, speed, stalled in active:
+                share = speed / throughput if throughput else 0.0
+                rows.append(JobRow(
+                    id=job.id,
+                    label=job.label,
+                    format=job.format,
+                    phase=STALLED if stalled else job.phase,
+                    speed=speed,
+                    history=list(job.history),
+                    eta=job.eta if job.phase == DOWNLOADING and not stalled else None,
+                    downloaded=job.streamed + job.downloaded,
+                    total=job.total,
+                    retries=job.retries,
+                    share=share,
+                    stalled=stalled,
+                    hogging=downloading > 1 and share > HOG_SHARE,
+                ))
+        rows.sort(key=lambda row: str(row.id).rjust(12))
+        return Snapshot(rows, throughput, peak, counts)
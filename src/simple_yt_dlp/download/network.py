@@ -0,0 +1,304 @@
+"""
+Pooled Request Handler - 基于共享连接池的 yt-dlp 请求处理器
+yt-dlp RequestHandler backed by the shared keep-alive connection pool
+
+yt-dlp 默认的 urllib 处理器每个请求都新建连接，而且每个 YoutubeDL
+实例各自维护网络状态。此处理器把直连的 http/https 请求交给进程级
+共享连接池，使连接可以跨请求、跨任务复用。
+
+需要代理、浏览器伪装等特性的请求会被拒绝（UnsupportedRequest），
+由 yt-dlp 自动回退到其内置处理器。处理器依赖 yt-dlp 的内部模块，
+这些模块在当前 yt-dlp 版本中不存在时不注册，所有请求使用内置处理器。
+"""
+import http.client
+import io
+import logging
+import ssl
+import threading
+import urllib.parse
+import urllib.request
+from typing import Optional
+
+from yt_dlp.networking.common import (
+    RequestHandler,
+    Response,
+    register_preference,
+    register_rh,
+)
+from yt_dlp.networking.exceptions import (
+    CertificateVerifyError,
+    HTTPError,
+    IncompleteRead,
+    SSLError,
+    TransportError,
+    UnsupportedRequest,
+)
+from yt_dlp.utils.networking import normalize_url
+
+from .pool import ConnectionPool, PooledResponse, get_shared_pool
+
+# yt-dlp 的内部模块（不属于公开 API，可能随版本改名或移除）
+try:
+    from yt_dlp.networking._helper import (
+        add_accept_encoding_header,
+        get_redirect_method,
+        make_ssl_context,
+    )
+    from yt_dlp.networking._urllib import (
+        CONTENT_DECODE_ERRORS,
+        SUPPORTED_ENCODINGS,
+        HTTPHandler,
+    )
+except ImportError as e:
+    _private_api_error: Optional[ImportError] = e
+    make_ssl_context = None
+else:
+    _private_api_error = None
+
+logger = logging.getLogger(__name__)
+
+# 最大重定向次数（与 urllib 一致）
+MAX_REDIRECTS = 10
+
+# 按 TLS 配置缓存 SSLContext，使不同任务的连接可以共享
+_ssl_contexts: dict[tuple, ssl.SSLContext] = {}
+_ssl_contexts_lock = threading.Lock()
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def get_ssl_context(
+    verify: bool = True,
+    legacy_ssl_support: bool = False,
+    prefer_system_certs: bool = False,
+    client_cert: Optional[dict] = None,
+) -> ssl.SSLContext:
+    """
+    获取共享的 SSLContext（相同 TLS 配置返回同一对象，连接池据此复用连接）
+
+    Args:
+        verify: 是否校验证书
+        legacy_ssl_support: 是否启用旧版 SSL 兼容
+        prefer_system_certs: 是否优先使用系统证书
+        client_cert: 客户端证书配置
+
+    Returns:
+        ssl.SSLContext 实例
+    """
+    client_cert = client_cert or {}
+    key = (verify, legacy_ssl_support, prefer_system_certs, tuple(sorted(client_cert.items())))
+    with _ssl_contexts_lock:
+        context = _ssl_contexts.get(key)
+        if context is None:
+            if make_ssl_context is not None:
+                context = make_ssl_context(
+                    verify=verify,
+                    legacy_support=legacy_ssl_support,
+                    use_certifi=not prefer_system_certs,
+                    **client_cert,
+                )
+            else:
+                context = _default_ssl_context(verify, client_cert)
+            _ssl_contexts[key] = context
+        return context
+
+
+def _default_ssl_context(verify: bool, client_cert: dict) -> ssl.SSLContext:
+    """yt-dlp 内部模块不可用时的 SSLContext（系统证书，不支持旧版 SSL 兼容）"""
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if client_cert.get("client_certificate"):
+        context.load_cert_chain(
+            client_cert["client_certificate"],
+            keyfile=client_cert.get("client_certificate_key"),
+            password=client_cert.get("client_certificate_password"),
+        )
+    return context
+
+
+def _wrap_transport_error(e: Exception) -> Exception:
+    """把底层异常转换为 yt-dlp 的 RequestError 子类"""
+    if isinstance(e, http.client.IncompleteRead):
+        return IncompleteRead(partial=len(e.partial), cause=e, expected=e.expected)
+    if isinstance(e, ssl.SSLCertVerificationError):
+        return CertificateVerifyError(cause=e)
+    if isinstance(e, ssl.SSLError):
+        return SSLError(cause=e)
+    return TransportError(cause=e)
+
+
+class PooledResponseAdapter(Response):
+    """
+    yt-dlp Response 适配器 - 包装 PooledResponse
+    """
+
+    def __init__(self, res: PooledResponse):
+        super().__init__(
+            fp=res, headers=res.headers, url=res.url, status=res.status, reason=res.reason
+        )
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if self.closed:
+            return b""
+        try:
+            data = self.fp.read(amt)
+        except (OSError, EOFError, http.client.HTTPException) as e:
+            raise _wrap_transport_error(e) from e
+        if self.fp.response.isclosed():
+            self.close()
+        return data
+
+
+class PooledHTTPRH(RequestHandler):
+    """
+    连接池请求处理器 - 只处理无代理的 http/https 请求
+    """
+
+    _SUPPORTED_URL_SCHEMES = ("http", "https")
+    _SUPPORTED_PROXY_SCHEMES = ()
+    _SUPPORTED_FEATURES = ()
+    RH_NAME = "pooled"
+
+    def __init__(self, pool: Optional[ConnectionPool] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool or get_shared_pool()
+
+    def _check_extensions(self, extensions):
+        super()._check_extensions(extensions)
+        extensions.pop("cookiejar", None)
+        extensions.pop("timeout", None)
+        extensions.pop("legacy_ssl", None)
+
+    def _validate(self, request):
+        super()._validate(request)
+        if request.data is not None and not isinstance(request.data, bytes):
+            raise UnsupportedRequest("Streaming request bodies are not supported")
+
+    def _prepare_headers(self, _, headers):
+        add_accept_encoding_header(headers, SUPPORTED_ENCODINGS)
+
+    def _get_ssl_context(self, legacy_ssl: Optional[bool]) -> ssl.SSLContext:
+        """获取（共享的）SSLContext"""
+        return get_ssl_context(
+            verify=self.verify,
+            legacy_ssl_support=self.legacy_ssl_support if legacy_ssl is None else legacy_ssl,
+            prefer_system_certs=self.prefer_system_certs,
+            client_cert=self._client_cert,
+        )
+
+    def _send(self, request):
+        headers = self._get_headers(request)
+        cookiejar = self._get_cookiejar(request)
+        timeout = self._calculate_timeout(request)
+        context = self._get_ssl_context(request.extensions.get("legacy_ssl"))
+
+        url = normalize_url(request.url)
+        method = request.method
+        data = request.data
+        if data is not None and "Content-Type" not in {k.title() for k in headers}:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        for _ in range(MAX_REDIRECTS + 1):
+            # Cookie 由 cookiejar 按当前 URL 生成
+            cookie_req = urllib.request.Request(url, headers=headers, method=method)
+            cookiejar.add_cookie_header(cookie_req)
+            send_headers = dict(cookie_req.header_items())
+
+            try:
+                res = self.pool.request(
+                    method, url, headers=send_headers, body=data,
+                    timeout=timeout, context=context, source_address=self.source_address,
+                )
+            except (OSError, http.client.HTTPException) as e:
+                raise _wrap_transport_error(e) from e
+
+            cookiejar.extract_cookies(res.response, cookie_req)
+
+            location = res.getheader("Location")
+            if res.status in (301, 302, 303, 307, 308) and location:
+                res.close()
+                location = normalize_url(location.encode("iso-8859-1").decode())
+                url = urllib.parse.urljoin(url, location)
+                new_method = get_redirect_method(method, res.status)
+                headers = {k: v for k, v in headers.items() if k.title() != "Cookie"}
+                if new_method != method:
+                    data = None
+                    headers = {
+                        k: v for k, v in headers.items()
+                        if k.title() not in ("Content-Length", "Content-Type")
+                    }
+                method = new_method
+                continue
+
+            response = self._decode(res)
+            if not 200 <= response.status < 300:
+                raise HTTPError(response)
+            return response
+
+        res = self._decode(res)
+        raise HTTPError(res, redirect_loop=True)
+
+    @staticmethod
+    def _decode(res: PooledResponse) -> Response:
+        """处理 Content-Encoding（压缩正文一次性读入并解压）"""
+        encodings = [
+            e.strip() for e in reversed(res.getheader("Content-Encoding", "").split(","))
+            if e.strip() and e.strip() != "identity"
+        ]
+        if not encodings:
+            return PooledResponseAdapter(res)
+
+        try:
+            body = res.read()
+            for encoding in encodings:
+                if encoding == "gzip":
+                    body = HTTPHandler.gz(body)
+                elif encoding == "deflate":
+                    body = HTTPHandler.deflate(body)
+                elif encoding == "br":
+                    body = HTTPHandler.brotli(body)
+        except (OSError, http.client.HTTPException, *CONTENT_DECODE_ERRORS) as e:
+            res.close()
+            raise _wrap_transport_error(e) from e
+
+        headers = {k: v for k, v in res.headers.items() if k.title() != "Content-Length"}
+        return Response(
+            io.BytesIO(body), url=res.url, headers=headers, status=res.status, reason=res.reason
+        )
+
+
+def pooled_preference(rh, request) -> int:
+    """
+    连接池处理器的优先级
+
+    普通请求略高于 requests 处理器（100）；要求浏览器伪装的请求返回 0，
+    交给 curl_cffi 等伪装处理器。
+    """
+    if request.extensions.get("impersonate"):
+        return 0
+    return 150
+
+
+def install_pooled_handler() -> None:
+    """
+    向 yt-dlp 注册连接池请求处理器（幂等）
+
+    注册后进程内所有 YoutubeDL 实例都会优先通过共享连接池发送请求。
+    依赖的 yt-dlp 内部模块不可用时只记录警告，继续使用内置处理器。
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        if _private_api_error is not None:
+            logger.warning(f"⚠️ 当前 yt-dlp 版本不支持连接池处理器，使用内置处理器: "
+                           f"{_private_api_error}")
+            _installed = True
+            return
+        register_rh(PooledHTTPRH)
+        register_preference(PooledHTTPRH)(pooled_preference)
+        _installed = True
+
@@ -0,0 +1,384 @@
+"""
+Connection Pool - 跨任务共享的 HTTP 长连接池
+Shared, size-bounded keep-alive HTTP connection pool
+
+同一进程内的所有下载任务共用一个连接池：同一主机的连接在任务结束后
+保留为空闲连接，下一个任务直接复用，省去 TCP/TLS 握手。
+"""
+import http.client
+import io
+import logging
+import socket
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 默认参数
+DEFAULT_MAX_IDLE = 32            # 全局最多保留的空闲连接数
+DEFAULT_MAX_IDLE_PER_HOST = 6    # 每个主机最多保留的空闲连接数
+DEFAULT_IDLE_TIMEOUT = 60.0      # 空闲连接存活时间（秒）
+DEFAULT_TIMEOUT = 20.0           # 套接字超时（秒）
+
+# 关闭响应时若剩余正文不超过该大小，则读完以保留连接
+DRAIN_LIMIT = 64 * 1024
+
+# 复用连接发送失败时可安全重试的方法
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class PooledConnection:
+    """
+    池中的一条连接 - 记录所属主机和使用情况
+    """
+
+    def __init__(self, key: tuple, conn: http.client.HTTPConnection):
+        self.key = key
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class ConnectionPool:
+    """
+    HTTP/HTTPS 长连接池
+
+    - 连接按 (scheme, host, port, ssl_context) 分组
+    - 空闲连接数量受全局和单主机上限约束
+    - 空闲超时的连接在下次访问池时被驱逐
+    - 复用的连接若已被服务器关闭，幂等请求自动换新连接重试一次
+    """
+
+    def __init__(
+        self,
+        max_idle: int = DEFAULT_MAX_IDLE,
+        max_idle_per_host: int = DEFAULT_MAX_IDLE_PER_HOST,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        """
+        初始化连接池
+
+        Args:
+            max_idle: 全局空闲连接上限
+            max_idle_per_host: 单主机空闲连接上限
+            idle_timeout: 空闲连接超时时间（秒）
+        """
+        self.max_idle = max_idle
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, deque[PooledConnection]] = {}
+        self._idle_count = 0
+        self._active = 0
+        self._stats = {
+            "requests": 0,
+            "created": 0,
+            "reused": 0,
+            "retried_stale": 0,
+            "evicted_idle": 0,
+            "evicted_overflow": 0,
+            "discarded": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 连接管理
+    # ------------------------------------------------------------------
+
+    def _new_connection(
+        self,
+        key: tuple,
+        timeout: float,
+        source_address: Optional[str] = None,
+    ) -> PooledConnection:
+        """建立新连接"""
+        scheme, host, port, context = key
+        source = (source_address, 0) if source_address else None
+        if scheme == "https":
+            conn = http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=context, source_address=source
+            )
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=timeout, source_address=source)
+        with self._lock:
+            self._stats["created"] += 1
+        return PooledConnection(key, conn)
+
+    def acquire(
+        self,
+        key: tuple,
+        timeout: float = DEFAULT_TIMEOUT,
+        source_address: Optional[str] = None,
+    ) -> tuple[PooledConnection, bool]:
+        """
+        获取一条连接（优先复用空闲连接）
+
+        Args:
+            key: (scheme, host, port, ssl_context)
+            timeout: 套接字超时
+            source_address: 绑定的本地地址
+
+        Returns:
+            (连接, 是否为复用的连接)
+        """
+        with self._lock:
+            self._evict_expired_locked()
+            idle = self._idle.get(key)
+            pconn = None
+            if idle:
+                pconn = idle.pop()
+                self._idle_count -= 1
+                if not idle:
+                    del self._idle[key]
+            self._active += 1
+
+        if pconn is not None:
+            pconn.conn.timeout = timeout
+            if pconn.conn.sock is not None:
+                pconn.conn.sock.settimeout(timeout)
+            return pconn, True
+
+        try:
+            return self._new_connection(key, timeout, source_address), False
+        except Exception:
+            with self._lock:
+                self._active -= 1
+            raise
+
+    def release(self, pconn: PooledConnection, reusable: bool = True) -> None:
+        """
+        归还连接；不可复用或超出上限时关闭
+
+        Args:
+            pconn: 连接
+            reusable: 连接是否仍可用于下一个请求
+        """
+        pconn.last_used = time.monotonic()
+        to_close = []
+        with self._lock:
+            self._active -= 1
+            if not reusable or pconn.conn.sock is None:
+                self._stats["discarded"] += 1
+                to_close.append(pconn)
+            else:
+                idle = self._idle.setdefault(pconn.key, deque())
+                idle.append(pconn)
+                self._idle_count += 1
+                # 单主机上限：驱逐最旧的连接
+                while len(idle) > self.max_idle_per_host:
+                    to_close.append(idle.popleft())
+                    self._idle_count -= 1
+                    self._stats["evicted_overflow"] += 1
+                # 全局上限：驱逐全池最旧的连接
+                while self._idle_count > self.max_idle:
+                    oldest_key = min(self._idle, key=lambda k: self._idle[k][0].last_used)
+                    to_close.append(self._idle[oldest_key].popleft())
+                    self._idle_count -= 1
+                    self._stats["evicted_overflow"] += 1
+                    if not self._idle[oldest_key]:
+                        del self._idle[oldest_key]
+        for old in to_close:
+            old.conn.close()
+
+    def _evict_expired_locked(self) -> None:
+        """驱逐超时的空闲连接（调用方需持有锁）"""
+        deadline = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            idle = self._idle[key]
+            while idle and idle[0].last_used < deadline:
+                idle.popleft().conn.close()
+                self._idle_count -= 1
+                self._stats["evicted_idle"] += 1
+            if not idle:
+                del self._idle[key]
+
+    def evict_idle(self) -> None:
+        """立即驱逐所有超时的空闲连接"""
+        with self._lock:
+            self._evict_expired_locked()
+
+    def close(self) -> None:
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle = [p for conns in self._idle.values() for p in conns]
+            self._idle.clear()
+            self._idle_count = 0
+        for pconn in idle:
+            pconn.conn.close()
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        body: Optional[bytes] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        context=None,
+        source_address: Optional[str] = None,
+    ) -> "PooledResponse":
+        """
+        通过连接池发送请求
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            headers: 请求头
+            body: 请求体
+            timeout: 套接字超时
+            context: HTTPS 使用的 ssl.SSLContext
+            source_address: 绑定的本地地址
+
+        Returns:
+            PooledResponse（正文读完或关闭后连接自动归还）
+        """
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported url scheme: {scheme!r}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port, context if scheme == "https" else None)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+
+        with self._lock:
+            self._stats["requests"] += 1
+
+        while True:
+            pconn, reused = self.acquire(key, timeout, source_address)
+            try:
+                pconn.conn.request(method, path, body=body, headers=headers or {})
+                response = pconn.conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError, BrokenPipeError):
+                self.release(pconn, reusable=False)
+                # 服务器已关闭空闲连接：换新连接重试一次
+                if reused and method.upper() in _IDEMPOTENT_METHODS:
+                    with self._lock:
+                        self._stats["retried_stale"] += 1
+                    continue
+                raise
+            except BaseException:
+                self.release(pconn, reusable=False)
+                raise
+
+            pconn.uses += 1
+            if reused:
+                with self._lock:
+                    self._stats["reused"] += 1
+            return PooledResponse(self, pconn, response, url)
+
+    def stats(self) -> dict:
+        """
+        连接池统计信息
+
+        Returns:
+            包含请求数、新建/复用连接数、复用率和驱逐次数的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = self._idle_count
+            stats["active"] = self._active
+        requests = stats["requests"]
+        stats["reuse_rate"] = stats["reused"] / requests if requests else 0.0
+        return stats
+
+
+class PooledResponse(io.RawIOBase):
+    """
+    连接池响应 - 正文读完后把连接归还给连接池
+
+    提前关闭时若剩余正文很少则读完以保留连接，否则丢弃连接。
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        pconn: PooledConnection,
+        response: http.client.HTTPResponse,
+        url: str,
+    ):
+        super().__init__()
+        self._pool = pool
+        self._pconn: Optional[PooledConnection] = pconn
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def readable(self) -> bool:
+        return True
+
+    def getheader(self, name: str, default=None):
+        return self.response.getheader(name, default)
+
+    def _finish(self, reusable: bool) -> None:
+        """归还或丢弃连接（只执行一次）"""
+        pconn, self._pconn = self._pconn, None
+        if pconn is not None:
+            self._pool.release(pconn, reusable=reusable and not self.response.will_close)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        if self._pconn is None and self.response.isclosed():
+            return b""
+        try:
+            data = self.response.read() if amt is None or amt < 0 else self.response.read(amt)
+        except BaseException:
+            self._finish(reusable=False)
+            raise
+        if self.response.isclosed():
+            self._finish(reusable=True)
+        return data
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def interrupt(self) -> None:
+        """从其他线程中断阻塞中的读取（关闭底层套接字，连接不再复用）"""
+        pconn = self._pconn
+        sock = pconn.conn.sock if pconn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        if self._pconn is not None:
+            remaining = self.response.length
+            if not self.response.isclosed() and remaining is not None and remaining <= DRAIN_LIMIT:
+                try:
+                    self.response.read()
+                except Exception:
+                    pass
+            self._finish(reusable=self.response.isclosed())
+        self.response.close()
+        super().close()
+
+
+# 进程级共享连接池
+_shared_pool: Optional[ConnectionPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool() -> ConnectionPool:
+    """
+    获取进程级共享连接池（首次调用时创建）
+
+    Returns:
+        共享的 ConnectionPool 实例
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ConnectionPool()
+        return _shared_pool
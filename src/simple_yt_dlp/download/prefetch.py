@@ -0,0 +1,223 @@
+"""
+Prefetch - 输入 URL 时的预提取
+Debounced speculative extraction while the URL is being entered
+
+用户停止输入一小段时间后，在后台提取视频信息（未处理的 ie_result，不含
+格式选择）并放入短时缓存。点击下载时直接使用缓存结果，省去整个提取耗时；
+界面也可以提前显示标题和大小。
+
+缓存记录正在进行的提取：下载在预提取完成前开始时等待其结果，而不是再
+提取一次。
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from ..utils.validation import VIDEO, normalize_youtube_url
+
+logger = logging.getLogger(__name__)
+
+
+# 缓存有效期（秒）。YouTube 的流 URL 数小时后才过期，这里取较短的值以便
+# 及时反映视频状态变化（例如直播结束）
+PREFETCH_TTL = 300.0
+
+# 最后一次输入后开始提取的延迟（秒）
+DEBOUNCE_DELAY = 0.6
+
+# 缓存的最大条目数
+MAX_ENTRIES = 16
+
+
+def _key(url: str) -> str:
+    """缓存键：视频 URL 使用规范 URL（youtu.be、shorts、跟踪参数等共用一个条目）"""
+    item = normalize_youtube_url(url)
+    return item.url if item.kind == VIDEO else url.strip()
+
+
+class InfoCache:
+    """
+    提取结果的短时缓存（线程安全）
+    """
+
+    def __init__(
+        self,
+        ttl: float = PREFETCH_TTL,
+        max_entries: int = MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 条目有效期（秒）
+            max_entries: 最大条目数（超出时淘汰最旧的条目）
+            clock: 单调时钟（测试时可替换）
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._entries: dict[str, tuple[float, dict]] = {}
+        self._pending: set[str] = set()
+
+    def get(self, url: str, wait: float = 0.0) -> Optional[dict]:
+        """
+        获取未过期的提取结果
+
+        Args:
+            url: 视频 URL
+            wait: 该 URL 正在提取时最多等待的秒数
+
+        Returns:
+            ie_result；没有或已过期时返回 None
+        """
+        key = _key(url)
+        deadline = self.clock() + wait
+        with self._cond:
+            while key in self._pending:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, info = entry
+            if self.clock() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return info
+
+    def begin(self, url: str) -> bool:
+        """
+        标记 URL 正在提取
+
+        Returns:
+            已有未过期结果或已在提取时返回 False（无需再提取）
+        """
+        key = _key(url)
+        with self._cond:
+            entry = self._entries.get(key)
+            if key in self._pending or (entry and self.clock() - entry[0] <= self.ttl):
+                return False
+            self._pending.add(key)
+            return True
+
+    def put(self, url: str, info: dict) -> None:
+        """存入提取结果（并结束提取标记）"""
+        key = _key(url)
+        with self._cond:
+            self._entries.pop(key, None)
+            self._entries[key] = (self.clock(), info)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._pending.discard(key)
+            self._cond.notify_all()
+
+    def abandon(self, url: str) -> None:
+        """提取失败：结束提取标记，不存入结果"""
+        with self._cond:
+            self._pending.discard(_key(url))
+            self._cond.notify_all()
+
+    def invalidate(self, url: str) -> None:
+        """删除条目（例如流 URL 返回 403 后）"""
+        with self._cond:
+            self._entries.pop(_key(url), None)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._cond:
+            self._entries.clear()
+
+
+class Prefetcher:
+    """
+    防抖的预提取器：只为最后一次输入的 URL 提取
+    """
+
+    def __init__(
+        self,
+        extract: Callable[[str], dict],
+        cache: InfoCache,
+        delay: float = DEBOUNCE_DELAY,
+    ):
+        """
+        初始化预提取器
+
+        Args:
+            extract: 提取函数，返回未处理的 ie_result
+            cache: 结果缓存
+            delay: 防抖延迟（秒）
+        """
+        self.extract = extract
+        self.cache = cache
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._latest: Optional[str] = None
+
+    def schedule(self, url: str, on_ready: Optional[Callable[[str, dict], None]] = None) -> None:
+        """
+        安排预提取（取消尚未开始的上一次安排）
+
+        Args:
+            url: 已通过验证的 URL
+            on_ready: 结果可用时在后台线程调用 on_ready(url, info)；
+                      仅当该 URL 仍是最后一次安排的 URL 时调用
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._latest = url
+            self._timer = threading.Timer(self.delay, self._run, args=(url, on_ready))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self) -> None:
+        """取消尚未开始的预提取（已开始的提取仍会完成并进入缓存）"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._latest = None
+
+    def _run(self, url: str, on_ready: Optional[Callable[[str, dict], None]]) -> None:
+        if self.cache.begin(url):
+            started = time.monotonic()
+            try:
+                info = self.extract(url)
+            except Exception as e:
+                self.cache.abandon(url)
+                logger.debug(f"预提取失败: {url}: {e}")
+                return
+            self.cache.put(url, info)
+            logger.debug(f"预提取完成: {url} ({time.monotonic() - started:.2f}s)")
+
+        info = self.cache.get(url, wait=60.0)
+        with self._lock:
+            current = url == self._latest
+        if info is not None and current and on_ready is not None:
+            on_ready(url, info)
+
+
+# 进程级共享缓存（TUI 的预提取和下载核心共用）
+_info_cache: Optional[InfoCache] = None
+_info_cache_lock = threading.Lock()
+
+
+def get_info_cache() -> InfoCache:
+    """
+    获取进程级共享的提取结果缓存
+
+    Returns:
+        共享的 InfoCache
+    """
+    global _info_cache
+    with _info_cache_lock:
+        if _info_cache is None:
+            _info_cache = InfoCache()
+        return _info_cache
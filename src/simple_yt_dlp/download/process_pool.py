@@ -0,0 +1,331 @@
+"""
+Process Pool - 预启动的下载工作进程
+Warm, pre-started worker processes for CPU-heavy extraction
+
+yt-dlp 的签名 / nsig JavaScript 解释、格式排序和 JSON 解析都是纯 Python 的
+CPU 密集工作，在线程中执行时与界面线程和其他任务争抢 GIL。进程池把每个
+任务交给一个独立的工作进程：
+
+- 预启动：工作进程启动时即导入 yt-dlp 并创建自己的 DownloadCore，第一个
+  任务不承担冷启动开销（支持 forkserver 时由预加载了 yt-dlp 的服务进程
+  fork，否则使用 spawn）
+- 隔离：工作进程崩溃（段错误、被 OOM 杀死）只让当前任务失败，并自动
+  启动新进程替代
+- 取消：取消请求发送给工作进程，由其中的 CancelToken 停止下载；超过宽限
+  时间仍未结束则强制终止进程
+- 日志：工作进程的日志转发到父进程，写入同一组带任务 ID 的日志文件
+
+每个工作进程有独立的连接池和缓存；磁盘空间预留记录在下载目录的账本文件中，
+工作进程的准入决定计入彼此的预留。
+"""
+import itertools
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from ..utils.logging import ForwardedLogHandler, forward_logging, log_context
+from .admission import share_reservations
+from .cancel import CancelToken
+from .core import DownloadCore
+from .transcode import default_threads, set_transcode_threads
+
+logger = logging.getLogger(__name__)
+
+
+# 父进程检查工作进程消息和存活状态的间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 发送取消请求后等待工作进程结束任务的时间（秒），超时则终止进程
+CANCEL_GRACE = 10.0
+
+# 启动时等待工作进程就绪的最长时间（秒）
+READY_TIMEOUT = 60.0
+
+# forkserver 服务进程预先导入的模块（之后 fork 的工作进程直接继承）
+PRELOAD = ["yt_dlp", "yt_dlp.extractor.youtube", "simple_yt_dlp.download.core"]
+
+
+def _context():
+    """优先使用 forkserver（避免在多线程进程中直接 fork），否则使用 spawn"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD)
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _worker_main(conn, core: DownloadCore, records, transcode_threads: int) -> None:
+    """
+    工作进程入口：预热后依次执行父进程发来的任务
+
+    消息（父 → 子）: ("job", job_id, url, formats, directory) / ("cancel",) / ("stop",)
+    消息（子 → 父）: ("ready", pid) / ("status", message) / ("progress", dict)
+                    / ("done", success, title, error)
+    """
+    from .jobs import PROGRESS_KEYS, run_download
+
+    # 终端的 Ctrl+C 发给整个进程组，由父进程决定如何停止
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if records is not None:
+        forward_logging(records)
+    set_transcode_threads(transcode_threads)
+    share_reservations()
+    try:
+        core.warm_up()
+    except Exception as e:
+        logger.warning(f"⚠️ 工作进程预热失败: {e}")
+
+    send_lock = threading.Lock()
+    jobs: queue.SimpleQueue = queue.SimpleQueue()
+    current: list[Optional[CancelToken]] = [None]
+
+    def send(message: tuple) -> None:
+        with send_lock:
+            conn.send(message)
+
+    def reader() -> None:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                # 父进程已退出：不留下孤儿进程
+                os._exit(0)
+            if message[0] == "job":
+                current[0] = CancelToken()
+                jobs.put((message, current[0]))
+            elif message[0] == "cancel" and current[0] is not None:
+                current[0].cancel()
+            elif message[0] == "stop":
+                jobs.put(None)
+                return
+
+    threading.Thread(target=reader, name="pool-reader", daemon=True).start()
+    send(("ready", os.getpid()))
+
+    while (item := jobs.get()) is not None:
+        (_, job_id, url, formats, directory), token = item
+
+        def on_progress(d: dict) -> None:
+            send(("progress", {k: d.get(k) for k in PROGRESS_KEYS if d.get(k) is not None}))
+
+        with log_context(job_id):
+            try:
+                result = run_download(
+                    core, url, formats, Path(directory), token,
+                    info_callback=lambda message: send(("status", message)),
+                    progress_callback=on_progress,
+                )
+            except Exception as e:
+                logger.exception(f"任务 #{job_id} 异常")
+                result = (False, "", f"{type(e).__name__}: {e}")
+        current[0] = None
+        send(("done", *result))
+
+
+class WorkerProcess:
+    """
+    父进程中的一个工作进程句柄
+    """
+
+    def __init__(self, ctx, core: DownloadCore, records, index: int, transcode_threads: int):
+        self.index = index
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, core, records, transcode_threads),
+            name=f"download-worker-{index}", daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """等待工作进程完成预热"""
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = self.conn.recv()[0] == "ready"
+        return self.ready
+
+    def execute(
+        self,
+        job_id: Optional[int],
+        url: str,
+        formats: list[str],
+        directory: Path,
+        cancel_token: CancelToken,
+        info_callback: Optional[Callable[[str], None]],
+        progress_callback: Optional[Callable[[dict], None]],
+    ) -> tuple[bool, str, Optional[str]]:
+        """在该工作进程中执行一个任务（阻塞到任务结束）"""
+        self.conn.send(("job", job_id, url, formats, str(directory)))
+        cancelled_at = None
+        while True:
+            if cancelled_at is None and cancel_token.cancelled:
+                cancelled_at = time.monotonic()
+                self.conn.send(("cancel",))
+            elif cancelled_at is not None and time.monotonic() - cancelled_at > CANCEL_GRACE:
+                logger.warning(f"工作进程 {self.process.pid} 未响应取消，强制终止")
+                self.kill()
+                return False, "", "Download cancelled"
+
+            try:
+                if not self.conn.poll(POLL_INTERVAL):
+                    if not self.alive:
+                        raise EOFError
+                    continue
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                self.process.join(1)
+                error = f"Worker process crashed (exit code {self.process.exitcode})"
+                logger.error(f"任务 #{job_id}: {error}")
+                return False, "", error
+
+            kind = message[0]
+            if kind == "ready":
+                self.ready = True
+            elif kind == "status" and info_callback:
+                info_callback(message[1])
+            elif kind == "progress" and progress_callback:
+                progress_callback(message[1])
+            elif kind == "done":
+                return message[1], message[2], message[3]
+
+    def stop(self) -> None:
+        """请求工作进程在当前任务后退出"""
+        try:
+            self.conn.send(("stop",))
+        except OSError:
+            pass
+
+    def kill(self) -> None:
+        """立即终止工作进程"""
+        self.process.terminate()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ProcessPool:
+    """
+    下载工作进程池 - 与 run_download 相同的调用方式，在独立进程中执行
+    """
+
+    def __init__(self, core: DownloadCore, processes: Optional[int] = None):
+        """
+        初始化进程池（调用 start() 后才启动进程）
+
+        Args:
+            core: 下载核心（序列化后交给每个工作进程，各自创建独立实例）
+            processes: 工作进程数，默认为 CPU 核数
+        """
+        self.core = core
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.restarts = 0
+        self._ctx = _context()
+        self._lock = threading.Lock()
+        self._idle: queue.Queue = queue.Queue()
+        self._workers: list[WorkerProcess] = []
+        self._records = None
+        self._log_listener: Optional[logging.handlers.QueueListener] = None
+        self._indexes = itertools.count()
+
+    def start(self, wait: bool = True) -> None:
+        """
+        启动全部工作进程
+
+        Args:
+            wait: 是否等待所有进程完成预热
+        """
+        self._records = self._ctx.Queue()
+        self._log_listener = logging.handlers.QueueListener(
+            self._records, ForwardedLogHandler()
+        )
+        self._log_listener.start()
+        for _ in range(self.processes):
+            self._idle.put(self._spawn())
+        if wait:
+            deadline = time.monotonic() + READY_TIMEOUT
+            for worker in list(self._workers):
+                worker.wait_ready(max(0.0, deadline - time.monotonic()))
+        logger.info(f"进程池已启动: {self.processes} 个工作进程")
+
+    def _spawn(self) -> WorkerProcess:
+        # 每个工作进程有自己的转码调度器：平分线程预算，进程之间不超额
+        threads = max(1, default_threads() // self.processes)
+        worker = WorkerProcess(
+            self._ctx, self.core, self._records, next(self._indexes), threads
+        )
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace(self, worker: WorkerProcess) -> WorkerProcess:
+        """替换已退出的工作进程"""
+        with self._lock:
+            self._workers.remove(worker)
+            self.restarts += 1
+        logger.warning(f"工作进程 {worker.process.pid} 已退出，启动新进程")
+        return self._spawn()
+
+    def run(
+        self,
+        url: str,
+        formats: list[str],
+        directory: Path,
+        cancel_token: CancelToken,
+        info_callback: Optional[Callable[[str], None]] = None,
+        progress_callback: Optional[Callable[[dict], None]] = None,
+        job_id: Optional[int] = None,
+    ) -> tuple[bool, str, Optional[str]]:
+        """
+        在空闲的工作进程中执行下载（阻塞到任务结束；没有空闲进程时等待）
+
+        Args:
+            url: 视频 URL
+            formats: 格式标识符列表
+            directory: 下载目录
+            cancel_token: 取消令牌
+            info_callback: 状态消息回调
+            progress_callback: 进度回调（已过滤为可序列化字段）
+            job_id: 任务 ID（用于日志）
+
+        Returns:
+            (成功状态, 标题, 错误信息)
+        """
+        worker = self._idle.get()
+        try:
+            if cancel_token.cancelled:
+                return False, "", "Download cancelled"
+            return worker.execute(
+                job_id, url, formats, directory, cancel_token, info_callback, progress_callback
+            )
+        finally:
+            if not worker.alive:
+                worker = self._replace(worker)
+            self._idle.put(worker)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """停止全部工作进程"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.alive:
+                worker.kill()
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
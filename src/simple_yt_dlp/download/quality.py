@@ -0,0 +1,284 @@
+"""
+Quality Planner - 按截止时间和流量预算自动选择画质
+Deadline- and byte-budget-driven automatic quality selection
+
+格式 "auto" 不对应固定的画质：任务开始时用提取到的各档大小和实测吞吐量，
+选出放得下的最高一档：
+
+- 流量预算：剩余预算（扣除已完成任务的实际流量和运行中任务的计划大小）
+  平均分给尚未开始的自动任务
+- 截止时间：实测吞吐量 × 安全系数 × 剩余时间，同样扣除运行中任务后平均分配
+
+每个任务都在开始时才做规划，吞吐量在队列中途下降时，后续任务自动降档。
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from .admission import format_size
+
+logger = logging.getLogger(__name__)
+
+
+# 自动画质的格式标识符
+AUTO = "auto"
+
+# 候选档位（按画质从高到低）
+AUTO_TIERS = ("mp4_best", "mp4_1080p", "mp4_720p", "mp4_480p", "mp4_360p")
+
+# 尚无实测吞吐量时假设的吞吐量（字节/秒）
+DEFAULT_RATE = 2 * 1024 * 1024
+
+# 按截止时间规划时只使用实测吞吐量的这一比例（留出波动和后处理的时间）
+SAFETY = 0.8
+
+# 吞吐量的统计窗口（秒）和计算所需的最短跨度
+RATE_WINDOW = 20.0
+MIN_RATE_SPAN = 1.0
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_size(text: str) -> int:
+    """
+    解析字节数，例如 "500M"、"1.5GB"、"20g"、"1048576"
+
+    Raises:
+        ValueError: 无法解析
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*", text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_deadline(text: str, now: Optional[datetime] = None) -> float:
+    """
+    解析截止时间：相对时长（"90m"、"2h"、"1h30m"）或当地时刻（"23:30"，
+    已过则为次日）
+
+    Returns:
+        截止时间（time.time() 时间戳）
+
+    Raises:
+        ValueError: 无法解析
+    """
+    now = now or datetime.now()
+    text = text.strip()
+    clock = re.fullmatch(r"(\d{1,2}):(\d{2})", text)
+    if clock:
+        hour, minute = int(clock.group(1)), int(clock.group(2))
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid time: {text!r}")
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target.timestamp()
+
+    parts = re.findall(r"(\d+(?:\.\d+)?)([smhd])", text.lower())
+    if not parts or "".join(n + u for n, u in parts) != text.lower():
+        raise ValueError(f"Invalid deadline: {text!r}")
+    seconds = sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    return now.timestamp() + seconds
+
+
+class ThroughputMeter:
+    """
+    所有运行中任务的总吞吐量（按滑动窗口统计进度事件中的字节增量）
+    """
+
+    def __init__(self, window: float = RATE_WINDOW, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            window: 统计窗口（秒）
+            clock: 时钟函数
+        """
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._samples: deque = deque()  # (时间, 字节增量)
+        self._streams: dict[tuple, int] = {}  # (任务, 流) -> 已下载字节
+        self._rate: Optional[float] = None
+
+    def observe(self, job, stream, downloaded: Optional[int]) -> None:
+        """
+        记录一个进度事件
+
+        Args:
+            job: 任务标识
+            stream: 流标识（例如文件名；同一任务的多个流分别统计）
+            downloaded: 该流已下载的字节数
+        """
+        if downloaded is None:
+            return
+        now = self.clock()
+        with self._lock:
+            previous = self._streams.get((job, stream), 0)
+            self._streams[(job, stream)] = max(previous, downloaded)
+            if downloaded > previous:
+                self._samples.append((now, downloaded - previous))
+                while now - self._samples[0][0] > self.window:
+                    self._samples.popleft()
+                span = now - self._samples[0][0]
+                if span >= MIN_RATE_SPAN:
+                    # 第一个样本的字节是在窗口开始之前传输的
+                    moved = sum(size for _, size in self._samples) - self._samples[0][1]
+                    self._rate = moved / span
+
+    def rate(self) -> Optional[float]:
+        """
+        当前吞吐量（字节/秒）
+
+        Returns:
+            最近一个窗口的吞吐量；没有下载时保持最后的结果（从未测得时为 None）
+        """
+        with self._lock:
+            return self._rate
+
+    def finish(self, job) -> int:
+        """
+        任务结束：清除其流的记录
+
+        Returns:
+            该任务实际下载的字节数
+        """
+        with self._lock:
+            keys = [key for key in self._streams if key[0] == job]
+            return sum(self._streams.pop(key) for key in keys)
+
+
+class QualityPlan:
+    """
+    一个自动画质任务的规划结果
+    """
+
+    __slots__ = ("format_id", "size", "allowance", "rate")
+
+    def __init__(self, format_id: str, size: Optional[int], allowance: Optional[float],
+                 rate: Optional[float]):
+        self.format_id = format_id
+        self.size = size
+        self.allowance = allowance
+        self.rate = rate
+
+    def describe(self) -> str:
+        """可读的规划说明"""
+        text = self.format_id
+        if self.size:
+            text += f"，约 {format_size(self.size)}"
+        if self.allowance is not None:
+            text += f"（可用 {format_size(max(0.0, self.allowance))}）"
+        return text
+
+    def __repr__(self) -> str:
+        return f"QualityPlan({self.format_id}, {self.size}, {self.allowance})"
+
+
+class QualityPlanner:
+    """
+    自动画质规划器（一个批次的截止时间和流量预算）
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        budget: Optional[int] = None,
+        meter: Optional[ThroughputMeter] = None,
+        tiers: tuple = AUTO_TIERS,
+        initial_rate: float = DEFAULT_RATE,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            deadline: 截止时间（time.time() 时间戳），None 表示不限
+            budget: 流量预算（字节），None 表示不限
+            meter: 吞吐量统计
+            tiers: 候选档位（按画质从高到低）
+            initial_rate: 尚无实测吞吐量时假设的吞吐量（字节/秒）
+            clock: 时钟函数（与 deadline 相同的时间基准）
+        """
+        self.deadline = deadline
+        self.budget = budget
+        self.meter = meter or ThroughputMeter()
+        self.tiers = tiers
+        self.initial_rate = initial_rate
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._spent = 0
+        self._running: dict[QualityPlan, int] = {}
+
+    def allowance(self, pending: int = 1) -> tuple[Optional[float], Optional[float]]:
+        """
+        计算下一个任务可用的字节数
+
+        Args:
+            pending: 尚未开始的自动任务数（包括这一个）
+
+        Returns:
+            (可用字节数, 使用的吞吐量)；不受限时可用字节数为 None
+        """
+        pending = max(1, pending)
+        with self._lock:
+            spent = self._spent
+            running = sum(self._running.values())
+        limits = []
+        rate = None
+        if self.budget is not None:
+            limits.append((self.budget - spent - running) / pending)
+        if self.deadline is not None:
+            rate = self.meter.rate() or self.initial_rate
+            remaining = max(0.0, self.deadline - self.clock())
+            limits.append((rate * SAFETY * remaining - running) / pending)
+        return (min(limits) if limits else None), rate
+
+    def choose(self, sizes: dict[str, Optional[int]], pending: int = 1) -> QualityPlan:
+        """
+        为一个任务选择档位，并把计划大小计入运行中任务
+
+        Args:
+            sizes: 各档位的下载大小（未知为 None）
+            pending: 尚未开始的自动任务数（包括这一个）
+
+        Returns:
+            QualityPlan（任务结束时交给 finish）
+        """
+        allowance, rate = self.allowance(pending)
+        candidates = [t for t in self.tiers if t in sizes] or list(self.tiers)
+        if allowance is None:
+            chosen = candidates[0]
+        else:
+            chosen = next(
+                (t for t in candidates if sizes.get(t) and sizes[t] <= allowance), None
+            )
+            if chosen is None:
+                # 没有一档放得下：选最小的一档（大小都未知时选最低档）
+                known = [t for t in candidates if sizes.get(t)]
+                chosen = min(known, key=sizes.get) if known else candidates[-1]
+                logger.warning(
+                    f"⚠️ 最低画质也超出可用流量 {format_size(max(0.0, allowance))}，"
+                    f"可能无法按时完成"
+                )
+        plan = QualityPlan(chosen, sizes.get(chosen), allowance, rate)
+        with self._lock:
+            self._running[plan] = plan.size or 0
+        logger.info(f"📐 自动画质: {plan.describe()}")
+        return plan
+
+    def finish(self, plan: QualityPlan, downloaded: Optional[int] = None) -> None:
+        """
+        任务结束：以实际流量替换计划大小
+
+        Args:
+            plan: choose 的结果
+            downloaded: 实际下载的字节数（未知时按计划大小计）
+        """
+        with self._lock:
+            planned = self._running.pop(plan, None)
+            if planned is None:
+                return
+            self._spent += planned if downloaded is None else downloaded
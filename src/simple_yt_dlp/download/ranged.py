@@ -0,0 +1,386 @@
+"""
+Ranged Downloader - 多连接分段下载器
+Multi-connection byte-range downloader for single-file HTTP formats
+
+把文件按字节区间切分，由多个连接并行下载，经各自的写缓冲区写入预分配
+文件的对应偏移（见 writer.py）。
+某个区间完成后，空闲的工作线程会"窃取"剩余量最大（优先停滞）的区间的
+后半段，避免慢连接拖住整体进度。超过 stall_timeout 没有进度的请求由
+看门狗中断，工作线程重新请求该区间剩余的部分。
+"""
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from .pool import ConnectionPool, get_shared_pool
+from .writer import BufferedRangeWriter, OutputFile, WriteOptions
+
+logger = logging.getLogger(__name__)
+
+
+# 默认参数
+DEFAULT_CONNECTIONS = 4
+MIN_SPLIT_SIZE = 1024 * 1024            # 区间小于该值时不再拆分
+READ_SIZE = 64 * 1024                   # 单次读取大小
+STALL_TIMEOUT = 5.0                     # 超过该时间无进度视为停滞
+DEFAULT_RETRIES = 3
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+
+class RangedDownloadError(Exception):
+    """分段下载失败"""
+
+
+class Segment:
+    """
+    一个待下载的字节区间 [pos, end)
+    """
+
+    __slots__ = ("start", "pos", "end", "last_progress", "response")
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.pos = start
+        self.end = end
+        self.last_progress = time.monotonic()
+        # 正在读取该区间的响应（看门狗据此中断停滞的请求）
+        self.response = None
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.end - self.pos)
+
+
+class RangedDownloader:
+    """
+    多连接分段下载器
+
+    - 通过共享连接池发送 Range 请求
+    - 服务器不支持 Range 或大小未知时退回单连接下载
+    - 每个请求最多获取 max_request_size 字节（YouTube 对大区间请求限速）
+    """
+
+    def __init__(
+        self,
+        connections: int = DEFAULT_CONNECTIONS,
+        headers: Optional[dict] = None,
+        pool: Optional[ConnectionPool] = None,
+        context=None,
+        timeout: float = 20.0,
+        max_request_size: Optional[int] = None,
+        min_split_size: int = MIN_SPLIT_SIZE,
+        stall_timeout: float = STALL_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+        write_options: Optional[WriteOptions] = None,
+    ):
+        """
+        初始化分段下载器
+
+        Args:
+            connections: 并行连接数
+            headers: 每个请求附带的请求头
+            pool: 连接池，默认使用进程级共享连接池
+            context: HTTPS 使用的 ssl.SSLContext
+            timeout: 套接字超时（秒）
+            max_request_size: 单个 Range 请求的最大字节数
+            min_split_size: 区间可被窃取拆分的最小剩余量
+            stall_timeout: 区间无进度多久视为停滞（秒）
+            retries: 单个请求失败的重试次数
+            progress_callback: 进度回调 (已下载字节, 总字节)
+            write_options: 磁盘写入参数（缓冲区、预分配、fsync）
+        """
+        self.connections = max(1, connections)
+        self.headers = dict(headers or {})
+        self.pool = pool or get_shared_pool()
+        self.context = context
+        self.timeout = timeout
+        self.max_request_size = max_request_size
+        self.min_split_size = min_split_size
+        self.stall_timeout = stall_timeout
+        self.retries = retries
+        self.progress_callback = progress_callback
+        self.write_options = write_options or WriteOptions()
+        # 写入时计算的校验和（"算法:十六进制"，下载完成后可用）
+        self.checksum: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._segments: list[Segment] = []
+        self._downloaded = 0
+        self._total_size: Optional[int] = None
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._responses: set = set()
+
+    # ------------------------------------------------------------------
+    # 探测
+    # ------------------------------------------------------------------
+
+    def probe(self, url: str) -> tuple[Optional[int], bool]:
+        """
+        探测文件大小和 Range 支持
+
+        Args:
+            url: 文件 URL
+
+        Returns:
+            (文件大小或 None, 是否支持 Range)
+        """
+        res = self.pool.request(
+            "GET", url, headers={**self.headers, "Range": "bytes=0-0"},
+            timeout=self.timeout, context=self.context,
+        )
+        try:
+            if res.status == 206:
+                match = _CONTENT_RANGE_RE.match(res.getheader("Content-Range", ""))
+                if match and match.group(3) != "*":
+                    return int(match.group(3)), True
+                return None, False
+            if 200 <= res.status < 300:
+                length = res.getheader("Content-Length")
+                return (int(length) if length else None), False
+            raise RangedDownloadError(f"HTTP Error {res.status}: {res.reason}")
+        finally:
+            res.close()
+
+    # ------------------------------------------------------------------
+    # 下载
+    # ------------------------------------------------------------------
+
+    def download(self, url: str, dest: Path, total_size: Optional[int] = None) -> int:
+        """
+        下载文件到 dest
+
+        Args:
+            url: 文件 URL
+            dest: 目标文件路径
+            total_size: 已知的文件大小（未知时自动探测）
+
+        Returns:
+            下载的字节数
+        """
+        accepts_ranges = True
+        if total_size is None:
+            total_size, accepts_ranges = self.probe(url)
+        self._total_size = total_size
+
+        if not total_size or not accepts_ranges or self.connections == 1:
+            return self._download_single(url, dest, total_size)
+
+        with OutputFile(dest, total_size, self.write_options) as output:
+            self._plan(total_size)
+            self._report()
+            workers = [
+                threading.Thread(
+                    target=self._worker, args=(url, output, seg), name=f"ranged-{i}",
+                    daemon=True,
+                )
+                for i, seg in enumerate(list(self._segments))
+            ]
+            for worker in workers:
+                worker.start()
+            self._watch(workers)
+            if output.digest is not None:
+                self.checksum = output.digest.hexdigest(total_size)
+
+        if self._error is not None:
+            raise RangedDownloadError(str(self._error)) from self._error
+        if self._abort.is_set():
+            raise RangedDownloadError("Download aborted")
+        if self._downloaded != total_size:
+            raise RangedDownloadError(
+                f"Incomplete download: {self._downloaded} of {total_size} bytes"
+            )
+        return self._downloaded
+
+    def abort(self) -> None:
+        """中止下载（中断进行中的请求，工作线程立即退出）"""
+        self._abort.set()
+        with self._lock:
+            responses = list(self._responses)
+        for res in responses:
+            res.interrupt()
+
+    def _open(self, url: str, headers: dict):
+        """发送请求并登记响应，以便 abort() 中断阻塞的读取"""
+        res = self.pool.request(
+            "GET", url, headers=headers, timeout=self.timeout, context=self.context
+        )
+        with self._lock:
+            self._responses.add(res)
+        if self._abort.is_set():
+            res.interrupt()
+        return res
+
+    def _close(self, res) -> None:
+        with self._lock:
+            self._responses.discard(res)
+        res.close()
+
+    def _watch(self, workers: list[threading.Thread]) -> None:
+        """等待工作线程结束，期间中断超过 stall_timeout 没有进度的请求"""
+        interval = max(0.05, self.stall_timeout / 4)
+        while True:
+            alive = [worker for worker in workers if worker.is_alive()]
+            if not alive:
+                return
+            alive[0].join(interval)
+            now = time.monotonic()
+            with self._lock:
+                stalled = [
+                    s for s in self._segments
+                    if s.response is not None and now - s.last_progress > self.stall_timeout
+                ]
+                responses = [s.response for s in stalled]
+                for segment in stalled:
+                    segment.response = None
+            for res in responses:
+                logger.debug("分段请求停滞，中断后重试")
+                res.interrupt()
+
+    def _plan(self, total_size: int) -> None:
+        """把文件平均切分为初始区间"""
+        count = min(self.connections, max(1, total_size // self.min_split_size))
+        step = total_size // count
+        bounds = [i * step for i in range(count)] + [total_size]
+        self._segments = [Segment(bounds[i], bounds[i + 1]) for i in range(count)]
+
+    def _steal(self) -> Optional[Segment]:
+        """
+        从剩余量最大（优先停滞）的区间窃取后半段；停滞区间只保留开头一小段
+
+        Returns:
+            新区间；没有可拆分的区间时返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [s for s in self._segments if s.remaining >= 2 * self.min_split_size]
+            if not candidates:
+                return None
+            victim = max(
+                candidates,
+                key=lambda s: (now - s.last_progress > self.stall_timeout, s.remaining),
+            )
+            if now - victim.last_progress > self.stall_timeout:
+                # 停滞的区间只保留开头一小段，其余全部转移
+                mid = victim.pos + self.min_split_size
+            else:
+                mid = victim.pos + victim.remaining // 2
+            stolen = Segment(mid, victim.end)
+            victim.end = mid
+            self._segments.append(stolen)
+            return stolen
+
+    def _worker(self, url: str, output: OutputFile, segment: Optional[Segment]) -> None:
+        """工作线程：下载分配的区间，完成后继续窃取"""
+        writer = output.writer()
+        try:
+            try:
+                while segment is not None and not self._abort.is_set():
+                    self._fetch_segment(url, writer, segment)
+                    segment = self._steal()
+            finally:
+                writer.flush()
+        except BaseException as e:
+            with self._lock:
+                if self._error is None:
+                    self._error = e
+            self._abort.set()
+
+    def _fetch_segment(self, url: str, writer: BufferedRangeWriter, segment: Segment) -> None:
+        """下载一个区间（按 max_request_size 拆成多个请求，失败重试）"""
+        attempt = 0
+        while segment.remaining > 0 and not self._abort.is_set():
+            request_end = segment.end
+            if self.max_request_size:
+                request_end = min(request_end, segment.pos + self.max_request_size)
+            try:
+                self._fetch_range(url, writer, segment, request_end)
+                attempt = 0
+            except RangedDownloadError:
+                raise
+            except Exception as e:
+                if self._abort.is_set():
+                    return
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                logger.debug(f"分段请求失败，重试 ({attempt}/{self.retries}): {e}")
+                time.sleep(min(2 ** (attempt - 1) * 0.5, 4.0))
+
+    def _fetch_range(
+        self, url: str, writer: BufferedRangeWriter, segment: Segment, request_end: int
+    ) -> None:
+        """请求 [segment.pos, request_end) 并写入文件"""
+        headers = {**self.headers, "Range": f"bytes={segment.pos}-{request_end - 1}"}
+        res = self._open(url, headers)
+        with self._lock:
+            segment.response = res
+            segment.last_progress = time.monotonic()
+        try:
+            if res.status != 206:
+                raise RangedDownloadError(f"HTTP Error {res.status}: {res.reason}")
+            while not self._abort.is_set():
+                with self._lock:
+                    # 区间可能被窃取缩短
+                    limit = min(request_end, segment.end)
+                    want = limit - segment.pos
+                if want <= 0:
+                    break
+                data = res.read(min(READ_SIZE, want))
+                if not data:
+                    raise ConnectionError("Connection closed before range was complete")
+                writer.seek(segment.pos)
+                writer.write(data)
+                with self._lock:
+                    segment.pos += len(data)
+                    segment.last_progress = time.monotonic()
+                    self._downloaded += len(data)
+                self._report()
+        finally:
+            with self._lock:
+                segment.response = None
+            self._close(res)
+
+    def _download_single(self, url: str, dest: Path, total_size: Optional[int]) -> int:
+        """单连接下载（服务器不支持 Range 时）"""
+        res = self._open(url, self.headers)
+        try:
+            if not 200 <= res.status < 300:
+                raise RangedDownloadError(f"HTTP Error {res.status}: {res.reason}")
+            with OutputFile(dest, total_size, self.write_options) as output:
+                writer = output.writer()
+                try:
+                    while not self._abort.is_set():
+                        data = res.read(READ_SIZE)
+                        if not data:
+                            break
+                        writer.write(data)
+                        self._downloaded += len(data)
+                        self._report()
+                finally:
+                    writer.flush()
+                if output.digest is not None:
+                    self.checksum = output.digest.hexdigest(self._downloaded)
+        except Exception as e:
+            if self._abort.is_set():
+                raise RangedDownloadError("Download aborted") from e
+            raise
+        finally:
+            self._close(res)
+        if self._abort.is_set():
+            raise RangedDownloadError("Download aborted")
+        if total_size is not None and self._downloaded != total_size:
+            raise RangedDownloadError(
+                f"Incomplete download: {self._downloaded} of {total_size} bytes"
+            )
+        return self._downloaded
+
+    def _report(self) -> None:
+        """调用进度回调"""
+        if self.progress_callback is not None:
+            self.progress_callback(self._downloaded, self._total_size)
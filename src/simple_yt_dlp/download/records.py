@@ -0,0 +1,159 @@
+"""
+Video Records - 精简的视频信息记录
+Compact, slotted records of the video info the app actually uses
+
+yt-dlp 的 info 字典包含所有格式（每个都带 URL、HTTP 头和分片信息）、
+缩略图、字幕和自动字幕，单个视频常常达到数百 KB。格式选择完成后只需要
+其中很少的字段：
+
+- VideoRecord: 标识、标题、时长和选中的流（队列、历史和界面使用）
+- slim_info: 只保留选中格式的 info 副本（下载阶段仍需交给 yt-dlp）
+"""
+from typing import Iterable, Optional
+
+# 格式选择后不再需要的大字段（下载不写缩略图、字幕和元数据）
+BULKY_KEYS = (
+    "thumbnails", "thumbnail", "subtitles", "automatic_captions", "requested_subtitles",
+    "heatmap", "description", "tags", "categories", "_format_sort_fields",
+)
+
+
+class StreamRecord:
+    """
+    一个选中的流
+    """
+
+    __slots__ = ("format_id", "ext", "vcodec", "acodec", "height", "size")
+
+    def __init__(
+        self,
+        format_id: str,
+        ext: str,
+        vcodec: Optional[str] = None,
+        acodec: Optional[str] = None,
+        height: Optional[int] = None,
+        size: Optional[int] = None,
+    ):
+        self.format_id = format_id
+        self.ext = ext
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.height = height
+        self.size = size
+
+    @classmethod
+    def from_format(cls, fmt: dict) -> "StreamRecord":
+        """从 yt-dlp 的格式字典创建"""
+        return cls(
+            format_id=str(fmt.get("format_id")),
+            ext=fmt.get("ext") or "",
+            vcodec=fmt.get("vcodec"),
+            acodec=fmt.get("acodec"),
+            height=fmt.get("height"),
+            size=fmt.get("filesize") or fmt.get("filesize_approx"),
+        )
+
+    def __repr__(self) -> str:
+        return f"StreamRecord({self.format_id}, {self.ext}, {self.size})"
+
+
+class VideoRecord:
+    """
+    格式选择后的视频信息（替代完整的 info 字典长期保存）
+    """
+
+    __slots__ = ("id", "title", "duration", "url", "format_id", "streams")
+
+    def __init__(
+        self,
+        id: str,
+        title: str,
+        duration: Optional[float],
+        url: Optional[str],
+        format_id: str,
+        streams: tuple,
+    ):
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.url = url
+        self.format_id = format_id
+        self.streams = streams
+
+    @classmethod
+    def from_info(cls, info: dict, format_id: str) -> "VideoRecord":
+        """
+        从已完成格式选择的 info 字典创建
+
+        Args:
+            info: yt-dlp 处理后的视频信息
+            format_id: 目标格式标识符
+
+        Returns:
+            VideoRecord
+        """
+        selected = info.get("requested_formats") or [info]
+        return cls(
+            id=info.get("id") or "",
+            title=info.get("title") or "",
+            duration=info.get("duration"),
+            url=info.get("webpage_url") or info.get("original_url"),
+            format_id=format_id,
+            streams=tuple(StreamRecord.from_format(fmt) for fmt in selected),
+        )
+
+    @property
+    def size(self) -> Optional[int]:
+        """选中的流的总大小；任一流大小未知时为 None"""
+        sizes = [s.size for s in self.streams]
+        return sum(sizes) if sizes and all(sizes) else None
+
+    @property
+    def stream_ids(self) -> list[str]:
+        return [s.format_id for s in self.streams]
+
+    def to_dict(self) -> dict:
+        """转换为可 JSON 序列化的字典"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "duration": self.duration,
+            "url": self.url,
+            "format": self.format_id,
+            "streams": self.stream_ids,
+            "size": self.size,
+        }
+
+    def __repr__(self) -> str:
+        return f"VideoRecord({self.id}, {self.format_id} <- {'+'.join(self.stream_ids)})"
+
+
+def selected_format_ids(info: dict) -> list[str]:
+    """获取处理后的 info 中选中的格式 ID"""
+    selected = info.get("requested_formats") or [info]
+    return [str(fmt.get("format_id")) for fmt in selected if fmt.get("format_id") is not None]
+
+
+def slim_info(info: dict, format_ids: Iterable[str]) -> dict:
+    """
+    生成只保留指定格式的 info 浅拷贝
+
+    对结果重新做格式选择得到的流与原来相同（候选只剩被选中的格式），
+    因此可以替代完整的 info 交给 yt-dlp 下载。
+
+    Args:
+        info: 未处理或已处理的 info 字典
+        format_ids: 需要保留的格式 ID
+
+    Returns:
+        新的字典（不修改 info）
+    """
+    keep = set(format_ids)
+    slim = {k: v for k, v in info.items() if k not in BULKY_KEYS}
+    if "formats" in info:
+        slim["formats"] = [f for f in info["formats"] if str(f.get("format_id")) in keep]
+    if "requested_formats" in info:
+        slim["requested_formats"] = [
+            f for f in info["requested_formats"] if str(f.get("format_id")) in keep
+        ]
+    return slim
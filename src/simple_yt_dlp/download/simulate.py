@@ -0,0 +1,352 @@
+"""
+Simulation Backend - 不访问网络的模拟下载后端
+Seeded, network-free download backend for load-testing the queue and UI
+
+作为 DownloadCore 的下载后端（backend 参数）替换 SimpleYoutubeDL：
+提取返回按种子生成的视频信息，传输按吞吐量曲线写入合成文件并发出与
+真实下载相同的进度钩子序列，按配置的概率出现 403 和停滞。DownloadCore
+的重试、磁盘准入、校验和存储逻辑照常执行，因此可以在一台笔记本上用
+上千个并发任务测试任务队列、进度汇总和界面。
+
+模拟视频只提供音视频合一的格式和纯音频格式，不需要合并和转码（yt-dlp
+的后处理器不执行，不依赖 ffmpeg）；多格式任务的 fanout 仍需要 ffmpeg。
+
+此模块在导入时加载 yt_dlp，应按需（延迟）导入。
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from yt_dlp.downloader.common import FileDownloader
+
+from ..utils.validation import VIDEO, normalize_youtube_url
+from .quality import parse_size
+from .ydl import SimpleYoutubeDL
+
+MIB = 1024 * 1024
+
+# 模拟 URL 的域名（保留域名，任何请求都不会发出）
+SIM_HOST = "sim.invalid"
+
+# 音视频合一的格式：(format_id, 高度, 码率 kbps)
+_PROGRESSIVE = (("18", 360, 700), ("59", 480, 1200), ("22", 720, 2500), ("37", 1080, 5000))
+# 纯音频格式
+_AUDIO = ("140", 128)
+
+# 合成文件内容的重复块大小
+_BLOCK_SIZE = 64 * 1024
+
+# 慢启动：传输开始后多少秒达到基础速率
+_RAMP_UP = 3.0
+
+
+class SimulationProfile:
+    """
+    模拟配置（同一种子和配置下，同一视频的信息和每次尝试的传输过程相同）
+
+    Attributes:
+        seed: 随机种子
+        min_rate / max_rate: 单个流的基础速率范围（字节/秒，按对数均匀抽取）
+        link: 所有传输共享的总带宽（字节/秒，None 表示不限制）
+        forbidden: 每次流传输中途出现 403 的概率
+        stall: 每次流传输中途停滞的概率
+        stall_time: 停滞持续的秒数
+        extract_time: 提取视频信息的平均耗时（秒）
+        size_scale: 合成文件大小的缩放比例（大量任务时调小以节省磁盘）
+        tick: 传输的步进间隔（秒，每步写入一次并发出一次进度）
+    """
+
+    # parse() 接受的键 -> (属性, 解析函数)
+    _KEYS = {
+        "seed": ("seed", int),
+        "link": ("link", parse_size),
+        "403": ("forbidden", float),
+        "stall": ("stall", float),
+        "stall-time": ("stall_time", float),
+        "extract": ("extract_time", float),
+        "size": ("size_scale", float),
+        "tick": ("tick", float),
+    }
+
+    def __init__(
+        self,
+        seed: int = 0,
+        min_rate: int = 1 * MIB,
+        max_rate: int = 8 * MIB,
+        link: Optional[int] = None,
+        forbidden: float = 0.05,
+        stall: float = 0.05,
+        stall_time: float = 20.0,
+        extract_time: float = 1.0,
+        size_scale: float = 1.0,
+        tick: float = 0.25,
+    ):
+        self.seed = seed
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.link = link
+        self.forbidden = forbidden
+        self.stall = stall
+        self.stall_time = stall_time
+        self.extract_time = extract_time
+        self.size_scale = size_scale
+        self.tick = tick
+
+    @classmethod
+    def parse(cls, spec: str) -> "SimulationProfile":
+        """
+        解析命令行上的配置，例如 "seed=7,rate=1M-8M,link=200M,403=0.05,size=0.01"
+
+        Raises:
+            ValueError: 键或值无法解析
+        """
+        profile = cls()
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, sep, value = item.partition("=")
+            key = key.strip().lower()
+            if not sep:
+                raise ValueError(f"Invalid simulation setting: {item!r}")
+            if key == "rate":
+                low, _, high = value.partition("-")
+                profile.min_rate = parse_size(low)
+                profile.max_rate = parse_size(high) if high else profile.min_rate
+            elif key in cls._KEYS:
+                name, convert = cls._KEYS[key]
+                setattr(profile, name, convert(value))
+            else:
+                raise ValueError(f"Unknown simulation setting: {key!r}")
+        if profile.min_rate <= 0 or profile.max_rate < profile.min_rate:
+            raise ValueError("Invalid simulation rate range")
+        return profile
+
+    def __repr__(self) -> str:
+        return (
+            f"SimulationProfile(seed={self.seed}, rate={self.min_rate}-{self.max_rate}, "
+            f"link={self.link}, forbidden={self.forbidden}, stall={self.stall}, "
+            f"size_scale={self.size_scale})"
+        )
+
+
+class SimulatedBackend:
+    """
+    模拟下载后端：DownloadCore(backend=SimulatedBackend(profile))
+
+    在同一个后端创建的所有实例之间共享尝试次数和总带宽。
+    """
+
+    def __init__(self, profile: Optional[SimulationProfile] = None):
+        """
+        Args:
+            profile: 模拟配置，默认使用 SimulationProfile()
+        """
+        self.profile = profile or SimulationProfile()
+        self._lock = threading.Lock()
+        self._attempts: dict = {}
+        self._active = 0
+        self.block = random.Random(self.profile.seed).randbytes(_BLOCK_SIZE)
+
+    def __getstate__(self) -> dict:
+        """交给工作进程时不带锁和计数（每个进程各自计数）"""
+        return {"profile": self.profile}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["profile"])
+
+    def __call__(self, params: dict) -> "SimulatedYoutubeDL":
+        return SimulatedYoutubeDL(params, self)
+
+    def video_info(self, url: str) -> dict:
+        """
+        生成一个视频的未处理信息（同一种子下相同）
+
+        Args:
+            url: 视频 URL
+
+        Returns:
+            与 extract_info(process=False) 结构相同的 ie_result
+        """
+        video = normalize_youtube_url(url)
+        video_id = video.id if video.ok and video.kind == VIDEO else hashlib.md5(
+            url.encode()).hexdigest()[:11]
+        rng = random.Random(f"{self.profile.seed}:{video_id}")
+        duration = rng.randint(60, 1200)
+
+        def size(kbps: int) -> int:
+            return max(1, int(kbps * 125 * duration * self.profile.size_scale))
+
+        formats = [{
+            "format_id": _AUDIO[0], "ext": "m4a", "vcodec": "none", "acodec": "mp4a.40.2",
+            "abr": _AUDIO[1], "tbr": _AUDIO[1], "filesize": size(_AUDIO[1]),
+            "url": f"https://{SIM_HOST}/{video_id}/{_AUDIO[0]}",
+        }]
+        for format_id, height, kbps in _PROGRESSIVE:
+            formats.append({
+                "format_id": format_id, "ext": "mp4", "vcodec": "avc1.64001F",
+                "acodec": "mp4a.40.2", "height": height, "width": height * 16 // 9,
+                "tbr": kbps, "filesize": size(kbps),
+                "url": f"https://{SIM_HOST}/{video_id}/{format_id}",
+            })
+        return {
+            "id": video_id,
+            "title": f"Simulated video {video_id}",
+            "duration": duration,
+            "extractor": "youtube",
+            "extractor_key": "Youtube",
+            "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+            "original_url": url,
+            "formats": formats,
+        }
+
+    def next_attempt(self, info: dict) -> random.Random:
+        """某个流的下一次传输尝试使用的随机数生成器（重试时结果不同）"""
+        key = (info.get("id"), info.get("format_id"))
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        return random.Random(f"{self.profile.seed}:{key[0]}:{key[1]}:{attempt}")
+
+    @contextmanager
+    def transfer(self):
+        """登记一个进行中的传输（用于分配总带宽）"""
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def link_share(self) -> float:
+        """每个进行中的传输当前可用的带宽（不限制时为无穷大）"""
+        if not self.profile.link:
+            return math.inf
+        return self.profile.link / max(1, self._active)
+
+
+class SimulatedFD(FileDownloader):
+    """
+    模拟的文件下载器：按吞吐量曲线写入合成文件
+    """
+
+    def real_download(self, filename, info_dict):
+        backend: SimulatedBackend = self.ydl.backend
+        profile = backend.profile
+        rng = backend.next_attempt(info_dict)
+        total = info_dict.get("filesize") or MIB
+        # 本次尝试的事件：403 和停滞发生在传输中途的随机位置
+        fail_at = int(total * rng.uniform(0.1, 0.9)) if rng.random() < profile.forbidden else None
+        stall_at = int(total * rng.uniform(0.1, 0.9)) if rng.random() < profile.stall else None
+        # 吞吐量曲线：对数均匀的基础速率 × 慢启动 × 周期性波动 × 噪声
+        base = math.exp(rng.uniform(math.log(profile.min_rate), math.log(profile.max_rate)))
+        period = rng.uniform(5.0, 20.0)
+        phase = rng.uniform(0.0, 2 * math.pi)
+
+        write_options = self.params.get("write_options")
+        algorithm = write_options.checksum if write_options is not None else None
+        digest = hashlib.new(algorithm) if algorithm else None
+        token = self.params.get("cancel_token")
+
+        def sleep(seconds: float) -> None:
+            if token is None:
+                time.sleep(seconds)
+            elif token.wait(seconds):
+                token.raise_if_cancelled()
+
+        tmpfilename = self.temp_name(filename)
+        self.report_destination(filename)
+        block = memoryview(backend.block)
+        start = last = time.time()
+        downloaded = 0
+        with backend.transfer(), open(tmpfilename, "wb") as f:
+            while downloaded < total:
+                if fail_at is not None and downloaded >= fail_at:
+                    self.report_error("unable to download video data: HTTP Error 403: Forbidden")
+                    return False
+                if stall_at is not None and downloaded >= stall_at:
+                    # 停滞：连接仍在但没有数据，也不发出进度
+                    stall_at = None
+                    sleep(profile.stall_time)
+                    last = time.time()
+                    continue
+
+                now = time.time()
+                elapsed = now - start
+                wave = 1 + 0.25 * math.sin(2 * math.pi * elapsed / period + phase)
+                rate = base * min(1.0, 0.2 + elapsed / _RAMP_UP) * wave
+                rate = min(rate * rng.uniform(0.85, 1.15), backend.link_share())
+                # 不越过下一个事件的位置，小文件也会在事件处停下
+                limit = min(x for x in (total, fail_at, stall_at) if x is not None)
+                chunk = min(limit - downloaded, int(rate * (now - last)))
+                last = now
+                while chunk > 0:
+                    data = block[:min(chunk, len(block))]
+                    f.write(data)
+                    if digest is not None:
+                        digest.update(data)
+                    downloaded += len(data)
+                    chunk -= len(data)
+
+                self._hook_progress({
+                    "status": "downloading",
+                    "downloaded_bytes": downloaded,
+                    "total_bytes": total,
+                    "tmpfilename": tmpfilename,
+                    "filename": filename,
+                    "eta": (total - downloaded) / rate if rate else None,
+                    "speed": rate,
+                    "elapsed": elapsed,
+                    "ctx_id": info_dict.get("ctx_id"),
+                }, info_dict)
+                if downloaded < total:
+                    sleep(profile.tick)
+
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "status": "finished",
+            "downloaded_bytes": total,
+            "total_bytes": total,
+            "filename": filename,
+            "checksum": f"{algorithm}:{digest.hexdigest()}" if digest is not None else None,
+            "elapsed": time.time() - start,
+            "ctx_id": info_dict.get("ctx_id"),
+        }, info_dict)
+        return True
+
+
+class SimulatedYoutubeDL(SimpleYoutubeDL):
+    """
+    模拟后端创建的 YoutubeDL：提取和传输都不访问网络
+    """
+
+    def __init__(self, params: dict, backend: SimulatedBackend):
+        params = dict(params)
+        # 合成文件不是有效的媒体文件，跳过转码等后处理
+        params["postprocessors"] = []
+        # 进度只交给钩子，上千个任务时不向终端输出进度行
+        params["noprogress"] = True
+        # 模拟的 403 会走真实的缓存清理，不能碰用户的 yt-dlp 缓存
+        params["cachedir"] = False
+        super().__init__(params)
+        self.backend = backend
+
+    def extract_info(self, url, download=True, ie_key=None, extra_info=None, process=True,
+                     force_generic_extractor=False):
+        profile = self.backend.profile
+        token = self.params.get("cancel_token")
+        delay = profile.extract_time * random.uniform(0.5, 1.5)
+        if token is None:
+            time.sleep(delay)
+        elif token.wait(delay):
+            token.raise_if_cancelled()
+        raw = self.backend.video_info(url)
+        return self.process_extracted(raw, download) if process else raw
+
+    def _download(self, name, info, hooks):
+        fd = SimulatedFD(self, self.params)
+        for ph in hooks:
+            fd.add_progress_hook(ph)
+        return fd.download(name, self._copy_infodict(info))
@@ -0,0 +1,140 @@
+"""
+Staging - 暂存目录中的进行中文件
+In-flight files on a fast staging volume, published with one move at the end
+
+下载目录常在 NAS 或 USB 磁盘上。设置暂存目录（本地 SSD 或 tmpfs）后，
+.part 文件、分离的视频/音频流和 ffmpeg 合并/转码的中间文件都写在暂存
+目录中，任务完成后每个输出只移动一次到下载目录：同一文件系统上是一次
+原子 rename；跨文件系统时流式复制到目标目录中的隐藏临时文件（同时计算
+校验和），fsync 后再 rename，下载目录中不会出现写了一半的文件。
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows：不加锁，每个任务使用唯一目录
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 跨文件系统复制的块大小
+COPY_SIZE = 4 * 1024 * 1024
+
+
+class Workdir:
+    """
+    一个任务独占的工作目录（按 key 命名的目录在 release() 前持有文件锁）
+    """
+
+    def __init__(self, path: Path, fd: Optional[int] = None):
+        self.path = path
+        self._fd = fd
+
+    def release(self, keep: bool = False) -> None:
+        """
+        结束使用：删除目录（keep 为 True 时保留以便续传）并释放锁
+
+        Args:
+            keep: 是否保留目录中的文件
+        """
+        if not keep:
+            shutil.rmtree(self.path, ignore_errors=True)
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _lock_workdir(path: Path) -> Optional[int]:
+    """
+    对工作目录加非阻塞排他锁
+
+    Returns:
+        持有锁的文件描述符；目录正被其他任务使用（或已被删除）时返回 None
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # 打开后目录可能被上一个任务删除：锁住的必须是当前路径上的目录
+        if os.fstat(fd).st_ino == os.stat(path).st_ino:
+            return fd
+    except OSError:
+        pass
+    os.close(fd)
+    return None
+
+
+def make_workdir(staging_dir: Path, key: Optional[str] = None, prefix: str = ".job-") -> Workdir:
+    """
+    在暂存目录中为一个任务创建工作目录
+
+    指定 key（例如 URL 和格式）时目录名由 key 决定，同一 URL 和格式的
+    下一次任务使用同一目录，取消时保留的 .part 文件可以续传。该目录正被
+    另一个并发任务使用时改为创建唯一的新目录，互不覆盖或删除对方的文件。
+
+    Args:
+        staging_dir: 暂存目录（不存在时创建）
+        key: 任务标识；为 None 时创建唯一的新目录
+        prefix: 工作目录名前缀
+
+    Returns:
+        Workdir 实例（用完后调用 release()）
+    """
+    staging_dir = Path(staging_dir)
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    if key is not None and fcntl is not None:
+        path = staging_dir / f"{prefix}{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+        path.mkdir(exist_ok=True)
+        fd = _lock_workdir(path)
+        if fd is not None:
+            return Workdir(path, fd)
+        logger.debug(f"工作目录正被其他任务使用，改用新目录: {path}")
+    return Workdir(Path(tempfile.mkdtemp(prefix=prefix, dir=staging_dir)))
+
+
+def move_into_place(src: Path, dst: Path, algorithm: Optional[str] = None) -> Optional[str]:
+    """
+    把暂存的完成文件移到最终位置（dst 已存在时被替换）
+
+    Args:
+        src: 暂存目录中的文件
+        dst: 最终路径
+        algorithm: 跨文件系统复制时顺便计算校验和使用的 hashlib 算法
+
+    Returns:
+        复制时计算的校验和（"算法:十六进制"）；rename 或不计算时为 None
+    """
+    src, dst = Path(src), Path(dst)
+    try:
+        os.replace(src, dst)
+        return None
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    partial = dst.with_name(f".{dst.name}.moving")
+    digest = hashlib.new(algorithm) if algorithm else None
+    try:
+        with open(src, "rb") as reader, open(partial, "wb") as writer:
+            while chunk := reader.read(COPY_SIZE):
+                writer.write(chunk)
+                if digest is not None:
+                    digest.update(chunk)
+            writer.flush()
+            os.fsync(writer.fileno())
+        shutil.copystat(src, partial)
+        os.replace(partial, dst)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    src.unlink()
+    return f"{algorithm}:{digest.hexdigest()}" if digest is not None else None
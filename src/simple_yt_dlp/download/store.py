@@ -0,0 +1,224 @@
+"""
+Content Store - 按内容寻址的去重存储
+Content-addressed store with hardlinked delivery
+
+同一个视频被下载到不同目录时，文件内容只保存一份：
+
+    <root>/objects/sha256/ab/abcdef...  内容（按校验和的算法和值命名）
+    <root>/refs/<视频 ID>/<格式>.json  视频 ID + 格式 → 校验和、文件名、标题
+
+下载完成并校验后，输出文件加入存储（同一文件系统上是硬链接，不占额外
+空间）。之后再请求同一视频和格式时，跳过提取和下载，直接把存储中的内容
+交付到目标目录：优先硬链接，其次写时复制（reflink），跨文件系统时复制。
+
+注意：硬链接共享同一份数据，原地修改交付的文件会同时修改存储中的内容。
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+# 交付方式
+HARDLINK = "hardlink"
+REFLINK = "reflink"
+COPY = "copy"
+
+# Linux FICLONE ioctl（btrfs、XFS 等支持写时复制的文件系统）
+_FICLONE = 0x40049409
+
+
+class StoredObject:
+    """
+    存储中的一个输出文件
+    """
+
+    __slots__ = ("path", "checksum", "name", "size", "title")
+
+    def __init__(self, path: Path, checksum: str, name: str, size: int, title: str = ""):
+        self.path = path
+        self.checksum = checksum
+        self.name = name
+        self.size = size
+        self.title = title
+
+    def __repr__(self) -> str:
+        return f"StoredObject({self.name}, {self.checksum[:19]}…)"
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """尝试写时复制（不支持时返回 False，不留下目标文件）"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+    shutil.copystat(src, dst)
+    return True
+
+
+def link_or_copy(src: Path, dst: Path) -> str:
+    """
+    把 src 放到 dst（dst 不能已存在）：硬链接 → reflink → 复制
+
+    Returns:
+        使用的方式（HARDLINK / REFLINK / COPY）
+    """
+    try:
+        os.link(src, dst)
+        return HARDLINK
+    except FileExistsError:
+        raise
+    except OSError:
+        pass  # 跨文件系统、不支持硬链接或链接数已满
+    if _reflink(src, dst):
+        return REFLINK
+    shutil.copy2(src, dst)
+    return COPY
+
+
+class ContentStore:
+    """
+    按内容寻址的存储（多个进程可以共用同一个根目录）
+    """
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root: 存储根目录（应与下载目录位于同一文件系统，才能使用硬链接）
+        """
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.refs = self.root / "refs"
+
+    def __repr__(self) -> str:
+        return f"ContentStore({self.root})"
+
+    def _object_path(self, checksum: str) -> Path:
+        # 不同算法的摘要分开存放，改用其他算法后不会混淆
+        algorithm, _, digest = checksum.rpartition(":")
+        if not algorithm or not digest:
+            raise ValueError(f"Checksum must be 'algorithm:hex': {checksum!r}")
+        return self.objects / algorithm / digest[:2] / digest
+
+    def _ref_path(self, video_id: str, format_id: str) -> Path:
+        return self.refs / video_id / f"{format_id}.json"
+
+    def lookup(self, video_id: str, format_id: str) -> Optional[StoredObject]:
+        """
+        查找已存储的输出
+
+        Returns:
+            StoredObject；不存在或内容已丢失时返回 None
+        """
+        ref = self._ref_path(video_id, format_id)
+        try:
+            data = json.loads(ref.read_text(encoding="utf-8"))
+            obj = StoredObject(
+                self._object_path(data["checksum"]), data["checksum"], data["name"],
+                data["size"], data.get("title") or "",
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            if obj.path.stat().st_size == obj.size:
+                return obj
+        except OSError:
+            pass
+        logger.warning(f"存储内容已丢失，忽略记录: {video_id}/{format_id}")
+        ref.unlink(missing_ok=True)
+        return None
+
+    def add(self, path: Path, video_id: str, format_id: str, checksum: str,
+            title: str = "") -> StoredObject:
+        """
+        把已校验的输出加入存储
+
+        内容已存在时（例如记录丢失后重新下载），path 被替换为指向存储内容的
+        链接，重复的数据随即释放。
+
+        Args:
+            path: 输出文件
+            video_id: 视频 ID
+            format_id: 格式标识符
+            checksum: 输出的校验和（"算法:十六进制"）
+            title: 视频标题
+
+        Returns:
+            StoredObject
+        """
+        path = Path(path)
+        target = self._object_path(checksum)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists():
+            self._put(path, target)
+        elif not os.path.samefile(path, target):
+            self._replace_with_link(target, path)
+
+        obj = StoredObject(target, checksum, path.name, target.stat().st_size, title)
+        ref = self._ref_path(video_id, format_id)
+        ref.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(ref, json.dumps({
+            "checksum": checksum, "name": obj.name, "size": obj.size, "title": title,
+        }, ensure_ascii=False))
+        return obj
+
+    def deliver(self, obj: StoredObject, directory: Path) -> tuple[Path, Optional[str]]:
+        """
+        把存储中的内容交付到目录
+
+        Returns:
+            (目标路径, 使用的方式)；目标已存在时不覆盖，方式为 None
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        dest = directory / obj.name
+        if dest.exists():
+            return dest, None
+        method = self._replace_with_link(obj.path, dest)
+        logger.info(f"♻️ 从存储交付 {obj.name} ({method})")
+        return dest, method
+
+    @staticmethod
+    def _put(path: Path, target: Path) -> None:
+        """内容放入存储：同一文件系统上硬链接，否则复制到临时文件后改名"""
+        try:
+            os.link(path, target)
+            return
+        except FileExistsError:
+            return
+        except OSError:
+            pass
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            shutil.copy2(path, tmp)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _replace_with_link(src: Path, dest: Path) -> str:
+        """以 src 的链接（或副本）原子地替换 / 创建 dest"""
+        tmp = dest.with_name(f".{dest.name}.store-tmp")
+        tmp.unlink(missing_ok=True)
+        method = link_or_copy(src, tmp)
+        os.replace(tmp, dest)
+        return method
+
+    @staticmethod
+    def _write_atomic(path: Path, text: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
@@ -0,0 +1,212 @@
+"""
+Streaming - 边下载边合并/转码
+Pipe downloaded bytes straight into ffmpeg instead of writing streams to disk first
+
+默认流程先把每个流完整写到磁盘，再由 ffmpeg 读回并写出最终文件。流式
+模式下每个流由一个线程按区间请求下载，直接写入 ffmpeg 的输入管道
+（pipe:N），ffmpeg 边读边生成最终的容器或编码：
+
+- 纯音频任务不写任何中间文件
+- 视频 + 音频合并时两个流同时下载，各写一个管道（ffmpeg 按时间戳交替读取）
+- 后处理与下载几乎同时结束，磁盘 I/O 减半
+
+只用于 http/https 单文件格式（不支持分片、直播），且只用于可以直接复制
+或单次编码的目标（MP4/MKV 和音频）；其他情况以及 ffmpeg 无法从管道读取
+输入时，DownloadCore 回退到普通流程。需要 POSIX 管道（pass_fds）。
+
+此模块在导入时加载 yt_dlp，应在 DownloadCore 中按需（延迟）导入。
+"""
+import contextlib
+import logging
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, RequestError
+from yt_dlp.utils import DownloadError, determine_protocol
+
+from .cancel import CancelToken, JobCancelled
+from .fanout import Target, ffmpeg_command
+from .transcode import DEFAULT_PRESET, TranscodeScheduler, lower_priority
+from .ydl import CombinedProgress
+
+logger = logging.getLogger(__name__)
+
+# 可以流式生成的目标（视频目标只转封装，音频目标单次编码）
+STREAMABLE_FORMATS = frozenset({
+    "mp4_best", "mp4_1080p", "mp4_720p", "mp4_480p", "mp4_360p", "mkv_best",
+    "mp3", "m4a", "opus", "flac", "wav",
+})
+
+# 每次区间请求的大小（格式自带 http_chunk_size 时使用格式的值）
+CHUNK_SIZE = 10 * 1024 * 1024
+
+# 每次读取并写入管道的块大小
+READ_SIZE = 256 * 1024
+
+
+class StreamingError(Exception):
+    """ffmpeg 无法从管道生成输出（调用方应回退到普通流程）"""
+
+
+def can_stream(format_id: str, streams: list[dict]) -> bool:
+    """
+    检查任务能否流式生成
+
+    Args:
+        format_id: 目标格式标识符
+        streams: 选中的流（合并格式为多个分离流）
+
+    Returns:
+        是否可以流式生成
+    """
+    if os.name != "posix" or format_id not in STREAMABLE_FORMATS or not streams:
+        return False
+    for stream in streams:
+        if determine_protocol(stream) not in ("http", "https") or not stream.get("url"):
+            return False
+        if any(stream.get(k) for k in ("is_live", "fragments", "section_start", "section_end")):
+            return False
+    return True
+
+
+def _fetch(ydl, stream: dict, pipe_fd: int, on_bytes: Callable[[int], None],
+           token: CancelToken) -> None:
+    """按区间请求下载一个流并写入管道（写完后关闭管道）"""
+    headers = dict(stream.get("http_headers") or {})
+    total = stream.get("filesize") or stream.get("filesize_approx")
+    chunk = (stream.get("downloader_options") or {}).get("http_chunk_size") or CHUNK_SIZE
+    position = 0
+    with os.fdopen(pipe_fd, "wb", buffering=0) as pipe:
+        while total is None or position < total:
+            end = position + chunk - 1
+            if total is not None:
+                end = min(end, total - 1)
+            headers["Range"] = f"bytes={position}-{end}"
+            request = Request(stream["url"], headers=dict(headers))
+            try:
+                response = ydl.urlopen(request)
+            except HTTPError as e:
+                if e.status == 416 and total is None:
+                    break  # 大小未知时读到末尾
+                raise DownloadError(f"unable to download video data: {e}") from e
+            except RequestError as e:
+                raise DownloadError(f"unable to download video data: {e}") from e
+            start, received = position, 0
+            with response:
+                while data := response.read(READ_SIZE):
+                    token.raise_if_cancelled()
+                    pipe.write(data)
+                    received += len(data)
+                    position += len(data)
+                    on_bytes(position)
+            if received < end - start + 1 and (total is None or received == 0):
+                break  # 服务器返回的比请求的少：流已结束
+
+
+def stream_to_ffmpeg(
+    ydl,
+    ffmpeg: str,
+    target: Target,
+    output: Path,
+    token: CancelToken,
+    hooks: list,
+    scheduler: Optional[TranscodeScheduler] = None,
+    preset: str = DEFAULT_PRESET,
+) -> Path:
+    """
+    并行下载目标的所有流并直接送入 ffmpeg 生成输出
+
+    Args:
+        ydl: YoutubeDL 实例（用于发送请求，Cookie 和连接池与普通流程相同）
+        ffmpeg: ffmpeg 路径
+        target: 输出目标（target.streams 为选中的流）
+        output: 输出文件
+        token: 取消令牌（ffmpeg 子进程登记到令牌）
+        hooks: 进度钩子（收到汇总后的 downloading / finished 事件）
+        scheduler: 转码调度器（ffmpeg 运行期间占用一个名额）
+        preset: 编码预设
+
+    Returns:
+        输出文件
+
+    Raises:
+        StreamingError: ffmpeg 无法从管道生成输出
+        DownloadError: 下载失败（例如 403）
+        JobCancelled: 任务被取消
+    """
+    temp = output.with_name(f"{output.stem}.temp{output.suffix}")
+    token.track_file(str(temp))
+    token.track_file(str(output))
+    # 下载期间 ffmpeg 一直在运行，整个过程占用转码名额（转封装或单线程音频编码）
+    with scheduler.slot(1, token) if scheduler else contextlib.nullcontext(None) as threads:
+        pipes = [os.pipe() for _ in target.streams]
+        inputs = [f"pipe:{r}" for r, _ in pipes]
+        cmd = ffmpeg_command(ffmpeg, target, inputs, temp, threads=threads, preset=preset)
+        try:
+            proc = subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                pass_fds=[r for r, _ in pipes],
+            )
+        except OSError as e:
+            for r, w in pipes:
+                os.close(r)
+                os.close(w)
+            raise StreamingError(f"Cannot start ffmpeg: {e}") from e
+        for r, _ in pipes:
+            os.close(r)
+        token.attach_process(proc)
+        lower_priority(proc.pid)
+
+        stderr: list[bytes] = []
+        reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+        reader.start()
+
+        progress = CombinedProgress(hooks, target.streams, str(output))
+        errors: list[BaseException] = []
+
+        def fetch(index: int, stream: dict, pipe_fd: int) -> None:
+            try:
+                def on_bytes(downloaded: int) -> None:
+                    progress.update(
+                        index, {"status": "downloading", "downloaded_bytes": downloaded}
+                    )
+
+                _fetch(ydl, stream, pipe_fd, on_bytes, token)
+            except BrokenPipeError:
+                pass  # ffmpeg 提前退出，结果由返回码判断
+            except BaseException as e:
+                errors.append(e)
+                if proc.poll() is None:
+                    proc.kill()
+
+        workers = [
+            threading.Thread(target=fetch, args=(i, s, w), name=f"stream-{s.get('format_id')}")
+            for i, (s, (_, w)) in enumerate(zip(target.streams, pipes))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        proc.wait()
+        reader.join()
+
+    token.raise_if_cancelled()
+    for error in errors:
+        if isinstance(error, (JobCancelled, DownloadError)):
+            raise error
+    if errors:
+        raise DownloadError(f"unable to download video data: {errors[0]}")
+    if proc.returncode != 0:
+        temp.unlink(missing_ok=True)
+        lines = b"".join(stderr).decode("utf-8", "replace").strip().splitlines()
+        raise StreamingError(f"ffmpeg failed: {lines[-1] if lines else proc.returncode}")
+
+    os.replace(temp, output)
+    for index, downloaded in enumerate(progress.done):
+        progress.update(index, {"status": "finished", "downloaded_bytes": downloaded})
+    logger.info(f"⚡ 流式生成 {target.format_id}: {output.name}")
+    return output
@@ -0,0 +1,232 @@
+"""
+Transcode Scheduling - 按 CPU 核数调度转码
+CPU-aware thread budgets, encoder presets and low priority for ffmpeg
+
+默认情况下每个 ffmpeg 转码进程都按 CPU 核数创建线程，几个任务同时转码时
+线程数远超核数，互相抢占并拖慢界面。TranscodeScheduler 把固定的线程预算
+（核数减一，留给界面和下载）分给正在进行的转码：
+
+- 每个转码按 -threads 使用分到的线程数，总数不超过预算
+- 单线程编码器（MP3/AAC/Opus/FLAC）只占一个线程，多个音频任务并行执行
+- 预算用完时新的转码等待，而不是挤占已经在运行的转码
+- ffmpeg 以较低的 CPU 优先级（nice）和 IO 优先级（Linux ionice）运行
+
+编码预设（fast / balanced / small）按格式在速度和文件大小之间取舍。
+"""
+import functools
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .cancel import CancelToken
+
+logger = logging.getLogger(__name__)
+
+# 编码预设名称
+PRESETS = ("fast", "balanced", "small")
+DEFAULT_PRESET = "balanced"
+
+# 各格式编码器的预设参数（输出参数）；未列出的格式（WAV、直接复制）不需要
+ENCODER_PRESETS: dict[str, dict[str, list[str]]] = {
+    # libvpx-vp9：cpu-used 越大越快，row-mt 让多线程真正生效
+    "webm_best": {
+        "fast": ["-deadline", "realtime", "-cpu-used", "8", "-row-mt", "1",
+                 "-crf", "34", "-b:v", "0"],
+        "balanced": ["-deadline", "good", "-cpu-used", "4", "-row-mt", "1",
+                     "-crf", "31", "-b:v", "0"],
+        "small": ["-deadline", "good", "-cpu-used", "1", "-row-mt", "1",
+                  "-crf", "31", "-b:v", "0"],
+    },
+    # libx264：同一 crf 下 preset 越慢文件越小
+    "mov_best": {
+        "fast": ["-preset", "veryfast", "-crf", "23"],
+        "balanced": ["-preset", "medium", "-crf", "23"],
+        "small": ["-preset", "slow", "-crf", "23"],
+    },
+    # FLAC 无损：压缩级别只影响速度和大小
+    "flac": {
+        "fast": ["-compression_level", "0"],
+        "balanced": ["-compression_level", "5"],
+        "small": ["-compression_level", "8"],
+    },
+    # LAME 算法质量（0 最慢最好，9 最快）
+    "mp3": {
+        "fast": ["-compression_level", "7"],
+        "balanced": ["-compression_level", "3"],
+        "small": ["-compression_level", "0"],
+    },
+    "opus": {
+        "fast": ["-compression_level", "5"],
+        "balanced": ["-compression_level", "10"],
+        "small": ["-compression_level", "10"],
+    },
+    "m4a": {
+        "fast": ["-aac_coder", "fast"],
+        "balanced": [],
+        "small": [],
+    },
+}
+
+# yt-dlp 中会编码的后处理器（pp_key）-> 每个进程最多有用的线程数（None 表示不限）
+TRANSCODE_POSTPROCESSORS: dict[str, Optional[int]] = {
+    "ExtractAudio": 1,
+    "VideoConvertor": None,
+}
+
+# ffmpeg 的 nice 值和 IO 优先级（best-effort 类中的最低级）
+NICENESS = 10
+IO_PRIORITY = ("-c", "2", "-n", "7")
+
+# 当前线程持有的转码名额（用于在启动子进程时降低优先级）
+_current = threading.local()
+
+
+def encoder_args(format_id: str, preset: str = DEFAULT_PRESET) -> list[str]:
+    """
+    获取格式的编码预设参数
+
+    Args:
+        format_id: 目标格式标识符
+        preset: 预设名称（fast / balanced / small）
+
+    Returns:
+        ffmpeg 输出参数（不需要编码的格式为空列表）
+    """
+    return list(ENCODER_PRESETS.get(format_id, {}).get(preset, []))
+
+
+def default_threads() -> int:
+    """默认线程预算：CPU 核数减一（至少为 1）"""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+class TranscodeScheduler:
+    """
+    转码线程预算（线程安全，可在多个任务和 DownloadCore 之间共享）
+    """
+
+    def __init__(self, threads: Optional[int] = None):
+        """
+        Args:
+            threads: 所有转码共用的线程数，默认为 default_threads()
+        """
+        self.threads = max(1, threads or default_threads())
+        self._free = self.threads
+        self._demand = 0  # 持有或等待名额的转码数
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(
+        self, max_threads: Optional[int] = None, token: Optional[CancelToken] = None
+    ) -> Iterator[int]:
+        """
+        获取一个转码名额（预算用完时等待）
+
+        分到的线程数为剩余预算、按同时转码数平分的份额和 max_threads 中的
+        最小值。名额有效期间本线程启动的 ffmpeg 以较低优先级运行。
+
+        Args:
+            max_threads: 该编码器最多有用的线程数
+            token: 取消令牌（等待时取消则抛出 JobCancelled）
+
+        Yields:
+            分到的线程数（作为 ffmpeg 的 -threads）
+        """
+        with self._cond:
+            self._demand += 1
+            try:
+                while self._free < 1:
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    self._cond.wait(0.5)
+            except BaseException:
+                self._demand -= 1
+                raise
+            granted = min(self._free, max(1, self.threads // self._demand))
+            if max_threads:
+                granted = min(granted, max_threads)
+            self._free -= granted
+        logger.debug(f"转码名额: {granted}/{self.threads} 线程")
+        _current.active = True
+        try:
+            yield granted
+        finally:
+            _current.active = False
+            with self._cond:
+                self._free += granted
+                self._demand -= 1
+                self._cond.notify_all()
+
+    @property
+    def active(self) -> int:
+        """正在使用的线程数"""
+        with self._cond:
+            return self.threads - self._free
+
+
+@functools.lru_cache(maxsize=None)
+def _ionice() -> Optional[str]:
+    return shutil.which("ionice") if os.name == "posix" else None
+
+
+def lower_priority(pid: int) -> None:
+    """
+    降低子进程的 CPU 和 IO 优先级（尽力而为，失败时忽略；Windows 上不调整）
+
+    Args:
+        pid: 子进程 ID
+    """
+    if hasattr(os, "setpriority"):
+        try:
+            niceness = max(NICENESS, os.getpriority(os.PRIO_PROCESS, 0))
+            os.setpriority(os.PRIO_PROCESS, pid, niceness)
+        except OSError:
+            pass
+    ionice = _ionice()
+    if ionice:
+        subprocess.run(
+            [ionice, *IO_PRIORITY, "-p", str(pid)],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            check=False,
+        )
+
+
+def on_spawn(pid: int) -> None:
+    """yt-dlp 启动子进程后调用：在转码名额内启动的进程降低优先级"""
+    if getattr(_current, "active", False):
+        lower_priority(pid)
+
+
+# 进程级共享调度器
+_shared: Optional[TranscodeScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def get_transcode_scheduler() -> TranscodeScheduler:
+    """
+    获取进程级共享的转码调度器（首次调用时创建）
+
+    Returns:
+        共享的 TranscodeScheduler 实例
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = TranscodeScheduler()
+        return _shared
+
+
+def set_transcode_threads(threads: int) -> None:
+    """
+    设置进程级共享调度器的线程预算（例如在工作进程中平分预算）
+
+    Args:
+        threads: 线程预算
+    """
+    global _shared
+    with _shared_lock:
+        _shared = TranscodeScheduler(threads)
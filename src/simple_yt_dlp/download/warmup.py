@@ -0,0 +1,100 @@
+"""
+Warm-up - 启动时在后台预热下载引擎
+Background warm-up of yt-dlp with a readiness signal
+
+第一次下载要承担 import yt_dlp、创建 YoutubeDL（注册请求处理器、加载
+CA 证书）和导入 YouTube 提取器的开销。应用挂载或守护进程启动时在后台
+线程中完成这些工作（不访问网络），界面保持响应；任务队列在执行第一个
+任务前等待就绪信号。
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    一次后台预热及其就绪信号
+    """
+
+    def __init__(self, target: Callable[[], None]):
+        """
+        Args:
+            target: 执行预热的函数（例如 DownloadCore.warm_up）
+        """
+        self._target = target
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+        self.elapsed: Optional[float] = None
+
+    def start(self) -> "WarmUp":
+        """在后台线程中开始预热（重复调用无效）"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        started = time.monotonic()
+        try:
+            self._target()
+        except Exception as e:
+            # 预热失败不影响下载：第一个任务照常承担初始化开销
+            self.error = e
+            logger.warning(f"⚠️ 预热失败: {e}")
+        finally:
+            self.elapsed = time.monotonic() - started
+            self._done.set()
+        if self.error is None:
+            logger.info(f"🔥 下载引擎已预热 ({self.elapsed:.2f}s)")
+
+    @property
+    def ready(self) -> bool:
+        """预热是否已结束（成功或失败）"""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待预热结束
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            是否已结束
+        """
+        return self._done.wait(timeout)
+
+    async def wait_async(self, timeout: Optional[float] = None) -> bool:
+        """在协程中等待预热结束（不阻塞事件循环）"""
+        if self.ready:
+            return True
+        return await asyncio.to_thread(self.wait, timeout)
+
+
+_shared: Optional[WarmUp] = None
+_shared_lock = threading.Lock()
+
+
+def start_warm_up(target: Callable[[], None]) -> WarmUp:
+    """
+    开始进程级的预热（导入和提取器是进程全局的，只需预热一次）
+
+    Args:
+        target: 执行预热的函数
+
+    Returns:
+        共享的 WarmUp（已开始）
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = WarmUp(target)
+        return _shared.start()
@@ -0,0 +1,241 @@
+"""
+Write Path - 大文件磁盘写入层
+Disk write path for large downloads
+
+- 已知大小时预分配（连续分配减少碎片；稀疏模式只设置文件长度）
+- 每个写入区间使用独立的大缓冲区，按偏移 pwrite 写入
+- 按字节量批量 fsync，限制脏页数量，避免最后一次性回写
+- 可选在 fsync 后丢弃已落盘的页缓存，避免多 GB 文件挤占页缓存
+- 写入的同时计算校验和（见 integrity.StreamDigest）
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from .integrity import DEFAULT_ALGORITHM, StreamDigest
+
+logger = logging.getLogger(__name__)
+
+
+MIB = 1024 * 1024
+
+
+class WriteOptions:
+    """
+    写入参数
+
+    Attributes:
+        buffer_size: 每个写入区间的缓冲区大小
+        preallocate: 已知大小时是否预分配
+        sparse: 预分配时只设置文件长度（稀疏文件），不实际分配磁盘块；
+            网络挂载等不支持 fallocate 的文件系统上应启用
+        fsync_interval: 每写入多少字节执行一次 fsync（0 表示不主动 fsync）
+        drop_cache: fsync 后是否通知内核丢弃该文件的页缓存
+        checksum: 写入时计算校验和使用的 hashlib 算法（None 表示不计算）
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 1 * MIB,
+        preallocate: bool = True,
+        sparse: bool = False,
+        fsync_interval: int = 64 * MIB,
+        drop_cache: bool = False,
+        checksum: Optional[str] = DEFAULT_ALGORITHM,
+    ):
+        self.buffer_size = buffer_size
+        self.preallocate = preallocate
+        self.sparse = sparse
+        self.fsync_interval = fsync_interval
+        self.drop_cache = drop_cache
+        self.checksum = checksum
+
+    def __repr__(self) -> str:
+        return (
+            f"WriteOptions(buffer_size={self.buffer_size}, preallocate={self.preallocate}, "
+            f"sparse={self.sparse}, fsync_interval={self.fsync_interval}, "
+            f"drop_cache={self.drop_cache}, checksum={self.checksum})"
+        )
+
+
+class OutputFile:
+    """
+    下载输出文件 - 支持多线程按偏移写入
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        size: Optional[int] = None,
+        options: Optional[WriteOptions] = None,
+    ):
+        """
+        创建（截断）输出文件并按需预分配
+
+        Args:
+            path: 文件路径
+            size: 已知的最终大小
+            options: 写入参数
+        """
+        self.path = Path(path)
+        self.size = size
+        self.options = options or WriteOptions()
+
+        flags = os.O_RDWR | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(self.path, flags, 0o666)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._unsynced = 0
+        self.stats = {"bytes": 0, "writes": 0, "fsyncs": 0}
+        self.digest = (
+            StreamDigest(self.options.checksum, self.pread) if self.options.checksum else None
+        )
+
+        if size and self.options.preallocate:
+            self._preallocate(size)
+
+    def _preallocate(self, size: int) -> None:
+        """预分配文件空间"""
+        if not self.options.sparse and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(self._fd, 0, size)
+                return
+            except OSError as e:
+                logger.debug(f"fallocate 失败，改用稀疏预分配: {e}")
+        os.ftruncate(self._fd, size)
+
+    def writer(self, offset: int = 0) -> "BufferedRangeWriter":
+        """
+        创建一个从 offset 开始写入的缓冲写入器
+
+        Args:
+            offset: 起始偏移
+
+        Returns:
+            BufferedRangeWriter 实例
+        """
+        return BufferedRangeWriter(self, offset)
+
+    def pwrite(self, offset: int, data) -> None:
+        """
+        在指定偏移写入数据（线程安全）
+
+        Args:
+            offset: 文件偏移
+            data: 待写入的字节
+        """
+        start = offset
+        view = memoryview(data)
+        if hasattr(os, "pwrite"):
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                offset += written
+                view = view[written:]
+        else:
+            with self._lock:
+                os.lseek(self._fd, offset, os.SEEK_SET)
+                while view:
+                    written = os.write(self._fd, view)
+                    view = view[written:]
+
+        if self.digest is not None:
+            self.digest.update_at(start, data)
+
+        with self._lock:
+            self.stats["bytes"] += len(data)
+            self.stats["writes"] += 1
+            self._unsynced += len(data)
+            interval = self.options.fsync_interval
+            need_sync = interval and self._unsynced >= interval
+        if need_sync:
+            # 其他线程正在 fsync 时不等待：未落盘字节仍计入 _unsynced，由下一批处理
+            self.sync(wait=False)
+
+    def pread(self, offset: int, size: int) -> bytes:
+        """读回已写入的数据"""
+        if hasattr(os, "pread"):
+            return os.pread(self._fd, size, offset)
+        with self._lock:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            return os.read(self._fd, size)
+
+    def sync(self, wait: bool = True) -> bool:
+        """
+        fsync 并按需丢弃页缓存
+
+        Args:
+            wait: 其他线程正在 fsync 时是否等待它完成后再同步
+
+        Returns:
+            是否执行了 fsync（wait=False 且锁被占用时为 False）
+        """
+        if not self._sync_lock.acquire(blocking=wait):
+            return False
+        try:
+            # 先清零再 fsync：此后写入的字节由下一次 fsync 负责
+            with self._lock:
+                self._unsynced = 0
+            if hasattr(os, "fdatasync"):
+                os.fdatasync(self._fd)
+            else:
+                os.fsync(self._fd)
+            with self._lock:
+                self.stats["fsyncs"] += 1
+            if self.options.drop_cache and hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(self._fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            self._sync_lock.release()
+        return True
+
+    def close(self) -> None:
+        """关闭文件（启用 fsync 时先落盘）"""
+        if self._fd < 0:
+            return
+        try:
+            if self.options.fsync_interval:
+                # 阻塞等待进行中的 fsync，再把剩余字节落盘
+                with self._sync_lock:
+                    pass
+                if self._unsynced:
+                    self.sync()
+        finally:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "OutputFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class BufferedRangeWriter:
+    """
+    缓冲写入器 - 把连续数据攒满缓冲区后一次 pwrite
+    """
+
+    def __init__(self, output: OutputFile, offset: int = 0):
+        self.output = output
+        self.offset = offset
+        self._buffer = bytearray()
+
+    def seek(self, offset: int) -> None:
+        """移动写入位置（不连续时先刷新缓冲区）"""
+        if offset != self.offset + len(self._buffer):
+            self.flush()
+            self.offset = offset
+
+    def write(self, data) -> None:
+        """追加数据，缓冲区满时写入文件"""
+        self._buffer += data
+        if len(self._buffer) >= self.output.options.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """把缓冲区写入文件"""
+        if self._buffer:
+            self.output.pwrite(self.offset, self._buffer)
+            self.offset += len(self._buffer)
+            self._buffer = bytearray()
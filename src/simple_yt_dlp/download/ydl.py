@@ -0,0 +1,408 @@
+"""
+YoutubeDL Integration - yt-dlp 扩展点
+YoutubeDL subclass and file downloaders used by DownloadCore
+
+此模块在导入时加载 yt_dlp，应在 DownloadCore 中按需（延迟）导入。
+"""
+import copy
+import threading
+import time
+from pathlib import Path
+
+import yt_dlp
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.utils import determine_protocol
+
+from .cancel import JobCancelled, current_token
+from .network import get_ssl_context
+from .ranged import DEFAULT_CONNECTIONS, RangedDownloader, RangedDownloadError
+from .transcode import TRANSCODE_POSTPROCESSORS
+
+# 小于该大小的文件不值得多连接下载
+RANGED_MIN_SIZE = 4 * 1024 * 1024
+
+# 进度回调的最小间隔（秒）
+PROGRESS_INTERVAL = 0.1
+
+
+class RangedFD(FileDownloader):
+    """
+    多连接分段文件下载器 - 用于单文件 http/https 格式
+
+    自定义参数（放在 YoutubeDL params 中）:
+    - ranged_connections: 并行连接数，<= 1 时禁用
+    - write_options: WriteOptions 实例（磁盘写入参数）
+    - cancel_token: CancelToken 实例（取消时立即中止所有连接）
+    """
+
+    @classmethod
+    def can_download(cls, info_dict: dict, params: dict, ydl=None) -> bool:
+        """
+        检查格式是否适合分段下载
+
+        Args:
+            info_dict: 格式信息
+            params: YoutubeDL 参数
+            ydl: YoutubeDL 实例（用于检查代理）
+
+        Returns:
+            是否可以使用分段下载
+        """
+        if params.get("ranged_connections", DEFAULT_CONNECTIONS) <= 1:
+            return False
+        if determine_protocol(info_dict) not in ("http", "https"):
+            return False
+        unsupported = ("is_live", "section_start", "section_end", "impersonate")
+        if any(info_dict.get(k) for k in unsupported):
+            return False
+        # 限速和代理由 yt-dlp 自带的下载器处理
+        if params.get("ratelimit") or (ydl is not None and any(ydl.proxies.values())):
+            return False
+        size = info_dict.get("filesize") or info_dict.get("filesize_approx")
+        return size is None or size >= RANGED_MIN_SIZE
+
+    def real_download(self, filename, info_dict):
+        url = info_dict["url"]
+        headers = dict(info_dict.get("http_headers") or {})
+        cookie = self.ydl.cookiejar.get_cookie_header(url)
+        if cookie:
+            headers["Cookie"] = cookie
+
+        tmpfilename = self.temp_name(filename)
+        self.report_destination(filename)
+
+        context = get_ssl_context(
+            verify=not self.params.get("nocheckcertificate"),
+            legacy_ssl_support=bool(self.params.get("legacyserverconnect")),
+            prefer_system_certs="no-certifi" in self.params.get("compat_opts", []),
+        )
+        chunk_size = (
+            (info_dict.get("downloader_options") or {}).get("http_chunk_size")
+            or self.params.get("http_chunk_size")
+        )
+
+        start = time.time()
+        lock = threading.Lock()
+        last_report = [0.0]
+
+        def progress(downloaded: int, total) -> None:
+            now = time.time()
+            with lock:
+                if now - last_report[0] < PROGRESS_INTERVAL and downloaded != total:
+                    return
+                last_report[0] = now
+                speed = self.calc_speed(start, now, downloaded)
+                self._hook_progress({
+                    "status": "downloading",
+                    "downloaded_bytes": downloaded,
+                    "total_bytes": total,
+                    "tmpfilename": tmpfilename,
+                    "filename": filename,
+                    "eta": self.calc_eta(speed, total - downloaded) if total else None,
+                    "speed": speed,
+                    "elapsed": now - start,
+                    "ctx_id": info_dict.get("ctx_id"),
+                }, info_dict)
+
+        downloader = RangedDownloader(
+            connections=self.params.get("ranged_connections", DEFAULT_CONNECTIONS),
+            headers=headers,
+            context=context,
+            timeout=float(self.params.get("socket_timeout") or 20),
+            max_request_size=chunk_size,
+            progress_callback=progress,
+            write_options=self.params.get("write_options"),
+        )
+        token = self.params.get("cancel_token")
+        unregister = token.add_callback(downloader.abort) if token else None
+        try:
+            total = downloader.download(url, Path(tmpfilename))
+        except (RangedDownloadError, OSError) as e:
+            if token is not None:
+                token.raise_if_cancelled()
+            if isinstance(e.__cause__, JobCancelled):
+                raise e.__cause__
+            self.report_error(f"unable to download video data: {e}")
+            return False
+        finally:
+            if unregister is not None:
+                unregister()
+
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "status": "finished",
+            "downloaded_bytes": total,
+            "total_bytes": total,
+            "filename": filename,
+            # 写入时计算的校验和（DownloadCore 校验输出时无需再读一遍文件）
+            "checksum": downloader.checksum,
+            "elapsed": time.time() - start,
+            "ctx_id": info_dict.get("ctx_id"),
+        }, info_dict)
+        return True
+
+
+class CombinedProgress:
+    """
+    把多个同时下载的流的进度汇总为一个任务级进度
+
+    汇总事件与 yt-dlp 进度钩子格式相同，filename 为任务的输出文件（监控和
+    吞吐量统计按文件名区分流，同一任务的汇总进度不会被当作切换了流）；
+    所有流都完成后发出一次 "finished" 事件。
+    """
+
+    def __init__(self, hooks: list, streams: list[dict], filename: str):
+        """
+        Args:
+            hooks: 接收汇总事件的进度钩子
+            streams: 各个流的格式信息（用于在下载器报告大小之前估算总大小）
+            filename: 任务的输出文件
+        """
+        self.hooks = hooks
+        self.filename = filename
+        self.totals = [s.get("filesize") or s.get("filesize_approx") for s in streams]
+        self.done = [0] * len(streams)
+        self.speeds: list = [None] * len(streams)
+        self.finished = [False] * len(streams)
+        self.start = time.time()
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, index: int, d: dict) -> None:
+        """
+        记录一个流的进度事件，必要时发出汇总事件
+
+        Args:
+            index: 流的序号
+            d: 该流的 yt-dlp 进度事件
+        """
+        with self._lock:
+            total = d.get("total_bytes") or d.get("total_bytes_estimate")
+            if total:
+                self.totals[index] = total
+            self.done[index] = d.get("downloaded_bytes") or self.done[index]
+            self.speeds[index] = d.get("speed")
+            if d.get("status") == "finished":
+                self.finished[index] = True
+                self.speeds[index] = None
+                if total:
+                    self.done[index] = total
+
+            now = time.time()
+            if all(self.finished):
+                event = self._event("finished", now)
+                event["total_bytes"] = event["downloaded_bytes"]
+                event.pop("eta"), event.pop("speed")
+            elif d.get("status") == "finished" or now - self._last >= PROGRESS_INTERVAL:
+                event = self._event("downloading", now)
+            else:
+                return
+            self._last = now
+            # 在锁内调用钩子：汇总事件按顺序到达
+            for hook in self.hooks:
+                hook(dict(event))
+
+    def _event(self, status: str, now: float) -> dict:
+        downloaded = sum(self.done)
+        known = [t for t in self.totals if t]
+        total = sum(known) if len(known) == len(self.totals) else None
+        elapsed = now - self.start
+        speeds = [s for s in self.speeds if s]
+        speed = sum(speeds) if speeds else (downloaded / elapsed if elapsed > 0 else None)
+        event = {
+            "status": status,
+            "downloaded_bytes": downloaded,
+            "total_bytes": total,
+            "filename": self.filename,
+            "eta": (total - downloaded) / speed if total and speed else None,
+            "speed": speed,
+            "elapsed": elapsed,
+        }
+        if total is None and known:
+            event["total_bytes_estimate"] = sum(known)
+        return event
+
+
+class _SiblingFailed(JobCancelled):
+    """同组的另一个流下载失败，中止本流（不作为任务的错误报告）"""
+
+
+class StreamGroup:
+    """
+    合并格式的分离流（视频 + 音频）：并行下载，进度汇总
+
+    yt-dlp 逐个调用 dl() 下载 requested_formats 中的流。组内的流在 dl()
+    中立即交给后台线程并返回；最后一个流提交后等待所有线程结束，再把
+    结果（或第一个错误）交回 yt-dlp，之后的合并流程不变。
+    """
+
+    def __init__(self, ydl: "SimpleYoutubeDL", formats: list[dict], filename: str):
+        self.ydl = ydl
+        self.order = {f.get("format_id"): i for i, f in enumerate(formats)}
+        self.progress = CombinedProgress(ydl._progress_hooks, formats, filename)
+        self.threads: list[threading.Thread] = []
+        self.submitted: set[int] = set()
+        self.results: list = [(False, False)] * len(formats)
+        self.errors: list[BaseException] = []
+        self.failed = threading.Event()
+        # 取消令牌是线程局部的：流线程重新激活，外部下载器等子进程才会关联到任务
+        self.token = current_token() or ydl.params.get("cancel_token")
+
+    def owns(self, info: dict) -> bool:
+        """dl() 收到的信息是否为组内尚未提交的流"""
+        index = self.order.get(info.get("format_id"))
+        return index is not None and index not in self.submitted and "requested_formats" not in info
+
+    def download(self, name: str, info: dict) -> tuple:
+        """
+        提交一个流；最后一个流提交后等待全部完成
+
+        Returns:
+            与 YoutubeDL.dl 相同的 (成功, 是否实际下载)
+        """
+        index = self.order[info.get("format_id")]
+        thread = threading.Thread(
+            target=self._run, args=(index, name, info), name=f"stream-{info.get('format_id')}",
+            daemon=True,
+        )
+        self.submitted.add(index)
+        self.threads.append(thread)
+        thread.start()
+        if len(self.submitted) < len(self.order):
+            return True, False
+
+        self.join()
+        if self.errors:
+            # 报告引起失败的错误，而不是被它中止的其他流
+            causes = [e for e in self.errors if not isinstance(e, _SiblingFailed)]
+            raise (causes or self.errors)[0]
+        return all(r[0] for r in self.results), any(r[1] for r in self.results)
+
+    def join(self) -> None:
+        for thread in self.threads:
+            thread.join()
+
+    def close(self) -> None:
+        """中止并等待尚未结束的流（yt-dlp 提前退出下载循环时）"""
+        self.failed.set()
+        self.join()
+
+    def _run(self, index: int, name: str, info: dict) -> None:
+        def hook(d: dict) -> None:
+            if self.failed.is_set():
+                raise _SiblingFailed()
+            # 取消令牌按分离流的文件名记录部分文件，并在取消后中止下载
+            token = self.ydl.params.get("cancel_token")
+            if token is not None:
+                token.progress_hook(d)
+            self.progress.update(index, d)
+
+        try:
+            if self.token is None:
+                self.results[index] = self.ydl._download(name, info, [hook])
+            else:
+                with self.token.activate():
+                    self.results[index] = self.ydl._download(name, info, [hook])
+        except BaseException as e:
+            self.errors.append(e)
+            self.failed.set()
+
+
+class SimpleYoutubeDL(yt_dlp.YoutubeDL):
+    """
+    YoutubeDL 子类 - 对合适的单文件格式使用多连接分段下载，合并格式的
+    视频流和音频流并行下载
+
+    自定义参数（放在 YoutubeDL params 中）:
+    - parallel_streams: 是否并行下载合并格式的分离流（默认开启）
+    - transcode_scheduler: TranscodeScheduler 实例；编码的后处理器先获取名额，
+      按分到的线程数运行 ffmpeg（见 download/transcode.py）
+    """
+
+    _stream_group = None
+
+    @yt_dlp.YoutubeDL._handle_extraction_exceptions
+    def process_extracted(self, ie_result: dict, download: bool = False) -> dict:
+        """
+        处理 extract_info(process=False) 的结果（格式选择，可选下载）
+
+        与 extract_info 的处理阶段相同，错误同样转换为 DownloadError。
+        ie_result 不会被修改，可以重复处理（例如先预览再下载）。
+
+        Args:
+            ie_result: 未处理的提取结果
+            download: 是否下载
+
+        Returns:
+            处理后的视频信息
+        """
+        ie_result = copy.deepcopy(ie_result)
+        self._wait_for_video(ie_result)
+        return self.process_ie_result(ie_result, download)
+
+    def process_info(self, info_dict):
+        formats = info_dict.get("requested_formats") or []
+        if len(formats) > 1 and self.params.get("parallel_streams", True):
+            self._stream_group = StreamGroup(self, formats, self.prepare_filename(info_dict))
+        try:
+            return super().process_info(info_dict)
+        finally:
+            group, self._stream_group = self._stream_group, None
+            if group is not None:
+                group.close()
+
+    def run_pp(self, pp, infodict):
+        scheduler = self.params.get("transcode_scheduler")
+        key = pp.pp_key()
+        args = self.params.get("postprocessor_args") or {}
+        if scheduler is None or key not in TRANSCODE_POSTPROCESSORS or not isinstance(args, dict):
+            return super().run_pp(pp, infodict)
+
+        token = self.params.get("cancel_token")
+        with scheduler.slot(TRANSCODE_POSTPROCESSORS[key], token) as threads:
+            # 本实例只属于一个任务，后处理器依次运行：临时加入本次的线程数即可
+            name = f"{key.lower()}+ffmpeg_o"
+            self.params["postprocessor_args"] = {
+                **args, name: [*args.get(name, []), "-threads", str(threads)]
+            }
+            try:
+                return super().run_pp(pp, infodict)
+            finally:
+                self.params["postprocessor_args"] = args
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if test or subtitle or name == "-":
+            return super().dl(name, info, subtitle=subtitle, test=test)
+        group = self._stream_group
+        if group is not None and group.owns(info):
+            return group.download(name, info)
+        return self._download(name, info, self._progress_hooks)
+
+    def _download(self, name: str, info: dict, hooks: list) -> tuple:
+        """
+        下载一个文件（与 YoutubeDL.dl 相同，但进度钩子由调用方指定）
+
+        Args:
+            name: 输出文件
+            info: 格式信息
+            hooks: 进度钩子
+
+        Returns:
+            (成功, 是否实际下载)
+        """
+        if not info.get("url"):
+            self.raise_no_formats(info, True)
+
+        if RangedFD.can_download(info, self.params, self):
+            fd = RangedFD(self, self.params)
+        else:
+            fd = get_suitable_downloader(info, self.params)(self, self.params)
+        for ph in hooks:
+            fd.add_progress_hook(ph)
+        self.write_debug(f'Invoking {fd.FD_NAME} downloader on "{info["url"]}"')
+
+        new_info = self._copy_infodict(info)
+        if new_info.get("http_headers") is None:
+            new_info["http_headers"] = self._calc_headers(new_info)
+        return fd.download(name, new_info)
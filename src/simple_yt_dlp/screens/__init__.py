@@ -1,6 +1,7 @@
 """Screens package - UI screen modules"""
+from .dashboard import DashboardScreen
 from .directory import DirectorySelector
 from .doctor import DoctorScreen
 from .main import MainScreen
 
-__all__ = ["MainScreen", "DirectorySelector", "DoctorScreen"]
+__all__ = ["MainScreen", "DirectorySelector", "DoctorScreen", "DashboardScreen"]
@@ -0,0 +1,141 @@
+"""
+Dashboard Screen - 多任务实时面板
+Live dashboard with one row per active job
+"""
+from rich.text import Text
+from textual.app import ComposeResult
+from textual.binding import Binding
+from textual.containers import Vertical
+from textual.screen import Screen
+from textual.widgets import Button, DataTable, Label, Static
+
+from ..download.admission import format_size
+from ..download.monitor import REFRESH_INTERVAL, JobMonitor, Snapshot, sparkline
+
+
+def _format_eta(eta) -> str:
+    if eta is None or eta < 0:
+        return "-"
+    minutes, seconds = divmod(int(eta), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+
+def _format_bytes(downloaded: int, total) -> str:
+    if total:
+        return f"{format_size(downloaded)} / {format_size(total)}"
+    return format_size(downloaded) if downloaded else "-"
+
+
+class DashboardScreen(Screen):
+    """
+    任务面板 - 每个排队或运行中的任务一行
+
+    显示内容:
+    - 阶段（排队、提取、下载、处理、重试、停滞）
+    - 速度和速度曲线（所有行使用同一刻度，可直接比较）
+    - 剩余时间、已下载 / 总字节数、重试次数、占总吞吐量的比例
+    - 总吞吐量和队列深度
+
+    按固定频率从 JobMonitor 取快照重绘，不随单个事件刷新。
+    """
+
+    BINDINGS = [
+        Binding("escape", "dismiss", "Back", show=True),
+        Binding("f2", "dismiss", "Back", show=False),
+    ]
+
+    CSS = """
+    DashboardScreen {
+        align: center middle;
+    }
+
+    .dashboard-container {
+        width: 95%;
+        height: 90%;
+        background: $panel;
+        border: round $primary;
+        padding: 1 2;
+    }
+
+    #dashboard-title {
+        text-align: center;
+        text-style: bold;
+        color: $primary;
+        margin-bottom: 1;
+    }
+
+    #dashboard-summary {
+        height: 1;
+        margin-bottom: 1;
+        color: $text;
+    }
+
+    #dashboard-table {
+        height: 1fr;
+    }
+
+    #close_btn {
+        margin-top: 1;
+        width: 20%;
+    }
+    """
+
+    COLUMNS = ("Job", "Title", "Phase", "Speed", "Trend", "ETA", "Bytes", "Retries", "Share")
+
+    def __init__(self, monitor: JobMonitor, refresh_interval: float = REFRESH_INTERVAL):
+        super().__init__()
+        self.monitor = monitor
+        self.refresh_interval = refresh_interval
+
+    def compose(self) -> ComposeResult:
+        yield Vertical(
+            Label("📊 任务面板 / Job Dashboard", id="dashboard-title"),
+            Static(id="dashboard-summary"),
+            DataTable(id="dashboard-table", zebra_stripes=True, cursor_type="row"),
+            Button("Close", variant="primary", id="close_btn"),
+            classes="dashboard-container",
+        )
+
+    def on_mount(self) -> None:
+        self.query_one("#dashboard-table", DataTable).add_columns(*self.COLUMNS)
+        self.render_snapshot()
+        self.set_interval(self.refresh_interval, self.render_snapshot)
+
+    def render_snapshot(self) -> None:
+        """取一份快照并重绘整个面板"""
+        snapshot = self.monitor.snapshot()
+        self.query_one("#dashboard-summary", Static).update(self._summary(snapshot))
+
+        table = self.query_one("#dashboard-table", DataTable)
+        table.clear()
+        for row in snapshot.rows:
+            phase = Text(row.phase, style="bold red" if row.stalled else "")
+            share = Text(f"{row.share:.0%}" if row.speed else "-",
+                         style="bold yellow" if row.hogging else "")
+            table.add_row(
+                f"#{row.id}",
+                (row.label or "")[:40],
+                phase,
+                f"{format_size(row.speed)}/s" if row.speed else "-",
+                sparkline(row.history, snapshot.peak),
+                _format_eta(row.eta),
+                _format_bytes(row.downloaded, row.total),
+                str(row.retries) if row.retries else "-",
+                share,
+            )
+
+    @staticmethod
+    def _summary(snapshot: Snapshot) -> str:
+        return (
+            f"⬇️ 总吞吐量 / Throughput: {format_size(snapshot.throughput)}/s | "
+            f"运行 / Running: {snapshot.running} | 排队 / Queued: {snapshot.queued} | "
+            f"完成 / Done: {snapshot.done} | 失败 / Failed: {snapshot.failed}"
+        )
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        """处理按钮点击"""
+        if event.button.id == "close_btn":
+            self.dismiss()
@@ -23,6 +23,7 @@ class DoctorScreen(Screen):
     - 配置文件路径
     - 下载目录状态
     - 系统信息（Python 版本、OS）
+    - 连接池统计（复用率、空闲驱逐）
     """
 
     CSS = """
@@ -96,11 +97,13 @@ class DoctorScreen(Screen):
         ffmpeg_path: str | None = None,
         config_path: Path | None = None,
         download_dir: Path | None = None,
+        pool_stats: dict | None = None,
     ):
         super().__init__()
         self.ffmpeg_path = ffmpeg_path
         self.config_path = config_path
         self.download_dir = download_dir
+        self.pool_stats = pool_stats
 
         # 收集诊断信息
         self.diagnostic_info = self._collect_diagnostic_info()
@@ -211,6 +214,7 @@ class DoctorScreen(Screen):
             self._create_ffmpeg_section(),
             self._create_ytdlp_section(),
             self._create_paths_section(),
+            self._create_network_section(),
             Button("关闭 / Close", variant="primary", id="close_btn"),
             classes="doctor-container",
         )
@@ -313,6 +317,39 @@ class DoctorScreen(Screen):
             classes="section",
         )
 
+    def _create_network_section(self) -> Vertical:
+        """创建连接池信息部分"""
+        stats = self.pool_stats
+        if not stats or not stats["requests"]:
+            rows = [Label("暂无连接 / No connections yet", classes="info-row")]
+        else:
+            rows = [
+                Label(
+                    f"请求 / Requests: {stats['requests']} | "
+                    f"复用率 / Reuse: {stats['reuse_rate']:.0%}",
+                    classes="info-row",
+                ),
+                Label(
+                    f"新建 / Created: {stats['created']} | 复用 / Reused: {stats['reused']}",
+                    classes="info-row",
+                ),
+                Label(
+                    f"空闲 / Idle: {stats['idle']} | 活动 / Active: {stats['active']}",
+                    classes="info-row",
+                ),
+                Label(
+                    f"空闲驱逐 / Idle evicted: {stats['evicted_idle']} | "
+                    f"超限驱逐 / Overflow evicted: {stats['evicted_overflow']}",
+                    classes="info-row",
+                ),
+            ]
+
+        return Vertical(
+            Label("🔌 连接池 / Connection Pool", classes="section-title"),
+            *rows,
+            classes="section",
+        )
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """处理按钮点击"""
         if event.button.id == "close_btn":
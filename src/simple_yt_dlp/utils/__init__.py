@@ -1,11 +1,19 @@
 """Utils package - Utility functions"""
 from .cookies import CookieManager, find_cookie_file, get_cookie_file_for_ytdlp
 from .logging import setup_logging
-from .validation import is_valid_directory_path, sanitize_filename, validate_youtube_url
+from .validation import (
+    is_valid_directory_path,
+    normalize_youtube_url,
+    normalize_youtube_urls,
+    sanitize_filename,
+    validate_youtube_url,
+)
 
 __all__ = [
     "setup_logging",
     "validate_youtube_url",
+    "normalize_youtube_url",
+    "normalize_youtube_urls",
     "sanitize_filename",
     "is_valid_directory_path",
     "CookieManager",
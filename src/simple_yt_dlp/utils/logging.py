@@ -5,14 +5,102 @@ File-based logging for yt-dlp core logic (separate from Textual UI logs)
 日志分离策略:
 - UI 事件 → 使用 Textual 的 self.log() (内置)
 - yt-dlp 核心逻辑 → 使用此处的 logger (写入文件)
+
+日志调用只把记录放入内存队列（不会阻塞在磁盘 I/O 上），由后台监听线程
+写入按大小（或时间）轮转的文件。可选的 JSON-lines 输出为每条记录附带
+任务 ID，并发任务的日志也能按任务拆分和解析。
 """
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
+from typing import Iterator, Optional
+
+# 写入同一组文件的 logger：应用日志 ("simple-yt-dlp") 和各模块的
+# getLogger(__name__) ("simple_yt_dlp.*")
+LOGGER_NAMES = ("simple-yt-dlp", "simple_yt_dlp")
+
+# 按大小轮转：单个文件上限和保留的旧文件数
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+# 设置该环境变量（非空）时额外输出 JSON-lines 日志
+JSON_ENV = "SIMPLE_YT_DLP_LOG_JSON"
+
+_context = threading.local()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def current_job_id() -> Optional[int]:
+    """获取当前线程正在执行的任务 ID"""
+    return getattr(_context, "job_id", None)
+
+
+@contextmanager
+def log_context(job_id: Optional[int]) -> Iterator[None]:
+    """
+    在当前线程内为日志记录附带任务 ID
+
+    Args:
+        job_id: 任务 ID
+    """
+    previous = current_job_id()
+    _context.job_id = job_id
+    try:
+        yield
+    finally:
+        _context.job_id = previous
+
+
+class JobContextFilter(logging.Filter):
+    """在记录入队前（调用线程中）写入任务 ID"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "job_id"):
+            record.job_id = current_job_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录格式化为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "job": getattr(record, "job_id", None),
+            # 异常堆栈已由 QueueHandler 合并进消息
+            "msg": record.getMessage(),
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _file_handler(path: Path, rotate_when: Optional[str], max_bytes: int,
+                  backup_count: int) -> logging.Handler:
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=rotate_when, backupCount=backup_count, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
 
 
 def setup_logging(
     log_dir: Path | None = None,
     log_level: int = logging.DEBUG,
+    json_lines: Optional[bool] = None,
+    max_bytes: int = MAX_BYTES,
+    backup_count: int = BACKUP_COUNT,
+    rotate_when: Optional[str] = None,
 ) -> logging.Logger:
     """
     配置文件日志系统 - 用于 yt-dlp 核心逻辑
@@ -20,10 +108,16 @@ def setup_logging(
     Args:
         log_dir: 日志目录，默认为 ~/.cache/simple-yt-dlp
         log_level: 日志级别
+        json_lines: 是否额外写入 debug.jsonl，默认由环境变量 SIMPLE_YT_DLP_LOG_JSON 决定
+        max_bytes: 单个日志文件的大小上限（按大小轮转）
+        backup_count: 保留的轮转文件数
+        rotate_when: 按时间轮转的周期（例如 "midnight"），设置后不再按大小轮转
 
     Returns:
         配置好的 logger 实例
     """
+    global _listener
+
     if log_dir is None:
         log_dir = Path.home() / ".cache" / "simple-yt-dlp"
 
@@ -36,9 +130,12 @@ def setup_logging(
     if logger.handlers:
         return logger
 
-    # 文件处理器
+    if json_lines is None:
+        json_lines = bool(os.environ.get(JSON_ENV))
+
+    # 文件处理器（在监听线程中执行）
     log_file = log_dir / "debug.log"
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    file_handler = _file_handler(log_file, rotate_when, max_bytes, backup_count)
     file_handler.setLevel(log_level)
 
     # 日志格式
@@ -47,8 +144,27 @@ def setup_logging(
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     file_handler.setFormatter(formatter)
+    handlers = [file_handler]
 
-    logger.addHandler(file_handler)
+    if json_lines:
+        json_handler = _file_handler(log_dir / "debug.jsonl", rotate_when, max_bytes, backup_count)
+        json_handler.setLevel(log_level)
+        json_handler.setFormatter(JsonFormatter())
+        handlers.append(json_handler)
+
+    # 调用方只入队（无界队列，put 不会阻塞）
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(JobContextFilter())
+
+    for name in LOGGER_NAMES:
+        target = logging.getLogger(name)
+        target.setLevel(log_level)
+        target.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
 
     # 静默初始化日志
     logger.debug("=" * 60)
@@ -59,6 +175,46 @@ def setup_logging(
     return logger
 
 
+def shutdown_logging() -> None:
+    """写出队列中剩余的记录并停止后台监听线程"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    for name in LOGGER_NAMES:
+        target = logging.getLogger(name)
+        for handler in list(target.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                target.removeHandler(handler)
+
+
+def forward_logging(records, log_level: int = logging.DEBUG) -> None:
+    """
+    工作进程中调用：把本进程的日志记录发送到父进程（由 ForwardedLogHandler 写入）
+
+    Args:
+        records: 跨进程队列（multiprocessing.Queue）
+        log_level: 日志级别
+    """
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(JobContextFilter())
+    for name in LOGGER_NAMES:
+        target = logging.getLogger(name)
+        target.setLevel(log_level)
+        target.handlers = [queue_handler]
+        target.propagate = False
+
+
+class ForwardedLogHandler(logging.Handler):
+    """父进程中把工作进程转发来的记录交给同名 logger（保留其任务 ID）"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
 def get_logger(name: str = "simple-yt-dlp") -> logging.Logger:
     """
     获取 logger 实例
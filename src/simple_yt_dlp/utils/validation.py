@@ -4,6 +4,196 @@ URL validation and filename sanitization utilities
 """
 import re
 from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# 预编译的模式（批量规范化时每个 URL 都会用到）
+_YOUTUBE_URL = re.compile(r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+$")
+_VIDEO_ID = re.compile(r"^[0-9A-Za-z_-]{11}$")
+_PLAYLIST_ID = re.compile(r"^(?:PL|UU|LL|RD|OL|FL|UL|OLAK5uy_)[0-9A-Za-z_-]{10,}$")
+_CHANNEL_ID = re.compile(r"^UC[0-9A-Za-z_-]{22}$")
+# /shorts/ID, /embed/ID, /v/ID, /live/ID, /e/ID
+_VIDEO_PATH = re.compile(r"^/(?:shorts|embed|v|live|e)/([0-9A-Za-z_-]{11})(?:[/?#]|$)")
+# /channel/UC..., /@handle, /c/name, /user/name
+_CHANNEL_PATH = re.compile(
+    r"^/(?:channel/(UC[0-9A-Za-z_-]{22})|(@[\w.-]{3,30})|((?:c|user)/[\w.-]+))"
+)
+_HAS_SCHEME = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://")
+
+YOUTUBE_HOSTS = frozenset({
+    "youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+    "youtube-nocookie.com", "www.youtube-nocookie.com",
+})
+SHORT_HOSTS = frozenset({"youtu.be", "www.youtu.be"})
+
+# 规范化结果的类型
+VIDEO = "video"
+PLAYLIST = "playlist"
+CHANNEL = "channel"
+
+
+class NormalizedURL:
+    """
+    一个 URL 的规范化结果
+
+    kind/id 唯一标识目标（用于去重）；视频 URL 中的播放列表上下文保存在
+    playlist_id 中，但不影响目标（下载时不展开播放列表）。error 非空时
+    表示该 URL 无法识别。
+    """
+
+    __slots__ = ("source", "kind", "id", "playlist_id", "error")
+
+    def __init__(
+        self,
+        source: str,
+        kind: Optional[str] = None,
+        id: Optional[str] = None,
+        playlist_id: Optional[str] = None,
+        error: Optional[str] = None,
+    ):
+        self.source = source
+        self.kind = kind
+        self.id = id
+        self.playlist_id = playlist_id
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def key(self) -> Optional[tuple[str, str]]:
+        """去重键 (kind, id)"""
+        return (self.kind, self.id) if self.error is None else None
+
+    @property
+    def url(self) -> Optional[str]:
+        """规范 URL（不含跟踪参数）"""
+        if self.kind == VIDEO:
+            return f"https://www.youtube.com/watch?v={self.id}"
+        if self.kind == PLAYLIST:
+            return f"https://www.youtube.com/playlist?list={self.id}"
+        if self.kind == CHANNEL:
+            if _CHANNEL_ID.match(self.id):
+                return f"https://www.youtube.com/channel/{self.id}"
+            # @handle、c/name、user/name
+            return f"https://www.youtube.com/{self.id}"
+        return None
+
+    def __repr__(self) -> str:
+        if self.error is not None:
+            return f"NormalizedURL({self.source!r}, error={self.error!r})"
+        return f"NormalizedURL({self.kind}:{self.id})"
+
+
+class BatchResult:
+    """
+    批量规范化结果
+    """
+
+    def __init__(self):
+        # 去重后的目标（按首次出现的顺序）
+        self.items: list[NormalizedURL] = []
+        # 无法识别的输入：(输入序号, 结果)
+        self.errors: list[tuple[int, NormalizedURL]] = []
+        # 重复的输入：(输入序号, 首次出现的结果)
+        self.duplicates: list[tuple[int, NormalizedURL]] = []
+
+    @property
+    def urls(self) -> list[str]:
+        """去重后的规范 URL"""
+        return [item.url for item in self.items]
+
+
+def normalize_youtube_url(url: str) -> NormalizedURL:
+    """
+    把 YouTube URL 规范化为视频 / 播放列表 / 频道 ID
+
+    支持 watch?v=、youtu.be、shorts、embed、live、播放列表、频道（ID、@handle、
+    /c/、/user/）、m. / music. / nocookie 域名，以及裸的 11 位视频 ID。
+    跟踪参数（si、feature、t 等）被丢弃。
+
+    Args:
+        url: 待规范化的 URL
+
+    Returns:
+        规范化结果（失败时 error 非空）
+    """
+    text = url.strip()
+    if not text:
+        return NormalizedURL(url, error="请输入 YouTube URL")
+    if _VIDEO_ID.match(text):
+        return NormalizedURL(url, VIDEO, text)
+
+    try:
+        parts = urlsplit(text if _HAS_SCHEME.match(text) else "https://" + text)
+        host = (parts.hostname or "").lower()
+    except ValueError:
+        return NormalizedURL(url, error="无效的 YouTube URL 格式")
+    if parts.scheme not in ("http", "https"):
+        return NormalizedURL(url, error="无效的 YouTube URL 格式")
+
+    path = parts.path or "/"
+    query = parse_qs(parts.query) if parts.query else {}
+    playlist_id = (query.get("list") or [None])[0]
+    if playlist_id is not None and not _PLAYLIST_ID.match(playlist_id):
+        playlist_id = None
+
+    if host in SHORT_HOSTS:
+        candidate = path.strip("/").split("/")[0]
+        if _VIDEO_ID.match(candidate):
+            return NormalizedURL(url, VIDEO, candidate, playlist_id)
+        return NormalizedURL(url, error="无法识别的视频 ID")
+
+    if host not in YOUTUBE_HOSTS:
+        return NormalizedURL(url, error="URL 必须来自 YouTube")
+
+    if path.rstrip("/") == "/watch":
+        video_id = (query.get("v") or [""])[0]
+        if _VIDEO_ID.match(video_id):
+            return NormalizedURL(url, VIDEO, video_id, playlist_id)
+        return NormalizedURL(url, error="无法识别的视频 ID")
+
+    match = _VIDEO_PATH.match(path)
+    if match:
+        return NormalizedURL(url, VIDEO, match.group(1), playlist_id)
+
+    if path.rstrip("/") == "/playlist":
+        if playlist_id is not None:
+            return NormalizedURL(url, PLAYLIST, playlist_id)
+        return NormalizedURL(url, error="无法识别的播放列表 ID")
+
+    match = _CHANNEL_PATH.match(path)
+    if match:
+        return NormalizedURL(url, CHANNEL, next(g for g in match.groups() if g))
+
+    return NormalizedURL(url, error="无法识别的 YouTube URL")
+
+
+def normalize_youtube_urls(urls: Iterable[str]) -> BatchResult:
+    """
+    批量规范化并去重 URL（提取前去重，避免重复的网络请求）
+
+    Args:
+        urls: URL 列表（可以是任意可迭代对象，例如文件的行）
+
+    Returns:
+        BatchResult：去重后的目标、逐项错误和重复项
+    """
+    result = BatchResult()
+    seen: dict[tuple[str, str], NormalizedURL] = {}
+    for index, url in enumerate(urls):
+        item = normalize_youtube_url(url)
+        if item.error is not None:
+            result.errors.append((index, item))
+            continue
+        first = seen.get(item.key)
+        if first is not None:
+            result.duplicates.append((index, first))
+            continue
+        seen[item.key] = item
+        result.items.append(item)
+    return result
 
 
 def validate_youtube_url(url: str) -> tuple[bool, str]:
@@ -24,10 +214,7 @@ def validate_youtube_url(url: str) -> tuple[bool, str]:
         return False, "URL 必须来自 YouTube"
 
     # 基本 URL 格式检查
-    youtube_pattern = re.compile(
-        r"^(https?://)?(www\.)?(youtube\.com|youtu\.be)/.+$"
-    )
-    if not youtube_pattern.match(url):
+    if not _YOUTUBE_URL.match(url):
         return False, "无效的 YouTube URL 格式"
 
     return True, ""
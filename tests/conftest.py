@@ -0,0 +1,95 @@
+"""
+Shared test fixtures
+"""
+import gzip
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _TestHandler(BaseHTTPRequestHandler):
+    """Keep-alive HTTP/1.1 handler serving a few fixed routes"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.path == "/hello":
+            self._send(200, b"hello world")
+        elif self.path == "/redirect":
+            self._send(302, b"", {"Location": "/hello", "Set-Cookie": "seen=1; Path=/"})
+        elif self.path == "/cookie":
+            self._send(200, (self.headers.get("Cookie") or "").encode())
+        elif self.path == "/gzip":
+            self._send(200, gzip.compress(b"compressed body"), {"Content-Encoding": "gzip"})
+        elif self.path == "/forbidden":
+            self._send(403, b"nope")
+        elif self.path in ("/data", "/norange", "/stall"):
+            self._send_payload()
+        else:
+            self._send(404, b"")
+
+    def _send_payload(self) -> None:
+        """Serve server.payload, honouring Range except on /norange"""
+        payload = self.server.payload
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if self.path == "/norange" or not match:
+            self._send(200, payload)
+            return
+
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(payload) - 1), len(payload) - 1)
+        if start >= len(payload):
+            self._send(416, b"", {"Content-Range": f"bytes */{len(payload)}"})
+            return
+        body = payload[start:end + 1]
+        self.server.ranges.append((start, end))
+
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.path == "/stall" and start == 0 and len(body) > 1 and not self.server.stalled:
+            # First large request from the beginning stalls mid-way
+            self.server.stalled = True
+            self.wfile.write(body[:1024])
+            self.wfile.flush()
+            time.sleep(1.0)
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def http_server():
+    """Local keep-alive HTTP server; yields (base_url, server)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TestHandler)
+    server.daemon_threads = True
+    server.connections = set()
+    server.payload = os.urandom(3 * 1024 * 1024 + 123)
+    server.ranges = []
+    server.stalled = False
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server
+    server.shutdown()
+    server.server_close()
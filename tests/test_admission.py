@@ -0,0 +1,140 @@
+"""
+Test free-space-aware job admission
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from simple_yt_dlp.download.admission import (
+    ADMIT,
+    LEDGER_NAME,
+    REJECT,
+    WAIT,
+    AdmissionController,
+    InsufficientSpaceError,
+    estimate_job_bytes,
+    format_size,
+    read_ledger,
+)
+
+MB = 1024 * 1024
+
+
+def fixed_free(free: int):
+    """disk_usage stub reporting a fixed amount of free space"""
+    return lambda path: SimpleNamespace(free=free)
+
+
+class TestEstimate:
+    """Test peak-usage estimation from extracted info"""
+
+    def test_merged_streams(self):
+        """Video + audio sizes are summed and scaled by the merge overhead"""
+        info = {"requested_formats": [{"filesize": 100 * MB}, {"filesize_approx": 10 * MB}]}
+        assert estimate_job_bytes(info, "mp4_best") == 220 * MB
+
+    def test_lossless_audio_overhead(self):
+        """WAV output is much larger than the compressed input stream"""
+        assert estimate_job_bytes({"filesize": 10 * MB}, "wav") == 120 * MB
+
+    def test_unknown_size(self):
+        """Any stream without a size makes the estimate unknown"""
+        info = {"requested_formats": [{"filesize": 100 * MB}, {}]}
+        assert estimate_job_bytes(info, "mp4_best") is None
+
+    def test_format_size(self):
+        """Sizes are formatted with binary units"""
+        assert format_size(512) == "512 B"
+        assert format_size(1.5 * 1024 * MB) == "1.5 GB"
+
+
+class TestAdmissionController:
+    """Test admit / wait / reject decisions and reservations"""
+
+    def test_decisions(self, tmp_path):
+        """Running reservations count against free space"""
+        controller = AdmissionController(margin=0, disk_usage=fixed_free(100 * MB))
+        assert controller.evaluate(tmp_path, 60 * MB)[0] == ADMIT
+        assert controller.evaluate(tmp_path, 150 * MB)[0] == REJECT
+
+        with controller.admit(tmp_path, 60 * MB):
+            assert controller.reserved(tmp_path) == 60 * MB
+            assert controller.evaluate(tmp_path, 60 * MB)[0] == WAIT
+            assert controller.evaluate(tmp_path, 30 * MB)[0] == ADMIT
+        assert controller.reserved(tmp_path) == 0
+
+    def test_reject_raises(self, tmp_path):
+        """Jobs that can never fit are rejected immediately"""
+        controller = AdmissionController(margin=10 * MB, disk_usage=fixed_free(100 * MB))
+        with pytest.raises(InsufficientSpaceError, match="need 105.0 MB"):
+            controller.admit(tmp_path, 95 * MB)
+
+    def test_limit_caps_reservations(self, tmp_path):
+        """A staging limit holds jobs back even when the disk has room"""
+        controller = AdmissionController(margin=0, disk_usage=fixed_free(1000 * MB))
+        assert controller.evaluate(tmp_path, 150 * MB, limit=100 * MB)[0] == REJECT
+        with controller.admit(tmp_path, 60 * MB, limit=100 * MB):
+            assert controller.evaluate(tmp_path, 60 * MB, limit=100 * MB)[0] == WAIT
+            with pytest.raises(InsufficientSpaceError, match="Staging limit"):
+                controller.admit(tmp_path, 60 * MB, timeout=0, limit=100 * MB)
+        assert controller.evaluate(tmp_path, 60 * MB, limit=100 * MB)[0] == ADMIT
+
+    def test_unknown_size_checks_margin(self, tmp_path):
+        """Jobs of unknown size only need the safety margin"""
+        controller = AdmissionController(margin=10 * MB, disk_usage=fixed_free(100 * MB))
+        with controller.admit(tmp_path, None) as reservation:
+            assert reservation.size == 0
+
+    def test_waits_for_release(self, tmp_path):
+        """A waiting job starts as soon as a running job releases its reservation"""
+        controller = AdmissionController(margin=0, disk_usage=fixed_free(100 * MB))
+        first = controller.admit(tmp_path, 80 * MB)
+        waited = []
+
+        threading.Timer(0.1, first.release).start()
+        start = time.monotonic()
+        with controller.admit(tmp_path, 50 * MB, timeout=5, on_wait=lambda *a: waited.append(a)):
+            assert time.monotonic() - start < 1.0
+        assert waited == [(50 * MB, 100 * MB, 80 * MB)]
+
+    def test_wait_timeout(self, tmp_path):
+        """Waiting gives up after the timeout"""
+        controller = AdmissionController(margin=0, disk_usage=fixed_free(100 * MB))
+        with controller.admit(tmp_path, 80 * MB):
+            with pytest.raises(InsufficientSpaceError):
+                controller.admit(tmp_path, 50 * MB, timeout=0.1)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="needs flock")
+class TestLedger:
+    """Test reservations shared between processes through the ledger file"""
+
+    def test_controllers_see_each_other(self, tmp_path):
+        """Each controller stands in for a worker process with its own DownloadCore"""
+        first, second = (
+            AdmissionController(margin=0, disk_usage=fixed_free(100 * MB), ledger=True)
+            for _ in range(2)
+        )
+        with first.admit(tmp_path, 60 * MB):
+            assert second.reserved(tmp_path) == 60 * MB
+            assert second.evaluate(tmp_path, 60 * MB)[0] == WAIT
+            with pytest.raises(InsufficientSpaceError):
+                second.admit(tmp_path, 60 * MB, timeout=0)
+        assert read_ledger(tmp_path) == {}
+        assert second.evaluate(tmp_path, 60 * MB)[0] == ADMIT
+
+    def test_dead_process_entries_are_ignored(self, tmp_path):
+        """Reservations of a worker that died without releasing them do not block others"""
+        child = subprocess.Popen([sys.executable, "-c", "pass"])
+        child.wait()
+        (tmp_path / LEDGER_NAME).write_text(json.dumps({f"{child.pid}:dead:1": 80 * MB}))
+        controller = AdmissionController(margin=0, disk_usage=fixed_free(100 * MB), ledger=True)
+        assert controller.reserved(tmp_path) == 0
+        with controller.admit(tmp_path, 60 * MB):
+            assert list(read_ledger(tmp_path).values()) == [60 * MB]
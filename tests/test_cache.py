@@ -0,0 +1,78 @@
+"""
+Test targeted yt-dlp cache invalidation
+"""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from simple_yt_dlp.download import cache
+from simple_yt_dlp.download.cache import (
+    find_player_ids,
+    invalidate_players,
+    latest_player_id,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_invalidation_state(monkeypatch):
+    """Each test starts without recent invalidations"""
+    monkeypatch.setattr(cache, "_recent_invalidations", {})
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    """Create a fake yt-dlp cache with two players and an unrelated site"""
+    entries = {
+        "youtube-sigfuncs/aaaa1111-main-js-abc.json": 100,
+        "youtube-sigfuncs/bbbb2222-main-js-abc.json": 200,
+        "youtube-nsig/aaaa1111-main-js.json": 100,
+        "challenge-solver/player,3Ahttps,3A,2F,2Fyt,2Fs,2Fplayer,2Faaaa1111,2Fbase.js.json": 100,
+        "brightcove/policy.json": 100,
+    }
+    for rel, mtime in entries.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("{}")
+        os.utime(path, (mtime, mtime))
+    return tmp_path
+
+
+class TestInvalidatePlayers:
+    """Test selective invalidation"""
+
+    def test_only_failing_player_removed(self, cache_dir):
+        """Entries of other players and other sites are kept"""
+        removed = invalidate_players(cache_dir, {"aaaa1111"})
+        assert removed == 3
+
+        remaining = sorted(p.name for p in cache_dir.rglob("*.json"))
+        assert remaining == ["bbbb2222-main-js-abc.json", "policy.json"]
+
+    def test_repeated_invalidation_is_debounced(self, cache_dir):
+        """Concurrent jobs hitting 403 on the same player only clear once"""
+        assert invalidate_players(cache_dir, {"aaaa1111"}) == 3
+        (cache_dir / "youtube-nsig" / "aaaa1111-main-js.json").write_text("{}")
+        assert invalidate_players(cache_dir, {"aaaa1111"}) == 0
+
+
+class TestPlayerDiscovery:
+    """Test how the failing player is identified"""
+
+    def test_latest_player_id(self, cache_dir):
+        """Most recently written player wins"""
+        assert latest_player_id(cache_dir) == "bbbb2222"
+        assert latest_player_id(cache_dir, known_ids={"aaaa1111"}) == "aaaa1111"
+
+    def test_find_player_ids_from_extractor(self):
+        """Player ids are read from the YouTube extractor's in-memory caches"""
+        ie = SimpleNamespace(
+            _code_cache={"aaaa1111-main": "js"},
+            _player_cache={("youtube-sts", "cccc3333-tv", None): 1},
+        )
+        ydl = SimpleNamespace(_ies_instances={"Youtube": ie})
+        assert find_player_ids(ydl) == {"aaaa1111", "cccc3333"}
+
+    def test_find_player_ids_without_extractor(self):
+        """No YouTube extractor instance means no known players"""
+        assert find_player_ids(SimpleNamespace(_ies_instances={})) == set()
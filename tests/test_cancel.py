@@ -0,0 +1,123 @@
+"""
+Test cooperative cancellation of download jobs
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from simple_yt_dlp.download.cancel import CancelToken, JobCancelled, install_process_tracking
+from simple_yt_dlp.download.pool import ConnectionPool
+from simple_yt_dlp.download.ranged import RangedDownloader, RangedDownloadError
+
+
+class TestCancelToken:
+    """Test callbacks, hooks and partial-file cleanup"""
+
+    def test_callbacks(self):
+        """Callbacks run once on cancel, or immediately when already cancelled"""
+        token = CancelToken()
+        calls = []
+        unregister = token.add_callback(lambda: calls.append("a"))
+        token.add_callback(lambda: calls.append("b"))
+        unregister()
+
+        token.cancel()
+        token.cancel()
+        token.add_callback(lambda: calls.append("c"))
+        assert calls == ["b", "c"]
+
+    def test_hooks_raise_after_cancel(self):
+        """Progress and postprocessor hooks abort yt-dlp once cancelled"""
+        token = CancelToken()
+        token.progress_hook({"status": "downloading", "filename": "a.mp4"})
+        token.cancel()
+        with pytest.raises(JobCancelled):
+            token.progress_hook({"status": "downloading"})
+        with pytest.raises(JobCancelled):
+            token.postprocessor_hook({"status": "started", "info_dict": {}})
+
+    def test_cleanup(self, tmp_path):
+        """Partial and intermediate files of the job are removed, older files kept"""
+        old = tmp_path / "old.mp4"
+        old.write_bytes(b"keep")
+        os.utime(old, (time.time() - 3600, time.time() - 3600))
+
+        token = CancelToken()
+        video = tmp_path / "clip.f137.mp4"
+        for name in ("clip.f137.mp4.part", "clip.f137.mp4.part-Frag3", "clip.temp.mp4"):
+            (tmp_path / name).write_bytes(b"x")
+        token.progress_hook({"filename": str(video), "tmpfilename": f"{video}.part"})
+        token.postprocessor_hook({"info_dict": {"filepath": str(tmp_path / "clip.mp4")}})
+        token.track_file(str(old))
+
+        removed = token.cleanup()
+        assert [os.path.basename(p) for p in removed] == [
+            "clip.f137.mp4.part", "clip.f137.mp4.part-Frag3", "clip.temp.mp4",
+        ]
+        assert old.exists()
+
+    def test_kills_tracked_processes(self):
+        """ffmpeg processes started by yt-dlp in the job thread are killed on cancel"""
+        pytest.importorskip("yt_dlp")
+        import yt_dlp.postprocessor.ffmpeg as ffmpeg
+
+        install_process_tracking()
+        token = CancelToken()
+        result = {}
+
+        def run():
+            with token.activate():
+                result["rc"] = ffmpeg.Popen.run(
+                    [sys.executable, "-c", "import time; time.sleep(30)"]
+                )[2]
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        time.sleep(0.5)
+        start = time.monotonic()
+        token.cancel()
+        thread.join(5)
+        assert time.monotonic() - start < 1.0
+        assert result["rc"] != 0
+
+
+class TestRangedCancellation:
+    """Test that aborting frees the download within a second"""
+
+    def test_abort_interrupts_blocked_reads(self, http_server, tmp_path):
+        """abort() unblocks a worker stuck on a stalled connection"""
+        base_url, _ = http_server
+        pool = ConnectionPool()
+        downloader = RangedDownloader(connections=2, pool=pool, min_split_size=128 * 1024)
+        threading.Timer(0.2, downloader.abort).start()
+
+        start = time.monotonic()
+        with pytest.raises(RangedDownloadError, match="aborted"):
+            downloader.download(f"{base_url}/stall", tmp_path / "out.bin")
+        assert time.monotonic() - start < 0.8
+        pool.close()
+
+    def test_ranged_fd_cancel(self, http_server, tmp_path):
+        """Cancelling from a progress hook stops RangedFD and cleans its .part file"""
+        pytest.importorskip("yt_dlp")
+        from simple_yt_dlp.download.ydl import SimpleYoutubeDL
+
+        base_url, _ = http_server
+        token = CancelToken()
+        dest = tmp_path / "video.mp4"
+        info = {
+            "id": "test", "url": f"{base_url}/data", "ext": "mp4",
+            "protocol": "http", "http_headers": {},
+        }
+        with SimpleYoutubeDL({
+            "quiet": True, "cancel_token": token,
+            "progress_hooks": [lambda d: token.cancel(), token.progress_hook],
+        }) as ydl:
+            with pytest.raises(JobCancelled):
+                ydl.dl(str(dest), info)
+
+        assert token.cleanup() == [f"{dest}.part"]
+        assert list(tmp_path.iterdir()) == []
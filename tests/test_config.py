@@ -56,6 +56,27 @@ class TestConfig:
         config.last_format = "mp4_best"
         assert config.last_format == "mp4_best"
 
+    def test_staging_properties(self, temp_config_path):
+        """Test staging_dir and the size-string staging_limit"""
+        config = Config(config_path=temp_config_path)
+        assert config.staging_dir is None and config.staging_limit is None
+
+        config.staging_dir = Path("/tmp/staging")
+        config.set("staging_limit", "8G")
+        assert config.staging_dir == Path("/tmp/staging")
+        assert config.staging_limit == 8 * 1024 ** 3
+        config.set("staging_limit", "lots")
+        assert config.staging_limit is None
+
+    def test_transcode_preset(self, temp_config_path):
+        """Test the encoder preset falls back to balanced when invalid"""
+        config = Config(config_path=temp_config_path)
+        assert config.transcode_preset == "balanced"
+        config.transcode_preset = "small"
+        assert config.transcode_preset == "small"
+        config.set("transcode_preset", "ultrafast")
+        assert config.transcode_preset == "balanced"
+
 
 class TestConfigMigration:
     """Test old config migration"""
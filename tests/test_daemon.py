@@ -0,0 +1,200 @@
+"""
+Test the job manager, the daemon control socket and its CLI client
+"""
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from simple_yt_dlp.__main__ import main
+from simple_yt_dlp.daemon import DaemonClient, DaemonError
+from simple_yt_dlp.daemon import server as daemon_server
+from simple_yt_dlp.daemon.server import DaemonServer
+from simple_yt_dlp.download.jobs import CANCELLED, DONE, FAILED, JobManager
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+class FakeCore:
+    """Stands in for DownloadCore: fast, slow (until cancelled) or failing jobs"""
+
+    def __init__(self, download_dir: Path):
+        self.download_dir = download_dir
+
+    async def download(self, url, format_id, info_callback=None, cancel_token=None,
+                       progress_callback=None):
+        info_callback("extracting")
+        if url.endswith("slow"):
+            cancel_token.wait(5)
+            return False, "", "Download cancelled"
+        if url.endswith("fail"):
+            return False, "", "boom"
+        progress_callback({"status": "downloading", "downloaded_bytes": 50, "total_bytes": 100})
+        progress_callback({"status": "finished", "downloaded_bytes": 100, "total_bytes": 100})
+        return True, "Title", None
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(FakeCore(tmp_path), max_concurrent=1)
+    manager.start()
+    yield manager
+    manager.shutdown()
+
+
+@pytest.fixture
+def daemon(manager):
+    """Daemon server on a short socket path (AF_UNIX paths are length-limited)"""
+    directory = Path(tempfile.mkdtemp(prefix="syd-", dir="/tmp"))
+    server = DaemonServer(directory / "d.sock", manager)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.stop()
+    server.server_close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestJobManager:
+    """Test queueing, events and cancellation"""
+
+    def test_job_lifecycle_events(self, manager):
+        """A job is queued, run and finished, with events along the way"""
+        events = manager.subscribe()
+        job = manager.submit(URL, "mp3")
+        wait_for(lambda: job.finished)
+
+        assert job.state == DONE
+        assert job.title == "Title"
+        kinds = [events.get_nowait() for _ in range(events.qsize())]
+        states = [e["job"]["state"] for e in kinds if e["event"] == "job"]
+        assert states == ["queued", "running", "done"]
+        assert {"event": "status", "id": job.id, "message": "extracting"} in kinds
+        assert job.progress["downloaded_bytes"] == 100
+
+    def test_failure_and_validation(self, manager):
+        """Failed downloads keep their error; unknown formats are refused"""
+        job = manager.submit(URL + "fail", "mp3")
+        wait_for(lambda: job.finished)
+        assert (job.state, job.error) == (FAILED, "boom")
+        with pytest.raises(ValueError):
+            manager.submit(URL, "nope")
+
+    def test_cancel_running_and_queued(self, manager):
+        """Running jobs are cancelled via their token, queued ones never start"""
+        running = manager.submit(URL + "slow", "mp3")
+        queued = manager.submit(URL, "mp3")
+        wait_for(lambda: running.state == "running")
+
+        assert manager.cancel(queued.id)
+        assert queued.state == CANCELLED
+        assert manager.cancel(running.id)
+        wait_for(lambda: running.finished)
+        assert running.state == CANCELLED
+        assert not manager.cancel(running.id)
+
+    def test_finished_jobs_are_pruned(self, tmp_path):
+        """Only the most recently finished jobs are kept; unfinished ones always are"""
+        manager = JobManager(FakeCore(tmp_path), max_concurrent=1, keep_finished=2)
+        manager.start()
+        try:
+            running = manager.submit(URL + "slow", "mp3")
+            wait_for(lambda: running.state == "running")
+            jobs = [manager.submit(URL, "mp3") for _ in range(3)]
+            for job in jobs:
+                manager.cancel(job.id)
+            assert manager.list() == [running, *jobs[1:]]
+            assert manager.get(jobs[0].id) is None
+        finally:
+            manager.shutdown()
+
+
+class TestDaemon:
+    """Test the socket protocol end to end"""
+
+    def test_submit_watch_list(self, daemon, tmp_path):
+        """Jobs submitted over the socket can be watched to completion"""
+        client = DaemonClient(daemon.socket_path)
+        assert client.available()
+
+        job = client.submit(URL, "mp3", tmp_path / "out")
+        events = list(client.watch(job["id"]))
+        # The job may finish before the watch starts; the snapshot carries its progress
+        assert events[-1]["job"]["state"] == "done"
+        assert events[-1]["job"]["progress"]["downloaded_bytes"] == 100
+        assert (tmp_path / "out").is_dir()
+        assert [j["state"] for j in client.list()] == ["done"]
+
+    def test_cancel_over_socket(self, daemon):
+        """Cancelling a running job ends its watch stream"""
+        client = DaemonClient(daemon.socket_path)
+        job = client.submit(URL + "slow", "mp3")
+        threading.Timer(0.2, client.cancel, args=(job["id"],)).start()
+        events = list(client.watch(job["id"]))
+        assert events[-1]["job"]["state"] == "cancelled"
+
+    def test_relative_directory_is_resolved_by_the_client(self, daemon, tmp_path, monkeypatch):
+        """A relative -d is relative to the caller, not to the daemon's working directory"""
+        monkeypatch.chdir(tmp_path)
+        job = DaemonClient(daemon.socket_path).submit(URL, "mp3", Path("out"))
+        assert job["directory"] == str(tmp_path / "out")
+
+    def test_watch_fails_when_daemon_stops(self, daemon, monkeypatch):
+        """A watch cut short by the daemon exiting is an error, not a finished job"""
+        monkeypatch.setattr(daemon_server, "HEARTBEAT_INTERVAL", 0.05)
+        client = DaemonClient(daemon.socket_path)
+        job = client.submit(URL + "slow", "mp3")
+        threading.Timer(0.2, daemon.stop).start()
+        with pytest.raises(DaemonError, match="before the job finished"):
+            list(client.watch(job["id"]))
+
+    def test_errors(self, daemon):
+        """Invalid requests are reported to the client"""
+        client = DaemonClient(daemon.socket_path)
+        with pytest.raises(DaemonError, match="YouTube"):
+            client.submit("https://example.com/video", "mp3")
+        with pytest.raises(DaemonError, match="Unknown op"):
+            client.request("frobnicate")
+        with pytest.raises(DaemonError, match="No such job"):
+            list(client.watch(999))
+
+    def test_single_instance(self, daemon, manager):
+        """A second daemon on the same socket is refused"""
+        with pytest.raises(DaemonError, match="already running"):
+            DaemonServer(daemon.socket_path, manager)
+
+    def test_unreachable(self, tmp_path):
+        """Clients report a missing daemon instead of hanging"""
+        client = DaemonClient(tmp_path / "missing.sock")
+        assert not client.available()
+        with pytest.raises(DaemonError):
+            client.list()
+
+    def test_cli_submit_dedupes(self, daemon, capsys):
+        """The CLI normalises URL batches and submits each video once"""
+        with pytest.raises(SystemExit) as exc:
+            main(["--socket", str(daemon.socket_path), "submit",
+                  URL, "https://youtu.be/dQw4w9WgXcQ?si=x", "https://example.com/x"])
+        assert exc.value.code == 1
+        err = capsys.readouterr().err
+        assert "duplicate" in err and "example.com" in err
+        assert [j.url for j in daemon.manager.list()] == [URL]
+
+    def test_cli_list(self, daemon, capsys):
+        """The CLI is a thin client of the daemon"""
+        DaemonClient(daemon.socket_path).submit(URL + "fail", "mp3")
+        wait_for(lambda: daemon.manager.list()[0].finished)
+        with pytest.raises(SystemExit) as exc:
+            main(["--socket", str(daemon.socket_path), "list"])
+        assert exc.value.code == 0
+        assert "failed" in capsys.readouterr().out
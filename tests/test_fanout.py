@@ -0,0 +1,143 @@
+"""
+Test multi-format fan-out planning and ffmpeg command construction
+"""
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+import yt_dlp
+
+from simple_yt_dlp.download.cancel import CancelToken
+from simple_yt_dlp.download.core import DownloadCore
+from simple_yt_dlp.download.fanout import (
+    Target,
+    estimate_fanout_bytes,
+    ffmpeg_command,
+    plan_targets,
+    produce_outputs,
+)
+from simple_yt_dlp.download.jobs import JobManager
+
+MB = 1024 * 1024
+
+# Sorted worst to best, as extract_info leaves them
+FORMATS = [
+    {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none",
+     "abr": 128, "filesize": 4 * MB, "url": "https://example.com/140"},
+    {"format_id": "251", "ext": "webm", "acodec": "opus", "vcodec": "none",
+     "abr": 160, "filesize": 5 * MB, "url": "https://example.com/251"},
+    {"format_id": "136", "ext": "mp4", "acodec": "none", "vcodec": "avc1.4d401f",
+     "height": 720, "filesize": 40 * MB, "url": "https://example.com/136"},
+    {"format_id": "137", "ext": "mp4", "acodec": "none", "vcodec": "avc1.640028",
+     "height": 1080, "filesize": 80 * MB, "url": "https://example.com/137"},
+]
+
+
+@pytest.fixture
+def ydl():
+    with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+        yield ydl
+
+
+def info() -> dict:
+    formats = [dict(f) for f in FORMATS]
+    return {"id": "abc", "title": "Clip", "extractor": "test", "formats": formats}
+
+
+class TestPlanning:
+    """Test stream selection across targets"""
+
+    def test_audio_target_reuses_video_audio(self, ydl):
+        """Video + MP3 downloads the video once and the audio once"""
+        targets, streams = plan_targets(ydl, info(), ["mp3", "mp4_1080p"])
+
+        assert [t.format_id for t in targets] == ["mp3", "mp4_1080p"]
+        video = next(t for t in targets if t.format_id == "mp4_1080p")
+        audio = next(t for t in targets if t.format_id == "mp3")
+        assert len(video.streams) == 2
+        assert [s["format_id"] for s in audio.streams] == [
+            s["format_id"] for s in video.streams if s["vcodec"] == "none"
+        ]
+        assert len(streams) == 2
+
+    def test_two_video_targets_share_audio(self, ydl):
+        """Different resolutions need their own video stream but one audio stream"""
+        _, streams = plan_targets(ydl, info(), ["mp4_1080p", "mp4_720p"])
+        assert {"137", "136"} <= set(streams)
+        assert len(streams) == 3
+
+    def test_estimate(self, ydl):
+        """Peak disk use counts the fetched streams plus every output"""
+        targets, streams = plan_targets(ydl, info(), ["mp4_1080p", "mp3"])
+        fetched = sum(s["filesize"] for s in streams.values())
+        assert estimate_fanout_bytes(targets, streams) > fetched
+
+        streams = {k: {**v, "filesize": None} for k, v in streams.items()}
+        assert estimate_fanout_bytes(targets, streams) is None
+
+    def test_output_names(self, ydl, tmp_path):
+        """Targets sharing an extension get distinct file names"""
+        ydl.params["outtmpl"] = {"default": str(tmp_path / "%(title)s.%(ext)s")}
+        targets = [Target("mp4_1080p", []), Target("mp4_720p", []), Target("mp3", [])]
+        outputs = DownloadCore._fanout_outputs(ydl, info(), targets)
+        assert outputs["mp3"].name == "Clip.mp3"
+        assert outputs["mp4_1080p"].name == "Clip.mp4_1080p.mp4"
+        assert len(set(outputs.values())) == 3
+
+
+class TestCommands:
+    """Test ffmpeg command construction"""
+
+    def test_audio_copy_or_encode(self):
+        """Compatible audio is copied, everything else is encoded"""
+        aac = {"format_id": "140", "acodec": "mp4a.40.2", "vcodec": "none"}
+        cmd = ffmpeg_command("ffmpeg", Target("m4a", [aac]), [Path("a.m4a")], Path("out.m4a"))
+        assert cmd[cmd.index("-c:a") + 1] == "copy"
+
+        cmd = ffmpeg_command("ffmpeg", Target("mp3", [aac]), [Path("a.m4a")], Path("out.mp3"))
+        assert cmd[cmd.index("-c:a") + 1] == "libmp3lame"
+        assert "-vn" in cmd and "-b:a" in cmd
+
+    def test_video_merge_is_stream_copy(self):
+        """Video outputs remux the fetched streams without re-encoding"""
+        video = {"format_id": "137", "acodec": "none", "vcodec": "avc1"}
+        audio = {"format_id": "140", "acodec": "mp4a.40.2", "vcodec": "none"}
+        cmd = ffmpeg_command(
+            "ffmpeg", Target("mp4_1080p", [video, audio]),
+            [Path("v.mp4"), Path("a.m4a")], Path("out.mp4"),
+        )
+        assert cmd.count("-i") == 2
+        assert ["-map", "0:v:0", "-map", "1:a:0", "-c", "copy"] == cmd[-9:-3]
+        assert cmd[-3:-1] == ["-map_metadata", "-1"]
+
+
+def test_job_accepts_format_list(tmp_path):
+    """Jobs take a comma-separated format list and validate every entry"""
+    manager = JobManager(type("Core", (), {"download_dir": tmp_path})())
+    job = manager.submit("https://youtu.be/x", "mp4_720p, mp3,mp3")
+    assert job.formats == ["mp4_720p", "mp3"]
+    assert job.to_dict()["format"] == "mp4_720p,mp3"
+    with pytest.raises(ValueError, match="bogus"):
+        manager.submit("https://youtu.be/x", ["mp3", "bogus"])
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_produce_outputs(tmp_path):
+    """Outputs are produced in parallel from one local copy"""
+    source = tmp_path / "src.mkv"
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=duration=1",
+         "-f", "lavfi", "-i", "color=size=64x64:duration=1",
+         "-c:a", "aac", "-c:v", "mpeg4", str(source)],
+        check=True,
+    )
+    stream = {"format_id": "18", "acodec": "mp4a.40.2", "vcodec": "mp4v"}
+    targets = [Target("mp4_360p", [stream]), Target("mp3", [stream]), Target("m4a", [stream])]
+    outputs = {t.format_id: tmp_path / f"out.{t.ext}" for t in targets}
+
+    produced = produce_outputs("ffmpeg", targets, {"18": source}, outputs, CancelToken())
+
+    assert sorted(produced) == sorted(outputs.values())
+    assert all(p.stat().st_size > 0 for p in produced)
+    assert not list(tmp_path.glob("*.temp.*"))
@@ -0,0 +1,125 @@
+"""
+Test streaming checksums and output verification
+"""
+import hashlib
+import os
+import random
+import threading
+from pathlib import Path
+
+import pytest
+
+from simple_yt_dlp.download import DownloadCore
+from simple_yt_dlp.download.integrity import IntegrityError, file_digest, verify_output
+from simple_yt_dlp.download.pool import ConnectionPool
+from simple_yt_dlp.download.ranged import RangedDownloader
+from simple_yt_dlp.download.writer import OutputFile, WriteOptions
+
+KIB = 1024
+
+
+def sha256(data: bytes) -> str:
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def fake_ffprobe(tmp_path):
+    """An ffprobe stand-in that reports the duration stored in DURATION"""
+    script = tmp_path / "bin" / "ffprobe"
+    script.parent.mkdir()
+    script.write_text('#!/bin/sh\necho "{\\"format\\": {\\"duration\\": \\"$DURATION\\"}}"\n')
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_out_of_order_writes_hash_like_the_file(tmp_path):
+    """Chunks written concurrently in any order give the digest of the whole file"""
+    data = os.urandom(2 * 1024 * KIB + 17)
+    chunks = [(offset, data[offset:offset + 64 * KIB]) for offset in range(0, len(data), 64 * KIB)]
+    random.Random(1).shuffle(chunks)
+
+    with OutputFile(tmp_path / "out.bin", len(data)) as output:
+        threads = [
+            threading.Thread(target=lambda part: [output.pwrite(o, c) for o, c in part],
+                             args=(chunks[n::4],))
+            for n in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        checksum = output.digest.hexdigest(len(data))
+
+    assert checksum == sha256(data) == file_digest(tmp_path / "out.bin")
+    assert output.digest.read_back < len(data)
+
+
+def test_digest_is_withheld_while_incomplete(tmp_path):
+    """A file with a hole has no checksum; checksums can be disabled"""
+    with OutputFile(tmp_path / "a.bin", 20) as output:
+        output.pwrite(10, b"x" * 10)
+        assert output.digest.hexdigest(20) is None
+        output.pwrite(0, b"y" * 10)
+        assert output.digest.hexdigest(20) == sha256(b"y" * 10 + b"x" * 10)
+    with OutputFile(tmp_path / "b.bin", options=WriteOptions(checksum=None)) as output:
+        assert output.digest is None
+
+
+def test_ranged_download_checksum(http_server, tmp_path):
+    """The ranged downloader reports the digest of what it wrote"""
+    base_url, server = http_server
+    pool = ConnectionPool()
+    try:
+        downloader = RangedDownloader(connections=4, pool=pool, min_split_size=256 * KIB)
+        downloader.download(f"{base_url}/data", tmp_path / "out.bin")
+    finally:
+        pool.close()
+    assert downloader.checksum == sha256(server.payload)
+
+
+def test_truncated_output_is_rejected(tmp_path, fake_ffprobe, monkeypatch):
+    """Outputs much shorter than the expected duration fail verification"""
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"media")
+
+    monkeypatch.setenv("DURATION", "211.4")
+    verification = verify_output(path, 212, ffprobe=fake_ffprobe)
+    assert verification.duration == 211.4 and not verification.truncated
+    assert verification.checksum == sha256(b"media")
+
+    monkeypatch.setenv("DURATION", "93.2")
+    with pytest.raises(IntegrityError, match="93.2s of 212s"):
+        verify_output(path, 212, ffprobe=fake_ffprobe)
+
+    assert verify_output(path, 212, ffprobe=None).duration is None
+
+
+def test_core_reuses_streamed_checksums_only_for_untouched_files(tmp_path):
+    """Files rewritten after download (e.g. by a postprocessor) are hashed again"""
+    core = DownloadCore(download_dir=tmp_path, ffmpeg_location=str(tmp_path / "none"))
+    kept, rewritten = tmp_path / "kept.mp4", tmp_path / "rewritten.mp4"
+    kept.write_bytes(b"kept")
+    rewritten.write_bytes(b"before")
+
+    streamed = {}
+    hook = core._checksum_hook(streamed)
+    hook({"status": "finished", "filename": str(kept), "checksum": "sha256:streamed"})
+    hook({"status": "finished", "filename": str(rewritten), "checksum": "sha256:stale"})
+    rewritten.write_bytes(b"after, remuxed")
+
+    events = []
+    core._verify_outputs([str(kept), str(rewritten), None], None, streamed, events.append)
+
+    assert [e["checksum"] for e in events] == ["sha256:streamed", sha256(b"after, remuxed")]
+    assert all(e["status"] == "verified" for e in events)
+    assert Path(events[1]["filename"]).name == "rewritten.mp4"
+
+
+def test_core_verifies_with_the_configured_algorithm(tmp_path):
+    """Read-back verification uses the same algorithm as the write path"""
+    core = DownloadCore(download_dir=tmp_path, ffmpeg_location=str(tmp_path / "none"),
+                        write_options=WriteOptions(checksum="blake2b"))
+    output = tmp_path / "clip.mp3"
+    output.write_bytes(b"audio")
+    [verification] = core._verify_outputs([str(output)], None, {})
+    assert verification.checksum == "blake2b:" + hashlib.blake2b(b"audio").hexdigest()
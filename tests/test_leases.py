@@ -0,0 +1,137 @@
+"""
+Test the lease-based shared job queue
+"""
+import threading
+import time
+
+import pytest
+
+from simple_yt_dlp.__main__ import main
+from simple_yt_dlp.download.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING
+from simple_yt_dlp.download.leases import LeaseQueue, LeaseWorker
+
+from .test_daemon import URL, FakeCore, wait_for
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = LeaseQueue(tmp_path / "queue.db", lease_seconds=10, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_claim_order_and_exactly_once(queue):
+    """Jobs are claimed in order; a result is recorded once, by the lease holder only"""
+    first = queue.submit(URL, "mp3")
+    second = queue.submit(URL, ["mp3", "mp4_720p"])
+
+    a = queue.claim("a")
+    b = queue.claim("b")
+    assert (a.job_id, b.job_id) == (first, second)
+    assert b.formats == ["mp3", "mp4_720p"]
+    assert queue.claim("c") is None
+    assert queue.get(first)["state"] == RUNNING
+
+    assert queue.complete(a, DONE, "Title")
+    assert not queue.complete(a, DONE, "Title")
+    assert queue.get(first)["state"] == DONE
+    assert [c["job_id"] for c in queue.completions()] == [first]
+
+    with pytest.raises(ValueError):
+        queue.submit(URL, "nope")
+
+
+def test_expired_lease_is_requeued_and_fenced(queue):
+    """A dead worker's job goes back to the queue; its late result is discarded"""
+    job_id = queue.submit(URL, "mp3")
+    now = time.time()
+    stale = queue.claim("dead", now=now)
+
+    assert queue.heartbeat(stale, now=now + 5)
+    assert queue.claim("other", now=now + 12) is None, "heartbeat extended the lease"
+
+    fresh = queue.claim("other", now=now + 20)
+    assert fresh.job_id == job_id and fresh.token > stale.token
+    assert not queue.heartbeat(stale, now=now + 20)
+    assert not queue.complete(stale, DONE, "late")
+    assert queue.complete(fresh, DONE, "Title")
+    assert queue.get(job_id)["worker"] == "other"
+    assert len(queue.completions()) == 1
+
+
+def test_repeatedly_lost_job_fails(queue):
+    """A job whose workers keep dying is failed after max_attempts"""
+    job_id = queue.submit(URL, "mp3")
+    now = time.time()
+    queue.claim("a", now=now)
+    queue.claim("b", now=now + 20)
+    assert queue.claim("c", now=now + 40) is None
+    job = queue.get(job_id)
+    assert job["state"] == FAILED and job["attempts"] == 2
+
+
+def test_concurrent_claimers_never_share_a_job(tmp_path):
+    """Independent connections (as in separate processes) each get distinct jobs"""
+    LeaseQueue(tmp_path / "q.db")
+    submitter = LeaseQueue(tmp_path / "q.db")
+    ids = {submitter.submit(URL, "mp3") for _ in range(40)}
+    claimed, lock = [], threading.Lock()
+
+    def claimer(name):
+        queue = LeaseQueue(tmp_path / "q.db")
+        while (lease := queue.claim(name)) is not None:
+            with lock:
+                claimed.append(lease.job_id)
+        queue.close()
+
+    threads = [threading.Thread(target=claimer, args=(f"w{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(ids)
+
+
+def test_worker_runs_jobs_and_honours_cancel(queue, tmp_path):
+    """Workers record results; cancelling a running job stops it at the next heartbeat"""
+    queue.lease_seconds = 0.3
+    done = queue.submit(URL, "mp3")
+    failed = queue.submit(URL + "fail", "mp3")
+    slow = queue.submit(URL + "slow", "mp3")
+
+    worker = LeaseWorker(queue, FakeCore(tmp_path), "w", idle_poll=0.05)
+    thread = threading.Thread(target=worker.run, args=(3,))
+    thread.start()
+    wait_for(lambda: queue.get(slow)["state"] == RUNNING)
+    assert queue.cancel(slow)
+    thread.join(3)
+
+    assert not thread.is_alive()
+    assert queue.get(done)["state"] == DONE and queue.get(done)["title"] == "Title"
+    assert queue.get(failed)["error"] == "boom"
+    assert queue.get(slow)["state"] == CANCELLED
+    assert [c["state"] for c in queue.completions()] == [DONE, FAILED, CANCELLED]
+    assert not queue.cancel(slow)
+
+
+def test_finished_job_does_not_cancel_its_token(queue, tmp_path, caplog):
+    """Stopping the heartbeat after a normal job is not a cancellation"""
+    queue.submit(URL, "mp3")
+    worker = LeaseWorker(queue, FakeCore(tmp_path), "w", idle_poll=0.05)
+    caplog.set_level("INFO")
+    assert worker.run(1) == 1
+    assert "任务已取消" not in caplog.text
+
+
+def test_cli_queue_add_and_list(tmp_path, capsys):
+    """The queue subcommands add normalized URLs and list them"""
+    db = str(tmp_path / "q.db")
+    with pytest.raises(SystemExit) as exit_info:
+        main(["queue", "add", db, URL, "dQw4w9WgXcQ", "-f", "mp3"])
+    assert exit_info.value.code == 0
+    capsys.readouterr()
+
+    with pytest.raises(SystemExit):
+        main(["queue", "list", db])
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1 and QUEUED in lines[0]
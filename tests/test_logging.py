@@ -0,0 +1,89 @@
+"""
+Test queued, rotating and structured logging
+"""
+import json
+import logging
+import threading
+
+import pytest
+
+from simple_yt_dlp.utils.logging import log_context, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    yield tmp_path
+    shutdown_logging()
+
+
+def test_module_and_app_loggers_share_the_file(log_dir):
+    """Module loggers (simple_yt_dlp.*) reach the log file, not just the app logger"""
+    setup_logging(log_dir)
+    logging.getLogger("simple_yt_dlp.download.core").info("from core")
+    logging.getLogger("simple-yt-dlp").info("from app")
+    shutdown_logging()
+
+    text = (log_dir / "debug.log").read_text(encoding="utf-8")
+    assert "from core" in text and "from app" in text
+    assert not (log_dir / "debug.jsonl").exists()
+
+
+def test_json_lines_carry_job_ids(log_dir):
+    """Concurrent jobs' records stay one parseable line each, tagged with their job"""
+    setup_logging(log_dir, json_lines=True)
+    logger = logging.getLogger("simple_yt_dlp.download.jobs")
+
+    def job(job_id):
+        with log_context(job_id):
+            for i in range(50):
+                logger.info(f"job {job_id} line {i}")
+
+    threads = [threading.Thread(target=job, args=(n,)) for n in (1, 2, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.info("outside")
+    shutdown_logging()
+
+    records = [json.loads(line) for line in open(log_dir / "debug.jsonl", encoding="utf-8")]
+    for job_id in (1, 2, 3):
+        lines = [r["msg"] for r in records if r["job"] == job_id]
+        assert lines == [f"job {job_id} line {i}" for i in range(50)]
+    assert records[-1]["job"] is None
+    assert records[-1]["logger"] == "simple_yt_dlp.download.jobs"
+
+
+def test_size_rotation(log_dir):
+    """The log file is rotated instead of growing without bound"""
+    setup_logging(log_dir, max_bytes=2000, backup_count=2)
+    logger = logging.getLogger("simple-yt-dlp")
+    for i in range(200):
+        logger.debug(f"filler line {i:04d} " + "x" * 40)
+    shutdown_logging()
+
+    files = sorted(p.name for p in log_dir.iterdir())
+    assert files == ["debug.log", "debug.log.1", "debug.log.2"]
+    assert all((log_dir / name).stat().st_size <= 2100 for name in files)
+
+
+def test_slow_disk_does_not_block_callers(log_dir, monkeypatch):
+    """Logging calls only enqueue; the file write happens on the listener thread"""
+    release = threading.Event()
+    original = logging.handlers.RotatingFileHandler.emit
+
+    def slow_emit(self, record):
+        release.wait(5)
+        original(self, record)
+
+    monkeypatch.setattr(logging.handlers.RotatingFileHandler, "emit", slow_emit)
+    setup_logging(log_dir)
+    logger = logging.getLogger("simple_yt_dlp.download.ranged")
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: ([logger.info("hot path") for _ in range(100)],
+                                              done.set()))
+    thread.start()
+    assert done.wait(1), "logging blocked on the file handler"
+    release.set()
+    shutdown_logging()
+    assert (log_dir / "debug.log").read_text(encoding="utf-8").count("hot path") == 100
@@ -0,0 +1,114 @@
+"""
+Test the shared job snapshot behind the live dashboard
+"""
+from simple_yt_dlp.download.jobs import JobManager
+from simple_yt_dlp.download.monitor import (
+    DOWNLOADING,
+    EXTRACTING,
+    PROCESSING,
+    QUEUED,
+    STALLED,
+    JobMonitor,
+    sparkline,
+)
+
+from .test_daemon import URL, FakeCore, wait_for
+
+MB = 1024 * 1024
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def job(job_id, state, **fields):
+    return {"event": "job", "job": {"id": job_id, "url": f"{URL}#{job_id}", "state": state,
+                                    "format": "mp3", **fields}}
+
+
+def progress(job_id, status="downloading", **fields):
+    return {"event": "progress", "id": job_id, "progress": {"status": status, **fields}}
+
+
+def test_sparkline():
+    assert sparkline([0, 1, 2, 4]) == "▁▃▅█"
+    assert sparkline([1, 1], peak=4) == "▃▃"
+    assert sparkline([0, 0]) == "▁▁"
+
+
+def test_rows_follow_job_phases():
+    """Rows appear for active jobs and move through the download phases"""
+    monitor = JobMonitor()
+    monitor.apply(job(1, "queued"))
+    monitor.apply(job(2, "running"))
+    monitor.apply(job(3, "done", title="Old"))
+
+    snapshot = monitor.snapshot()
+    assert [(row.id, row.phase) for row in snapshot.rows] == [(1, QUEUED), (2, EXTRACTING)]
+    assert (snapshot.queued, snapshot.running, snapshot.done) == (1, 1, 1)
+
+    monitor.apply(progress(2, downloaded_bytes=10 * MB, total_bytes=40 * MB, speed=MB,
+                           eta=30, filename="v.mp4"))
+    monitor.apply(progress(2, "finished", downloaded_bytes=40 * MB, total_bytes=40 * MB,
+                           filename="v.mp4"))
+    monitor.apply(progress(2, downloaded_bytes=2 * MB, total_bytes=5 * MB, speed=MB,
+                           eta=3, filename="a.m4a"))
+    row = monitor.snapshot().rows[1]
+    assert row.phase == DOWNLOADING
+    assert (row.downloaded, row.total, row.eta) == (42 * MB, 45 * MB, 3)
+
+    monitor.apply(progress(2, "retrying", attempt=1))
+    monitor.apply(job(2, "running", retries=1))
+    monitor.apply(progress(2, "finished", downloaded_bytes=5 * MB, filename="a.m4a"))
+    row = monitor.snapshot().rows[1]
+    assert (row.phase, row.retries, row.speed) == (PROCESSING, 1, 0.0)
+
+    monitor.apply(job(2, "failed"))
+    monitor.forget_finished()
+    assert [row.id for row in monitor.snapshot().rows] == [1]
+
+
+def test_stalled_and_hogging_jobs_are_flagged():
+    """No new bytes for a while marks a row stalled; most of the bandwidth marks it hogging"""
+    clock = Clock()
+    monitor = JobMonitor(stall_after=10, clock=clock)
+    for job_id in (1, 2, 3):
+        monitor.apply(job(job_id, "running"))
+    monitor.apply(progress(1, downloaded_bytes=MB, speed=8 * MB, filename="a"))
+    monitor.apply(progress(2, downloaded_bytes=MB, speed=MB, filename="b"))
+    monitor.apply(progress(3, downloaded_bytes=MB, speed=MB, filename="c"))
+
+    clock.now = 5
+    monitor.apply(progress(1, downloaded_bytes=40 * MB, speed=8 * MB, filename="a"))
+    monitor.apply(progress(2, downloaded_bytes=6 * MB, speed=MB, filename="b"))
+    snapshot = monitor.snapshot()
+    assert snapshot.throughput == 10 * MB
+    assert [row.hogging for row in snapshot.rows] == [True, False, False]
+
+    clock.now = 12
+    rows = monitor.snapshot().rows
+    assert [row.phase for row in rows] == [DOWNLOADING, DOWNLOADING, STALLED]
+    assert rows[2].speed == 0 and rows[2].eta is None
+    # One sample per snapshot, whatever the number of events
+    assert rows[0].history == [8 * MB, 8 * MB]
+
+
+def test_fed_from_job_manager_events(tmp_path):
+    """The daemon's event stream drives the monitor directly"""
+    monitor = JobMonitor()
+    manager = JobManager(FakeCore(tmp_path), max_concurrent=1)
+    events = manager.subscribe()
+    manager.start()
+    try:
+        done = manager.submit(URL, "mp3")
+        wait_for(lambda: done.finished)
+    finally:
+        manager.shutdown()
+    while not events.empty():
+        monitor.apply(events.get())
+    snapshot = monitor.snapshot()
+    assert snapshot.rows == [] and snapshot.done == 1
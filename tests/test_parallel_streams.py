@@ -0,0 +1,108 @@
+"""
+Test parallel download of the separate streams of merged formats
+"""
+import sys
+import time
+
+import pytest
+import yt_dlp.downloader.external as external
+from yt_dlp.utils import DownloadError
+
+from simple_yt_dlp.download.cancel import CancelToken, JobCancelled, install_process_tracking
+from simple_yt_dlp.download.simulate import SimulatedBackend, SimulationProfile
+from simple_yt_dlp.download.ydl import CombinedProgress, StreamGroup
+
+from .test_daemon import URL
+
+SLOW = "rate=4M-8M,403=0,stall=0,extract=0,size=0.05,tick=0.01"
+
+
+def components(spec, tmp_path, **params):
+    """A simulated YoutubeDL and a video + audio pair of its formats"""
+    backend = SimulatedBackend(SimulationProfile.parse(spec))
+    events = []
+    ydl = backend({"progress_hooks": [events.append], **params})
+    raw = backend.video_info(URL)
+    base = {k: v for k, v in raw.items() if k != "formats"}
+    by_id = {f["format_id"]: {**base, **f} for f in raw["formats"]}
+    formats = [by_id["18"], by_id["140"]]
+    names = [str(tmp_path / f"video.f{f['format_id']}.{f['ext']}") for f in formats]
+    return ydl, formats, names, events
+
+
+def test_streams_download_side_by_side(tmp_path):
+    ydl, formats, names, events = components(SLOW, tmp_path)
+    group = StreamGroup(ydl, formats, str(tmp_path / "video.mp4"))
+
+    assert group.owns(formats[0]) and not group.owns({**formats[0], "requested_formats": []})
+    # The first stream is handed to a thread and dl() returns at once
+    assert group.download(names[0], formats[0]) == (True, False)
+    assert group.threads[0].is_alive() and not group.owns(formats[0])
+    assert group.download(names[1], formats[1]) == (True, True)
+
+    sizes = [f["filesize"] for f in formats]
+    assert [(tmp_path / n).stat().st_size for n in names] == sizes
+    # One job-level progress: a single filename, growing bytes, one final event
+    assert {e["filename"] for e in events} == {str(tmp_path / "video.mp4")}
+    assert [e["status"] for e in events].count("finished") == 1
+    assert events[-1]["status"] == "finished"
+    assert events[-1]["downloaded_bytes"] == events[-1]["total_bytes"] == sum(sizes)
+    downloaded = [e["downloaded_bytes"] for e in events]
+    assert downloaded == sorted(downloaded)
+
+
+def test_failure_is_reported_once(tmp_path):
+    ydl, formats, names, _ = components(SLOW.replace("403=0", "403=1"), tmp_path)
+    group = StreamGroup(ydl, formats, str(tmp_path / "video.mp4"))
+    group.download(names[0], formats[0])
+    with pytest.raises(DownloadError, match="403"):
+        group.download(names[1], formats[1])
+    assert not any(t.is_alive() for t in group.threads)
+
+
+def test_cancel_stops_every_stream(tmp_path):
+    token = CancelToken()
+    ydl, formats, names, _ = components(SLOW, tmp_path, cancel_token=token)
+    group = StreamGroup(ydl, formats, str(tmp_path / "video.mp4"))
+    group.download(names[0], formats[0])
+    token.cancel()
+    with pytest.raises(JobCancelled) as excinfo:
+        group.download(names[1], formats[1])
+    assert type(excinfo.value) is JobCancelled
+    # Both partial files were recorded for cleanup under their own names
+    assert set(token.cleanup()) <= {n + ".part" for n in names}
+
+
+def test_cancel_kills_stream_subprocesses(tmp_path):
+    """Processes a stream starts on its own thread (external downloader, ffmpeg) are killed"""
+    install_process_tracking()
+    token = CancelToken()
+    ydl, formats, names, _ = components(SLOW, tmp_path, cancel_token=token)
+    codes = []
+
+    def external_download(name, info, hooks):
+        codes.append(external.Popen.run([sys.executable, "-c", "import time; time.sleep(30)"])[2])
+        token.raise_if_cancelled()
+
+    ydl._download = external_download
+    with token.activate():
+        group = StreamGroup(ydl, formats, str(tmp_path / "video.mp4"))
+    group.download(names[0], formats[0])
+    time.sleep(0.5)
+    started = time.monotonic()
+    token.cancel()
+    with pytest.raises(JobCancelled):
+        group.download(names[1], formats[1])
+    assert time.monotonic() - started < 5
+    assert len(codes) == 2 and all(code != 0 for code in codes)
+
+
+def test_combined_progress_estimates_until_sizes_are_known():
+    events = []
+    progress = CombinedProgress([events.append], [{"filesize": 100}, {}], "out.mkv")
+    progress.update(0, {"status": "downloading", "downloaded_bytes": 40, "speed": 10.0})
+    progress.update(1, {"status": "finished", "downloaded_bytes": 50})
+    assert events[-1]["total_bytes"] is None and events[-1]["total_bytes_estimate"] == 100
+    assert events[-1]["downloaded_bytes"] == 90 and events[-1]["speed"] == 10.0
+    progress.update(0, {"status": "finished", "downloaded_bytes": 100, "total_bytes": 100})
+    assert events[-1]["status"] == "finished" and events[-1]["total_bytes"] == 150
@@ -0,0 +1,132 @@
+"""
+Test the shared keep-alive connection pool
+"""
+import time
+
+import pytest
+
+from simple_yt_dlp.download.pool import ConnectionPool
+
+
+class TestConnectionPool:
+    """Test connection reuse and eviction"""
+
+    def test_connection_reused_across_requests(self, http_server):
+        """Sequential requests to one host share a single connection"""
+        base_url, server = http_server
+        pool = ConnectionPool()
+
+        for _ in range(3):
+            res = pool.request("GET", f"{base_url}/hello")
+            assert res.read() == b"hello world"
+
+        stats = pool.stats()
+        assert stats["requests"] == 3
+        assert stats["created"] == 1
+        assert stats["reused"] == 2
+        assert stats["reuse_rate"] == pytest.approx(2 / 3)
+        assert len(server.connections) == 1
+        pool.close()
+
+    def test_small_unread_body_drained(self, http_server):
+        """Closing a response with a small unread body keeps the connection"""
+        base_url, _ = http_server
+        pool = ConnectionPool()
+
+        res = pool.request("GET", f"{base_url}/hello")
+        res.close()
+        assert pool.stats()["idle"] == 1
+        pool.close()
+
+    def test_idle_connections_evicted(self, http_server):
+        """Idle connections older than idle_timeout are closed"""
+        base_url, _ = http_server
+        pool = ConnectionPool(idle_timeout=0.01)
+
+        pool.request("GET", f"{base_url}/hello").read()
+        time.sleep(0.05)
+        pool.evict_idle()
+
+        stats = pool.stats()
+        assert stats["idle"] == 0
+        assert stats["evicted_idle"] == 1
+
+    def test_idle_size_bound(self, http_server):
+        """The pool never keeps more idle connections than allowed per host"""
+        base_url, _ = http_server
+        pool = ConnectionPool(max_idle_per_host=1)
+
+        responses = [pool.request("GET", f"{base_url}/hello") for _ in range(3)]
+        for res in responses:
+            res.read()
+
+        stats = pool.stats()
+        assert stats["idle"] == 1
+        assert stats["evicted_overflow"] == 2
+        pool.close()
+
+
+class TestPooledRequestHandler:
+    """Test the yt-dlp request handler backed by the pool"""
+
+    @pytest.fixture
+    def ydl(self, monkeypatch):
+        """YoutubeDL whose pooled handler uses a private pool"""
+        yt_dlp = pytest.importorskip("yt_dlp")
+        from simple_yt_dlp.download import network
+
+        pool = ConnectionPool()
+        monkeypatch.setattr(network, "get_shared_pool", lambda: pool)
+        network.install_pooled_handler()
+        with yt_dlp.YoutubeDL({"quiet": True, "proxy": ""}) as ydl:
+            ydl.pool = pool
+            yield ydl
+        pool.close()
+
+    def test_requests_go_through_pool(self, ydl, http_server):
+        """yt-dlp requests reuse pooled connections"""
+        base_url, _ = http_server
+        assert ydl.urlopen(f"{base_url}/hello").read() == b"hello world"
+        assert ydl.urlopen(f"{base_url}/hello").read() == b"hello world"
+        assert ydl.pool.stats()["reused"] == 1
+
+    def test_redirect_and_cookies(self, ydl, http_server):
+        """Redirects are followed and cookies stored in the YoutubeDL jar"""
+        base_url, _ = http_server
+        assert ydl.urlopen(f"{base_url}/redirect").read() == b"hello world"
+        assert ydl.urlopen(f"{base_url}/cookie").read() == b"seen=1"
+
+    def test_gzip_decoding(self, ydl, http_server):
+        """Compressed bodies are decoded"""
+        base_url, _ = http_server
+        assert ydl.urlopen(f"{base_url}/gzip").read() == b"compressed body"
+
+    def test_http_error(self, ydl, http_server):
+        """Non-2xx responses raise yt-dlp's HTTPError"""
+        from yt_dlp.networking.exceptions import HTTPError
+
+        base_url, _ = http_server
+        with pytest.raises(HTTPError) as exc_info:
+            ydl.urlopen(f"{base_url}/forbidden")
+        assert exc_info.value.status == 403
+
+    def test_impersonation_left_to_other_handlers(self):
+        """Requests asking for impersonation get no preference from the pool"""
+        from yt_dlp.networking import Request
+
+        from simple_yt_dlp.download.network import pooled_preference
+
+        assert pooled_preference(None, Request("https://example.com")) > 100
+        request = Request("https://example.com", extensions={"impersonate": "chrome"})
+        assert pooled_preference(None, request) == 0
+
+    def test_missing_private_api_falls_back(self, monkeypatch, caplog):
+        """Without yt-dlp's internal modules the stock handlers are kept"""
+        from simple_yt_dlp.download import network
+
+        registered = []
+        monkeypatch.setattr(network, "_installed", False)
+        monkeypatch.setattr(network, "_private_api_error", ImportError("no _helper"))
+        monkeypatch.setattr(network, "register_rh", registered.append)
+        network.install_pooled_handler()
+        assert registered == [] and "no _helper" in caplog.text
@@ -0,0 +1,151 @@
+"""
+Test speculative pre-extraction and the extraction result cache
+"""
+import threading
+import time
+
+from simple_yt_dlp.download.core import DownloadCore, extract_pinned
+from simple_yt_dlp.download.prefetch import InfoCache, Prefetcher
+from simple_yt_dlp.download.ydl import SimpleYoutubeDL
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+RAW_INFO = {
+    "id": "dQw4w9WgXcQ",
+    "title": "Clip",
+    "extractor": "youtube",
+    "extractor_key": "Youtube",
+    "webpage_url": URL,
+    "formats": [
+        {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none",
+         "filesize": 3_000_000, "url": "https://example.com/140"},
+        {"format_id": "136", "ext": "mp4", "acodec": "none", "vcodec": "avc1",
+         "height": 720, "filesize": 20_000_000, "url": "https://example.com/136"},
+    ],
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestInfoCache:
+    """Test expiry and waiting for in-flight extractions"""
+
+    def test_ttl_and_eviction(self):
+        """Entries expire after the TTL; the oldest entry is evicted first"""
+        clock = FakeClock()
+        cache = InfoCache(ttl=10, max_entries=2, clock=clock)
+        cache.put(URL, {"id": "a"})
+        assert cache.get(" " + URL + " ") == {"id": "a"}
+
+        clock.now = 11
+        assert cache.get(URL) is None
+
+        for name in ("a", "b", "c"):
+            cache.put(name, {"id": name})
+        assert cache.get("a") is None
+        assert cache.get("c") == {"id": "c"}
+
+    def test_waits_for_pending_extraction(self):
+        """A download starting mid-prefetch waits instead of extracting again"""
+        cache = InfoCache()
+        assert cache.begin(URL)
+        assert not cache.begin(URL)
+        threading.Timer(0.1, cache.put, args=(URL, {"id": "x"})).start()
+        assert cache.get(URL, wait=5) == {"id": "x"}
+
+        assert cache.begin("other")
+        cache.abandon("other")
+        assert cache.get("other", wait=5) is None
+        assert cache.begin("other")
+
+
+class TestPrefetcher:
+    """Test debouncing and result delivery"""
+
+    def test_only_last_url_is_extracted(self):
+        """Rapid edits collapse into one extraction of the final URL"""
+        extracted = []
+        ready = threading.Event()
+        results = []
+        prefetcher = Prefetcher(lambda url: extracted.append(url) or {"url": url},
+                                InfoCache(), delay=0.05)
+
+        for i in range(5):
+            prefetcher.schedule(f"{URL}&t={i}", lambda url, info: (results.append(url),
+                                                                    ready.set()))
+        assert ready.wait(2)
+        assert extracted == [f"{URL}&t=4"]
+        assert results == [f"{URL}&t=4"]
+
+    def test_cached_url_is_not_extracted_again(self):
+        """Rescheduling a cached URL only re-delivers the result"""
+        cache = InfoCache()
+        cache.put(URL, {"id": "cached"})
+        ready = threading.Event()
+        prefetcher = Prefetcher(lambda url: 1 / 0, cache, delay=0.01)
+        prefetcher.schedule(URL, lambda url, info: ready.set())
+        assert ready.wait(2)
+
+    def test_failure_and_cancel(self):
+        """Failed extractions are not cached; cancelled ones never start"""
+        cache = InfoCache()
+        calls = []
+
+        def extract(url):
+            calls.append(url)
+            raise RuntimeError("offline")
+
+        prefetcher = Prefetcher(extract, cache, delay=0.01)
+        prefetcher.schedule(URL)
+        deadline = time.monotonic() + 2
+        while not calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get(URL, wait=2) is None
+
+        prefetcher = Prefetcher(extract, cache, delay=0.2)
+        prefetcher.schedule("never")
+        prefetcher.cancel()
+        time.sleep(0.3)
+        assert "never" not in calls
+
+
+def test_preview_uses_cached_info(tmp_path):
+    """Title and download size come from the cached info without network access"""
+    core = DownloadCore(tmp_path, use_connection_pool=False, info_cache=InfoCache())
+    title, size = core.preview(RAW_INFO, "mp4_720p")
+    assert title == "Clip"
+    assert size == 23_000_000
+
+    title, size = core.preview(RAW_INFO, "mp3")
+    assert size == 3_000_000
+    # The cached result is left untouched for the real download
+    assert "requested_formats" not in RAW_INFO
+    assert len(RAW_INFO["formats"]) == 2
+
+
+def test_video_urls_go_straight_to_the_youtube_extractor(tmp_path):
+    """Extraction skips extractor matching and only the YouTube family is registered"""
+    calls = []
+
+    class FakeYDL:
+        def extract_info(self, url, download=True, process=True, ie_key=None):
+            calls.append((url, ie_key))
+            return RAW_INFO
+
+    extract_pinned(FakeYDL(), "https://youtu.be/dQw4w9WgXcQ?si=x")
+    extract_pinned(FakeYDL(), "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL0123456789ab")
+    extract_pinned(FakeYDL(), "https://www.youtube.com/playlist?list=PL0123456789ab")
+    watch = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    assert calls == [(watch, "Youtube"), (watch, "Youtube"),
+                     ("https://www.youtube.com/playlist?list=PL0123456789ab", None)]
+
+    core = DownloadCore(tmp_path, use_connection_pool=False, info_cache=InfoCache())
+    with SimpleYoutubeDL(core.build_ydl_opts("mp3")) as ydl:
+        assert "Youtube" in ydl._ies and "YoutubeTab" in ydl._ies
+        assert all(key.startswith("Youtube") for key in ydl._ies)
@@ -0,0 +1,119 @@
+"""
+Test the pre-started worker process pool
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from simple_yt_dlp.download.cancel import CancelToken
+from simple_yt_dlp.download.jobs import CANCELLED, DONE, FAILED, JobManager
+from simple_yt_dlp.download.process_pool import ProcessPool
+
+from .test_daemon import URL, wait_for
+
+logger = logging.getLogger("simple_yt_dlp.tests.pool")
+
+
+class ProcessFakeCore:
+    """Picklable stand-in for DownloadCore that reports which process ran it"""
+
+    def __init__(self, download_dir: Path):
+        self.download_dir = download_dir
+        self.warm_pid = None
+
+    def warm_up(self):
+        self.warm_pid = os.getpid()
+
+    async def download(self, url, format_id, info_callback=None, cancel_token=None,
+                       progress_callback=None):
+        info_callback(f"warm {self.warm_pid}")
+        logger.info("from the worker")
+        if url.endswith("crash"):
+            os._exit(3)
+        if url.endswith("slow"):
+            cancel_token.wait(5)
+            return False, "", "Download cancelled"
+        progress_callback({"status": "finished", "downloaded_bytes": 10, "info_dict": {}})
+        return True, f"pid {os.getpid()}", None
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ProcessPool(ProcessFakeCore(tmp_path), processes=2)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_in_warm_worker_processes(pool, tmp_path):
+    """Jobs run outside this process, in workers that warmed up before the job"""
+    messages, progress = [], []
+    success, title, error = pool.run(URL, ["mp3"], tmp_path / "out", CancelToken(),
+                                     messages.append, progress.append)
+
+    assert success and error is None
+    worker_pid = int(title.split()[1])
+    assert worker_pid != os.getpid()
+    assert messages == [f"warm {worker_pid}"]
+    assert progress == [{"status": "finished", "downloaded_bytes": 10}]
+    assert (tmp_path / "out").is_dir()
+
+
+def test_crash_fails_only_that_job_and_restarts(pool, tmp_path):
+    """A worker that dies mid-job fails the job and is replaced"""
+    success, _, error = pool.run(URL + "crash", ["mp3"], tmp_path, CancelToken())
+    assert not success and "exit code 3" in error
+    assert pool.restarts == 1
+
+    results = [pool.run(URL, ["mp3"], tmp_path, CancelToken()) for _ in range(3)]
+    assert all(success for success, _, _ in results)
+
+
+def test_cancel_reaches_the_worker(pool, tmp_path):
+    """Cancelling the parent's token stops the job inside the worker"""
+    token = CancelToken()
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(pool.run(URL + "slow", ["mp3"], tmp_path, token))
+    )
+    thread.start()
+    threading.Timer(0.3, token.cancel).start()
+    thread.join(4)
+    assert result == [(False, "", "Download cancelled")]
+
+
+def test_worker_logs_reach_the_parent(pool, tmp_path):
+    """Worker log records are re-emitted in the parent"""
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logging.getLogger("simple_yt_dlp").addHandler(handler)
+    try:
+        pool.run(URL, ["mp3"], tmp_path, CancelToken())
+        wait_for(lambda: any(r.getMessage() == "from the worker" for r in records))
+    finally:
+        logging.getLogger("simple_yt_dlp").removeHandler(handler)
+    record = next(r for r in records if r.getMessage() == "from the worker")
+    assert record.process != os.getpid()
+
+
+def test_job_manager_with_processes(tmp_path):
+    """JobManager can execute its jobs in the process pool"""
+    manager = JobManager(ProcessFakeCore(tmp_path), max_concurrent=1, processes=True)
+    manager.start()
+    try:
+        done = manager.submit(URL, "mp3")
+        crashed = manager.submit(URL + "crash", "mp3")
+        slow = manager.submit(URL + "slow", "mp3")
+        wait_for(lambda: slow.state == "running", timeout=10)
+        manager.cancel(slow.id)
+        wait_for(lambda: slow.finished, timeout=5)
+    finally:
+        manager.shutdown()
+
+    assert done.state == DONE and done.progress["downloaded_bytes"] == 10
+    assert crashed.state == FAILED and "crashed" in crashed.error
+    assert slow.state == CANCELLED
@@ -0,0 +1,155 @@
+"""
+Test deadline- and budget-driven automatic quality selection
+"""
+from datetime import datetime
+
+import pytest
+
+from simple_yt_dlp.download.jobs import DONE, FAILED, JobManager, parse_formats
+from simple_yt_dlp.download.quality import (
+    AUTO,
+    QualityPlanner,
+    ThroughputMeter,
+    parse_deadline,
+    parse_size,
+)
+
+from .test_daemon import URL, FakeCore, wait_for
+
+MB = 1024 * 1024
+
+SIZES = {
+    "mp4_best": 900 * MB,
+    "mp4_1080p": 400 * MB,
+    "mp4_720p": 200 * MB,
+    "mp4_480p": 90 * MB,
+    "mp4_360p": 50 * MB,
+}
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def feed(meter, clock, rate, seconds, job=1):
+    """Report progress at a steady rate for a while"""
+    downloaded = meter._streams.get((job, "f"), 0)
+    for _ in range(int(seconds)):
+        clock.now += 1
+        downloaded += int(rate)
+        meter.observe(job, "f", downloaded)
+
+
+class TestParsing:
+    """Test the CLI value parsers"""
+
+    def test_sizes(self):
+        assert parse_size("500M") == 500 * MB
+        assert parse_size("1.5GB") == int(1.5 * 1024 * MB)
+        assert parse_size("20g") == 20 * 1024 * MB
+        assert parse_size("4096") == 4096
+        with pytest.raises(ValueError):
+            parse_size("lots")
+
+    def test_deadlines(self):
+        now = datetime(2026, 10, 19, 22, 0)
+        assert parse_deadline("90m", now) == now.timestamp() + 5400
+        assert parse_deadline("1h30m", now) == now.timestamp() + 5400
+        assert parse_deadline("23:30", now) == datetime(2026, 10, 19, 23, 30).timestamp()
+        assert parse_deadline("06:00", now) == datetime(2026, 10, 20, 6, 0).timestamp()
+        for text in ("soon", "2x", "25:00"):
+            with pytest.raises(ValueError):
+                parse_deadline(text, now)
+
+
+class TestPlanner:
+    """Test tier selection against budgets and deadlines"""
+
+    def test_unconstrained_picks_best(self):
+        assert QualityPlanner().choose(SIZES).format_id == "mp4_best"
+
+    def test_budget_is_shared_by_pending_jobs(self):
+        planner = QualityPlanner(budget=1000 * MB)
+        first = planner.choose(SIZES, pending=4)
+        assert first.format_id == "mp4_720p"  # 250 MB each
+
+        # The running job holds its planned size until it finishes
+        assert planner.choose(SIZES, pending=3).format_id == "mp4_720p"
+        planner.finish(first, downloaded=100 * MB)
+        assert planner.allowance(pending=2)[0] == (1000 - 100 - 200) * MB / 2
+
+    def test_nothing_fits_picks_smallest(self):
+        planner = QualityPlanner(budget=10 * MB)
+        sizes = dict(SIZES, mp4_360p=None)
+        assert planner.choose(sizes).format_id == "mp4_480p"
+
+    def test_replans_when_throughput_drops(self):
+        clock, wall = Clock(), Clock(1000.0)
+        meter = ThroughputMeter(clock=clock)
+        planner = QualityPlanner(deadline=1000.0 + 600, meter=meter, clock=wall)
+
+        feed(meter, clock, 2 * MB, 10)
+        assert meter.rate() == pytest.approx(2 * MB)
+        # 2 MB/s * 0.8 * 600 s = 960 MB for two jobs
+        first = planner.choose(SIZES, pending=2)
+        assert first.format_id == "mp4_1080p"
+        planner.finish(first, 400 * MB)
+
+        feed(meter, clock, 256 * 1024, 30)
+        wall.now += 300
+        assert meter.rate() == pytest.approx(256 * 1024)
+        assert planner.choose(SIZES, pending=1).format_id == "mp4_360p"
+
+    def test_meter_keeps_last_rate_while_idle(self):
+        clock = Clock()
+        meter = ThroughputMeter(clock=clock)
+        assert meter.rate() is None
+        feed(meter, clock, MB, 5)
+        meter.observe(2, "g", 3 * MB)
+        clock.now += 120
+        assert meter.rate() is not None
+        assert meter.finish(1) == 5 * MB and meter.finish(1) == 0
+
+
+class PlanningFakeCore(FakeCore):
+    """FakeCore that records the format it was asked for"""
+
+    def __init__(self, download_dir):
+        super().__init__(download_dir)
+        self.formats = []
+
+    def estimate_sizes(self, url, format_ids):
+        if url.endswith("gone"):
+            raise RuntimeError("Video unavailable")
+        return {f: SIZES[f] for f in format_ids}
+
+    async def download(self, url, format_id, **kwargs):
+        self.formats.append(format_id)
+        return await super().download(url, format_id, **kwargs)
+
+
+def test_job_manager_resolves_auto_jobs(tmp_path):
+    """'auto' jobs are planned when they start, sharing the daemon's budget"""
+    core = PlanningFakeCore(tmp_path)
+    manager = JobManager(core, max_concurrent=1, planner=QualityPlanner(budget=1000 * MB))
+    # Queue all three before the worker starts, so the first plan sees the other two
+    jobs = [manager.submit(URL, AUTO) for _ in range(2)]
+    gone = manager.submit(URL + "gone", "auto")
+    manager.start()
+    try:
+        wait_for(lambda: all(job.finished for job in jobs + [gone]))
+    finally:
+        manager.shutdown()
+
+    # 1000 MB over 3 queued auto jobs, then what is left (the fake moves 100 bytes) over 2
+    assert core.formats == ["mp4_720p", "mp4_1080p"]
+    assert [job.state for job in jobs] == [DONE, DONE]
+    assert jobs[0].to_dict()["format"] == "mp4_720p"
+    assert gone.state == FAILED and gone.error == "Video unavailable"
+
+    with pytest.raises(ValueError):
+        parse_formats("auto,mp3")
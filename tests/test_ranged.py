@@ -0,0 +1,129 @@
+"""
+Test the multi-connection ranged downloader against a local HTTP server
+"""
+import time
+
+import pytest
+
+from simple_yt_dlp.download.pool import ConnectionPool
+from simple_yt_dlp.download.ranged import RangedDownloader, RangedDownloadError
+
+KIB = 1024
+
+
+@pytest.fixture
+def pool():
+    """Private connection pool per test"""
+    pool = ConnectionPool()
+    yield pool
+    pool.close()
+
+
+class TestRangedDownloader:
+    """Test splitting, reassembly and rebalancing"""
+
+    def test_probe(self, http_server, pool):
+        """Size and range support are detected with a one-byte request"""
+        base_url, server = http_server
+        downloader = RangedDownloader(pool=pool)
+        assert downloader.probe(f"{base_url}/data") == (len(server.payload), True)
+        assert downloader.probe(f"{base_url}/norange") == (len(server.payload), False)
+
+    def test_parallel_download(self, http_server, pool, tmp_path):
+        """Ranges are fetched in parallel and written at the right offsets"""
+        base_url, server = http_server
+        dest = tmp_path / "out.bin"
+        progress = []
+
+        downloader = RangedDownloader(
+            connections=4, pool=pool, min_split_size=256 * KIB,
+            progress_callback=lambda done, total: progress.append((done, total)),
+        )
+        size = downloader.download(f"{base_url}/data", dest)
+
+        assert size == len(server.payload)
+        assert dest.read_bytes() == server.payload
+        assert len({start for start, _ in server.ranges}) >= 4
+        assert progress[-1] == (len(server.payload), len(server.payload))
+
+    def test_max_request_size(self, http_server, pool, tmp_path):
+        """Each request asks for at most max_request_size bytes"""
+        base_url, server = http_server
+        dest = tmp_path / "out.bin"
+
+        RangedDownloader(
+            connections=2, pool=pool, max_request_size=512 * KIB, min_split_size=256 * KIB,
+        ).download(f"{base_url}/data", dest)
+
+        assert dest.read_bytes() == server.payload
+        real_ranges = [(s, e) for s, e in server.ranges if e > s]
+        assert all(e - s + 1 <= 512 * KIB for s, e in real_ranges)
+        assert pool.stats()["reused"] > 0
+
+    def test_stalled_range_is_rebalanced(self, http_server, pool, tmp_path):
+        """A stalled range is stolen by idle workers and retried"""
+        base_url, server = http_server
+        dest = tmp_path / "out.bin"
+
+        RangedDownloader(
+            connections=2, pool=pool, min_split_size=128 * KIB,
+            stall_timeout=0.1, timeout=0.5,
+        ).download(f"{base_url}/stall", dest)
+
+        assert server.stalled
+        assert dest.read_bytes() == server.payload
+
+    def test_stalled_request_is_interrupted(self, http_server, pool, tmp_path):
+        """The watchdog cuts a stalled request long before the socket timeout"""
+        base_url, server = http_server
+        dest = tmp_path / "out.bin"
+
+        start = time.monotonic()
+        RangedDownloader(
+            connections=2, pool=pool, min_split_size=128 * KIB,
+            stall_timeout=0.1, timeout=10,
+        ).download(f"{base_url}/stall", dest)
+
+        # The server holds the stalled connection for a full second
+        assert server.stalled and time.monotonic() - start < 0.8
+        assert dest.read_bytes() == server.payload
+
+    def test_fallback_without_range_support(self, http_server, pool, tmp_path):
+        """Servers that ignore Range are downloaded over a single stream"""
+        base_url, server = http_server
+        dest = tmp_path / "out.bin"
+
+        RangedDownloader(connections=4, pool=pool).download(f"{base_url}/norange", dest)
+        assert dest.read_bytes() == server.payload
+
+    def test_http_error(self, http_server, pool, tmp_path):
+        """HTTP errors abort the download"""
+        base_url, _ = http_server
+        with pytest.raises(RangedDownloadError):
+            RangedDownloader(pool=pool).download(f"{base_url}/forbidden", tmp_path / "x")
+
+
+class TestRangedFD:
+    """Test the yt-dlp integration"""
+
+    def test_dl_uses_ranged_downloader(self, http_server, tmp_path):
+        """SimpleYoutubeDL routes plain http formats through RangedFD"""
+        pytest.importorskip("yt_dlp")
+        from simple_yt_dlp.download.ydl import SimpleYoutubeDL
+
+        base_url, server = http_server
+        statuses = []
+        dest = tmp_path / "video.mp4"
+        info = {
+            "id": "test", "url": f"{base_url}/data", "ext": "mp4",
+            "protocol": "http", "http_headers": {},
+        }
+        with SimpleYoutubeDL({
+            "quiet": True, "progress_hooks": [lambda d: statuses.append(d["status"])],
+        }) as ydl:
+            success, _ = ydl.dl(str(dest), info)
+
+        assert success
+        assert dest.read_bytes() == server.payload
+        assert statuses[-1] == "finished"
+        assert len({start for start, _ in server.ranges}) > 1
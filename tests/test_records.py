@@ -0,0 +1,79 @@
+"""
+Test compact video records and info slimming
+"""
+import pytest
+
+from simple_yt_dlp.download.records import (
+    VideoRecord,
+    selected_format_ids,
+    slim_info,
+)
+from simple_yt_dlp.download.ydl import SimpleYoutubeDL
+
+MB = 1024 * 1024
+
+
+def raw_info() -> dict:
+    return {
+        "id": "dQw4w9WgXcQ",
+        "title": "Clip",
+        "duration": 212,
+        "extractor": "youtube",
+        "extractor_key": "Youtube",
+        "webpage_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "description": "x" * 5000,
+        "thumbnails": [{"url": f"https://i.ytimg.com/{n}.jpg"} for n in range(40)],
+        "automatic_captions": {"en": [{"ext": "vtt", "url": "https://example.com/vtt"}]},
+        "formats": [
+            {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none",
+             "abr": 128, "filesize": 3 * MB, "url": "https://example.com/140"},
+            {"format_id": "251", "ext": "webm", "acodec": "opus", "vcodec": "none",
+             "abr": 160, "filesize": 4 * MB, "url": "https://example.com/251"},
+            {"format_id": "18", "ext": "mp4", "acodec": "mp4a.40.2", "vcodec": "avc1",
+             "height": 360, "filesize": 9 * MB, "url": "https://example.com/18"},
+            {"format_id": "136", "ext": "mp4", "acodec": "none", "vcodec": "avc1",
+             "height": 720, "filesize": 20 * MB, "url": "https://example.com/136"},
+            {"format_id": "137", "ext": "mp4", "acodec": "none", "vcodec": "avc1",
+             "height": 1080, "filesize_approx": 40 * MB, "url": "https://example.com/137"},
+        ],
+    }
+
+
+def process(raw: dict, spec: str) -> dict:
+    with SimpleYoutubeDL({"quiet": True, "no_warnings": True, "format": spec}) as ydl:
+        return ydl.process_extracted(raw)
+
+
+@pytest.mark.parametrize("spec", [
+    "bestvideo[height<=720]+bestaudio/best[height<=720]",
+    "bestvideo+bestaudio/best",
+    "bestaudio/best",
+    "best[height<=360]",
+])
+def test_slim_info_keeps_the_same_selection(spec):
+    """Re-selecting on the slimmed info picks exactly the same streams"""
+    raw = raw_info()
+    info = process(raw, spec)
+    slim = slim_info(raw, selected_format_ids(info))
+
+    assert len(slim["formats"]) < len(raw["formats"])
+    assert "thumbnails" not in slim and "automatic_captions" not in slim
+    assert slim["title"] == raw["title"]
+    assert len(raw["formats"]) == 5, "source must not be modified"
+    assert selected_format_ids(process(slim, spec)) == selected_format_ids(info)
+
+
+def test_video_record():
+    """Records keep only what the app uses and have no per-instance dict"""
+    info = process(raw_info(), "bestvideo+bestaudio/best")
+    record = VideoRecord.from_info(info, "mp4_best")
+
+    assert (record.id, record.title, record.duration) == ("dQw4w9WgXcQ", "Clip", 212)
+    assert record.stream_ids == ["137", "251"]
+    assert record.size == 44 * MB
+    assert record.to_dict()["streams"] == ["137", "251"]
+    assert not hasattr(record, "__dict__")
+    assert not hasattr(record.streams[0], "__dict__")
+
+    record.streams[0].size = None
+    assert record.size is None
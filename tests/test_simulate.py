@@ -0,0 +1,94 @@
+"""
+Test the network-free simulation backend under DownloadCore
+"""
+import asyncio
+import hashlib
+import threading
+import time
+
+import pytest
+
+from simple_yt_dlp.download import DownloadCore
+from simple_yt_dlp.download.cancel import CancelToken
+from simple_yt_dlp.download.jobs import DONE, JobManager
+from simple_yt_dlp.download.prefetch import InfoCache
+from simple_yt_dlp.download.simulate import SimulatedBackend, SimulationProfile
+
+from .test_daemon import URL, wait_for
+
+FAST = "rate=20M-40M,403=0,stall=0,extract=0.01,size=0.001,tick=0.01"
+
+
+def simulated_core(tmp_path, spec=FAST):
+    backend = SimulatedBackend(SimulationProfile.parse(spec))
+    return DownloadCore(tmp_path, use_connection_pool=False, info_cache=InfoCache(),
+                        backend=backend)
+
+
+def run(core, format_id="mp3", url=URL, **kwargs):
+    events = []
+    result = asyncio.run(core.download(url, format_id, progress_callback=events.append, **kwargs))
+    return result, events
+
+
+def test_parse_profile():
+    profile = SimulationProfile.parse("seed=7, rate=1M-8M, link=200M, 403=0.1, size=0.01")
+    assert (profile.seed, profile.min_rate, profile.max_rate) == (7, 1 << 20, 8 << 20)
+    assert (profile.link, profile.forbidden, profile.size_scale) == (200 << 20, 0.1, 0.01)
+    for spec in ("speed=2", "rate", "rate=8M-1M"):
+        with pytest.raises(ValueError):
+            SimulationProfile.parse(spec)
+
+
+def test_download_writes_a_synthetic_file(tmp_path):
+    """Progress hooks, checksum and verification behave as for a real download"""
+    (ok, title, error), events = run(simulated_core(tmp_path), "mp4_720p")
+    assert ok and error is None and title.startswith("Simulated video")
+
+    statuses = [e["status"] for e in events]
+    assert statuses[0] == "downloading" and statuses[-2:] == ["finished", "verified"]
+    verified = events[-1]
+    path = tmp_path / verified["filename"].split("/")[-1]
+    assert verified["checksum"] == "sha256:" + hashlib.sha256(path.read_bytes()).hexdigest()
+    # Same seed, same video: same formats and sizes
+    backend = SimulatedBackend(SimulationProfile.parse(FAST))
+    assert backend.video_info(URL) == SimulatedBackend(backend.profile).video_info(URL)
+    assert verified["size"] == 2500 * 125 * backend.video_info(URL)["duration"] // 1000
+
+
+def test_forbidden_goes_through_the_retry_path(tmp_path, monkeypatch):
+    """A 403 mid-transfer is retried once with a fresh extraction, then reported"""
+    cached = tmp_path / "cache" / "yt-dlp" / "youtube-nsig" / "aaaa1111-main-js.json"
+    cached.parent.mkdir(parents=True)
+    cached.write_text("{}")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    (tmp_path / "out").mkdir()
+    core = simulated_core(tmp_path / "out", FAST.replace("403=0", "403=1"))
+    (ok, _, error), events = run(core)
+    assert not ok and "403" in error
+    assert [e["attempt"] for e in events if e["status"] == "retrying"] == [1]
+    # 模拟的 403 不清理真实的 yt-dlp 缓存
+    assert cached.is_file()
+
+
+def test_stall_pauses_progress_and_can_be_cancelled(tmp_path):
+    core = simulated_core(tmp_path, FAST.replace("stall=0", "stall=1,stall-time=30"))
+    token = CancelToken()
+    threading.Timer(0.5, token.cancel).start()
+    started = time.monotonic()
+    (ok, _, error), events = run(core, cancel_token=token)
+    assert not ok and error == "Download cancelled"
+    assert time.monotonic() - started < 5
+    assert events and events[-1]["status"] == "downloading"
+
+
+def test_many_concurrent_jobs(tmp_path):
+    """The queue runs a large batch of simulated jobs side by side"""
+    manager = JobManager(simulated_core(tmp_path), max_concurrent=50)
+    manager.start()
+    try:
+        jobs = [manager.submit(f"https://youtu.be/sim{n:08d}", "mp3") for n in range(100)]
+        wait_for(lambda: all(job.finished for job in jobs), timeout=30)
+    finally:
+        manager.shutdown()
+    assert all(job.state == DONE for job in jobs)
@@ -0,0 +1,160 @@
+"""
+Test the staging directory for in-flight files
+"""
+import asyncio
+import errno
+import hashlib
+import os
+import threading
+
+import pytest
+
+from simple_yt_dlp.download import DownloadCore, staging
+from simple_yt_dlp.download.cancel import CancelToken
+from simple_yt_dlp.download.fanout import Target
+from simple_yt_dlp.download.prefetch import InfoCache
+from simple_yt_dlp.download.simulate import SimulatedBackend, SimulationProfile
+from simple_yt_dlp.download.staging import move_into_place
+
+from .test_daemon import URL
+from .test_simulate import FAST
+
+
+def test_download_runs_in_staging_and_lands_in_download_dir(tmp_path):
+    """Only the finished output reaches the download directory"""
+    download_dir, staging_dir = tmp_path / "nas", tmp_path / "ssd"
+    download_dir.mkdir()
+    core = DownloadCore(download_dir, use_connection_pool=False, info_cache=InfoCache(),
+                        backend=SimulatedBackend(SimulationProfile.parse(FAST)),
+                        staging_dir=staging_dir, staging_limit=1 << 30)
+    seen = []
+
+    def on_progress(d):
+        for key in ("tmpfilename", "filename"):
+            if d.get(key):
+                seen.append(d[key])
+
+    ok, _, error = asyncio.run(core.download(URL, "mp4_720p", progress_callback=on_progress))
+    assert ok, error
+
+    assert all(path.startswith(str(staging_dir)) for path in seen[:-1])
+    outputs = list(download_dir.iterdir())
+    assert len(outputs) == 1 and seen[-1] == str(outputs[0])
+    assert list(staging_dir.iterdir()) == []
+
+
+def test_cross_filesystem_move_is_atomic_and_hashed(tmp_path, monkeypatch):
+    """Without a shared filesystem the file is copied under a hidden name, then renamed"""
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if str(src).endswith("staged.mp4"):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(staging.os, "replace", replace)
+    src = tmp_path / "staged.mp4"
+    src.write_bytes(os.urandom(5 * 1024 * 1024 + 3))
+    expected = hashlib.sha256(src.read_bytes()).hexdigest()
+    dst = tmp_path / "out" / "final.mp4"
+    dst.parent.mkdir()
+
+    assert move_into_place(src, dst, "sha256") == f"sha256:{expected}"
+    assert not src.exists() and os.listdir(dst.parent) == ["final.mp4"]
+    assert hashlib.sha256(dst.read_bytes()).hexdigest() == expected
+    # Same filesystem: a plain rename, nothing to hash
+    assert move_into_place(dst, tmp_path / "renamed.mp4", "sha256") is None
+
+
+def test_existing_output_is_not_replaced(tmp_path):
+    """A file already in the download directory is kept, as yt-dlp would without staging"""
+    download_dir, staging_dir = tmp_path / "nas", tmp_path / "ssd"
+    download_dir.mkdir()
+    core = DownloadCore(download_dir, use_connection_pool=False, info_cache=InfoCache(),
+                        backend=SimulatedBackend(SimulationProfile.parse(FAST)),
+                        staging_dir=staging_dir)
+    ok, _, error = asyncio.run(core.download(URL, "mp4_720p"))
+    assert ok, error
+    [output] = download_dir.iterdir()
+    before = output.stat()
+
+    events = []
+    ok, _, error = asyncio.run(core.download(URL, "mp4_720p", progress_callback=events.append))
+    assert ok, error
+    after = output.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert not any(e.get("status") == "downloading" for e in events)
+
+
+@pytest.mark.parametrize("staged", [True, False])
+def test_fanout_keeps_existing_outputs(tmp_path, staged):
+    """Fan-out targets whose output already exists are skipped, not regenerated over"""
+    download_dir = tmp_path / "nas"
+    download_dir.mkdir()
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text("#!/bin/sh\nexit 1\n")
+    ffmpeg.chmod(0o755)
+    backend = SimulatedBackend(SimulationProfile.parse(FAST))
+    core = DownloadCore(download_dir, use_connection_pool=False, info_cache=InfoCache(),
+                        backend=backend, ffmpeg_location=str(ffmpeg),
+                        staging_dir=tmp_path / "ssd" if staged else None)
+    with core._new_ydl(core.build_ydl_opts("mp3")) as ydl:
+        targets = [Target("mp3", []), Target("m4a", [])]
+        outputs = core._fanout_outputs(ydl, backend.video_info(URL), targets)
+    for path in outputs.values():
+        path.write_bytes(b"kept")
+
+    events = []
+    ok, _, error = asyncio.run(
+        core.download_formats(URL, ["mp3", "m4a"], progress_callback=events.append)
+    )
+    assert ok, error
+    assert all(path.read_bytes() == b"kept" for path in outputs.values())
+    assert not any(e.get("status") == "downloading" for e in events)
+
+
+def test_cancelled_fanout_keeps_partials_for_the_next_job(tmp_path):
+    """Without a staging directory, kept fan-out partials sit in a workdir keyed like staging"""
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text("#!/bin/sh\nexit 1\n")
+    ffmpeg.chmod(0o755)
+    download_dir = tmp_path / "out"
+    download_dir.mkdir()
+    spec = FAST.replace("stall=0", "stall=1,stall-time=30")
+    core = DownloadCore(download_dir, use_connection_pool=False, info_cache=InfoCache(),
+                        backend=SimulatedBackend(SimulationProfile.parse(spec)),
+                        ffmpeg_location=str(ffmpeg), keep_partial_files=True)
+    token = CancelToken()
+    threading.Timer(0.5, token.cancel).start()
+    ok, _, error = asyncio.run(core.download_formats(URL, ["mp3", "m4a"], cancel_token=token))
+    assert not ok and error == "Download cancelled"
+
+    key = hashlib.sha1(f"{URL}\nmp3,m4a".encode()).hexdigest()[:16]
+    [workdir] = download_dir.iterdir()
+    assert workdir.name == f".fanout-{key}"
+    assert any(p.name.endswith(".part") for p in workdir.iterdir())
+
+
+def test_workdir_is_stable_per_key(tmp_path):
+    """Partial files kept after a cancel are found again by the next attempt"""
+    workdir = staging.make_workdir(tmp_path, "url\nmp3")
+    (workdir.path / "video.webm.part").write_bytes(b"partial")
+    workdir.release(keep=True)
+    again = staging.make_workdir(tmp_path, "url\nmp3")
+    assert again.path == workdir.path and (again.path / "video.webm.part").exists()
+    assert staging.make_workdir(tmp_path, "url\nflac").path != workdir.path
+    assert staging.make_workdir(tmp_path).path != staging.make_workdir(tmp_path).path
+
+
+@pytest.mark.skipif(os.name != "posix", reason="needs flock")
+def test_concurrent_jobs_get_their_own_workdir(tmp_path):
+    """A second job for the same URL and format never shares (or deletes) the first one's files"""
+    first = staging.make_workdir(tmp_path, "url\nmp3")
+    (first.path / "video.webm.part").write_bytes(b"partial")
+    second = staging.make_workdir(tmp_path, "url\nmp3")
+    assert second.path != first.path
+    second.release()
+    assert (first.path / "video.webm.part").exists()
+    first.release()
+    assert not first.path.exists()
+    assert staging.make_workdir(tmp_path, "url\nmp3").path == first.path
@@ -0,0 +1,101 @@
+"""
+Test the content-addressed dedup store
+"""
+import asyncio
+import errno
+import os
+
+import pytest
+
+from simple_yt_dlp.download import DownloadCore
+from simple_yt_dlp.download import store as store_module
+from simple_yt_dlp.download.integrity import file_digest
+from simple_yt_dlp.download.store import COPY, HARDLINK, REFLINK, ContentStore
+
+VIDEO_ID = "dQw4w9WgXcQ"
+URL = f"https://youtu.be/{VIDEO_ID}"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(tmp_path / "store")
+
+
+def make_output(directory, name="Clip.mp3", data=b"audio bytes"):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(data)
+    return path
+
+
+def test_add_lookup_and_deliver_as_hardlinks(store, tmp_path):
+    """One copy of the data serves every directory it is delivered to"""
+    original = make_output(tmp_path / "music")
+    checksum = file_digest(original)
+    store.add(original, VIDEO_ID, "mp3", checksum, "Clip")
+
+    obj = store.lookup(VIDEO_ID, "mp3")
+    assert (obj.name, obj.title, obj.checksum) == ("Clip.mp3", "Clip", checksum)
+    assert obj.path.relative_to(store.objects).parts[0] == "sha256"
+    assert store.lookup(VIDEO_ID, "flac") is None
+
+    dest, method = store.deliver(obj, tmp_path / "elsewhere")
+    assert method == HARDLINK
+    assert os.path.samefile(dest, original) and os.path.samefile(dest, obj.path)
+
+    dest.write_bytes(b"user's own file")
+    assert store.deliver(obj, tmp_path / "elsewhere") == (dest, None)
+    assert dest.read_bytes() == b"user's own file"
+
+
+def test_duplicate_content_is_collapsed(store, tmp_path):
+    """A re-download of stored content is replaced by a link to the stored copy"""
+    first = make_output(tmp_path / "a")
+    second = make_output(tmp_path / "b")
+    checksum = file_digest(first)
+    store.add(first, VIDEO_ID, "mp3", checksum)
+    store.add(second, VIDEO_ID, "mp3", checksum)
+    assert os.path.samefile(first, second)
+
+
+def test_lost_content_is_a_miss(store, tmp_path):
+    """A reference whose content was deleted is dropped"""
+    original = make_output(tmp_path / "a")
+    obj = store.add(original, VIDEO_ID, "mp3", file_digest(original))
+    obj.path.unlink()
+    assert store.lookup(VIDEO_ID, "mp3") is None
+    assert not any(store.refs.rglob("*.json"))
+
+
+def test_copy_fallback_across_filesystems(store, tmp_path, monkeypatch):
+    """Without hardlinks the content is cloned or copied"""
+    original = make_output(tmp_path / "a")
+    obj = store.add(original, VIDEO_ID, "mp3", file_digest(original))
+
+    def cross_device(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(store_module.os, "link", cross_device)
+    dest, method = store.deliver(obj, tmp_path / "other")
+    assert method in (REFLINK, COPY)
+    assert dest.read_bytes() == original.read_bytes()
+    assert not os.path.samefile(dest, original)
+
+
+def test_core_delivers_stored_formats_without_downloading(store, tmp_path):
+    """Requests for stored video/format pairs never reach yt-dlp"""
+    for format_id, name in (("mp3", "Clip.mp3"), ("m4a", "Clip.m4a")):
+        output = make_output(tmp_path / "first", name, name.encode())
+        store.add(output, VIDEO_ID, format_id, file_digest(output), "Clip: live!")
+
+    target = tmp_path / "second"
+    core = DownloadCore(download_dir=target, store=store)
+    events = []
+    result = asyncio.run(core.download_formats(
+        URL, ["mp3", "m4a"], progress_callback=events.append
+    ))
+
+    assert result == (True, "Clip live", None)
+    assert sorted(p.name for p in target.iterdir()) == ["Clip.m4a", "Clip.mp3"]
+    assert [e["status"] for e in events] == ["verified", "verified"]
+    assert events[0]["checksum"] == file_digest(target / "Clip.mp3")
@@ -0,0 +1,140 @@
+"""
+Test streaming downloads straight into ffmpeg
+"""
+import io
+import os
+import sys
+import textwrap
+
+import pytest
+from yt_dlp.networking.common import Response
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.utils import DownloadError
+
+from simple_yt_dlp.download.cancel import CancelToken
+from simple_yt_dlp.download.fanout import Target
+from simple_yt_dlp.download.streaming import StreamingError, can_stream, stream_to_ffmpeg
+from simple_yt_dlp.download.transcode import TranscodeScheduler
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="streaming needs POSIX pipes")
+
+VIDEO = {"format_id": "137", "url": "https://example.invalid/v", "vcodec": "avc1",
+         "acodec": "none", "ext": "mp4"}
+AUDIO = {"format_id": "140", "url": "https://example.invalid/a", "vcodec": "none",
+         "acodec": "mp4a.40.2", "ext": "m4a"}
+
+
+class FakeYDL:
+    """Serves stream bodies for ranged requests; status codes by URL"""
+
+    def __init__(self, bodies, status=None):
+        self.bodies = bodies
+        self.status = status or {}
+        self.ranges = []
+
+    def urlopen(self, request):
+        start, end = request.headers["Range"][len("bytes="):].split("-")
+        self.ranges.append((request.url, int(start), int(end)))
+        if request.url in self.status:
+            raise HTTPError(Response(None, request.url, {}, status=self.status[request.url]))
+        body = self.bodies[request.url][int(start):int(end) + 1]
+        return Response(io.BytesIO(body), request.url, {}, status=206)
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Concatenates pipe inputs into the output; ARGS=path records argv, FAIL=1 exits like
+    a demuxer error"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\n" + textwrap.dedent("""
+        import os, sys
+        args = sys.argv[1:]
+        inputs = [args[i + 1] for i, a in enumerate(args) if a == "-i"]
+        data = b"".join(os.fdopen(int(p[5:]), "rb").read() for p in inputs)
+        if os.environ.get("ARGS"):
+            open(os.environ["ARGS"], "w").write("\\n".join(args))
+        if os.environ.get("FAIL"):
+            sys.exit("pipe:3: Invalid data found when processing input")
+        with open(args[-1], "wb") as f:
+            f.write(data)
+    """))
+    script.chmod(0o755)
+    return str(script)
+
+
+def test_can_stream():
+    assert can_stream("mp4_1080p", [VIDEO, AUDIO])
+    assert can_stream("mp3", [AUDIO])
+    assert not can_stream("webm_best", [VIDEO, AUDIO])
+    assert not can_stream("mp3", [])
+    assert not can_stream("mp3", [{**AUDIO, "protocol": "m3u8_native"}])
+    assert not can_stream("mp3", [{**AUDIO, "fragments": [{"url": "x"}]}])
+    assert not can_stream("mp4_best", [{**VIDEO, "is_live": True}, AUDIO])
+
+
+def test_merge_streams_without_intermediate_files(tmp_path, fake_ffmpeg):
+    bodies = {VIDEO["url"]: os.urandom(300_000), AUDIO["url"]: os.urandom(50_000)}
+    streams = [{**VIDEO, "filesize": 300_000, "downloader_options": {"http_chunk_size": 100_000}},
+               {**AUDIO, "filesize": 50_000}]
+    ydl, events = FakeYDL(bodies), []
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    output = out_dir / "video.mp4"
+
+    result = stream_to_ffmpeg(ydl, fake_ffmpeg, Target("mp4_1080p", streams), output,
+                              CancelToken(), [events.append])
+
+    assert result == output
+    assert output.read_bytes() == bodies[VIDEO["url"]] + bodies[AUDIO["url"]]
+    assert os.listdir(out_dir) == ["video.mp4"]
+    assert [r for r in ydl.ranges if r[0] == VIDEO["url"]] == [
+        (VIDEO["url"], 0, 99_999), (VIDEO["url"], 100_000, 199_999),
+        (VIDEO["url"], 200_000, 299_999)]
+    # One combined progress for both streams, reported under the output name
+    finished = events[-1]
+    assert finished["status"] == "finished" and finished["filename"] == str(output)
+    assert finished["downloaded_bytes"] == finished["total_bytes"] == 350_000
+
+
+def test_unknown_size_reads_until_short_response(tmp_path, fake_ffmpeg):
+    body = os.urandom(25_000)
+    output = tmp_path / "audio.mp3"
+    stream = {**AUDIO, "downloader_options": {"http_chunk_size": 10_000}}
+    stream_to_ffmpeg(FakeYDL({AUDIO["url"]: body}), fake_ffmpeg, Target("mp3", [stream]),
+                     output, CancelToken(), [])
+    assert output.read_bytes() == body
+
+
+def test_ffmpeg_holds_a_transcode_slot(tmp_path, fake_ffmpeg, monkeypatch):
+    args = tmp_path / "args.txt"
+    monkeypatch.setenv("ARGS", str(args))
+    scheduler, active = TranscodeScheduler(threads=2), []
+
+    def hook(d):
+        active.append((d["status"], scheduler.active))
+
+    stream = {**AUDIO, "filesize": 20_000, "downloader_options": {"http_chunk_size": 5_000}}
+    stream_to_ffmpeg(FakeYDL({AUDIO["url"]: os.urandom(20_000)}), fake_ffmpeg,
+                     Target("flac", [stream]), tmp_path / "audio.flac", CancelToken(),
+                     [hook], scheduler=scheduler, preset="small")
+    # Held while the bytes flow through ffmpeg, returned before the output is reported
+    assert set(active) == {("downloading", 1), ("finished", 0)}
+    cmd = args.read_text().splitlines()
+    assert cmd[cmd.index("-threads") + 1] == "1" and "-compression_level" in cmd
+
+
+def test_ffmpeg_failure_raises_streaming_error(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAIL", "1")
+    output = tmp_path / "audio.mp3"
+    with pytest.raises(StreamingError, match="Invalid data"):
+        stream_to_ffmpeg(FakeYDL({AUDIO["url"]: b"x" * 1000}), fake_ffmpeg,
+                         Target("mp3", [{**AUDIO, "filesize": 1000}]), output, CancelToken(), [])
+    assert os.listdir(tmp_path) == ["ffmpeg"]
+
+
+def test_http_error_is_a_download_error(tmp_path, fake_ffmpeg):
+    """A 403 goes through the same retry path as a normal download"""
+    ydl = FakeYDL({}, status={AUDIO["url"]: 403})
+    with pytest.raises(DownloadError, match="403"):
+        stream_to_ffmpeg(ydl, fake_ffmpeg, Target("mp3", [{**AUDIO, "filesize": 1000}]),
+                         tmp_path / "audio.mp3", CancelToken(), [])
@@ -0,0 +1,112 @@
+"""
+Test CPU-aware transcode scheduling
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from yt_dlp.postprocessor.common import PostProcessor
+
+from simple_yt_dlp.download import DownloadCore
+from simple_yt_dlp.download.cancel import CancelToken, JobCancelled
+from simple_yt_dlp.download.fanout import Target, ffmpeg_command
+from simple_yt_dlp.download.transcode import (
+    NICENESS,
+    TranscodeScheduler,
+    encoder_args,
+    lower_priority,
+)
+from simple_yt_dlp.download.ydl import SimpleYoutubeDL
+
+AUDIO = {"format_id": "251", "acodec": "opus", "vcodec": "none"}
+
+
+def test_encoder_presets():
+    assert encoder_args("flac", "fast") == ["-compression_level", "0"]
+    assert encoder_args("flac", "small") == ["-compression_level", "8"]
+    assert encoder_args("wav") == [] and encoder_args("mp4_720p") == []
+
+
+def test_budget_is_shared_and_never_exceeded():
+    scheduler = TranscodeScheduler(threads=4)
+    peak, grants, lock = [0], [], threading.Lock()
+
+    def transcode(max_threads):
+        with scheduler.slot(max_threads) as threads:
+            with lock:
+                grants.append(threads)
+                peak[0] = max(peak[0], scheduler.active)
+            time.sleep(0.05)
+
+    workers = [threading.Thread(target=transcode, args=(1 if n % 2 else None,))
+               for n in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert peak[0] <= 4 and len(grants) == 8 and scheduler.active == 0
+
+
+def test_single_threaded_encoders_run_side_by_side():
+    scheduler = TranscodeScheduler(threads=3)
+    with scheduler.slot(1) as a, scheduler.slot(1) as b, scheduler.slot(1) as c:
+        assert (a, b, c) == (1, 1, 1) and scheduler.active == 3
+    # Alone, a video encode gets the whole budget
+    with scheduler.slot() as threads:
+        assert threads == 3
+
+
+def test_cancel_while_waiting_for_a_slot():
+    scheduler = TranscodeScheduler(threads=1)
+    token = CancelToken()
+    with scheduler.slot():
+        threading.Timer(0.1, token.cancel).start()
+        with pytest.raises(JobCancelled):
+            with scheduler.slot(token=token):
+                pass
+    assert scheduler.active == 0
+
+
+def test_ffmpeg_command_threads_and_preset():
+    cmd = ffmpeg_command("ffmpeg", Target("flac", [AUDIO]), ["in.webm"], "out.flac",
+                         threads=1, preset="small")
+    assert cmd[cmd.index("-c:a") + 1:cmd.index("-c:a") + 4] == ["flac", "-compression_level", "8"]
+    assert cmd[cmd.index("-threads") + 1] == "1"
+    # Stream copy: no encoder preset
+    copy = ffmpeg_command("ffmpeg", Target("opus", [AUDIO]), ["in.webm"], "out.opus")
+    assert "-compression_level" not in copy and "-threads" not in copy
+
+
+class FFmpegExtractAudioPP(PostProcessor):
+    """Stands in for yt-dlp's audio extractor and records its ffmpeg output args"""
+
+    def run(self, info):
+        info["args"] = self._configuration_args("ffmpeg", ["_o"])
+        return [], info
+
+
+def test_postprocessor_gets_preset_and_thread_budget(tmp_path):
+    core = DownloadCore(tmp_path, transcode_preset="fast", transcode_threads=2)
+    opts = core.build_ydl_opts("flac")
+    opts["progress_hooks"] = []
+    with SimpleYoutubeDL(opts) as ydl:
+        info = ydl.run_pp(FFmpegExtractAudioPP(ydl), {})
+        assert info["args"] == ["-compression_level", "0", "-threads", "1"]
+        # The budget is returned and the per-run args are not left behind
+        assert core.transcode_scheduler.active == 0
+        assert ydl.params["postprocessor_args"]["extractaudio+ffmpeg_o"] == [
+            "-compression_level", "0"]
+
+
+@pytest.mark.skipif(not hasattr(os, "getpriority"), reason="POSIX priorities only")
+def test_lower_priority():
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        lower_priority(proc.pid)
+        assert os.getpriority(os.PRIO_PROCESS, proc.pid) >= NICENESS
+    finally:
+        proc.kill()
+        proc.wait()
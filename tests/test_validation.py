@@ -3,9 +3,14 @@ Test validation utilities
 """
 import pytest
 from simple_yt_dlp.utils.validation import (
+    CHANNEL,
+    PLAYLIST,
+    VIDEO,
     validate_youtube_url,
     sanitize_filename,
     is_valid_directory_path,
+    normalize_youtube_url,
+    normalize_youtube_urls,
 )
 
 
@@ -40,6 +45,68 @@ class TestValidateYoutubeUrl:
             assert msg != ""
 
 
+class TestNormalizeYoutubeUrl:
+    """Test canonical ID extraction"""
+
+    def test_video_forms(self):
+        """Every common video URL form maps to the same canonical ID"""
+        forms = [
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=42s",
+            "https://youtu.be/dQw4w9WgXcQ?si=tracking",
+            "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://music.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+            "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ?autoplay=1",
+            "https://www.youtube.com/live/dQw4w9WgXcQ",
+            "  dQw4w9WgXcQ  ",
+        ]
+        for url in forms:
+            item = normalize_youtube_url(url)
+            assert (item.kind, item.id) == (VIDEO, "dQw4w9WgXcQ"), url
+            assert item.url == "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    def test_playlist_context_and_channels(self):
+        """Playlist context is kept on videos; playlists and channels get their own IDs"""
+        playlist = "PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf"
+        item = normalize_youtube_url(f"https://www.youtube.com/watch?v=dQw4w9WgXcQ&list={playlist}")
+        assert (item.kind, item.playlist_id) == (VIDEO, playlist)
+
+        item = normalize_youtube_url(f"https://www.youtube.com/playlist?list={playlist}")
+        assert (item.kind, item.id) == (PLAYLIST, playlist)
+
+        channel = "UCuAXFkgsw1L7xaCfnd5JJOw"
+        assert normalize_youtube_url(f"youtube.com/channel/{channel}/videos").id == channel
+        item = normalize_youtube_url("https://www.youtube.com/@SomeHandle/featured")
+        assert (item.kind, item.url) == (CHANNEL, "https://www.youtube.com/@SomeHandle")
+
+    def test_errors(self):
+        """Unrecognised input is reported instead of raising"""
+        for url in ("", "https://vimeo.com/12345", "https://youtu.be/short",
+                    "https://www.youtube.com/watch?v=", "https://www.youtube.com/feed/trending",
+                    "ftp://youtube.com/watch?v=dQw4w9WgXcQ", "http://[::1"):
+            item = normalize_youtube_url(url)
+            assert not item.ok and item.error, url
+
+    def test_batch_dedup(self):
+        """Batches are deduplicated by ID with per-item errors"""
+        urls = [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "not a url",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&si=x",
+            "https://www.youtube.com/shorts/aaaaaaaaaaa",
+        ] * 1000
+        batch = normalize_youtube_urls(urls)
+        assert batch.urls == [
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=aaaaaaaaaaa",
+        ]
+        assert len(batch.errors) == 1000
+        assert batch.errors[0][0] == 1
+        assert len(batch.duplicates) == 4000 - 1000 - 2
+        assert batch.duplicates[0] == (2, batch.items[0])
+
+
 class TestSanitizeFilename:
     """Test filename sanitization"""
 
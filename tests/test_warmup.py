@@ -0,0 +1,90 @@
+"""
+Test the background warm-up and its readiness signal
+"""
+import asyncio
+import sys
+import threading
+
+from simple_yt_dlp.download import DownloadCore
+from simple_yt_dlp.download.jobs import DONE, JobManager
+from simple_yt_dlp.download.warmup import WarmUp
+
+from .test_daemon import URL, FakeCore, wait_for
+
+
+def test_ready_after_target_runs():
+    """The signal is set once the warm-up has run in the background"""
+    release = threading.Event()
+    calls = []
+
+    def target():
+        release.wait(5)
+        calls.append(threading.current_thread().name)
+
+    warmup = WarmUp(target).start().start()
+    assert not warmup.ready and not warmup.wait(0.05)
+    release.set()
+    assert asyncio.run(warmup.wait_async(5))
+    assert calls == ["warm-up"] and warmup.error is None and warmup.elapsed is not None
+
+
+def test_failure_still_signals_ready():
+    """A failed warm-up must not hold the queue back"""
+    def target():
+        raise RuntimeError("no yt-dlp")
+
+    warmup = WarmUp(target).start()
+    assert warmup.wait(5)
+    assert isinstance(warmup.error, RuntimeError)
+
+
+def test_job_manager_waits_for_warm_up(tmp_path):
+    """Submissions are accepted at once; the first job starts after the warm-up"""
+    release = threading.Event()
+    warmup = WarmUp(lambda: release.wait(5)).start()
+    manager = JobManager(FakeCore(tmp_path), max_concurrent=1, warmup=warmup)
+    events = manager.subscribe()
+    manager.start()
+    try:
+        job = manager.submit(URL, "mp3")
+        wait_for(lambda: any(
+            e.get("message", "").startswith("⏳") for e in list(events.queue)
+        ))
+        assert job.state == "queued"
+        release.set()
+        wait_for(lambda: job.finished)
+    finally:
+        manager.shutdown()
+    assert job.state == DONE
+
+
+def test_job_cancelled_during_warm_up_never_runs(tmp_path):
+    """A cancel that lands while the worker waits for the warm-up is final"""
+    release = threading.Event()
+    warmup = WarmUp(lambda: release.wait(5)).start()
+    manager = JobManager(FakeCore(tmp_path), max_concurrent=1, warmup=warmup)
+    events = manager.subscribe()
+    manager.start()
+    try:
+        job = manager.submit(URL, "mp3")
+        wait_for(lambda: any(
+            e.get("message", "").startswith("⏳") for e in list(events.queue)
+        ))
+        assert manager.cancel(job.id)
+        finished_at = job.finished_at
+        release.set()
+        warmup.wait(5)
+        manager.submit(URL, "mp3")
+        wait_for(lambda: all(j.finished for j in manager.list()))
+    finally:
+        manager.shutdown()
+    states = [e["job"]["state"] for e in list(events.queue)
+              if e["event"] == "job" and e["job"]["id"] == job.id]
+    assert states == ["queued", "cancelled"]
+    assert job.finished_at == finished_at
+
+
+def test_core_warm_up_loads_the_youtube_extractor(tmp_path):
+    """DownloadCore.warm_up imports yt-dlp and the YouTube extractor without any request"""
+    DownloadCore(download_dir=tmp_path).warm_up()
+    assert "yt_dlp.extractor.youtube" in sys.modules
@@ -0,0 +1,115 @@
+"""
+Test the disk write path used by the ranged downloader
+"""
+import os
+import threading
+
+import pytest
+
+from simple_yt_dlp.download.writer import OutputFile, WriteOptions
+
+KIB = 1024
+
+
+class TestOutputFile:
+    """Test preallocation, buffered positional writes and fsync batching"""
+
+    def test_preallocate(self, tmp_path):
+        """Known sizes are allocated up front"""
+        path = tmp_path / "out.bin"
+        with OutputFile(path, 4 * 1024 * KIB):
+            assert path.stat().st_size == 4 * 1024 * KIB
+            if hasattr(os, "posix_fallocate"):
+                assert path.stat().st_blocks * 512 >= 4 * 1024 * KIB
+
+    def test_sparse_preallocate(self, tmp_path):
+        """Sparse mode sets the length without allocating blocks"""
+        path = tmp_path / "out.bin"
+        with OutputFile(path, 4 * 1024 * KIB, WriteOptions(sparse=True)):
+            assert path.stat().st_size == 4 * 1024 * KIB
+            assert path.stat().st_blocks * 512 < 4 * 1024 * KIB
+
+    def test_buffered_writes(self, tmp_path):
+        """Small writes are coalesced into buffer-sized pwrite calls"""
+        path = tmp_path / "out.bin"
+        data = os.urandom(256 * KIB)
+        with OutputFile(path, len(data), WriteOptions(buffer_size=64 * KIB)) as output:
+            writer = output.writer()
+            for i in range(0, len(data), 4 * KIB):
+                writer.write(data[i:i + 4 * KIB])
+            writer.flush()
+            assert output.stats["writes"] == 4
+        assert path.read_bytes() == data
+
+    def test_seek_flushes_discontiguous_data(self, tmp_path):
+        """Seeking away from the buffered run writes it at the right offset"""
+        path = tmp_path / "out.bin"
+        with OutputFile(path, 8) as output:
+            writer = output.writer()
+            writer.write(b"ab")
+            writer.seek(6)
+            writer.write(b"gh")
+            writer.seek(2)
+            writer.write(b"cd")
+            writer.flush()
+        assert path.read_bytes() == b"abcd\0\0gh"
+
+    def test_concurrent_writers(self, tmp_path):
+        """Writers on disjoint ranges can run in parallel"""
+        path = tmp_path / "out.bin"
+        data = os.urandom(1024 * KIB)
+        quarter = len(data) // 4
+
+        with OutputFile(path, len(data), WriteOptions(buffer_size=32 * KIB)) as output:
+            def fill(start):
+                writer = output.writer(start)
+                for i in range(start, start + quarter, 8 * KIB):
+                    writer.write(data[i:i + 8 * KIB])
+                writer.flush()
+
+            threads = [threading.Thread(target=fill, args=(i * quarter,)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert path.read_bytes() == data
+
+    @pytest.mark.parametrize("drop_cache", [False, True])
+    def test_fsync_batching(self, tmp_path, drop_cache):
+        """fsync runs once per fsync_interval bytes, plus once on close"""
+        path = tmp_path / "out.bin"
+        options = WriteOptions(buffer_size=64 * KIB, fsync_interval=256 * KIB,
+                               drop_cache=drop_cache)
+        with OutputFile(path, 1024 * KIB + 1, options) as output:
+            writer = output.writer()
+            for _ in range(16):
+                writer.write(b"\1" * (64 * KIB))
+            writer.write(b"\1")
+            writer.flush()
+        assert output.stats["fsyncs"] == 5
+        assert path.stat().st_size == 1024 * KIB + 1
+
+    def test_fsync_skipped_during_another_sync_is_not_lost(self, tmp_path):
+        """Bytes written while another thread fsyncs are synced later, at the latest on close"""
+        options = WriteOptions(fsync_interval=64 * KIB)
+        output = OutputFile(tmp_path / "out.bin", 128 * KIB, options)
+        with output._sync_lock:
+            output.pwrite(0, b"\1" * (64 * KIB))
+            assert output.stats["fsyncs"] == 0
+        assert output._unsynced == 64 * KIB
+        output.pwrite(64 * KIB, b"\1")
+        assert output.stats["fsyncs"] == 1 and output._unsynced == 0
+
+        output.pwrite(0, b"\2" * KIB)
+        holder = threading.Thread(target=output._sync_lock.acquire)
+        holder.start()
+        holder.join()
+        threading.Timer(0.1, output._sync_lock.release).start()
+        output.close()  # waits for the running fsync, then syncs the rest
+        assert output.stats["fsyncs"] == 2
+
+    def test_fsync_disabled(self, tmp_path):
+        """fsync_interval=0 leaves writeback to the kernel"""
+        with OutputFile(tmp_path / "out.bin", options=WriteOptions(fsync_interval=0)) as output:
+            output.pwrite(0, b"x" * KIB)
+        assert output.stats["fsyncs"] == 0